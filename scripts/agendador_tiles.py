@@ -0,0 +1,222 @@
+# Agendador Paralelo de Tiles
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script distribui tarefas de processamento de rasters (tiles ou tipos de
+# estrutura) entre processos, entregando os arrays aos trabalhadores por memória
+# compartilhada em vez de serializá-los a cada tarefa.
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+from instrumentacao import etapa, drenar_eventos, incorporar_eventos, reiniciar_no_trabalhador
+
+# Estado de cada processo trabalhador, preenchido pelo inicializador do pool
+_ARENA_TRABALHADOR = None
+_FUNCAO_TRABALHADOR = None
+_PARAMETROS_TRABALHADOR = None
+
+
+class ArenaCompartilhada:
+    """
+    Conjunto de arrays nomeados alocados em blocos de memória compartilhada.
+
+    O processo principal cria a arena e envia aos trabalhadores apenas os
+    descritores (nome do bloco, forma e tipo); cada trabalhador anexa os mesmos
+    blocos e lê ou escreve os arrays sem cópias.
+    """
+
+    def __init__(self):
+        self._blocos = {}
+        self.arrays = {}
+
+    def criar(self, nome, forma, dtype):
+        """
+        Aloca um array zerado na arena.
+
+        Args:
+            nome (str): Nome do array na arena
+            forma (tuple): Dimensões do array
+            dtype: Tipo de dado do array
+
+        Returns:
+            numpy.ndarray: Array apoiado na memória compartilhada
+        """
+        dtype = np.dtype(dtype)
+        tamanho = max(int(np.prod(forma)) * dtype.itemsize, 1)
+        bloco = shared_memory.SharedMemory(create=True, size=tamanho)
+        array = np.ndarray(forma, dtype=dtype, buffer=bloco.buf)
+        array.fill(0)
+        self._blocos[nome] = bloco
+        self.arrays[nome] = array
+        return array
+
+    def copiar(self, nome, array):
+        """
+        Copia um array existente para a arena.
+
+        Args:
+            nome (str): Nome do array na arena
+            array (numpy.ndarray): Array de origem
+
+        Returns:
+            numpy.ndarray: Cópia apoiada na memória compartilhada
+        """
+        destino = self.criar(nome, array.shape, array.dtype)
+        destino[...] = array
+        return destino
+
+    def descritores(self):
+        """
+        Descreve os arrays da arena de forma leve para envio aos trabalhadores.
+
+        Returns:
+            dict: nome -> (nome do bloco, forma, tipo)
+        """
+        return {
+            nome: (self._blocos[nome].name, array.shape, array.dtype.str)
+            for nome, array in self.arrays.items()
+        }
+
+    @staticmethod
+    def anexar(descritores):
+        """
+        Anexa, em um trabalhador, os blocos descritos pelo processo principal.
+
+        Args:
+            descritores (dict): Resultado de ArenaCompartilhada.descritores
+
+        Returns:
+            ArenaCompartilhada: Arena que apenas referencia os blocos existentes
+        """
+        arena = ArenaCompartilhada()
+        for nome, (nome_bloco, forma, dtype) in descritores.items():
+            bloco = shared_memory.SharedMemory(name=nome_bloco)
+            arena._blocos[nome] = bloco
+            arena.arrays[nome] = np.ndarray(forma, dtype=np.dtype(dtype), buffer=bloco.buf)
+        return arena
+
+    def fechar(self):
+        """
+        Desanexa os blocos deste processo sem liberá-los.
+        """
+        self.arrays = {}
+        for bloco in self._blocos.values():
+            bloco.close()
+
+    def liberar(self):
+        """
+        Desanexa e libera todos os blocos (apenas no processo que os criou).
+        """
+        blocos = list(self._blocos.values())
+        self.fechar()
+        for bloco in blocos:
+            bloco.unlink()
+        self._blocos = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.liberar()
+
+
+def _inicializar_trabalhador(descritores, funcao, parametros):
+    """
+    Anexa a arena e guarda a função de trabalho em cada processo do pool.
+    """
+    global _ARENA_TRABALHADOR, _FUNCAO_TRABALHADOR, _PARAMETROS_TRABALHADOR
+    _ARENA_TRABALHADOR = ArenaCompartilhada.anexar(descritores)
+    _FUNCAO_TRABALHADOR = funcao
+    _PARAMETROS_TRABALHADOR = parametros
+    reiniciar_no_trabalhador()
+
+
+def _executar_tarefa(tarefa):
+    """
+    Executa uma tarefa no trabalhador com os arrays da arena anexada.
+
+    Returns:
+        tuple: (resultado, eventos de instrumentação registrados pela tarefa)
+    """
+    with etapa(_FUNCAO_TRABALHADOR.__name__, tarefa=tarefa):
+        resultado = _FUNCAO_TRABALHADOR(_ARENA_TRABALHADOR.arrays, tarefa, _PARAMETROS_TRABALHADOR)
+    return resultado, drenar_eventos()
+
+
+def numero_processos(n_processos=None):
+    """
+    Resolve o número de processos a usar.
+
+    Args:
+        n_processos (int, opcional): Número pedido; se omitido, usa todos os núcleos
+
+    Returns:
+        int: Número de processos (pelo menos 1)
+    """
+    if n_processos is None:
+        n_processos = os.cpu_count() or 1
+    return max(1, int(n_processos))
+
+
+def mapear_com_arena(funcao, arena, tarefas, n_processos=None, parametros=None,
+                     processo_por_tarefa=False):
+    """
+    Aplica uma função a cada tarefa em um pool de processos que compartilha a arena.
+
+    A função deve estar definida no nível de módulo e ter a assinatura
+    funcao(arrays, tarefa, parametros), onde arrays é o dicionário de arrays da
+    arena. As tarefas e os resultados devem ser pequenos (índices, tiles,
+    contagens): os dados volumosos trafegam apenas pela memória compartilhada.
+    Com a instrumentação ativa, cada tarefa é uma etapa da linha do tempo, e as
+    etapas registradas nos trabalhadores voltam ao processo principal.
+
+    Args:
+        funcao (callable): Função de trabalho
+        arena (ArenaCompartilhada): Arena com os arrays de entrada e saída
+        tarefas (iterable): Descrições das tarefas
+        n_processos (int, opcional): Número de processos; 1 executa no próprio processo
+        parametros (dict, opcional): Parâmetros constantes enviados uma vez por trabalhador
+        processo_por_tarefa (bool): Executar cada tarefa em um processo novo (iniciado
+            por spawn), mesmo com n_processos=1, para que medidas por processo, como o
+            pico de RSS, não herdem a memória liberada por tarefas anteriores
+
+    Returns:
+        list: Resultados na mesma ordem das tarefas
+    """
+    tarefas = list(tarefas)
+    n_processos = min(numero_processos(n_processos), max(len(tarefas), 1))
+
+    if processo_por_tarefa:
+        contexto = multiprocessing.get_context('spawn')
+        with contexto.Pool(n_processos, initializer=_inicializar_trabalhador,
+                           initargs=(arena.descritores(), funcao, parametros),
+                           maxtasksperchild=1) as pool:
+            resultados = []
+            for resultado, eventos in pool.map(_executar_tarefa, tarefas, chunksize=1):
+                incorporar_eventos(eventos)
+                resultados.append(resultado)
+            return resultados
+
+    if n_processos == 1:
+        resultados = []
+        for tarefa in tarefas:
+            with etapa(funcao.__name__, tarefa=tarefa):
+                resultados.append(funcao(arena.arrays, tarefa, parametros))
+        return resultados
+
+    # Tarefas em blocos reduzem a comunicação entre processos
+    tamanho_bloco = max(1, len(tarefas) // (4 * n_processos))
+    with ProcessPoolExecutor(
+        max_workers=n_processos,
+        initializer=_inicializar_trabalhador,
+        initargs=(arena.descritores(), funcao, parametros),
+    ) as executor:
+        resultados = []
+        for resultado, eventos in executor.map(_executar_tarefa, tarefas, chunksize=tamanho_bloco):
+            # Os trabalhadores devolvem as etapas registradas junto com o resultado
+            incorporar_eventos(eventos)
+            resultados.append(resultado)
+        return resultados
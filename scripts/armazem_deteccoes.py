@@ -0,0 +1,512 @@
+# Armazém de Detecções com Índice Espacial
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script reúne os candidatos detectados em tiles sobrepostos de um
+# levantamento regional, remove as detecções repetidas da mesma estrutura por supressão
+# de não máximos (NMS) ordenada por escore e responde consultas por caixa e por raio. As
+# caixas são indexadas em uma grade uniforme esparsa, então apenas caixas que dividem uma
+# célula são comparadas: milhões de candidatos são tratados em segundos, sem comparar
+# todos os pares.
+
+import os
+import time
+import numpy as np
+
+from detector_formas import CLASSE_GEOGLIFO
+
+# Diretório para salvar resultados
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'deteccoes')
+
+# Detecções armazenadas: caixa envolvente em pixels do raster, escore, classe e tile de origem
+DTYPE_DETECCOES = np.dtype([
+    ('y0', np.float64),
+    ('x0', np.float64),
+    ('y1', np.float64),
+    ('x1', np.float64),
+    ('escore', np.float32),
+    ('classe', np.uint8),
+    ('tile', np.int32),
+])
+
+# Lado padrão das células da grade, em múltiplos do lado mediano das caixas
+CELULAS_POR_CAIXA = 2.0
+
+
+def criar_deteccoes(y0, x0, y1, x1, escore, classe=0, tile=-1):
+    """
+    Monta uma tabela de detecções a partir de colunas.
+
+    Returns:
+        numpy.ndarray: Tabela com DTYPE_DETECCOES
+    """
+    y0 = np.asarray(y0)
+    deteccoes = np.zeros(len(y0), dtype=DTYPE_DETECCOES)
+    deteccoes['y0'] = y0
+    deteccoes['x0'] = x0
+    deteccoes['y1'] = y1
+    deteccoes['x1'] = x1
+    deteccoes['escore'] = escore
+    deteccoes['classe'] = classe
+    deteccoes['tile'] = tile
+    return deteccoes
+
+
+def deteccoes_de_candidatos(candidatos, origem=(0, 0), tile=-1):
+    """
+    Converte os candidatos de detector_formas de um tile em detecções do raster.
+
+    A caixa de um anel é o quadrado circunscrito; a de uma moldura quadrada
+    girada cobre os cantos da moldura.
+
+    Args:
+        candidatos (numpy.ndarray): Candidatos com DTYPE_CANDIDATOS
+        origem (tuple): Posição (linha, coluna) do tile no raster
+        tile (int): Identificador do tile de origem
+
+    Returns:
+        numpy.ndarray: Tabela com DTYPE_DETECCOES
+    """
+    raio = candidatos['raio'].astype(np.float64)
+    orientacao = candidatos['orientacao'].astype(np.float64)
+    quadrado = candidatos['classe'] == CLASSE_GEOGLIFO
+    meio = np.where(quadrado, raio * (np.abs(np.cos(orientacao)) + np.abs(np.sin(orientacao))), raio)
+    y = candidatos['y'] + float(origem[0])
+    x = candidatos['x'] + float(origem[1])
+    return criar_deteccoes(y - meio, x - meio, y + meio + 1, x + meio + 1,
+                           candidatos['escore'], candidatos['classe'], tile)
+
+
+def deteccoes_de_propriedades(tabela, campo_escore='circularidade', tile=-1):
+    """
+    Converte uma tabela de propriedades de regiões em detecções (caixa envolvente).
+
+    Args:
+        tabela (numpy.ndarray): Tabela com DTYPE_PROPRIEDADES (coordenadas do raster)
+        campo_escore (str): Coluna usada como escore da supressão
+        tile (int): Identificador do tile de origem
+
+    Returns:
+        numpy.ndarray: Tabela com DTYPE_DETECCOES
+    """
+    return criar_deteccoes(tabela['y0'], tabela['x0'], tabela['y1'], tabela['x1'],
+                           tabela[campo_escore], 0, tile)
+
+
+def _faixas(inicios, fins):
+    """
+    Concatena os intervalos [inicio, fim) de cada par, sem laço em Python.
+    """
+    tamanhos = fins - inicios
+    total = int(tamanhos.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    deslocamentos = np.repeat(inicios - np.cumsum(tamanhos) + tamanhos, tamanhos)
+    return np.arange(total, dtype=np.int64) + deslocamentos
+
+
+class IndiceGrade:
+    """
+    Índice espacial de caixas em uma grade uniforme esparsa.
+
+    Cada caixa é registrada em todas as células que toca; as entradas ficam
+    ordenadas por célula (formato CSR), e apenas as células ocupadas existem,
+    então a memória é proporcional ao número de caixas, não à área coberta.
+    Com células do tamanho de duas caixas típicas, cada caixa ocupa até
+    quatro células e as consultas examinam poucas caixas além das respostas.
+    """
+
+    def __init__(self, y0, x0, y1, x1, tamanho_celula=None):
+        """
+        Args:
+            y0, x0, y1, x1 (numpy.ndarray): Caixas (y1 e x1 exclusivos)
+            tamanho_celula (float, opcional): Lado das células; padrão:
+                CELULAS_POR_CAIXA vezes o maior lado mediano das caixas
+        """
+        self.y0, self.x0 = np.asarray(y0, np.float64), np.asarray(x0, np.float64)
+        self.y1, self.x1 = np.asarray(y1, np.float64), np.asarray(x1, np.float64)
+        if tamanho_celula is None:
+            if len(self.y0):
+                lado = max(np.median(self.y1 - self.y0), np.median(self.x1 - self.x0))
+            else:
+                lado = 1.0
+            tamanho_celula = CELULAS_POR_CAIXA * max(float(lado), 1e-9)
+        self.tamanho_celula = float(tamanho_celula)
+
+        if len(self.y0):
+            self.origem = (float(self.y0.min()), float(self.x0.min()))
+            cy1 = self._celula(self.y1.max(), 0)
+            self.colunas_grade = int(self._celula(self.x1.max(), 1)) + 1
+            self.linhas_grade = int(cy1) + 1
+        else:
+            self.origem = (0.0, 0.0)
+            self.colunas_grade = self.linhas_grade = 1
+
+        # Células tocadas por cada caixa (o fim exclusivo não ocupa a célula seguinte)
+        cy0, cx0 = self._celula(self.y0, 0), self._celula(self.x0, 1)
+        cy1 = np.maximum(self._celula(np.nextafter(self.y1, -np.inf), 0), cy0)
+        cx1 = np.maximum(self._celula(np.nextafter(self.x1, -np.inf), 1), cx0)
+        altura, largura = cy1 - cy0 + 1, cx1 - cx0 + 1
+        n_celulas = altura * largura
+        caixa = np.repeat(np.arange(len(self.y0), dtype=np.int64), n_celulas)
+        posicao = _faixas(np.zeros_like(n_celulas), n_celulas)
+        linha = cy0[caixa] + posicao // largura[caixa]
+        coluna = cx0[caixa] + posicao % largura[caixa]
+
+        chaves = linha * self.colunas_grade + coluna
+        ordem = np.argsort(chaves, kind='stable')
+        self.chaves = chaves[ordem]
+        self.caixas = caixa[ordem]
+        self.chaves_ocupadas, self.inicios = np.unique(self.chaves, return_index=True)
+        self.fins = np.append(self.inicios[1:], len(self.chaves))[:len(self.inicios)]
+
+    def _celula(self, valor, eixo):
+        return np.floor((np.asarray(valor) - self.origem[eixo]) / self.tamanho_celula).astype(np.int64)
+
+    def consultar_caixa(self, y0, x0, y1, x1):
+        """
+        Retorna os índices das caixas que intersectam a caixa de consulta.
+
+        Args:
+            y0, x0, y1, x1 (float): Caixa de consulta (y1 e x1 exclusivos)
+
+        Returns:
+            numpy.ndarray: Índices em ordem crescente
+        """
+        cy0 = max(int(self._celula(y0, 0)), 0)
+        cx0 = max(int(self._celula(x0, 1)), 0)
+        cy1 = min(int(self._celula(np.nextafter(y1, -np.inf), 0)), self.linhas_grade - 1)
+        cx1 = min(int(self._celula(np.nextafter(x1, -np.inf), 1)), self.colunas_grade - 1)
+        if cy1 < cy0 or cx1 < cx0 or len(self.chaves) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        if (cy1 - cy0 + 1) * (cx1 - cx0 + 1) > len(self.chaves_ocupadas):
+            # Consulta maior que a parte ocupada da grade: filtrar as células ocupadas
+            linhas, colunas = np.divmod(self.chaves_ocupadas, self.colunas_grade)
+            dentro = (linhas >= cy0) & (linhas <= cy1) & (colunas >= cx0) & (colunas <= cx1)
+            inicios, fins = self.inicios[dentro], self.fins[dentro]
+        else:
+            linhas = np.arange(cy0, cy1 + 1)[:, None]
+            chaves = (linhas * self.colunas_grade + np.arange(cx0, cx1 + 1)[None, :]).ravel()
+            posicoes = np.minimum(np.searchsorted(self.chaves_ocupadas, chaves),
+                                  len(self.chaves_ocupadas) - 1)
+            posicoes = posicoes[self.chaves_ocupadas[posicoes] == chaves]
+            inicios, fins = self.inicios[posicoes], self.fins[posicoes]
+
+        candidatas = np.unique(self.caixas[_faixas(inicios, fins)])
+        intersecta = ((self.y0[candidatas] < y1) & (self.y1[candidatas] > y0) &
+                      (self.x0[candidatas] < x1) & (self.x1[candidatas] > x0))
+        return candidatas[intersecta]
+
+    def pares_sobrepostos(self):
+        """
+        Retorna todos os pares de caixas que se intersectam, cada par uma única vez.
+
+        Os pares são formados dentro de cada célula; um par que divide várias
+        células é contado apenas na célula que contém o canto superior esquerdo
+        da interseção (que está dentro das duas caixas).
+
+        Returns:
+            tuple: (a, b) arrays de índices, com a < b
+        """
+        # Todos os pares (i, j), i < j, dentro de cada célula
+        n = len(self.chaves)
+        fim_da_celula = np.repeat(self.fins, self.fins - self.inicios)
+        n_pares = fim_da_celula - np.arange(n) - 1
+        primeiro = np.repeat(np.arange(n, dtype=np.int64), n_pares)
+        segundo = primeiro + 1 + _faixas(np.zeros(n, dtype=np.int64), n_pares)
+        a, b = self.caixas[primeiro], self.caixas[segundo]
+        chave = self.chaves[primeiro]
+        del primeiro, segundo
+
+        intersecta = ((self.y0[a] < self.y1[b]) & (self.y0[b] < self.y1[a]) &
+                      (self.x0[a] < self.x1[b]) & (self.x0[b] < self.x1[a]))
+        a, b, chave = a[intersecta], b[intersecta], chave[intersecta]
+        referencia = (self._celula(np.maximum(self.y0[a], self.y0[b]), 0) * self.colunas_grade +
+                      self._celula(np.maximum(self.x0[a], self.x0[b]), 1))
+        unico = referencia == chave
+        a, b = a[unico], b[unico]
+        return np.minimum(a, b), np.maximum(a, b)
+
+
+def suprimir_nao_maximos(deteccoes, limiar_iou=0.5, por_classe=False, indice=None):
+    """
+    Supressão de não máximos gulosa, ordenada por escore, sobre todas as detecções.
+
+    O resultado é exatamente o do algoritmo guloso clássico (manter a detecção
+    de maior escore e suprimir as que a sobrepõem além do limiar, repetidamente),
+    mas resolvido em rodadas vetorizadas sobre os pares sobrepostos do índice:
+    a cada rodada são mantidas as detecções cujas vizinhas de escore maior já
+    foram todas suprimidas, e suprimidas as vizinhas de escore menor das
+    mantidas. Empates de escore são decididos pela ordem na tabela.
+
+    Args:
+        deteccoes (numpy.ndarray): Tabela com DTYPE_DETECCOES
+        limiar_iou (float): Interseção sobre união acima da qual uma detecção é suprimida
+        por_classe (bool): Suprimir apenas detecções da mesma classe
+        indice (IndiceGrade, opcional): Índice já construído sobre as detecções
+
+    Returns:
+        numpy.ndarray: Índices das detecções mantidas, por escore decrescente
+    """
+    n = len(deteccoes)
+    if indice is None:
+        indice = IndiceGrade(deteccoes['y0'], deteccoes['x0'], deteccoes['y1'], deteccoes['x1'])
+    a, b = indice.pares_sobrepostos()
+
+    # Interseção sobre união de cada par sobreposto
+    y0, x0, y1, x1 = indice.y0, indice.x0, indice.y1, indice.x1
+    intersecao = ((np.minimum(y1[a], y1[b]) - np.maximum(y0[a], y0[b])) *
+                  (np.minimum(x1[a], x1[b]) - np.maximum(x0[a], x0[b])))
+    area = (y1 - y0) * (x1 - x0)
+    suprime = intersecao > limiar_iou * (area[a] + area[b] - intersecao)
+    if por_classe:
+        suprime &= deteccoes['classe'][a] == deteccoes['classe'][b]
+    a, b = a[suprime], b[suprime]
+
+    # Orientar cada aresta da detecção de maior escore (posição menor) para a de menor
+    ordem = np.argsort(-deteccoes['escore'], kind='stable')
+    posicao = np.empty(n, dtype=np.int64)
+    posicao[ordem] = np.arange(n)
+    troca = posicao[a] > posicao[b]
+    alta, baixa = np.where(troca, b, a), np.where(troca, a, b)
+
+    # 0 = indecisa, 1 = mantida, 2 = suprimida
+    estado = np.zeros(n, dtype=np.uint8)
+    while True:
+        bloqueada = np.zeros(n, dtype=bool)
+        bloqueada[baixa[estado[alta] == 0]] = True
+        mantidas = (estado == 0) & ~bloqueada
+        if not mantidas.any():
+            break
+        estado[mantidas] = 1
+        estado[baixa[estado[alta] == 1]] = 2
+        # Arestas entre detecções já decididas não influenciam as próximas rodadas
+        restantes = estado[baixa] == 0
+        alta, baixa = alta[restantes], baixa[restantes]
+
+    mantidas = np.flatnonzero(estado == 1)
+    return mantidas[np.argsort(posicao[mantidas])]
+
+
+def suprimir_nao_maximos_ingenuo(deteccoes, limiar_iou=0.5, por_classe=False):
+    """
+    Supressão de não máximos por comparação com todas as mantidas (referência, O(n²)).
+
+    Returns:
+        numpy.ndarray: Índices das detecções mantidas, por escore decrescente
+    """
+    area = (deteccoes['y1'] - deteccoes['y0']) * (deteccoes['x1'] - deteccoes['x0'])
+    mantidas = []
+    for i in np.argsort(-deteccoes['escore'], kind='stable'):
+        if mantidas:
+            m = np.array(mantidas)
+            altura = np.minimum(deteccoes['y1'][m], deteccoes['y1'][i]) - np.maximum(deteccoes['y0'][m], deteccoes['y0'][i])
+            largura = np.minimum(deteccoes['x1'][m], deteccoes['x1'][i]) - np.maximum(deteccoes['x0'][m], deteccoes['x0'][i])
+            intersecao = np.clip(altura, 0, None) * np.clip(largura, 0, None)
+            sobrepoe = intersecao > limiar_iou * (area[m] + area[i] - intersecao)
+            if por_classe:
+                sobrepoe &= deteccoes['classe'][m] == deteccoes['classe'][i]
+            if sobrepoe.any():
+                continue
+        mantidas.append(i)
+    return np.array(mantidas, dtype=np.int64)
+
+
+class ArmazemDeteccoes:
+    """
+    Detecções de um levantamento, com índice espacial e supressão de não máximos.
+
+    Os lotes de cada tile são acumulados com adicionar; a tabela e o índice são
+    montados sob demanda e refeitos apenas quando novos lotes chegam.
+    """
+
+    def __init__(self, deteccoes=None, tamanho_celula=None):
+        """
+        Args:
+            deteccoes (numpy.ndarray, opcional): Tabela inicial com DTYPE_DETECCOES
+            tamanho_celula (float, opcional): Lado das células do índice (ver IndiceGrade)
+        """
+        self.tamanho_celula = tamanho_celula
+        self._lotes = [] if deteccoes is None else [deteccoes]
+        self._tabela = None
+        self._indice = None
+
+    def adicionar(self, deteccoes):
+        """
+        Acrescenta um lote de detecções (ex.: as de um tile).
+        """
+        self._lotes.append(np.asarray(deteccoes, dtype=DTYPE_DETECCOES))
+        self._tabela = None
+        self._indice = None
+
+    def __len__(self):
+        return sum(len(lote) for lote in self._lotes)
+
+    @property
+    def deteccoes(self):
+        """
+        Tabela com todas as detecções, na ordem em que foram adicionadas.
+        """
+        if self._tabela is None:
+            self._tabela = (np.concatenate(self._lotes) if self._lotes
+                            else np.zeros(0, dtype=DTYPE_DETECCOES))
+            self._lotes = [self._tabela]
+        return self._tabela
+
+    @property
+    def indice(self):
+        """
+        Índice espacial das detecções (construído uma vez por conteúdo).
+        """
+        if self._indice is None:
+            tabela = self.deteccoes
+            self._indice = IndiceGrade(tabela['y0'], tabela['x0'], tabela['y1'], tabela['x1'],
+                                       self.tamanho_celula)
+        return self._indice
+
+    def consultar_caixa(self, y0, x0, y1, x1):
+        """
+        Retorna as detecções cujas caixas intersectam a caixa de consulta.
+        """
+        return self.deteccoes[self.indice.consultar_caixa(y0, x0, y1, x1)]
+
+    def consultar_raio(self, y, x, raio):
+        """
+        Retorna as detecções cujo centro está a até raio pixels de (y, x).
+
+        O centro está dentro da caixa, então basta filtrar as caixas que tocam o
+        quadrado circunscrito ao círculo.
+        """
+        candidatas = self.consultar_caixa(y - raio, x - raio, y + raio, x + raio)
+        dy = (candidatas['y0'] + candidatas['y1']) / 2 - y
+        dx = (candidatas['x0'] + candidatas['x1']) / 2 - x
+        return candidatas[dy * dy + dx * dx <= raio * raio]
+
+    def suprimir_nao_maximos(self, limiar_iou=0.5, por_classe=False):
+        """
+        Remove as detecções repetidas (ver suprimir_nao_maximos).
+
+        Returns:
+            ArmazemDeteccoes: Novo armazém com as detecções mantidas, por escore decrescente
+        """
+        mantidas = suprimir_nao_maximos(self.deteccoes, limiar_iou, por_classe, self.indice)
+        return ArmazemDeteccoes(self.deteccoes[mantidas], self.tamanho_celula)
+
+    def salvar(self, caminho_base):
+        """
+        Salva as detecções (ver propriedades_regioes.salvar_tabela).
+
+        Returns:
+            str: Caminho do arquivo gravado
+        """
+        from propriedades_regioes import salvar_tabela
+        return salvar_tabela(self.deteccoes, caminho_base)
+
+    @classmethod
+    def carregar(cls, caminho, tamanho_celula=None):
+        """
+        Carrega detecções gravadas por salvar.
+        """
+        from propriedades_regioes import carregar_tabela
+        tabela = carregar_tabela(caminho)
+        deteccoes = np.zeros(len(tabela), dtype=DTYPE_DETECCOES)
+        for nome in DTYPE_DETECCOES.names:
+            deteccoes[nome] = tabela[nome]
+        return cls(deteccoes, tamanho_celula)
+
+
+def simular_levantamento_regional(n_estruturas=500000, tamanho=2000000, tamanho_tile=1024,
+                                  sobreposicao=256, semente=42):
+    """
+    Simula os candidatos de uma execução regional em tiles sobrepostos.
+
+    Cada estrutura é reportada por todos os tiles cujas janelas a contêm (até
+    quatro nas faixas de sobreposição), com caixas e escores ligeiramente
+    diferentes em cada tile, e cada tile acrescenta candidatos falsos isolados.
+
+    Args:
+        n_estruturas (int): Número de estruturas verdadeiras
+        tamanho (int): Lado do levantamento em pixels
+        tamanho_tile (int): Passo entre tiles em pixels
+        sobreposicao (int): Sobreposição entre tiles vizinhos em pixels
+        semente (int): Semente do gerador de números aleatórios
+
+    Returns:
+        tuple: (detecções, número de estruturas verdadeiras)
+    """
+    rng = np.random.default_rng(semente)
+    meio = rng.uniform(16, 80, n_estruturas)
+    cy = rng.uniform(0, tamanho, n_estruturas)
+    cx = rng.uniform(0, tamanho, n_estruturas)
+    classe = rng.integers(1, 4, n_estruturas)
+
+    # Tiles (passo tamanho_tile, janela estendida por sobreposicao) que contêm cada estrutura
+    lotes = []
+    for dy in (0, -1):
+        for dx in (0, -1):
+            ty = np.floor(cy / tamanho_tile).astype(np.int64) + dy
+            tx = np.floor(cx / tamanho_tile).astype(np.int64) + dx
+            contido = ((ty >= 0) & (tx >= 0) &
+                       (cy - meio >= ty * tamanho_tile) & (cy + meio <= (ty + 1) * tamanho_tile + sobreposicao) &
+                       (cx - meio >= tx * tamanho_tile) & (cx + meio <= (tx + 1) * tamanho_tile + sobreposicao))
+            if dy == 0 and dx == 0:
+                contido[:] = True
+            i = np.flatnonzero(contido)
+            ruido = rng.normal(0, 1.5, (len(i), 2))
+            escala = meio[i] * rng.uniform(0.95, 1.05, len(i))
+            lotes.append(criar_deteccoes(cy[i] + ruido[:, 0] - escala, cx[i] + ruido[:, 1] - escala,
+                                         cy[i] + ruido[:, 0] + escala, cx[i] + ruido[:, 1] + escala,
+                                         rng.uniform(0.3, 1.0, len(i)), classe[i],
+                                         ty[i] * (tamanho // tamanho_tile + 1) + tx[i]))
+
+    # Candidatos falsos isolados
+    n_falsos = n_estruturas // 2
+    meio = rng.uniform(8, 40, n_falsos)
+    y, x = rng.uniform(0, tamanho, n_falsos), rng.uniform(0, tamanho, n_falsos)
+    lotes.append(criar_deteccoes(y - meio, x - meio, y + meio, x + meio,
+                                 rng.uniform(0.25, 0.5, n_falsos), rng.integers(1, 4, n_falsos)))
+    deteccoes = np.concatenate(lotes)
+    return deteccoes[rng.permutation(len(deteccoes))], n_estruturas
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    from deteccao_sitios import criar_diretorio_se_nao_existir
+
+    print("Simulando candidatos de uma execução regional em tiles sobrepostos...")
+    criar_diretorio_se_nao_existir(RESULTS_DIR)
+
+    # Conferir a supressão vetorizada com a referência O(n²) em um recorte pequeno
+    deteccoes, _ = simular_levantamento_regional(n_estruturas=3000, tamanho=60000)
+    for por_classe in (False, True):
+        rapida = suprimir_nao_maximos(deteccoes, por_classe=por_classe)
+        ingenua = suprimir_nao_maximos_ingenuo(deteccoes, por_classe=por_classe)
+        if not np.array_equal(rapida, ingenua):
+            raise RuntimeError("A supressão vetorizada diverge da referência")
+    print(f"  Supressão conferida com a referência O(n²) em {len(deteccoes)} candidatos")
+
+    deteccoes, n_estruturas = simular_levantamento_regional()
+    armazem = ArmazemDeteccoes(deteccoes)
+    inicio = time.time()
+    armazem.indice
+    tempo_indice = time.time() - inicio
+    inicio = time.time()
+    unicas = armazem.suprimir_nao_maximos(limiar_iou=0.5)
+    tempo_nms = time.time() - inicio
+    print(f"  {len(armazem)} candidatos -> {len(unicas)} detecções "
+          f"({n_estruturas} estruturas + {n_estruturas // 2} falsos isolados)")
+    print(f"  Índice em {tempo_indice:.2f} s, supressão em {tempo_nms:.2f} s")
+
+    inicio = time.time()
+    n_consultas = 1000
+    rng = np.random.default_rng(0)
+    encontradas = 0
+    for y, x in rng.uniform(0, 2000000, (n_consultas, 2)):
+        encontradas += len(unicas.consultar_raio(y, x, 5000))
+    print(f"  {n_consultas} consultas por raio de 5000 px em {time.time() - inicio:.2f} s "
+          f"({encontradas / n_consultas:.1f} detecções por consulta)")
+
+    caminho = unicas.salvar(os.path.join(RESULTS_DIR, 'deteccoes_unicas'))
+    print(f"Processamento concluído. Resultados salvos em: {caminho}")
@@ -0,0 +1,192 @@
+# Artefatos Versionados de Modelos
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script grava e carrega os modelos treinados como artefatos versionados
+# em disco. Cada versão guarda os estimadores com joblib (sem compressão, para que os
+# arrays NumPy das árvores sejam lidos por mapeamento em memória) e um arquivo de
+# metadados com as características esperadas, os alvos, a região, as métricas e a
+# impressão digital do treinamento. Um treinamento idêntico ao da última versão não
+# cria uma nova versão.
+
+import os
+import json
+import time
+from datetime import datetime
+
+import joblib
+import sklearn
+
+# Diretório padrão dos artefatos
+MODELOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'modelos')
+
+# Arquivos de cada versão
+ARQUIVO_MODELOS = 'modelos.joblib'
+ARQUIVO_METADADOS = 'metadados.json'
+
+# Tamanho a partir do qual os arrays são mapeados em memória ao carregar; abaixo
+# dele, mapear centenas de arrays pequenos custa mais do que lê-los
+LIMIAR_MAPEAMENTO_MB = 16
+
+
+def _diretorio_versao(diretorio, nome, versao):
+    return os.path.join(diretorio, nome, f'v{versao:04d}')
+
+
+def listar_artefatos(diretorio=MODELOS_DIR):
+    """
+    Lista os nomes dos artefatos que têm pelo menos uma versão.
+
+    Returns:
+        list: Nomes em ordem alfabética
+    """
+    if not os.path.isdir(diretorio):
+        return []
+    return sorted(entrada.name for entrada in os.scandir(diretorio)
+                  if entrada.is_dir() and listar_versoes(entrada.name, diretorio))
+
+
+def listar_versoes(nome, diretorio=MODELOS_DIR):
+    """
+    Lista as versões completas (com metadados gravados) de um artefato.
+
+    Returns:
+        list: Números de versão em ordem crescente
+    """
+    pasta = os.path.join(diretorio, nome)
+    if not os.path.isdir(pasta):
+        return []
+    versoes = []
+    for entrada in os.scandir(pasta):
+        if (entrada.is_dir() and entrada.name.startswith('v') and entrada.name[1:].isdigit()
+                and os.path.exists(os.path.join(entrada.path, ARQUIVO_METADADOS))):
+            versoes.append(int(entrada.name[1:]))
+    return sorted(versoes)
+
+
+def carregar_metadados(nome, versao=None, diretorio=MODELOS_DIR):
+    """
+    Lê os metadados de uma versão (a mais recente se versao for None).
+
+    Returns:
+        dict: Metadados da versão
+
+    Raises:
+        FileNotFoundError: Se o artefato ou a versão não existir
+    """
+    versoes = listar_versoes(nome, diretorio)
+    if not versoes:
+        raise FileNotFoundError(f"Artefato não encontrado: {nome} em {diretorio}")
+    versao = versoes[-1] if versao is None else int(versao)
+    caminho = os.path.join(_diretorio_versao(diretorio, nome, versao), ARQUIVO_METADADOS)
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"Versão {versao} do artefato {nome} não encontrada")
+    with open(caminho) as arquivo:
+        return json.load(arquivo)
+
+
+def salvar_artefato(nome, modelos, caracteristicas, impressao=None, metadados=None, diretorio=MODELOS_DIR):
+    """
+    Grava os estimadores de um modelo como uma nova versão do artefato.
+
+    Args:
+        nome (str): Nome do artefato (ex.: 'coordenadas_rf_amazonia')
+        modelos (dict): Estimador ajustado por alvo (ex.: {'latitude': ..., 'longitude': ...})
+        caracteristicas (list): Nomes das características, na ordem esperada pelos estimadores
+        impressao (str, opcional): Impressão digital do treinamento (ver cache_modelos);
+            se for igual à da última versão, nenhuma versão nova é criada
+        metadados (dict, opcional): Informações extras (região, métricas, ...)
+        diretorio (str): Diretório dos artefatos
+
+    Returns:
+        int: Versão gravada (ou a versão existente com a mesma impressão digital)
+    """
+    versoes = listar_versoes(nome, diretorio)
+    if versoes and impressao is not None:
+        ultima = carregar_metadados(nome, versoes[-1], diretorio)
+        if ultima.get('impressao') == impressao:
+            return versoes[-1]
+
+    # Reservar o número da versão criando o seu diretório (os.mkdir é atômico):
+    # se outro processo já o criou, tentar o número seguinte
+    os.makedirs(os.path.join(diretorio, nome), exist_ok=True)
+    versao = (versoes[-1] if versoes else 0) + 1
+    while True:
+        destino = _diretorio_versao(diretorio, nome, versao)
+        try:
+            os.mkdir(destino)
+            break
+        except FileExistsError:
+            versao += 1
+    # Sem compressão: os arrays NumPy ficam contíguos no arquivo e podem ser mapeados
+    joblib.dump(dict(modelos), os.path.join(destino, ARQUIVO_MODELOS))
+    descricao = {
+        'nome': nome,
+        'versao': versao,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'alvos': list(modelos),
+        'caracteristicas': [str(coluna) for coluna in caracteristicas],
+        'estimadores': {alvo: type(modelo).__name__ for alvo, modelo in modelos.items()},
+        'impressao': impressao,
+        'sklearn': sklearn.__version__,
+    }
+    descricao.update(metadados or {})
+    # Os metadados são gravados por último e renomeados: a versão só aparece em
+    # listar_versoes quando está completa
+    temporario = os.path.join(destino, f"{ARQUIVO_METADADOS}.{os.getpid()}.tmp")
+    with open(temporario, 'w') as arquivo:
+        json.dump(descricao, arquivo, indent=2, default=float)
+    os.replace(temporario, os.path.join(destino, ARQUIVO_METADADOS))
+    return versao
+
+
+def carregar_artefato(nome, versao=None, diretorio=MODELOS_DIR, mapear=None):
+    """
+    Carrega os estimadores de uma versão (a mais recente se versao for None).
+
+    Args:
+        nome (str): Nome do artefato
+        versao (int, opcional): Versão desejada
+        diretorio (str): Diretório dos artefatos
+        mapear (bool, opcional): Ler os arrays NumPy por mapeamento em memória
+            (mmap_mode='r'); por padrão, apenas arquivos com pelo menos
+            LIMIAR_MAPEAMENTO_MB são mapeados
+
+    Returns:
+        tuple: (dicionário de estimadores por alvo, metadados)
+    """
+    metadados = carregar_metadados(nome, versao, diretorio)
+    caminho = os.path.join(_diretorio_versao(diretorio, nome, metadados['versao']), ARQUIVO_MODELOS)
+    if mapear is None:
+        mapear = os.path.getsize(caminho) >= LIMIAR_MAPEAMENTO_MB * 1024 * 1024
+    modelos = joblib.load(caminho, mmap_mode='r' if mapear else None)
+    return modelos, metadados
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    import sys
+
+    nomes = sys.argv[1:] or listar_artefatos()
+    if not nomes:
+        print(f"Nenhum artefato em {MODELOS_DIR}. Execute previsao_coordenadas_final.py para gerá-los.")
+        sys.exit(0)
+
+    print("Artefatos de modelos disponíveis:")
+    for nome in nomes:
+        versoes = listar_versoes(nome)
+        metadados = carregar_metadados(nome)
+        # Carregar uma vez antes de medir (importações e cache de disco)
+        carregar_artefato(nome)
+        inicio = time.time()
+        carregar_artefato(nome, mapear=True)
+        tempo_mmap = time.time() - inicio
+        inicio = time.time()
+        carregar_artefato(nome, mapear=False)
+        tempo_leitura = time.time() - inicio
+        print(f"  {nome}: versões {versoes}, última de {metadados['data']} "
+              f"({', '.join(f'{alvo}: {estimador}' for alvo, estimador in metadados['estimadores'].items())})")
+        print(f"    Carregamento: {tempo_mmap * 1000:.1f} ms com mapeamento, "
+              f"{tempo_leitura * 1000:.1f} ms com leitura completa")
+    print("Processamento concluído.")
@@ -0,0 +1,165 @@
+# Benchmark dos Modelos de Previsão de Coordenadas
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script compara a configuração atual de previsão de coordenadas (um
+# modelo para latitude e outro para longitude) com os modelos conjuntos (Random Forest
+# de saída dupla e Gradient Boosting encadeado). Para cada número de amostras, mede o
+# tempo de treinamento, o tempo de inferência de um lote de linhas e o erro de
+# distância geodésica no conjunto de teste, e grava os resultados em JSON.
+
+import os
+import json
+import time
+import warnings
+from contextlib import redirect_stdout
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from geodesia import haversine_km
+from previsao_coordenadas_final import (RANDOM_SEED, criar_diretorio_se_nao_existir, gerar_dados_simulados,
+                                        treinar_modelo_gb, treinar_modelo_gb_encadeado,
+                                        treinar_modelo_rf, treinar_modelo_rf_conjunto)
+from regressao_coordenadas import prever_coordenadas
+
+# Diretório para salvar resultados
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'benchmark')
+
+# Configurações comparadas: nome -> (função de treinamento, descrição, configuração de referência)
+CONFIGURACOES = {
+    'rf_separado': (treinar_modelo_rf, 'Random Forest, um modelo por coordenada', None),
+    'rf_conjunto': (treinar_modelo_rf_conjunto, 'Random Forest de saída dupla', 'rf_separado'),
+    'gb_separado': (treinar_modelo_gb, 'Gradient Boosting, um modelo por coordenada', None),
+    'gb_encadeado': (treinar_modelo_gb_encadeado, 'Gradient Boosting encadeado', 'gb_separado'),
+}
+
+# Números de amostras medidos por padrão e linhas do lote de inferência
+AMOSTRAS = (200, 2000, 20000)
+LINHAS_INFERENCIA = 10000
+
+
+def medir_configuracao(treinar, X_train, y_train, X_test, y_test, X_inferencia, repeticoes=3):
+    """
+    Mede o treinamento, a inferência e o erro de uma configuração.
+
+    Args:
+        treinar (callable): Função de treinamento (retorna modelo_lat, modelo_lon)
+        X_train, y_train: Dados de treinamento
+        X_test, y_test: Dados de teste (erro de distância)
+        X_inferencia (pandas.DataFrame): Lote usado para medir a inferência
+        repeticoes (int): Repetições (menor tempo)
+
+    Returns:
+        dict: Tempos em segundos e erros em km
+    """
+    tempos_treino, tempos_inferencia = [], []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        modelo_lat, modelo_lon = treinar(X_train, y_train)
+        tempos_treino.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        prever_coordenadas(modelo_lat, modelo_lon, X_inferencia)
+        tempos_inferencia.append(time.perf_counter() - inicio)
+
+    lat, lon = prever_coordenadas(modelo_lat, modelo_lon, X_test)
+    erros = haversine_km(y_test['latitude'].values, y_test['longitude'].values, lat, lon)
+    return {
+        'treino_s': min(tempos_treino),
+        'inferencia_s': min(tempos_inferencia),
+        'linhas_por_s': len(X_inferencia) / min(tempos_inferencia),
+        'erro_rms_km': float(np.sqrt(np.mean(erros ** 2))),
+        'erro_mediano_km': float(np.median(erros)),
+    }
+
+
+def executar_benchmark(amostras=AMOSTRAS, configuracoes=tuple(CONFIGURACOES), repeticoes=3,
+                       linhas_inferencia=LINHAS_INFERENCIA):
+    """
+    Executa todas as configurações para cada número de amostras.
+
+    Os dados de cada tamanho são gerados uma vez, com semente fixa, e usados
+    por todas as configurações.
+
+    Returns:
+        list: Uma medida por (amostras, configuração)
+    """
+    resultados = []
+    for n_amostras in amostras:
+        np.random.seed(RANDOM_SEED)
+        X, y = gerar_dados_simulados(n_amostras=n_amostras)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=RANDOM_SEED)
+        X_inferencia = X.sample(linhas_inferencia, replace=True, random_state=RANDOM_SEED)
+
+        for nome in configuracoes:
+            treinar, descricao, _ = CONFIGURACOES[nome]
+            medida = medir_configuracao(treinar, X_train, y_train, X_test, y_test, X_inferencia, repeticoes)
+            medida.update({'amostras': n_amostras, 'configuracao': nome, 'descricao': descricao})
+            resultados.append(medida)
+    return resultados
+
+
+def comparar_com_referencia(resultados):
+    """
+    Compara cada modelo conjunto com a configuração de dois modelos correspondente.
+
+    Returns:
+        list: Acelerações de treino e inferência e variação do erro, por tamanho
+    """
+    indice = {(medida['amostras'], medida['configuracao']): medida for medida in resultados}
+    comparacoes = []
+    for (n_amostras, nome), medida in indice.items():
+        referencia = indice.get((n_amostras, CONFIGURACOES[nome][2]))
+        if referencia is None:
+            continue
+        comparacoes.append({
+            'amostras': n_amostras,
+            'configuracao': nome,
+            'referencia': CONFIGURACOES[nome][2],
+            'aceleracao_treino': referencia['treino_s'] / medida['treino_s'],
+            'aceleracao_inferencia': referencia['inferencia_s'] / medida['inferencia_s'],
+            'variacao_erro_km': medida['erro_rms_km'] - referencia['erro_rms_km'],
+        })
+    return comparacoes
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark dos modelos de previsão de coordenadas")
+    parser.add_argument('--amostras', type=int, nargs='+', default=list(AMOSTRAS),
+                        help="Números de amostras simuladas")
+    parser.add_argument('--configuracoes', nargs='+', choices=list(CONFIGURACOES), default=list(CONFIGURACOES),
+                        help="Configurações comparadas")
+    parser.add_argument('--repeticoes', type=int, default=3,
+                        help="Repetições por configuração (menor tempo)")
+    parser.add_argument('--linhas-inferencia', type=int, default=LINHAS_INFERENCIA,
+                        help="Linhas do lote usado para medir a inferência")
+    argumentos = parser.parse_args()
+
+    print("Iniciando benchmark dos modelos de coordenadas...")
+    criar_diretorio_se_nao_existir(RESULTS_DIR)
+    # As funções de treinamento anunciam cada modelo; no benchmark isso só polui a tabela
+    with open(os.devnull, 'w') as nulo, warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        with redirect_stdout(nulo):
+            resultados = executar_benchmark(argumentos.amostras, argumentos.configuracoes,
+                                            argumentos.repeticoes, argumentos.linhas_inferencia)
+    comparacoes = comparar_com_referencia(resultados)
+
+    print(f"{'Amostras':>8}  {'Configuração':<14} {'Treino (s)':>10} {'Inferência (s)':>14} "
+          f"{'Erro RMS (km)':>13} {'Mediana (km)':>12}")
+    for medida in resultados:
+        print(f"{medida['amostras']:>8}  {medida['configuracao']:<14} {medida['treino_s']:>10.3f} "
+              f"{medida['inferencia_s']:>14.3f} {medida['erro_rms_km']:>13.1f} {medida['erro_mediano_km']:>12.1f}")
+    for comparacao in comparacoes:
+        print(f"  {comparacao['amostras']} amostras, {comparacao['configuracao']} vs {comparacao['referencia']}: "
+              f"treino {comparacao['aceleracao_treino']:.2f}x, inferência {comparacao['aceleracao_inferencia']:.2f}x, "
+              f"erro RMS {comparacao['variacao_erro_km']:+.1f} km")
+
+    with open(os.path.join(RESULTS_DIR, 'benchmark_coordenadas.json'), 'w') as arquivo:
+        json.dump({'resultados': resultados, 'comparacoes': comparacoes}, arquivo, indent=2)
+    print(f"Processamento concluído. Resultados salvos em: {RESULTS_DIR}")
@@ -0,0 +1,288 @@
+# Benchmark das Etapas de Detecção
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script mede, para cada tamanho de imagem e tipo de estrutura, o tempo de
+# relógio, o tempo de CPU e o pico de memória residente das etapas da detecção de sítios
+# (geração da imagem simulada, bordas, realce e segmentação). Os resultados são gravados
+# em JSON e comparados com uma linha de base salva anteriormente, de modo que uma
+# regressão em qualquer etapa aparece imediatamente.
+
+import os
+import sys
+import json
+import platform
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from orcamento_memoria import MedidorMemoria
+
+# Diretório para salvar resultados
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'benchmark')
+
+# Linha de base padrão (gravada com --salvar-linha-base)
+LINHA_BASE = os.path.join(RESULTS_DIR, 'linha_base.json')
+
+# Lados das imagens e tipos de estrutura medidos por padrão
+TAMANHOS = (512, 1024, 2048, 4096, 8192, 16384)
+TIPOS = ('geoglifo', 'aldeia_circular', 'vala_circular')
+
+# Etapas medidas, na ordem do pipeline
+ETAPAS = ('geracao', 'bordas', 'realce', 'segmentacao')
+
+# Aumentos relativos acima dos quais uma etapa é considerada uma regressão
+TOLERANCIA_TEMPO = 0.25
+TOLERANCIA_MEMORIA = 0.10
+
+# Diferenças absolutas abaixo destas são ruído de medição, não regressão
+TEMPO_MINIMO_S = 0.05
+MEMORIA_MINIMA_MB = 8.0
+
+# Pico estimado por pixel antes da primeira medida, usado para pular tamanhos
+# que não cabem na memória disponível
+BYTES_POR_PIXEL_ESTIMADO = 128
+
+
+def memoria_disponivel_mb():
+    """
+    Retorna a memória disponível do sistema em megabytes, ou None fora do Linux.
+    """
+    try:
+        with open('/proc/meminfo') as arquivo:
+            for linha in arquivo:
+                if linha.startswith('MemAvailable:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def descrever_ambiente():
+    """
+    Descreve a máquina e as versões das bibliotecas, para contextualizar as medidas.
+
+    Returns:
+        dict: Descrição do ambiente
+    """
+    import scipy
+    import skimage
+    return {
+        'plataforma': platform.platform(),
+        'processador': platform.machine(),
+        'nucleos': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'skimage': skimage.__version__,
+    }
+
+
+def medir_etapas(tamanho, tipo, repeticoes=3, semente=42):
+    """
+    Executa as etapas da detecção sobre uma imagem e mede cada uma.
+
+    Uma execução de aquecimento sobre uma imagem pequena precede as medidas, e
+    cada repetição gera a imagem com a mesma semente. O tempo reportado é o
+    menor entre as repetições (o menos afetado por interferências externas) e o
+    pico de memória é o maior.
+
+    Args:
+        tamanho (int): Lado da imagem simulada
+        tipo (str): Tipo de estrutura simulada
+        repeticoes (int): Número de repetições
+        semente (int): Semente do gerador de números aleatórios
+
+    Returns:
+        dict: Medidas por etapa (tempo_s, cpu_s, pico_mb, bytes_por_pixel)
+    """
+    from deteccao_sitios import (
+        gerar_imagem_lidar_simulada,
+        detectar_bordas,
+        realcar_estruturas,
+        segmentar_estruturas,
+    )
+
+    # Aquecimento: a primeira chamada carrega módulos sob demanda e alocaria
+    # memória que não pertence à etapa
+    imagem = gerar_imagem_lidar_simulada(64, tipo)
+    detectar_bordas(imagem)
+    realcar_estruturas(imagem)
+    segmentar_estruturas(imagem)
+
+    medidas = {}
+    for _ in range(repeticoes):
+        medidor = MedidorMemoria(tamanho * tamanho)
+        np.random.seed(semente)
+        with medidor.etapa('geracao'):
+            imagem = gerar_imagem_lidar_simulada(tamanho, tipo)
+        with medidor.etapa('bordas'):
+            detectar_bordas(imagem)
+        with medidor.etapa('realce'):
+            realcar_estruturas(imagem)
+        with medidor.etapa('segmentacao'):
+            segmentar_estruturas(imagem)
+        del imagem
+
+        for etapa in ETAPAS:
+            medida = dict(medidor.etapas[etapa], bytes_por_pixel=medidor.bytes_por_pixel(etapa))
+            if etapa not in medidas:
+                medidas[etapa] = medida
+                continue
+            anterior = medidas[etapa]
+            for campo in ('tempo_s', 'cpu_s'):
+                anterior[campo] = min(anterior[campo], medida[campo])
+            for campo in ('pico_mb', 'bytes_por_pixel'):
+                anterior[campo] = max(anterior[campo], medida[campo])
+    return medidas
+
+
+def executar_benchmark(tamanhos=TAMANHOS, tipos=TIPOS, repeticoes=3, semente=42):
+    """
+    Mede todas as combinações de tamanho e tipo, cada uma em um processo novo.
+
+    Um processo novo por combinação evita que a memória liberada por uma medida
+    seja reaproveitada pela seguinte e esconda o seu pico. Tamanhos cujo pico
+    estimado (pelo maior pico por pixel já medido) excede a memória disponível
+    são pulados.
+
+    Args:
+        tamanhos (sequence): Lados das imagens, em ordem crescente
+        tipos (sequence): Tipos de estrutura
+        repeticoes (int): Repetições por combinação
+        semente (int): Semente do gerador de números aleatórios
+
+    Returns:
+        dict: {'ambiente': ..., 'medidas': lista de registros por etapa, 'pulados': ...}
+    """
+    medidas = []
+    pulados = []
+    bytes_por_pixel = 0.0
+    for tamanho in sorted(tamanhos):
+        disponivel = memoria_disponivel_mb()
+        estimativa_mb = (bytes_por_pixel or BYTES_POR_PIXEL_ESTIMADO) * tamanho * tamanho / (1024 * 1024)
+        if disponivel is not None and estimativa_mb > disponivel:
+            print(f"  {tamanho}x{tamanho}: pulado (pico estimado de {estimativa_mb:.0f} MB, "
+                  f"{disponivel:.0f} MB disponíveis)")
+            pulados.extend({'tamanho': tamanho, 'tipo': tipo, 'pico_estimado_mb': estimativa_mb}
+                           for tipo in tipos)
+            continue
+
+        for tipo in tipos:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                por_etapa = executor.submit(medir_etapas, tamanho, tipo, repeticoes, semente).result()
+            for etapa in ETAPAS:
+                registro = dict(tamanho=tamanho, tipo=tipo, etapa=etapa, **por_etapa[etapa])
+                medidas.append(registro)
+                print(f"  {tamanho:>6} {tipo:<16} {etapa:<12} {registro['tempo_s']:8.3f} s "
+                      f"(CPU {registro['cpu_s']:8.3f} s) pico de {registro['pico_mb']:8.1f} MB")
+            # Durante cada etapa ficam residentes a imagem (float64) e o pico da etapa
+            bytes_por_pixel = max(bytes_por_pixel, 8 + max(
+                por_etapa[etapa]['bytes_por_pixel'] for etapa in ETAPAS))
+
+    return {'ambiente': descrever_ambiente(), 'medidas': medidas, 'pulados': pulados}
+
+
+def comparar_com_linha_base(resultados, linha_base, tolerancia_tempo=TOLERANCIA_TEMPO,
+                            tolerancia_memoria=TOLERANCIA_MEMORIA):
+    """
+    Compara as medidas com a linha de base, etapa por etapa.
+
+    Uma etapa regride quando o tempo de relógio ou o pico de memória cresce
+    mais que a tolerância relativa e também mais que o limite absoluto de
+    ruído (TEMPO_MINIMO_S, MEMORIA_MINIMA_MB). Combinações ausentes de um dos
+    lados são ignoradas.
+
+    Args:
+        resultados (dict): Resultados de executar_benchmark
+        linha_base (dict): Resultados gravados anteriormente
+        tolerancia_tempo (float): Aumento relativo aceito no tempo
+        tolerancia_memoria (float): Aumento relativo aceito no pico de memória
+
+    Returns:
+        list: Regressões, uma por etapa e grandeza (dicionários)
+    """
+    def indexar(medidas):
+        return {(m['tamanho'], m['tipo'], m['etapa']): m for m in medidas}
+
+    base = indexar(linha_base['medidas'])
+    regressoes = []
+    for chave, atual in indexar(resultados['medidas']).items():
+        anterior = base.get(chave)
+        if anterior is None:
+            continue
+        for campo, tolerancia, minimo in (('tempo_s', tolerancia_tempo, TEMPO_MINIMO_S),
+                                          ('pico_mb', tolerancia_memoria, MEMORIA_MINIMA_MB)):
+            aumento = atual[campo] - anterior[campo]
+            if aumento > minimo and aumento > tolerancia * anterior[campo]:
+                tamanho, tipo, etapa = chave
+                regressoes.append({
+                    'tamanho': tamanho,
+                    'tipo': tipo,
+                    'etapa': etapa,
+                    'grandeza': campo,
+                    'linha_base': anterior[campo],
+                    'atual': atual[campo],
+                    'razao': atual[campo] / max(anterior[campo], 1e-12),
+                })
+    return regressoes
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark das etapas de detecção de sítios")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=list(TAMANHOS),
+                        help="Lados das imagens simuladas")
+    parser.add_argument('--tipos', nargs='+', choices=TIPOS, default=list(TIPOS),
+                        help="Tipos de estrutura")
+    parser.add_argument('--repeticoes', type=int, default=3,
+                        help="Repetições por combinação (menor tempo, maior pico)")
+    parser.add_argument('--linha-base', default=LINHA_BASE,
+                        help="Arquivo JSON da linha de base usada na comparação")
+    parser.add_argument('--salvar-linha-base', action='store_true',
+                        help="Gravar os resultados como nova linha de base")
+    parser.add_argument('--tolerancia-tempo', type=float, default=TOLERANCIA_TEMPO,
+                        help="Aumento relativo de tempo aceito antes de acusar regressão")
+    parser.add_argument('--tolerancia-memoria', type=float, default=TOLERANCIA_MEMORIA,
+                        help="Aumento relativo de pico de memória aceito antes de acusar regressão")
+    argumentos = parser.parse_args()
+
+    from deteccao_sitios import criar_diretorio_se_nao_existir
+
+    print("Iniciando benchmark das etapas de detecção...")
+    criar_diretorio_se_nao_existir(RESULTS_DIR)
+    resultados = executar_benchmark(argumentos.tamanhos, argumentos.tipos, argumentos.repeticoes)
+
+    with open(os.path.join(RESULTS_DIR, 'benchmark_deteccao.json'), 'w') as arquivo:
+        json.dump(resultados, arquivo, indent=2)
+
+    regressoes = []
+    if argumentos.salvar_linha_base:
+        criar_diretorio_se_nao_existir(os.path.dirname(os.path.abspath(argumentos.linha_base)))
+        with open(argumentos.linha_base, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+        print(f"Linha de base salva em: {argumentos.linha_base}")
+    elif os.path.exists(argumentos.linha_base):
+        with open(argumentos.linha_base) as arquivo:
+            linha_base = json.load(arquivo)
+        if linha_base.get('ambiente') != resultados['ambiente']:
+            print("Aviso: a linha de base foi gravada em outro ambiente; diferenças podem não ser regressões")
+        regressoes = comparar_com_linha_base(resultados, linha_base,
+                                             argumentos.tolerancia_tempo,
+                                             argumentos.tolerancia_memoria)
+        if regressoes:
+            print(f"{len(regressoes)} regressões em relação à linha de base:")
+            for regressao in regressoes:
+                print(f"  {regressao['tamanho']:>6} {regressao['tipo']:<16} {regressao['etapa']:<12} "
+                      f"{regressao['grandeza']}: {regressao['linha_base']:.3f} -> "
+                      f"{regressao['atual']:.3f} ({regressao['razao']:.2f}x)")
+        else:
+            print("Nenhuma regressão em relação à linha de base.")
+    else:
+        print(f"Linha de base não encontrada ({argumentos.linha_base}); "
+              "use --salvar-linha-base para gravar uma.")
+
+    print(f"Processamento concluído. Resultados salvos em: {RESULTS_DIR}")
+    sys.exit(1 if regressoes else 0)
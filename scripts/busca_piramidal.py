@@ -0,0 +1,257 @@
+# Busca Piramidal de Estruturas Arqueológicas
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script procura estruturas arqueológicas em levantamentos LIDAR grandes
+# com uma estratégia do grosso para o fino: um detector barato roda sobre níveis
+# reduzidos de uma pirâmide de resolução para encontrar janelas candidatas, e apenas
+# essas janelas passam pela cadeia completa de detecção na resolução original.
+
+import os
+import time
+import numpy as np
+from scipy import ndimage
+
+from deteccao_sitios import criar_diretorio_se_nao_existir
+from espaco_escala import EspacoEscala
+from processamento_tiles import (
+    abrir_raster,
+    planejar_processamento,
+    criar_saidas,
+    executar_tiles,
+    iterar_tiles,
+)
+
+# Diretório para salvar resultados
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'piramide')
+
+
+def reduzir_nivel(nivel, memoria_max_mb=512, destino=None):
+    """
+    Reduz um nível da pirâmide pela metade, pela média de blocos 2x2, faixa a faixa.
+
+    Args:
+        nivel (numpy.ndarray): Nível de origem (possivelmente mapeado em memória)
+        memoria_max_mb (float): Orçamento de memória para cada faixa lida
+        destino (str, opcional): Caminho .npy para gravar o nível reduzido em disco;
+            se omitido, o nível é mantido em memória
+
+    Returns:
+        numpy.ndarray: Nível reduzido, float32
+    """
+    altura, largura = nivel.shape[0] // 2, nivel.shape[1] // 2
+    if destino is None:
+        reduzido = np.empty((altura, largura), dtype=np.float32)
+    else:
+        reduzido = np.lib.format.open_memmap(destino, mode='w+', dtype=np.float32,
+                                             shape=(altura, largura))
+
+    # Faixas com número par de linhas de origem
+    linhas_por_faixa = max(1, int(memoria_max_mb * 1024 * 1024 / (8 * 2 * nivel.shape[1])))
+    for y0 in range(0, altura, linhas_por_faixa):
+        y1 = min(y0 + linhas_por_faixa, altura)
+        faixa = np.asarray(nivel[2 * y0:2 * y1, :2 * largura], dtype=np.float32)
+        reduzido[y0:y1] = faixa.reshape(y1 - y0, 2, largura, 2).mean(axis=(1, 3))
+
+    return reduzido
+
+
+def construir_piramide(raster, n_niveis=3, memoria_max_mb=512, dir_niveis=None):
+    """
+    Constrói os níveis reduzidos de uma pirâmide de resolução.
+
+    Args:
+        raster (numpy.ndarray): Raster em resolução original
+        n_niveis (int): Número de reduções (o nível n tem fator 2**n)
+        memoria_max_mb (float): Orçamento de memória para cada faixa lida
+        dir_niveis (str, opcional): Diretório para gravar os níveis em disco
+
+    Returns:
+        list: Níveis [original, 1/2, 1/4, ...]
+    """
+    niveis = [raster]
+    for n in range(1, n_niveis + 1):
+        destino = None
+        if dir_niveis is not None:
+            destino = os.path.join(dir_niveis, f"nivel_{n}.npy")
+        niveis.append(reduzir_nivel(niveis[-1], memoria_max_mb, destino))
+    return niveis
+
+
+def resposta_grosseira(nivel, raio_estrutura):
+    """
+    Detector barato de estruturas em um nível reduzido.
+
+    Combina a densidade de bordas (magnitude do gradiente integrada na escala da
+    estrutura) com uma resposta de anel/retângulo dada pela diferença entre a
+    média local na escala da estrutura e a média do entorno: anéis, valas e
+    molduras quadradas alteram ambas em relação ao terreno natural.
+
+    Args:
+        nivel (numpy.ndarray): Nível reduzido da pirâmide
+        raio_estrutura (float): Raio típico das estruturas, em pixels do nível
+
+    Returns:
+        numpy.ndarray: Resposta normalizada (escore z robusto), float32
+    """
+    espaco = EspacoEscala(np.asarray(nivel, dtype=np.float32))
+    magnitude = espaco.gradiente(1.0)[2]
+    lado = max(3, int(2 * raio_estrutura) | 1)
+
+    # Densidade de bordas na escala da estrutura
+    densidade = ndimage.uniform_filter(magnitude, size=lado)
+
+    # Contraste entre a estrutura e seu entorno
+    media_local = ndimage.uniform_filter(espaco.imagem, size=lado)
+    media_entorno = ndimage.uniform_filter(espaco.imagem, size=3 * lado)
+    contraste = np.abs(media_local - media_entorno)
+
+    resposta = np.zeros(magnitude.shape, dtype=np.float32)
+    for termo in (densidade, contraste):
+        mediana = np.median(termo)
+        desvio = 1.4826 * np.median(np.abs(termo - mediana)) + np.finfo(np.float32).eps
+        resposta += (termo - mediana) / desvio
+    return resposta
+
+
+def janelas_candidatas(resposta, fator, forma_original, limiar_z=15.0, margem=0):
+    """
+    Converte a resposta grosseira em janelas candidatas na resolução original.
+
+    Pixels acima do limiar são dilatados pela margem e agrupados em componentes
+    conexos; cada componente vira uma janela, de modo que candidatos próximos ou
+    sobrepostos são fundidos em uma única janela.
+
+    Args:
+        resposta (numpy.ndarray): Resposta do detector no nível reduzido
+        fator (int): Fator de redução do nível (2**n)
+        forma_original (tuple): Dimensões do raster original
+        limiar_z (float): Limiar do escore z
+        margem (int): Margem ao redor dos candidatos, em pixels do nível reduzido
+
+    Returns:
+        list: Janelas (y0, y1, x0, x1) em coordenadas da resolução original
+    """
+    mascara = resposta > limiar_z
+    if margem > 0:
+        mascara = ndimage.binary_dilation(mascara, iterations=margem)
+    rotulos, _ = ndimage.label(mascara)
+
+    altura, largura = forma_original
+    janelas = []
+    for fatia_y, fatia_x in ndimage.find_objects(rotulos):
+        janelas.append((
+            fatia_y.start * fator,
+            min(fatia_y.stop * fator, altura),
+            fatia_x.start * fator,
+            min(fatia_x.stop * fator, largura),
+        ))
+    return janelas
+
+
+def buscar_estruturas_piramide(raster, dir_saida, n_niveis=3, raio_estrutura=64,
+                               limiar_z=15.0, memoria_max_mb=512, n_processos=1,
+                               **parametros):
+    """
+    Busca estruturas do grosso para o fino em um raster grande.
+
+    O detector barato roda no nível mais reduzido da pirâmide (1/4**n_niveis dos
+    pixels, o único nível carregado inteiro na memória); apenas as janelas
+    candidatas (com margem do tamanho de uma estrutura) são refinadas com a
+    cadeia completa detectar_bordas/segmentar_rotulos em resolução original.
+    Pixels fora das janelas ficam zerados nas saídas.
+
+    Args:
+        raster (str ou numpy.ndarray): Caminho de um .npy 2D ou array de entrada
+        dir_saida (str): Diretório onde os resultados .npy serão gravados
+        n_niveis (int): Número de reduções da pirâmide
+        raio_estrutura (float): Raio típico das estruturas, em pixels originais
+        limiar_z (float): Limiar do escore z do detector barato
+        memoria_max_mb (float): Orçamento de memória por tile em megabytes
+        n_processos (int, opcional): Processos trabalhadores; None usa todos os núcleos
+        **parametros: Parâmetros repassados a planejar_processamento
+
+    Returns:
+        dict: Caminhos das saídas, janelas refinadas e resumo do processamento
+    """
+    criar_diretorio_se_nao_existir(dir_saida)
+    caminho_raster = raster if isinstance(raster, str) else None
+    raster = abrir_raster(raster)
+
+    inicio = time.time()
+    # Níveis intermediários ficam em disco; apenas o mais reduzido é lido inteiro
+    niveis = construir_piramide(raster, n_niveis, memoria_max_mb, dir_niveis=dir_saida)
+    fator = 2 ** n_niveis
+    raio_nivel = raio_estrutura / fator
+    resposta = resposta_grosseira(niveis[-1], raio_nivel)
+    janelas = janelas_candidatas(resposta, fator, raster.shape, limiar_z,
+                                 margem=int(np.ceil(raio_nivel)))
+    tempo_grosseiro = time.time() - inicio
+
+    # Refinamento em resolução original, apenas nas janelas candidatas
+    etapas = parametros.pop('etapas', ('bordas', 'segmentacao'))
+    plano = planejar_processamento(raster, memoria_max_mb, etapas=etapas, **parametros)
+    caminhos, saidas = criar_saidas(dir_saida, raster.shape, etapas)
+    plano['caminhos'] = caminhos
+    plano['caminho_raster'] = caminho_raster
+
+    tiles = []
+    for janela in janelas:
+        tiles.extend(iterar_tiles(raster.shape, plano['tamanho_tile'], plano['halo_maximo'],
+                                  regiao=janela))
+    contagens = executar_tiles(raster, tiles, plano, saidas, n_processos)
+
+    area_refinada = sum((y1 - y0) * (x1 - x0) for y0, y1, x0, x1 in janelas)
+    fracao = area_refinada / float(raster.shape[0] * raster.shape[1])
+    print(f"  {len(janelas)} janelas candidatas ({fracao:.1%} da área) "
+          f"refinadas em {len(tiles)} tiles")
+
+    return {
+        'caminhos': caminhos,
+        'janelas': janelas,
+        'fracao_refinada': fracao,
+        'tempo_grosseiro_s': tempo_grosseiro,
+        'tempo_total_s': time.time() - inicio,
+        'n_rotulos': int(sum(contagens)),
+    }
+
+
+def gerar_levantamento_esparso(caminho, tamanho=4096, n_estruturas=6, semente=42):
+    """
+    Gera um levantamento simulado grande com poucas estruturas espalhadas.
+
+    Args:
+        caminho (str): Caminho do arquivo .npy a ser criado
+        tamanho (int): Lado do levantamento em pixels
+        n_estruturas (int): Número de estruturas
+        semente (int): Semente do gerador de números aleatórios
+
+    Returns:
+        tuple: (caminho do raster, caixas das estruturas inseridas)
+    """
+    from gerador_cenas import gerar_lote_cenas
+
+    rng = np.random.default_rng(semente)
+    escala = (40 / tamanho, 120 / tamanho)
+    imagens, _, caixas = gerar_lote_cenas(1, tamanho, rng, (n_estruturas, n_estruturas), escala)
+    np.save(caminho, imagens[0])
+    return caminho, caixas
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    from processamento_tiles import processar_raster_em_tiles
+
+    print("Iniciando busca piramidal em levantamento LIDAR simulado...")
+    criar_diretorio_se_nao_existir(RESULTS_DIR)
+    caminho_raster, caixas = gerar_levantamento_esparso(os.path.join(RESULTS_DIR, 'levantamento.npy'))
+
+    resumo = buscar_estruturas_piramide(caminho_raster, RESULTS_DIR)
+    print(f"Busca piramidal: {resumo['tempo_total_s']:.1f} s")
+
+    inicio = time.time()
+    processar_raster_em_tiles(caminho_raster, os.path.join(RESULTS_DIR, 'completo'),
+                              etapas=('bordas', 'segmentacao'))
+    print(f"Processamento completo: {time.time() - inicio:.1f} s")
+    print(f"Processamento concluído. Resultados salvos em: {RESULTS_DIR}")
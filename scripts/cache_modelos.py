@@ -0,0 +1,293 @@
+# Cache de Modelos Treinados
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script evita treinar duas vezes o mesmo modelo. A chave de cada ajuste
+# é a impressão digital dos dados de treinamento (conteúdo, forma, tipo e nomes das
+# colunas) e do estimador (classe e hiperparâmetros); o modelo ajustado fica em memória
+# e em disco, de modo que regiões, processos e execuções diferentes que treinam o mesmo
+# modelo sobre os mesmos dados reaproveitam um único ajuste. Os arquivos menos usados
+# recentemente são removidos quando o cache em disco excede o limite.
+
+import os
+import pickle
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.base import clone
+
+from cache_rasters import CACHE_DIR, calcular_chave
+
+# Diretório padrão dos modelos em cache
+MODELOS_DIR = os.path.join(CACHE_DIR, 'modelos')
+
+# Versões que entram na chave: um modelo serializado por outra versão do
+# scikit-learn ou do joblib pode não carregar ou se comportar de outro modo
+VERSOES = {'sklearn': sklearn.__version__, 'joblib': joblib.__version__}
+
+# Erros de um arquivo em cache ilegível (incompleto, corrompido ou gravado por
+# versões incompatíveis das bibliotecas); o arquivo é descartado e o modelo reajustado
+ERROS_LEITURA = (EOFError, OSError, ValueError, AttributeError, ImportError,
+                 pickle.UnpicklingError, IndexError, KeyError, TypeError)
+
+
+def impressao_digital(estimador, X, y=None):
+    """
+    Calcula a chave de um ajuste a partir dos dados de treinamento, do estimador
+    e das versões do scikit-learn e do joblib.
+
+    Args:
+        estimador: Estimador do scikit-learn (não precisa estar ajustado)
+        X (array ou pandas.DataFrame): Características de treinamento
+        y (array, opcional): Alvos de treinamento
+
+    Returns:
+        str: Chave hexadecimal (SHA-256)
+    """
+    colunas = [str(coluna) for coluna in getattr(X, 'columns', [])]
+    partes = [VERSOES, type(estimador).__module__ + '.' + type(estimador).__qualname__,
+              estimador.get_params(deep=True), colunas, np.asarray(X)]
+    if y is not None:
+        partes.append(np.asarray(y))
+    return calcular_chave(*partes)
+
+
+class CacheModelos:
+    """
+    Cache de modelos ajustados em memória (LRU) e em disco, com remoção LRU por tamanho.
+
+    Cada modelo é gravado com joblib em <diretorio>/<2 primeiros dígitos>/<chave>.joblib,
+    com gravação atômica (arquivo temporário + os.replace), então vários
+    processos podem compartilhar o mesmo diretório. Como em CacheRasters, a data
+    de modificação registra o último uso do arquivo.
+    """
+
+    def __init__(self, diretorio=MODELOS_DIR, max_em_memoria=8, tamanho_max_mb=1024):
+        """
+        Args:
+            diretorio (str ou None): Diretório do cache em disco; None mantém apenas em memória
+            max_em_memoria (int): Número máximo de modelos mantidos em memória
+            tamanho_max_mb (float): Tamanho máximo do cache em disco em megabytes
+        """
+        self.diretorio = diretorio
+        self.max_em_memoria = max_em_memoria
+        self.tamanho_max = int(tamanho_max_mb * 1024 * 1024)
+        self.memoria = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+        self._tamanho = 0
+        if diretorio is not None:
+            os.makedirs(diretorio, exist_ok=True)
+            self._tamanho = sum(tamanho for _, tamanho, _ in self._listar())
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, chave[:2], chave + '.joblib')
+
+    def _listar(self):
+        """
+        Lista os arquivos do cache em disco como (caminho, tamanho, último uso).
+        """
+        arquivos = []
+        for subdiretorio in os.scandir(self.diretorio):
+            if not subdiretorio.is_dir():
+                continue
+            for entrada in os.scandir(subdiretorio.path):
+                if entrada.name.endswith('.joblib'):
+                    estado = entrada.stat()
+                    arquivos.append((entrada.path, estado.st_size, estado.st_mtime))
+        return arquivos
+
+    def _lembrar(self, chave, modelo):
+        self.memoria[chave] = modelo
+        self.memoria.move_to_end(chave)
+        while len(self.memoria) > self.max_em_memoria:
+            self.memoria.popitem(last=False)
+
+    def obter(self, chave):
+        """
+        Retorna o modelo de uma chave (da memória ou do disco), ou None.
+        """
+        if chave in self.memoria:
+            self.memoria.move_to_end(chave)
+            self.acertos += 1
+            return self.memoria[chave]
+        if self.diretorio is not None:
+            caminho = self._caminho(chave)
+            try:
+                modelo = joblib.load(caminho)
+            except FileNotFoundError:
+                pass
+            except ERROS_LEITURA:
+                # Arquivo ilegível: descartá-lo para que o novo ajuste o substitua
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+            else:
+                try:
+                    os.utime(caminho)
+                except OSError:
+                    pass
+                self._lembrar(chave, modelo)
+                self.acertos += 1
+                return modelo
+        self.falhas += 1
+        return None
+
+    def guardar(self, chave, modelo):
+        """
+        Guarda um modelo ajustado em memória e em disco e remove os menos usados
+        se o limite do disco for excedido.
+        """
+        self._lembrar(chave, modelo)
+        if self.diretorio is None:
+            return
+        caminho = self._caminho(chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        joblib.dump(modelo, temporario)
+        os.replace(temporario, caminho)
+        self._tamanho += os.path.getsize(caminho)
+        if self._tamanho > self.tamanho_max:
+            self.remover_antigos()
+
+    def ajustar(self, estimador, X, y=None, **parametros_ajuste):
+        """
+        Retorna o estimador ajustado a (X, y), reaproveitando um ajuste idêntico.
+
+        O estimador recebido não é alterado: em caso de falha, uma cópia
+        (sklearn.base.clone) é ajustada e guardada.
+
+        Args:
+            estimador: Estimador do scikit-learn com os hiperparâmetros desejados
+            X, y: Dados de treinamento
+            **parametros_ajuste: Argumentos extras de fit (entram na chave)
+
+        Returns:
+            Estimador ajustado
+        """
+        chave = impressao_digital(estimador, X, y)
+        if parametros_ajuste:
+            nomes = sorted(parametros_ajuste)
+            chave = calcular_chave(chave, nomes, *(parametros_ajuste[nome] for nome in nomes))
+        modelo = self.obter(chave)
+        if modelo is None:
+            modelo = clone(estimador)
+            if y is None:
+                modelo.fit(X, **parametros_ajuste)
+            else:
+                modelo.fit(X, y, **parametros_ajuste)
+            self.guardar(chave, modelo)
+        return modelo
+
+    def remover_antigos(self):
+        """
+        Remove os arquivos menos usados recentemente até o cache em disco caber no limite.
+
+        O tamanho é recalculado a partir do disco, pois outros processos podem
+        ter gravado ou removido arquivos.
+        """
+        arquivos = sorted(self._listar(), key=lambda arquivo: arquivo[2])
+        tamanho = sum(tamanho for _, tamanho, _ in arquivos)
+        for caminho, tamanho_arquivo, _ in arquivos:
+            if tamanho <= self.tamanho_max:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            tamanho -= tamanho_arquivo
+        self._tamanho = tamanho
+
+    def limpar(self):
+        """
+        Remove todos os modelos em memória e em disco.
+        """
+        self.memoria.clear()
+        if self.diretorio is None:
+            return
+        for caminho, _, _ in self._listar():
+            os.remove(caminho)
+        self._tamanho = 0
+
+
+# Caches abertos por processo, reaproveitados entre chamadas
+_CACHES_ABERTOS = {}
+
+
+def abrir_cache_modelos(diretorio=MODELOS_DIR, tamanho_max_mb=1024):
+    """
+    Abre (uma única vez por processo) o cache de modelos de um diretório.
+
+    Args:
+        diretorio (str ou None): Diretório do cache; None mantém apenas em memória
+        tamanho_max_mb (float): Tamanho máximo do cache em disco em megabytes
+
+    Returns:
+        CacheModelos
+    """
+    chave = (None if diretorio is None else os.path.abspath(diretorio), tamanho_max_mb)
+    if chave not in _CACHES_ABERTOS:
+        _CACHES_ABERTOS[chave] = CacheModelos(diretorio, tamanho_max_mb=tamanho_max_mb)
+    return _CACHES_ABERTOS[chave]
+
+
+def ajustar_em_cache(estimador, X, y=None, diretorio=MODELOS_DIR, **parametros_ajuste):
+    """
+    Ajusta um estimador passando pelo cache de modelos do processo.
+
+    Desative o cache com a variável de ambiente AMAZONIA_CACHE_MODELOS=0.
+
+    Args:
+        estimador: Estimador do scikit-learn com os hiperparâmetros desejados
+        X, y: Dados de treinamento
+        diretorio (str ou None): Diretório do cache em disco
+
+    Returns:
+        Estimador ajustado
+    """
+    if os.environ.get('AMAZONIA_CACHE_MODELOS', '1') == '0':
+        modelo = clone(estimador)
+        return modelo.fit(X, **parametros_ajuste) if y is None else modelo.fit(X, y, **parametros_ajuste)
+    return abrir_cache_modelos(diretorio).ajustar(estimador, X, y, **parametros_ajuste)
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    import sys
+    import time
+    import shutil
+    import tempfile
+
+    if '--limpar' in sys.argv:
+        abrir_cache_modelos().limpar()
+        print(f"Cache de modelos limpo: {MODELOS_DIR}")
+        sys.exit(0)
+
+    from sklearn.datasets import make_classification
+    from sklearn.ensemble import RandomForestClassifier
+
+    print("Demonstrando o cache de modelos...")
+    X, y = make_classification(n_samples=2000, n_features=7, random_state=42)
+    cache = CacheModelos(diretorio=tempfile.mkdtemp(prefix='cache_modelos_'))
+    estimador = RandomForestClassifier(n_estimators=100, random_state=42)
+
+    for tentativa in range(3):
+        inicio = time.time()
+        modelo = cache.ajustar(estimador, X, y)
+        print(f"  Ajuste {tentativa + 1}: {time.time() - inicio:.3f} s "
+              f"(acertos: {cache.acertos}, falhas: {cache.falhas})")
+
+    inicio = time.time()
+    CacheModelos(diretorio=cache.diretorio).ajustar(estimador, X, y)
+    print(f"  Novo processo (lido do disco): {time.time() - inicio:.3f} s")
+
+    inicio = time.time()
+    cache.ajustar(clone(estimador).set_params(n_estimators=50), X, y)
+    print(f"  Hiperparâmetros diferentes (novo ajuste): {time.time() - inicio:.3f} s")
+
+    shutil.rmtree(cache.diretorio)
+    print("Processamento concluído.")
@@ -0,0 +1,169 @@
+# Cache de Produtos Intermediários de Rasters
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script mantém em disco um cache endereçado por conteúdo dos produtos
+# intermediários da detecção (níveis suavizados, bordas, realce CLAHE e rótulos). A chave
+# de cada produto é o hash do conteúdo do tile, dos parâmetros da etapa e da chave da
+# etapa anterior, de modo que alterar apenas os parâmetros da segmentação reaproveita as
+# etapas anteriores e uma nova execução sobre o mesmo levantamento é quase gratuita.
+# Os arquivos menos usados recentemente são removidos quando o cache excede o limite.
+
+import os
+import json
+import hashlib
+import numpy as np
+
+# Diretório padrão do cache
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'cache')
+
+
+def calcular_chave(*partes):
+    """
+    Calcula a chave (SHA-256) de uma combinação de arrays, parâmetros e chaves anteriores.
+
+    Arrays entram pelo conteúdo, forma e tipo; demais valores pela sua
+    representação JSON (dicionários com chaves ordenadas).
+
+    Args:
+        *partes: Arrays NumPy, chaves de etapas anteriores (str) ou parâmetros
+
+    Returns:
+        str: Chave hexadecimal
+    """
+    resumo = hashlib.sha256()
+    for parte in partes:
+        if isinstance(parte, np.ndarray):
+            resumo.update(f"{parte.dtype.str}{parte.shape}".encode())
+            resumo.update(np.ascontiguousarray(parte).data)
+        else:
+            resumo.update(json.dumps(parte, sort_keys=True, default=str).encode())
+        resumo.update(b'\x00')
+    return resumo.hexdigest()
+
+
+class CacheRasters:
+    """
+    Cache de arrays em disco endereçado por conteúdo, com remoção LRU por tamanho.
+
+    Cada array é um .npy em <diretorio>/<2 primeiros dígitos>/<chave>.npy. A data
+    de modificação registra o último uso (é atualizada a cada acerto), e a
+    gravação é atômica (arquivo temporário + os.replace), então vários processos
+    podem compartilhar o mesmo diretório.
+    """
+
+    def __init__(self, diretorio=CACHE_DIR, tamanho_max_mb=1024):
+        """
+        Args:
+            diretorio (str): Diretório do cache
+            tamanho_max_mb (float): Tamanho máximo do cache em megabytes
+        """
+        self.diretorio = diretorio
+        self.tamanho_max = int(tamanho_max_mb * 1024 * 1024)
+        self.acertos = 0
+        self.falhas = 0
+        os.makedirs(diretorio, exist_ok=True)
+        self._tamanho = sum(tamanho for _, tamanho, _ in self._listar())
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, chave[:2], chave + '.npy')
+
+    def _listar(self):
+        """
+        Lista os arquivos do cache como (caminho, tamanho, último uso).
+        """
+        arquivos = []
+        for subdiretorio in os.scandir(self.diretorio):
+            if not subdiretorio.is_dir():
+                continue
+            for entrada in os.scandir(subdiretorio.path):
+                if entrada.name.endswith('.npy'):
+                    estado = entrada.stat()
+                    arquivos.append((entrada.path, estado.st_size, estado.st_mtime))
+        return arquivos
+
+    def obter(self, chave):
+        """
+        Retorna o array de uma chave, ou None se não estiver no cache.
+        """
+        caminho = self._caminho(chave)
+        try:
+            array = np.load(caminho)
+            os.utime(caminho)
+        except (FileNotFoundError, ValueError, OSError):
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        return array
+
+    def guardar(self, chave, array):
+        """
+        Grava um array no cache e remove os menos usados se o limite for excedido.
+        """
+        caminho = self._caminho(chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, 'wb') as arquivo:
+            np.save(arquivo, array)
+        os.replace(temporario, caminho)
+        self._tamanho += os.path.getsize(caminho)
+        if self._tamanho > self.tamanho_max:
+            self.remover_antigos()
+
+    def obter_ou_calcular(self, chave, funcao, *args, **kwargs):
+        """
+        Retorna o array em cache ou o calcula com funcao(*args, **kwargs) e o guarda.
+        """
+        array = self.obter(chave)
+        if array is None:
+            array = funcao(*args, **kwargs)
+            self.guardar(chave, array)
+        return array
+
+    def remover_antigos(self):
+        """
+        Remove os arquivos menos usados recentemente até o cache caber no limite.
+
+        O tamanho é recalculado a partir do disco, pois outros processos podem
+        ter gravado ou removido arquivos.
+        """
+        arquivos = sorted(self._listar(), key=lambda arquivo: arquivo[2])
+        tamanho = sum(tamanho for _, tamanho, _ in arquivos)
+        for caminho, tamanho_arquivo, _ in arquivos:
+            if tamanho <= self.tamanho_max:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            tamanho -= tamanho_arquivo
+        self._tamanho = tamanho
+
+    def limpar(self):
+        """
+        Remove todos os arquivos do cache.
+        """
+        for caminho, _, _ in self._listar():
+            os.remove(caminho)
+        self._tamanho = 0
+
+
+# Caches abertos por processo, reaproveitados entre tarefas
+_CACHES_ABERTOS = {}
+
+
+def abrir_cache(diretorio, tamanho_max_mb=1024):
+    """
+    Abre (uma única vez por processo) o cache de um diretório.
+
+    Args:
+        diretorio (str ou None): Diretório do cache; None desativa o cache
+
+    Returns:
+        CacheRasters ou None
+    """
+    if diretorio is None:
+        return None
+    chave = (os.path.abspath(diretorio), tamanho_max_mb)
+    if chave not in _CACHES_ABERTOS:
+        _CACHES_ABERTOS[chave] = CacheRasters(diretorio, tamanho_max_mb)
+    return _CACHES_ABERTOS[chave]
@@ -3,6 +3,8 @@
 # Data: Junho 2025
 # Descrição: Este script simula a detecção de diferentes tipos de estruturas arqueológicas
 # na Amazônia usando técnicas de processamento de imagens em dados LIDAR simulados.
+# Com --economizar-memoria, o processamento é feito em float32 e reduz o pico de
+# bordas, segmentação e saída; o realce (CLAHE do skimage) custa o mesmo nos dois modos.
 
 import os
 import numpy as np
@@ -11,6 +13,13 @@ from skimage import filters, feature, segmentation, color
 from scipy import ndimage
 import random
 
+from agendador_tiles import ArenaCompartilhada, mapear_com_arena
+from cache_rasters import abrir_cache, calcular_chave
+from orcamento_memoria import BuffersTrabalho, MedidorMemoria, medir, obter_buffer
+from espaco_escala import equalizar_clahe_alinhado
+from instrumentacao import etapa, instrumentar
+from propriedades_regioes import calcular_propriedades, salvar_tabela
+
 # Configurações
 RANDOM_SEED = 42
 np.random.seed(RANDOM_SEED)
@@ -20,6 +29,10 @@ random.seed(RANDOM_SEED)
 RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados')
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+# Linhas de ruído sorteadas por vez; sortear em blocos consome a mesma sequência
+# do gerador que um único sorteio da imagem inteira, sem o array temporário inteiro
+LINHAS_POR_SORTEIO = 64
+
 def criar_diretorio_se_nao_existir(diretorio):
     """
     Cria um diretório se ele não existir.
@@ -30,29 +43,60 @@ def criar_diretorio_se_nao_existir(diretorio):
     if not os.path.exists(diretorio):
         os.makedirs(diretorio)
 
-def gerar_imagem_lidar_simulada(tamanho=512, tipo='geoglifo'):
+def somar_ruido_normal(imagem, media, desvio, substituir=False):
+    """
+    Soma (ou grava) ruído normal em uma imagem, no lugar, sorteando blocos de linhas.
+    
+    Args:
+        imagem (numpy.ndarray): Imagem modificada no lugar
+        media (float): Média do ruído
+        desvio (float): Desvio padrão do ruído
+        substituir (bool): Gravar o ruído em vez de somá-lo
+    """
+    for inicio in range(0, imagem.shape[0], LINHAS_POR_SORTEIO):
+        bloco = imagem[inicio:inicio + LINHAS_POR_SORTEIO]
+        ruido = np.random.normal(media, desvio, bloco.shape)
+        if substituir:
+            bloco[...] = ruido
+        else:
+            bloco += ruido
+
+def gerar_imagem_lidar_simulada(tamanho=512, tipo='geoglifo', dtype=np.float64, saida=None,
+                                buffers=None):
     """
     Gera uma imagem LIDAR simulada com diferentes tipos de estruturas arqueológicas.
     
+    Todas as etapas operam no lugar sobre a imagem de saída e um único buffer de
+    ruído; em float64 o resultado é idêntico ao de sortear e somar imagens inteiras.
+    
     Args:
         tamanho (int): Tamanho da imagem (quadrada)
         tipo (str): Tipo de estrutura ('geoglifo', 'aldeia_circular', 'vala_circular')
+        dtype (numpy.dtype): Tipo da imagem (np.float32 no modo de economia de memória)
+        saida (numpy.ndarray, opcional): Array (tamanho, tamanho) onde gravar a imagem,
+            ex.: uma fatia da arena compartilhada; define o tipo no lugar de dtype
+        buffers (BuffersTrabalho, opcional): Buffers reutilizados entre imagens
     
     Returns:
         numpy.ndarray: Imagem LIDAR simulada
     """
+    imagem = np.empty((tamanho, tamanho), dtype=dtype) if saida is None else saida
+    
     # Base da imagem (terreno natural)
-    imagem = np.random.normal(0.5, 0.1, (tamanho, tamanho))
+    base = obter_buffer(buffers, 'ruido', imagem.shape, imagem.dtype)
+    somar_ruido_normal(base, 0.5, 0.1, substituir=True)
     
     # Suavizar para simular terreno natural
-    imagem = ndimage.gaussian_filter(imagem, sigma=5)
+    ndimage.gaussian_filter(base, sigma=5, output=imagem)
     
     # Adicionar ruído de vegetação
-    vegetacao = np.random.normal(0, 0.05, (tamanho, tamanho))
-    imagem += vegetacao
+    somar_ruido_normal(imagem, 0, 0.05)
     
     # Normalizar para [0, 1]
-    imagem = (imagem - imagem.min()) / (imagem.max() - imagem.min())
+    minimo = imagem.min()
+    amplitude = imagem.max() - minimo
+    imagem -= minimo
+    imagem /= amplitude
     
     # Adicionar estrutura arqueológica
     centro_x, centro_y = tamanho // 2, tamanho // 2
@@ -108,151 +152,455 @@ def gerar_imagem_lidar_simulada(tamanho=512, tipo='geoglifo'):
         mascara_vala = mascara_externa & ~mascara_interna
         imagem[mascara_vala] -= 0.3  # Valas são depressões (valores mais baixos)
         
-        # Adicionar entrada (abertura na vala)
+        # Adicionar entrada (abertura na vala); o ângulo só é calculado na vala
         angulo_entrada = np.pi / 4
         largura_entrada = np.pi / 16
-        for y in range(tamanho):
-            for x in range(tamanho):
-                if mascara_vala[y, x]:
-                    dx, dy = x - centro_x, y - centro_y
-                    angulo = np.arctan2(dy, dx) % (2 * np.pi)
-                    if abs(angulo - angulo_entrada) < largura_entrada:
-                        imagem[y, x] += 0.3  # Reverter a depressão na entrada
+        linhas, colunas = np.nonzero(mascara_vala)
+        angulo = np.arctan2(linhas - centro_y, colunas - centro_x) % (2 * np.pi)
+        entrada = np.abs(angulo - angulo_entrada) < largura_entrada
+        imagem[linhas[entrada], colunas[entrada]] += 0.3  # Reverter a depressão na entrada
     
     # Normalizar novamente após adicionar estruturas
-    imagem = np.clip(imagem, 0, 1)
+    np.clip(imagem, 0, 1, out=imagem)
     
     # Adicionar mais ruído para simular imperfeições na captura LIDAR
-    imagem += np.random.normal(0, 0.02, (tamanho, tamanho))
-    imagem = np.clip(imagem, 0, 1)
+    somar_ruido_normal(imagem, 0, 0.02)
+    np.clip(imagem, 0, 1, out=imagem)
     
     return imagem
 
-def detectar_bordas(imagem):
+def detectar_bordas(imagem, sigma_suavizacao=1.0, sigma_canny=2.0, espaco=None):
     """
     Detecta bordas em uma imagem usando o algoritmo Canny.
     
     Args:
         imagem (numpy.ndarray): Imagem de entrada
+        sigma_suavizacao (float): Desvio padrão do filtro gaussiano inicial
+        sigma_canny (float): Desvio padrão da suavização interna do Canny
+        espaco (EspacoEscala, opcional): Espaço de escala compartilhado da imagem
     
     Returns:
         numpy.ndarray: Imagem com bordas detectadas
     """
+    if espaco is not None:
+        # As duas suavizações em cascata equivalem a um único nível gaussiano,
+        # derivado do nível do pré-filtro já presente no espaço de escala
+        espaco.suavizada(sigma_suavizacao)
+        sigma_total = np.hypot(sigma_suavizacao, sigma_canny)
+        return feature.canny(espaco.suavizada(sigma_total), sigma=0)
+    
     # Aplicar filtro gaussiano para reduzir ruído
-    imagem_suavizada = filters.gaussian(imagem, sigma=1.0)
+    imagem_suavizada = filters.gaussian(imagem, sigma=sigma_suavizacao)
     
     # Detectar bordas com Canny
-    bordas = feature.canny(imagem_suavizada, sigma=2.0)
+    bordas = feature.canny(imagem_suavizada, sigma=sigma_canny)
     
     return bordas
 
-def realcar_estruturas(imagem):
+def realcar_estruturas(imagem, espaco=None, kernel_size=None, clip_limit=0.03):
     """
     Realça estruturas na imagem usando equalização de histograma local.
     
     Args:
         imagem (numpy.ndarray): Imagem de entrada
+        espaco (EspacoEscala, opcional): Espaço de escala compartilhado; quando
+            informado, usa o CLAHE alinhado sobre os níveis de cinza já quantizados
+        kernel_size (int, opcional): Tamanho das regiões contextuais (padrão: 1/8 da imagem)
+        clip_limit (float): Limite de recorte do histograma
     
     Returns:
         numpy.ndarray: Imagem com estruturas realçadas
     """
+    if espaco is not None:
+        if kernel_size is None:
+            kernel_size = max(min(imagem.shape) // 8, 1)
+        return equalizar_clahe_alinhado(imagem, kernel_size, clip_limit,
+                                        espaco.nbins, espaco.niveis())
+    
     # Equalização de histograma local
     from skimage import exposure
-    imagem_realcada = exposure.equalize_adapthist(imagem, clip_limit=0.03)
+    imagem_realcada = exposure.equalize_adapthist(imagem, kernel_size=kernel_size, clip_limit=clip_limit)
     
     return imagem_realcada
 
-def segmentar_estruturas(imagem):
+def segmentar_rotulos(imagem, limiar=None, min_distance=20, espaco=None, buffers=None):
     """
-    Segmenta estruturas na imagem usando limiarização e watershed.
+    Rotula estruturas na imagem usando limiarização e watershed.
     
     Args:
         imagem (numpy.ndarray): Imagem de entrada
+        limiar (float, opcional): Limiar de binarização; se omitido, usa Otsu
+            calculado sobre a própria imagem
+        min_distance (int): Distância mínima entre marcadores do watershed
+        espaco (EspacoEscala, opcional): Espaço de escala compartilhado, de onde vêm
+            o histograma do Otsu e a transformada de distância
+        buffers (BuffersTrabalho, opcional): Buffers reutilizados entre imagens; a
+            transformada de distância é guardada no tipo da imagem e negada no lugar
     
     Returns:
-        numpy.ndarray: Imagem segmentada
+        numpy.ndarray: Imagem de rótulos (0 = fundo)
     """
-    # Limiarização
-    limiar = filters.threshold_otsu(imagem)
-    mascara_binaria = imagem > limiar
-    
-    # Distância euclidiana para watershed
-    distancia = ndimage.distance_transform_edt(mascara_binaria)
+    if espaco is not None:
+        if limiar is None:
+            limiar = espaco.limiar_otsu()
+        mascara_binaria, distancia = espaco.distancia(limiar)
+    else:
+        # Limiarização
+        if limiar is None:
+            limiar = filters.threshold_otsu(imagem)
+        mascara_binaria = imagem > limiar
+        
+        # Distância euclidiana para watershed. O scipy só grava a transformada em
+        # float64; no modo de economia de memória ela é copiada para um buffer no
+        # tipo da imagem, e peak_local_max e watershed trabalham em float32 (as
+        # raízes de inteiros mantêm a mesma ordem em float32 até ~2900 pixels)
+        if buffers is not None:
+            distancia = buffers.obter('distancia', imagem.shape, imagem.dtype)
+            distancia[...] = ndimage.distance_transform_edt(mascara_binaria)
+        else:
+            distancia = ndimage.distance_transform_edt(mascara_binaria)
     
     # Encontrar máximos locais
-    from scipy import ndimage as ndi
-    maximos_locais = feature.peak_local_max(distancia, min_distance=20, labels=mascara_binaria)
+    maximos_locais = feature.peak_local_max(distancia, min_distance=min_distance, labels=mascara_binaria)
     marcadores = np.zeros_like(distancia, dtype=bool)
     marcadores[tuple(maximos_locais.T)] = True
-    marcadores = ndi.label(marcadores)[0]
+    marcadores = ndimage.label(marcadores)[0]
+    
+    # Aplicar watershed (o buffer de distância pode ser negado no lugar)
+    if buffers is not None and espaco is None:
+        relevo = np.negative(distancia, out=distancia)
+    else:
+        relevo = -distancia
+    rotulos = segmentation.watershed(relevo, marcadores, mask=mascara_binaria)
     
-    # Aplicar watershed
-    rotulos = segmentation.watershed(-distancia, marcadores, mask=mascara_binaria)
+    return rotulos
+
+def segmentar_estruturas(imagem, espaco=None, retornar_tabela=False):
+    """
+    Segmenta estruturas na imagem usando limiarização e watershed.
+    
+    Args:
+        imagem (numpy.ndarray): Imagem de entrada
+        espaco (EspacoEscala, opcional): Espaço de escala compartilhado da imagem
+        retornar_tabela (bool): Se True, retorna também a tabela de propriedades
+            das regiões (ver propriedades_regioes.calcular_propriedades)
+    
+    Returns:
+        numpy.ndarray: Imagem segmentada, ou (imagem segmentada, tabela) se
+            retornar_tabela for True
+    """
+    rotulos = segmentar_rotulos(imagem, espaco=espaco)
     
     # Criar imagem colorida para visualização
     imagem_segmentada = color.label2rgb(rotulos, imagem, alpha=0.5, bg_label=0)
     
+    if retornar_tabela:
+        return imagem_segmentada, calcular_propriedades(rotulos, imagem)
     return imagem_segmentada
 
-def processar_e_salvar_imagens():
+def executar_etapas(imagem, cache=None, sigma_suavizacao=1.0, sigma_canny=2.0,
+                    clip_limit=0.03, min_distance=20, medidor=None, buffers=None):
+    """
+    Executa bordas, realce e segmentação, reaproveitando produtos em cache.
+    
+    A chave de cada produto encadeia o hash da imagem, os parâmetros da etapa e a
+    chave da etapa anterior (imagem -> suavizada -> bordas; imagem -> realce;
+    imagem -> rótulos). Alterar apenas min_distance reaproveita bordas e realce,
+    alterar sigma_canny reaproveita a imagem suavizada, e uma imagem inalterada
+    com os mesmos parâmetros não recalcula nada.
+    
+    Args:
+        imagem (numpy.ndarray): Imagem de entrada
+        cache (CacheRasters, opcional): Cache de produtos; None calcula tudo
+        sigma_suavizacao (float): Desvio padrão do filtro gaussiano inicial
+        sigma_canny (float): Desvio padrão da suavização interna do Canny
+        clip_limit (float): Limite de recorte do CLAHE
+        min_distance (int): Distância mínima entre marcadores do watershed
+        medidor (MedidorMemoria, opcional): Registra o pico de RSS de cada etapa
+        buffers (BuffersTrabalho, opcional): Buffers reutilizados entre imagens
+    
+    Returns:
+        tuple: (bordas, realce, rotulos)
+    """
+    if cache is None:
+        with medir(medidor, 'bordas'):
+            bordas = detectar_bordas(imagem, sigma_suavizacao, sigma_canny)
+        with medir(medidor, 'realce'):
+            realce = realcar_estruturas(imagem, clip_limit=clip_limit)
+        with medir(medidor, 'segmentacao'):
+            rotulos = segmentar_rotulos(imagem, min_distance=min_distance, buffers=buffers)
+        return bordas, realce, rotulos
+    
+    chave_imagem = calcular_chave(imagem)
+    chave_suavizada = calcular_chave(chave_imagem, 'suavizada', sigma_suavizacao)
+    chave_bordas = calcular_chave(chave_suavizada, 'bordas', sigma_canny)
+    with medir(medidor, 'bordas'):
+        bordas = cache.obter(chave_bordas)
+        if bordas is None:
+            imagem_suavizada = cache.obter_ou_calcular(chave_suavizada, filters.gaussian,
+                                                       imagem, sigma=sigma_suavizacao)
+            bordas = feature.canny(imagem_suavizada, sigma=sigma_canny)
+            cache.guardar(chave_bordas, bordas)
+    
+    with medir(medidor, 'realce'):
+        realce = cache.obter_ou_calcular(calcular_chave(chave_imagem, 'realce', clip_limit),
+                                         realcar_estruturas, imagem, clip_limit=clip_limit)
+    with medir(medidor, 'segmentacao'):
+        rotulos = cache.obter_ou_calcular(calcular_chave(chave_imagem, 'rotulos', min_distance),
+                                          segmentar_rotulos, imagem, min_distance=min_distance,
+                                          buffers=buffers)
+    return bordas, realce, rotulos
+
+def sobrepor_rotulos(rotulos, imagem, alpha=0.5, buffers=None):
+    """
+    Sobrepõe os rótulos coloridos à imagem, como color.label2rgb, sem temporários RGB.
+    
+    As cores seguem o mesmo ciclo do label2rgb (rótulos em ordem crescente, fundo
+    0 misturado ao preto), mas a mistura é feita canal a canal no próprio array de
+    saída e no tipo da imagem (float32 no modo de economia de memória).
+    
+    Args:
+        rotulos (numpy.ndarray): Imagem de rótulos (0 = fundo)
+        imagem (numpy.ndarray): Imagem em tons de cinza em [0, 1]
+        alpha (float): Opacidade das cores
+        buffers (BuffersTrabalho, opcional): Buffers reutilizados entre imagens
+    
+    Returns:
+        numpy.ndarray: Imagem RGB (altura, largura, 3)
+    """
+    from skimage.color.colorlabel import DEFAULT_COLORS, _rgb_vector
+    
+    # Cor de cada rótulo: os rótulos presentes, em ordem crescente, percorrem o ciclo
+    presentes = np.flatnonzero(np.bincount(rotulos.ravel()))
+    presentes = presentes[presentes > 0]
+    paleta = np.array([_rgb_vector(cor) for cor in DEFAULT_COLORS], dtype=imagem.dtype)
+    cores = np.zeros((int(rotulos.max(initial=0)) + 1, 3), dtype=imagem.dtype)
+    cores[presentes] = paleta[np.arange(len(presentes)) % len(paleta)] * alpha
+    
+    saida = obter_buffer(buffers, 'sobreposicao', imagem.shape + (3,), imagem.dtype)
+    for canal in range(3):
+        plano = saida[..., canal]
+        np.multiply(imagem, 1 - alpha, out=plano)
+        plano += cores[rotulos, canal]
+    return saida
+
+# Figuras de resultado: título, mapa de cores, rótulo da barra de cores e nome do arquivo
+FIGURAS = {
+    'original': ("Imagem Original", 'terrain', 'Elevação', "original_{tipo}.png"),
+    'bordas': ("Detecção de Bordas", 'gray', None, "{tipo}_bordas.png"),
+    'realce': ("Estruturas Realçadas", 'viridis', 'Intensidade', "{tipo}_realce.png"),
+    'segmentacao': ("Segmentação de Estruturas", None, None, "{tipo}_segmentacao.png"),
+}
+
+# Modos de saída: figuras PNG (padrão) ou apenas arrays brutos, sem renderização
+MODOS_SAIDA = ('figuras', 'arrays')
+
+@instrumentar('renderizacao')
+def salvar_figura(tipo, nome, array, diretorio=RESULTS_DIR, dpi=300):
+    """
+    Renderiza e salva uma figura de resultado.
+    
+    Args:
+        tipo (str): Tipo de estrutura
+        nome (str): Chave em FIGURAS ('original', 'bordas', 'realce' ou 'segmentacao')
+        array (numpy.ndarray): Array a renderizar (RGB no caso da segmentação)
+        diretorio (str): Diretório de destino
+        dpi (int): Resolução da figura
+    
+    Returns:
+        str: Caminho da figura gravada
+    """
+    titulo, cmap, rotulo_barra, arquivo = FIGURAS[nome]
+    plt.figure(figsize=(10, 8))
+    plt.imshow(array, cmap=cmap)
+    plt.title(f"{titulo} - {tipo.replace('_', ' ').title()}")
+    if rotulo_barra is not None:
+        plt.colorbar(label=rotulo_barra)
+    plt.axis('off')
+    plt.tight_layout()
+    caminho = os.path.join(diretorio, arquivo.format(tipo=tipo))
+    plt.savefig(caminho, dpi=dpi)
+    plt.close()
+    return caminho
+
+def salvar_figuras(tipo, imagem_original, bordas, realce, segmentacao):
+    """
+    Renderiza e salva as figuras de resultado de um tipo de estrutura.
+    
+    Args:
+        tipo (str): Tipo de estrutura
+        imagem_original (numpy.ndarray): Imagem LIDAR simulada
+        bordas (numpy.ndarray): Bordas detectadas
+        realce (numpy.ndarray): Estruturas realçadas
+        segmentacao (numpy.ndarray): Imagem segmentada (RGB)
+    """
+    arrays = {
+        'original': imagem_original,
+        'bordas': bordas,
+        'realce': realce,
+        'segmentacao': segmentacao,
+    }
+    for nome, array in arrays.items():
+        salvar_figura(tipo, nome, array)
+
+@instrumentar('gravacao')
+def salvar_arrays(tipo, imagem_original, bordas, realce, rotulos, diretorio=RESULTS_DIR):
+    """
+    Salva os resultados brutos de um tipo de estrutura em um .npz comprimido.
+    
+    As figuras podem ser geradas depois, em paralelo, por renderizar_resultados.py.
+    
+    Args:
+        tipo (str): Tipo de estrutura
+        imagem_original (numpy.ndarray): Imagem LIDAR simulada
+        bordas (numpy.ndarray): Bordas detectadas
+        realce (numpy.ndarray): Estruturas realçadas
+        rotulos (numpy.ndarray): Rótulos da segmentação (0 = fundo)
+        diretorio (str): Diretório de destino
+    
+    Returns:
+        str: Caminho do arquivo gravado
+    """
+    caminho = os.path.join(diretorio, f"{tipo}_resultados.npz")
+    np.savez_compressed(caminho, original=imagem_original, bordas=bordas,
+                        realce=realce.astype(np.float32), rotulos=rotulos.astype(np.int32))
+    return caminho
+
+def _processar_tipo(arrays, indice, parametros):
+    """
+    Tarefa do agendador: processa e salva um tipo de estrutura.
+    
+    A imagem é lida da arena compartilhada, sem cópia entre processos.
+    """
+    tipo = parametros['tipos'][indice]
+    imagem_original = arrays['imagens'][indice]
+    economizar = parametros['economizar_memoria']
+    buffers = BuffersTrabalho() if economizar else None
+    medidor = MedidorMemoria(imagem_original.size) if parametros['relatorio_memoria'] else None
+    
+    # Detectar bordas, realçar e segmentar estruturas (passando pelo cache, se houver)
+    cache = abrir_cache(parametros['dir_cache'], parametros['cache_max_mb'])
+    bordas, realce, rotulos = executar_etapas(imagem_original, cache, medidor=medidor,
+                                              buffers=buffers, **parametros['etapas'])
+    with medir(medidor, 'propriedades'):
+        propriedades = calcular_propriedades(rotulos, imagem_original)
+    
+    # Salvar resultados
+    with medir(medidor, 'saida'):
+        if parametros['modo_saida'] == 'figuras':
+            if economizar:
+                segmentacao = sobrepor_rotulos(rotulos, imagem_original, buffers=buffers)
+            else:
+                segmentacao = color.label2rgb(rotulos, imagem_original, alpha=0.5, bg_label=0)
+            salvar_figuras(tipo, imagem_original, bordas, realce, segmentacao)
+        else:
+            salvar_arrays(tipo, imagem_original, bordas, realce, rotulos)
+        salvar_tabela(propriedades, os.path.join(RESULTS_DIR, f"{tipo}_propriedades"))
+    
+    if medidor is not None:
+        return tipo, medidor.relatorio()
+    return tipo
+
+@instrumentar('deteccao_sitios')
+def processar_e_salvar_imagens(n_processos=1, modo_saida='figuras', dir_cache=None,
+                               cache_max_mb=1024, sigma_suavizacao=1.0, sigma_canny=2.0,
+                               clip_limit=0.03, min_distance=20, economizar_memoria=False,
+                               relatorio_memoria=False):
     """
     Processa e salva imagens para diferentes tipos de estruturas arqueológicas.
+    
+    As imagens simuladas são geradas em sequência no processo principal (mantendo
+    a reprodutibilidade da semente) e entregues aos trabalhadores por memória
+    compartilhada; cada tipo é processado e salvo em um processo.
+    
+    Args:
+        n_processos (int, opcional): Processos trabalhadores; None usa todos os núcleos
+        modo_saida (str): 'figuras' renderiza as figuras PNG; 'arrays' grava apenas
+            os arrays brutos (.npz comprimido), sem matplotlib
+        dir_cache (str, opcional): Diretório do cache de produtos intermediários
+            (ver cache_rasters e executar_etapas)
+        cache_max_mb (float): Tamanho máximo do cache em megabytes
+        sigma_suavizacao, sigma_canny, clip_limit, min_distance: Parâmetros das
+            etapas (ver executar_etapas)
+        economizar_memoria (bool): Modo de economia de memória: imagens em float32,
+            operações no lugar e buffers de trabalho reutilizados (ver orcamento_memoria).
+            O realce custa o mesmo nos dois modos: os temporários do CLAHE do
+            skimage são internos e em float64
+        relatorio_memoria (bool): Imprimir o pico de RSS de cada etapa, por tipo (cada
+            tipo é então processado em um processo novo)
     """
+    if modo_saida not in MODOS_SAIDA:
+        raise ValueError(f"modo_saida deve ser um de {MODOS_SAIDA}")
     tipos = ['geoglifo', 'aldeia_circular', 'vala_circular']
     
-    for tipo in tipos:
-        print(f"Processando {tipo}...")
-        
-        # Gerar imagem simulada
-        imagem_original = gerar_imagem_lidar_simulada(tipo=tipo)
-        
-        # Detectar bordas
-        bordas = detectar_bordas(imagem_original)
-        
-        # Realçar estruturas
-        realce = realcar_estruturas(imagem_original)
-        
-        # Segmentar estruturas
-        segmentacao = segmentar_estruturas(imagem_original)
-        
-        # Salvar resultados
-        plt.figure(figsize=(10, 8))
-        plt.imshow(imagem_original, cmap='terrain')
-        plt.title(f"Imagem Original - {tipo.replace('_', ' ').title()}")
-        plt.colorbar(label='Elevação')
-        plt.axis('off')
-        plt.tight_layout()
-        plt.savefig(os.path.join(RESULTS_DIR, f"original_{tipo}.png"), dpi=300)
-        
-        plt.figure(figsize=(10, 8))
-        plt.imshow(bordas, cmap='gray')
-        plt.title(f"Detecção de Bordas - {tipo.replace('_', ' ').title()}")
-        plt.axis('off')
-        plt.tight_layout()
-        plt.savefig(os.path.join(RESULTS_DIR, f"{tipo}_bordas.png"), dpi=300)
-        
-        plt.figure(figsize=(10, 8))
-        plt.imshow(realce, cmap='viridis')
-        plt.title(f"Estruturas Realçadas - {tipo.replace('_', ' ').title()}")
-        plt.colorbar(label='Intensidade')
-        plt.axis('off')
-        plt.tight_layout()
-        plt.savefig(os.path.join(RESULTS_DIR, f"{tipo}_realce.png"), dpi=300)
-        
-        plt.figure(figsize=(10, 8))
-        plt.imshow(segmentacao)
-        plt.title(f"Segmentação de Estruturas - {tipo.replace('_', ' ').title()}")
-        plt.axis('off')
-        plt.tight_layout()
-        plt.savefig(os.path.join(RESULTS_DIR, f"{tipo}_segmentacao.png"), dpi=300)
+    with ArenaCompartilhada() as arena:
+        dtype = np.float32 if economizar_memoria else np.float64
+        imagens = arena.criar('imagens', (len(tipos), 512, 512), dtype)
+        buffers = BuffersTrabalho() if economizar_memoria else None
+        for indice, tipo in enumerate(tipos):
+            print(f"Processando {tipo}...")
+            
+            # Gerar imagem simulada diretamente na arena
+            with etapa('geracao', itens=imagens[indice].size, tipo=tipo):
+                gerar_imagem_lidar_simulada(tipo=tipo, saida=imagens[indice], buffers=buffers)
         
-        plt.close('all')
+        parametros = {
+            'tipos': tipos,
+            'modo_saida': modo_saida,
+            'dir_cache': dir_cache,
+            'cache_max_mb': cache_max_mb,
+            'economizar_memoria': economizar_memoria,
+            'relatorio_memoria': relatorio_memoria,
+            'etapas': {
+                'sigma_suavizacao': sigma_suavizacao,
+                'sigma_canny': sigma_canny,
+                'clip_limit': clip_limit,
+                'min_distance': min_distance,
+            },
+        }
+        # O relatório de memória mede cada tipo em um processo novo: no mesmo processo,
+        # a memória liberada pelo tipo anterior é reaproveitada pelo alocador e o pico
+        # dos tipos seguintes quase não passa da memória residente inicial
+        retornos = mapear_com_arena(_processar_tipo, arena, range(len(tipos)), n_processos, parametros,
+                                    processo_por_tarefa=relatorio_memoria)
+    
+    if relatorio_memoria:
+        for tipo, relatorio in retornos:
+            print(f"Pico de memória por etapa ({tipo}):")
+            print(relatorio)
 
 if __name__ == "__main__":
     """
     Ponto de entrada principal do script.
     """
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Detecção de sítios arqueológicos em imagens LIDAR simuladas")
+    parser.add_argument('--modo-saida', choices=MODOS_SAIDA, default='figuras',
+                        help="'arrays' grava apenas os arrays brutos, sem renderizar figuras")
+    parser.add_argument('--cache', metavar='DIRETORIO', default=None,
+                        help="Diretório do cache de produtos intermediários (desativado se omitido)")
+    parser.add_argument('--cache-max-mb', type=float, default=1024,
+                        help="Tamanho máximo do cache em megabytes")
+    parser.add_argument('--sigma', type=float, default=1.0,
+                        help="Sigma do filtro gaussiano anterior ao Canny")
+    parser.add_argument('--clip-limit', type=float, default=0.03,
+                        help="Limite de recorte do CLAHE")
+    parser.add_argument('--min-distance', type=int, default=20,
+                        help="Distância mínima entre marcadores do watershed")
+    parser.add_argument('--economizar-memoria', action='store_true',
+                        help="Processar em float32, com operações no lugar e buffers reutilizados "
+                             "(reduz bordas, segmentação e saída; o realce custa o mesmo nos dois modos)")
+    parser.add_argument('--relatorio-memoria', action='store_true',
+                        help="Imprimir o pico de memória residente de cada etapa")
+    argumentos = parser.parse_args()
+    
     print("Iniciando detecção de sítios arqueológicos na Amazônia...")
     criar_diretorio_se_nao_existir(RESULTS_DIR)
-    processar_e_salvar_imagens()
+    processar_e_salvar_imagens(n_processos=None, modo_saida=argumentos.modo_saida,
+                               dir_cache=argumentos.cache, cache_max_mb=argumentos.cache_max_mb,
+                               sigma_suavizacao=argumentos.sigma, clip_limit=argumentos.clip_limit,
+                               min_distance=argumentos.min_distance,
+                               economizar_memoria=argumentos.economizar_memoria,
+                               relatorio_memoria=argumentos.relatorio_memoria)
     print(f"Processamento concluído. Resultados salvos em: {RESULTS_DIR}")
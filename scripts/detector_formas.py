@@ -0,0 +1,303 @@
+# Detector de Formas Geométricas por Correlação FFT
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script detecta as formas geométricas típicas das estruturas arqueológicas
+# (anéis de aldeias circulares, valas circulares e recintos quadrados de geoglifos)
+# correlacionando o mapa de bordas com modelos de anéis e quadrados de vários tamanhos
+# e orientações. Cada correlação é feita no domínio da frequência, em tempo
+# proporcional a N log N do tamanho do tile.
+
+import numpy as np
+from scipy import fft
+from skimage import feature
+
+from deteccao_sitios import gerar_imagem_lidar_simulada, detectar_bordas
+
+# Classes de estrutura (mesma numeração das máscaras de gerador_cenas)
+CLASSE_GEOGLIFO = 1
+CLASSE_ALDEIA_CIRCULAR = 2
+CLASSE_VALA_CIRCULAR = 3
+
+NOMES_CLASSES = {
+    CLASSE_GEOGLIFO: 'geoglifo',
+    CLASSE_ALDEIA_CIRCULAR: 'aldeia_circular',
+    CLASSE_VALA_CIRCULAR: 'vala_circular',
+}
+
+# Candidatos retornados pelo detector
+DTYPE_CANDIDATOS = np.dtype([
+    ('y', np.float32),
+    ('x', np.float32),
+    ('classe', np.uint8),
+    ('raio', np.float32),
+    ('orientacao', np.float32),
+    ('escore', np.float32),
+])
+
+# Um candidato dentro da pegada de outro é descartado se o escore do envolvente
+# for ao menos (1 - TOLERANCIA_ESCORE_ANINHADO) vezes o seu
+TOLERANCIA_ESCORE_ANINHADO = 0.05
+
+
+def modelo_anel(raio, espessura=3.0):
+    """
+    Cria um modelo de anel normalizado (soma 1).
+
+    Args:
+        raio (float): Raio do anel em pixels
+        espessura (float): Largura da faixa do anel (tolerância ao raio exato)
+
+    Returns:
+        numpy.ndarray: Modelo quadrado de lado ímpar
+    """
+    r = int(np.ceil(raio + espessura))
+    y, x = np.ogrid[-r:r + 1, -r:r + 1]
+    distancia = np.sqrt(x * x + y * y)
+    modelo = (np.abs(distancia - raio) <= espessura / 2).astype(np.float32)
+    return modelo / modelo.sum()
+
+
+def modelo_disco(raio):
+    """
+    Cria um modelo de disco normalizado (soma 1), usado para medir o entorno.
+    """
+    r = int(np.ceil(raio))
+    y, x = np.ogrid[-r:r + 1, -r:r + 1]
+    modelo = (x * x + y * y <= raio * raio).astype(np.float32)
+    return modelo / modelo.sum()
+
+
+def modelo_quadrado(meio_lado, angulo, espessura=3.0):
+    """
+    Cria um modelo de moldura quadrada rotacionada, normalizado (soma 1).
+
+    Args:
+        meio_lado (float): Metade do lado do quadrado em pixels
+        angulo (float): Orientação em radianos (o quadrado é simétrico a cada 90°)
+        espessura (float): Largura da faixa da moldura
+
+    Returns:
+        numpy.ndarray: Modelo quadrado de lado ímpar
+    """
+    r = int(np.ceil((meio_lado + espessura) * np.sqrt(2)))
+    y, x = np.ogrid[-r:r + 1, -r:r + 1]
+    u = x * np.cos(angulo) + y * np.sin(angulo)
+    v = -x * np.sin(angulo) + y * np.cos(angulo)
+    distancia = np.maximum(np.abs(u), np.abs(v))
+    modelo = (np.abs(distancia - meio_lado) <= espessura / 2).astype(np.float32)
+    return modelo / modelo.sum()
+
+
+class CorrelacionadorFFT:
+    """
+    Correlaciona uma imagem com vários modelos reaproveitando a mesma FFT da imagem.
+
+    A imagem é completada com zeros para evitar o efeito circular da FFT; cada
+    modelo custa uma FFT direta e uma inversa do tamanho da imagem completada.
+    """
+
+    def __init__(self, imagem, raio_maximo):
+        """
+        Args:
+            imagem (numpy.ndarray): Imagem (ou mapa de bordas) a correlacionar
+            raio_maximo (int): Maior meia-largura dos modelos que serão usados
+        """
+        self.forma = imagem.shape
+        self.forma_fft = tuple(fft.next_fast_len(s + raio_maximo + 1, real=True)
+                               for s in imagem.shape)
+        self.espectro = fft.rfft2(np.asarray(imagem, dtype=np.float32), s=self.forma_fft,
+                                  workers=-1)
+
+    def correlacionar(self, modelo):
+        """
+        Calcula a correlação da imagem com um modelo centrado.
+
+        Args:
+            modelo (numpy.ndarray): Modelo de lado ímpar
+
+        Returns:
+            numpy.ndarray: Resposta com a forma da imagem original
+        """
+        altura, largura = modelo.shape
+        completo = np.zeros(self.forma_fft, dtype=np.float32)
+        completo[:altura, :largura] = modelo[::-1, ::-1]
+        completo = np.roll(completo, (-(altura // 2), -(largura // 2)), axis=(0, 1))
+        resposta = fft.irfft2(self.espectro * fft.rfft2(completo, workers=-1),
+                              s=self.forma_fft, workers=-1)
+        return resposta[:self.forma[0], :self.forma[1]]
+
+
+def detectar_formas(bordas, imagem=None, raio_min=8, raio_max=160, espessura=3.0,
+                    passo_angular=15.0, limiar=0.25, min_distance=None):
+    """
+    Detecta anéis e molduras quadradas em um mapa de bordas.
+
+    A resposta de cada modelo é a fração do modelo coberta por bordas; para cada
+    pixel guarda-se o melhor modelo (família, raio e orientação) e os máximos
+    locais acima do limiar tornam-se candidatos. Quando a imagem de elevação é
+    informada, anéis elevados são classificados como aldeia circular e anéis
+    rebaixados como vala circular; molduras quadradas são geoglifos.
+
+    Args:
+        bordas (numpy.ndarray): Mapa de bordas (ex.: saída de detectar_bordas)
+        imagem (numpy.ndarray, opcional): Imagem de elevação do mesmo tile
+        raio_min (float): Menor raio / meio-lado procurado, em pixels
+        raio_max (float): Maior raio / meio-lado procurado, em pixels
+        espessura (float): Tolerância radial dos modelos, em pixels
+        passo_angular (float): Passo das orientações dos quadrados, em graus
+        limiar (float): Fração mínima do modelo coberta por bordas
+        min_distance (int, opcional): Distância mínima entre candidatos (padrão: raio_min)
+
+    Returns:
+        numpy.ndarray: Candidatos com DTYPE_CANDIDATOS, sem os aninhados em outro
+        de escore maior (suprimir_aninhados), ordenados por escore decrescente
+    """
+    raios = np.arange(raio_min, raio_max + espessura, espessura)
+    angulos = np.radians(np.arange(0.0, 90.0, passo_angular))
+    raio_maximo = int(np.ceil((raio_max + espessura) * np.sqrt(2))) + 1
+    correlacionador = CorrelacionadorFFT(bordas.astype(np.float32), raio_maximo)
+
+    # Melhor resposta por pixel e o modelo que a produziu
+    melhor = np.full(bordas.shape, -np.inf, dtype=np.float32)
+    melhor_raio = np.zeros(bordas.shape, dtype=np.float32)
+    melhor_angulo = np.full(bordas.shape, np.nan, dtype=np.float32)
+
+    def acumular(resposta, raio, angulo):
+        maior = resposta > melhor
+        melhor[maior] = resposta[maior]
+        melhor_raio[maior] = raio
+        melhor_angulo[maior] = angulo
+
+    for raio in raios:
+        acumular(correlacionador.correlacionar(modelo_anel(raio, espessura)), raio, np.nan)
+        for angulo in angulos:
+            acumular(correlacionador.correlacionar(modelo_quadrado(raio, angulo, espessura)),
+                     raio, angulo)
+
+    if min_distance is None:
+        min_distance = int(raio_min)
+    picos = feature.peak_local_max(melhor, min_distance=min_distance, threshold_abs=limiar,
+                                   exclude_border=False)
+
+    candidatos = np.zeros(len(picos), dtype=DTYPE_CANDIDATOS)
+    if len(picos) == 0:
+        return candidatos
+
+    py, px = picos[:, 0], picos[:, 1]
+    candidatos['y'] = py
+    candidatos['x'] = px
+    candidatos['raio'] = melhor_raio[py, px]
+    candidatos['orientacao'] = np.nan_to_num(melhor_angulo[py, px], nan=0.0)
+    candidatos['escore'] = melhor[py, px]
+
+    quadrado = ~np.isnan(melhor_angulo[py, px])
+    candidatos['classe'] = np.where(quadrado, CLASSE_GEOGLIFO, CLASSE_ALDEIA_CIRCULAR)
+
+    # Polaridade dos anéis: média sobre o anel menos a média do disco envolvente
+    if imagem is not None and (~quadrado).any():
+        correlacionador_imagem = CorrelacionadorFFT(imagem, raio_maximo)
+        circulos = np.flatnonzero(~quadrado)
+        for raio in np.unique(candidatos['raio'][circulos]):
+            selecao = circulos[candidatos['raio'][circulos] == raio]
+            anel = correlacionador_imagem.correlacionar(modelo_anel(raio, espessura))
+            disco = correlacionador_imagem.correlacionar(modelo_disco(raio * 1.3))
+            polaridade = anel[py[selecao], px[selecao]] - disco[py[selecao], px[selecao]]
+            candidatos['classe'][selecao] = np.where(polaridade < 0, CLASSE_VALA_CIRCULAR,
+                                                     CLASSE_ALDEIA_CIRCULAR)
+
+    return suprimir_aninhados(candidatos[np.argsort(-candidatos['escore'])], espessura)
+
+
+def _contorno(candidato, n_pontos=16):
+    """
+    Pontos do contorno da pegada de um candidato (anel ou moldura quadrada).
+
+    Args:
+        candidato (numpy.void): Candidato com DTYPE_CANDIDATOS
+        n_pontos (int): Número de pontos sobre o anel
+
+    Returns:
+        numpy.ndarray: Pontos (y, x) do contorno
+    """
+    if candidato['classe'] == CLASSE_GEOGLIFO:
+        angulos = candidato['orientacao'] + np.pi / 4 + np.arange(4) * np.pi / 2
+        raio = candidato['raio'] * np.sqrt(2)
+    else:
+        angulos = np.linspace(0.0, 2 * np.pi, n_pontos, endpoint=False)
+        raio = candidato['raio']
+    return np.column_stack([candidato['y'] + raio * np.sin(angulos),
+                            candidato['x'] + raio * np.cos(angulos)])
+
+
+def _dentro(pontos, candidato, espessura):
+    """
+    Verifica se todos os pontos estão dentro da pegada de um candidato.
+
+    Args:
+        pontos (numpy.ndarray): Pontos (y, x)
+        candidato (numpy.void): Candidato envolvente
+        espessura (float): Tolerância, em pixels
+
+    Returns:
+        bool: True se todos os pontos estiverem dentro
+    """
+    dy = pontos[:, 0] - candidato['y']
+    dx = pontos[:, 1] - candidato['x']
+    if candidato['classe'] == CLASSE_GEOGLIFO:
+        angulo = candidato['orientacao']
+        u = dx * np.cos(angulo) + dy * np.sin(angulo)
+        v = -dx * np.sin(angulo) + dy * np.cos(angulo)
+        distancia = np.maximum(np.abs(u), np.abs(v))
+    else:
+        distancia = np.hypot(dx, dy)
+    return bool(np.all(distancia <= candidato['raio'] + espessura))
+
+
+def suprimir_aninhados(candidatos, espessura=3.0, tolerancia=TOLERANCIA_ESCORE_ANINHADO):
+    """
+    Supressão entre modelos: descarta os candidatos cuja pegada está dentro da
+    de outro candidato mantido com escore igual ou maior (a menos da tolerância).
+
+    Os máximos locais de raios e famílias diferentes não se suprimem no
+    peak_local_max; um geoglifo subdividido, por exemplo, responde com a moldura
+    externa e com cada quadrado interno. Os envolventes são avaliados primeiro
+    (do maior para o menor), de modo que a estrutura inteira prevaleça sobre as
+    suas partes quando os escores estão praticamente empatados.
+
+    Args:
+        candidatos (numpy.ndarray): Candidatos com DTYPE_CANDIDATOS
+        espessura (float): Tolerância de contenção, em pixels
+        tolerancia (float): Fração do escore abaixo da qual o envolvente ainda suprime
+
+    Returns:
+        numpy.ndarray: Candidatos restantes, ordenados por escore decrescente
+    """
+    if len(candidatos) < 2:
+        return candidatos
+    fator = np.where(candidatos['classe'] == CLASSE_GEOGLIFO, np.sqrt(2), 1.0)
+    ordem = np.lexsort((-candidatos['escore'], -candidatos['raio'] * fator))
+    mantidos = []
+    for j in ordem:
+        pontos = _contorno(candidatos[j])
+        if not any(candidatos['escore'][i] >= (1 - tolerancia) * candidatos['escore'][j]
+                   and _dentro(pontos, candidatos[i], espessura) for i in mantidos):
+            mantidos.append(j)
+    restantes = candidatos[np.sort(mantidos)]
+    return restantes[np.argsort(-restantes['escore'], kind='stable')]
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    print("Detectando formas geométricas em imagens LIDAR simuladas...")
+    for tipo in NOMES_CLASSES.values():
+        imagem = gerar_imagem_lidar_simulada(tipo=tipo)
+        bordas = detectar_bordas(imagem)
+        candidatos = detectar_formas(bordas, imagem, raio_min=32, raio_max=144)
+        print(f"{tipo}: {len(candidatos)} candidatos")
+        for candidato in candidatos[:3]:
+            print(f"  {NOMES_CLASSES[candidato['classe']]} em ({candidato['y']:.0f}, "
+                  f"{candidato['x']:.0f}), raio {candidato['raio']:.0f}, "
+                  f"orientação {np.degrees(candidato['orientacao']):.0f}°, "
+                  f"escore {candidato['escore']:.2f}")
@@ -0,0 +1,218 @@
+# Espaço de Escala Compartilhado
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script mantém, para um tile ou imagem, os produtos intermediários comuns
+# às etapas de detecção (níveis gaussianos, níveis de cinza quantizados, histograma e
+# transformada de distância), além dos gradientes usados pela busca piramidal,
+# calculando cada um apenas uma vez.
+
+import numpy as np
+from scipy import ndimage
+from skimage import filters
+
+# Número padrão de níveis de cinza (mesmo do CLAHE e do Otsu do skimage)
+NBINS = 256
+
+
+class EspacoEscala:
+    """
+    Cache de produtos intermediários de uma imagem, compartilhado entre etapas.
+
+    Níveis gaussianos são derivados incrementalmente do maior nível já calculado
+    (suavizar com sigma_a e depois com sqrt(sigma_b² - sigma_a²) equivale a
+    suavizar com sigma_b), então a cadeia gaussiana + Canny reaproveita o nível
+    do pré-filtro em vez de convoluir a imagem bruta duas vezes. O Canny
+    (feature.canny) ainda calcula as próprias derivadas de Sobel sobre esse nível;
+    os gradientes em cache servem à busca piramidal. Os níveis de cinza
+    quantizados alimentam tanto os histogramas por região do CLAHE quanto o
+    histograma global do Otsu.
+    """
+
+    def __init__(self, imagem, faixa=None, nbins=NBINS):
+        """
+        Args:
+            imagem (numpy.ndarray): Imagem (ou janela de tile) de entrada
+            faixa (tuple, opcional): Faixa (mínimo, máximo) usada na quantização; se
+                omitida, usa a faixa da própria imagem, como o Otsu do skimage
+            nbins (int): Número de níveis de cinza
+        """
+        self.imagem = imagem
+        self.nbins = nbins
+        if faixa is None:
+            faixa = (float(imagem.min()), float(imagem.max()))
+        self.faixa = faixa
+        self._suavizadas = {0.0: imagem}
+        self._gradientes = {}
+        self._distancias = {}
+        self._niveis = None
+        self._histograma = None
+
+    def suavizada(self, sigma):
+        """
+        Retorna a imagem suavizada por uma gaussiana de desvio padrão sigma.
+
+        Args:
+            sigma (float): Desvio padrão da gaussiana
+
+        Returns:
+            numpy.ndarray: Nível gaussiano (calculado uma única vez)
+        """
+        sigma = float(sigma)
+        if sigma not in self._suavizadas:
+            # Partir do maior nível já calculado abaixo de sigma
+            base = max(s for s in self._suavizadas if s < sigma)
+            incremento = np.sqrt(sigma ** 2 - base ** 2)
+            self._suavizadas[sigma] = ndimage.gaussian_filter(
+                self._suavizadas[base], sigma=incremento, mode='nearest'
+            )
+        return self._suavizadas[sigma]
+
+    def semear(self, sigma, nivel):
+        """
+        Registra um nível gaussiano já calculado (ex.: lido de cache_rasters).
+
+        Níveis maiores derivados depois partem dele, exatamente como se tivesse
+        sido calculado por suavizada.
+
+        Args:
+            sigma (float): Desvio padrão do nível gaussiano
+            nivel (numpy.ndarray): Imagem suavizada com a forma da imagem do espaço
+        """
+        self._suavizadas[float(sigma)] = nivel
+
+    def gradiente(self, sigma):
+        """
+        Retorna as derivadas de Sobel e a magnitude do gradiente de um nível gaussiano.
+
+        Usado pela densidade de bordas de busca_piramidal; o Canny de
+        detectar_bordas não recebe derivadas prontas e calcula as suas.
+
+        Args:
+            sigma (float): Desvio padrão do nível gaussiano
+
+        Returns:
+            tuple: (derivada vertical, derivada horizontal, magnitude)
+        """
+        sigma = float(sigma)
+        if sigma not in self._gradientes:
+            suavizada = self.suavizada(sigma)
+            derivada_y = ndimage.sobel(suavizada, axis=0)
+            derivada_x = ndimage.sobel(suavizada, axis=1)
+            self._gradientes[sigma] = (derivada_y, derivada_x, np.hypot(derivada_y, derivada_x))
+        return self._gradientes[sigma]
+
+    def niveis(self):
+        """
+        Retorna os níveis de cinza quantizados (0..nbins-1) sobre a faixa do espaço.
+
+        Returns:
+            numpy.ndarray: Níveis de cinza inteiros
+        """
+        if self._niveis is None:
+            minimo, maximo = self.faixa
+            escala = self.nbins / max(maximo - minimo, np.finfo(float).eps)
+            self._niveis = np.clip(((self.imagem - minimo) * escala).astype(np.intp),
+                                   0, self.nbins - 1)
+        return self._niveis
+
+    def histograma(self):
+        """
+        Retorna o histograma global dos níveis de cinza e os centros dos bins.
+
+        Returns:
+            tuple: (contagens, centros) no formato aceito por threshold_otsu(hist=...)
+        """
+        if self._histograma is None:
+            contagens = np.bincount(self.niveis().ravel(), minlength=self.nbins)
+            minimo, maximo = self.faixa
+            bordas = np.linspace(minimo, maximo, self.nbins + 1)
+            self._histograma = (contagens, (bordas[:-1] + bordas[1:]) / 2)
+        return self._histograma
+
+    def limiar_otsu(self):
+        """
+        Retorna o limiar de Otsu calculado a partir do histograma compartilhado.
+
+        Returns:
+            float: Limiar de Otsu
+        """
+        return filters.threshold_otsu(hist=self.histograma())
+
+    def distancia(self, limiar):
+        """
+        Retorna a máscara binária e a transformada de distância euclidiana para um limiar.
+
+        Args:
+            limiar (float): Limiar de binarização
+
+        Returns:
+            tuple: (mascara_binaria, distancia)
+        """
+        limiar = float(limiar)
+        if limiar not in self._distancias:
+            mascara = self.imagem > limiar
+            self._distancias[limiar] = (mascara, ndimage.distance_transform_edt(mascara))
+        return self._distancias[limiar]
+
+
+def equalizar_clahe_alinhado(imagem, kernel_size=64, clip_limit=0.03, nbins=NBINS, niveis=None):
+    """
+    CLAHE com regiões contextuais alinhadas à origem da imagem e faixa fixa [0, 1].
+
+    Ao contrário de exposure.equalize_adapthist, não reescala a intensidade pela
+    faixa da própria imagem. Assim, janelas cuja origem é múltipla de kernel_size
+    produzem exatamente os mesmos valores que a imagem inteira, sem costuras.
+
+    Args:
+        imagem (numpy.ndarray): Imagem normalizada em [0, 1]
+        kernel_size (int): Lado das regiões contextuais
+        clip_limit (float): Limite de recorte normalizado do histograma
+        nbins (int): Número de níveis de cinza
+        niveis (numpy.ndarray, opcional): Níveis já quantizados (ex.: EspacoEscala.niveis)
+
+    Returns:
+        numpy.ndarray: Imagem equalizada em [0, 1]
+    """
+    altura, largura = imagem.shape
+    k = kernel_size
+    n_by, n_bx = -(-altura // k), -(-largura // k)
+
+    # Quantizar níveis de cinza
+    if niveis is None:
+        niveis = np.clip((imagem * nbins).astype(np.intp), 0, nbins - 1)
+
+    # Histograma de cada região contextual em uma única contagem
+    bloco_y = np.arange(altura) // k
+    bloco_x = np.arange(largura) // k
+    indice_bloco = (bloco_y[:, None] * n_bx + bloco_x[None, :]) * nbins + niveis
+    hist = np.bincount(indice_bloco.ravel(), minlength=n_by * n_bx * nbins)
+    hist = hist.reshape(n_by, n_bx, nbins).astype(np.float64)
+    del indice_bloco
+
+    # Recortar o histograma e redistribuir o excesso uniformemente
+    contagens = hist.sum(axis=-1, keepdims=True)
+    limite = np.maximum(clip_limit * contagens, 1.0)
+    excesso = np.maximum(hist - limite, 0).sum(axis=-1, keepdims=True)
+    hist = np.minimum(hist, limite) + excesso / nbins
+
+    # Função de mapeamento (CDF) por região
+    mapeamento = np.cumsum(hist, axis=-1) / np.maximum(contagens, 1.0)
+
+    # Interpolação bilinear entre os centros das regiões vizinhas
+    fy = (np.arange(altura) + 0.5) / k - 0.5
+    fx = (np.arange(largura) + 0.5) / k - 0.5
+    iy0 = np.floor(fy).astype(np.intp)
+    ix0 = np.floor(fx).astype(np.intp)
+    wy = (fy - iy0)[:, None]
+    wx = (fx - ix0)[None, :]
+    iy1 = np.clip(iy0 + 1, 0, n_by - 1)[:, None]
+    ix1 = np.clip(ix0 + 1, 0, n_bx - 1)[None, :]
+    iy0 = np.clip(iy0, 0, n_by - 1)[:, None]
+    ix0 = np.clip(ix0, 0, n_bx - 1)[None, :]
+
+    resultado = (1 - wy) * (1 - wx) * mapeamento[iy0, ix0, niveis]
+    resultado += (1 - wy) * wx * mapeamento[iy0, ix1, niveis]
+    resultado += wy * (1 - wx) * mapeamento[iy1, ix0, niveis]
+    resultado += wy * wx * mapeamento[iy1, ix1, niveis]
+
+    return np.clip(resultado, 0, 1)
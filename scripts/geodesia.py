@@ -0,0 +1,313 @@
+# Distâncias Geodésicas Vetorizadas
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script reúne as distâncias entre coordenadas geográficas usadas pelos
+# scripts de previsão: haversine (esfera) e Vincenty (elipsoide WGS84), ambas vetorizadas,
+# distâncias entre todos os pares calculadas em blocos de memória limitada e busca do
+# vizinho mais próximo por árvore k-d sobre vetores unitários. Assim, limiares em
+# quilômetros (5 km, 10 km) valem igualmente em qualquer latitude.
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Raio médio da Terra (IUGG) e elipsoide WGS84
+RAIO_TERRA_KM = 6371.0088
+SEMIEIXO_MAIOR_KM = 6378.137
+ACHATAMENTO = 1 / 298.257223563
+SEMIEIXO_MENOR_KM = SEMIEIXO_MAIOR_KM * (1 - ACHATAMENTO)
+
+# Métodos de distância disponíveis
+METODOS = ('haversine', 'vincenty')
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Distância do grande círculo (esfera de raio médio) entre coordenadas em graus.
+
+    Os argumentos seguem as regras de broadcasting do NumPy.
+
+    Returns:
+        numpy.ndarray: Distâncias em quilômetros
+    """
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def vincenty_km(lat1, lon1, lat2, lon2, max_iteracoes=100, tolerancia=1e-12):
+    """
+    Distância geodésica no elipsoide WGS84 pela fórmula inversa de Vincenty.
+
+    Todos os pares iteram juntos, e cada um deixa de ser atualizado ao
+    convergir. Pares quase antípodas, onde o método não converge, recebem a
+    distância haversine.
+
+    Args:
+        lat1, lon1, lat2, lon2: Coordenadas em graus (com broadcasting)
+        max_iteracoes (int): Número máximo de iterações
+        tolerancia (float): Variação de lambda (radianos) considerada convergida
+
+    Returns:
+        numpy.ndarray: Distâncias em quilômetros
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64)
+                                                   for v in (lat1, lon1, lat2, lon2)))
+    a, b, f = SEMIEIXO_MAIOR_KM, SEMIEIXO_MENOR_KM, ACHATAMENTO
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sinU1, cosU1, sinU2, cosU2 = np.sin(U1), np.cos(U1), np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    ativo = np.ones(L.shape, dtype=bool)
+    sin_sigma = np.zeros(L.shape)
+    cos_sigma = np.ones(L.shape)
+    sigma = np.zeros(L.shape)
+    cos2_alpha = np.ones(L.shape)
+    cos_2sigma_m = np.zeros(L.shape)
+    for _ in range(max_iteracoes):
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        sin_sigma_i = np.hypot(cosU2 * sin_lam, cosU1 * sinU2 - sinU1 * cosU2 * cos_lam)
+        cos_sigma_i = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+        sigma_i = np.arctan2(sin_sigma_i, cos_sigma_i)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sin_alpha = np.where(sin_sigma_i > 0, cosU1 * cosU2 * sin_lam / sin_sigma_i, 0.0)
+            cos2_alpha_i = 1 - sin_alpha ** 2
+            cos_2sigma_m_i = np.where(cos2_alpha_i > 0,
+                                      cos_sigma_i - 2 * sinU1 * sinU2 / cos2_alpha_i, 0.0)
+        C = f / 16 * cos2_alpha_i * (4 + f * (4 - 3 * cos2_alpha_i))
+        lam_novo = L + (1 - C) * f * sin_alpha * (
+            sigma_i + C * sin_sigma_i * (cos_2sigma_m_i + C * cos_sigma_i * (-1 + 2 * cos_2sigma_m_i ** 2)))
+
+        # Atualizar apenas os pares ainda não convergidos
+        sin_sigma = np.where(ativo, sin_sigma_i, sin_sigma)
+        cos_sigma = np.where(ativo, cos_sigma_i, cos_sigma)
+        sigma = np.where(ativo, sigma_i, sigma)
+        cos2_alpha = np.where(ativo, cos2_alpha_i, cos2_alpha)
+        cos_2sigma_m = np.where(ativo, cos_2sigma_m_i, cos_2sigma_m)
+        convergiu = np.abs(lam_novo - lam) < tolerancia
+        lam = np.where(ativo, lam_novo, lam)
+        ativo &= ~convergiu
+        if not ativo.any():
+            break
+
+    u2 = cos2_alpha * (a * a - b * b) / (b * b)
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2) -
+        B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+    distancia = b * A * (sigma - delta_sigma)
+    if ativo.any():
+        distancia = np.where(ativo, haversine_km(lat1, lon1, lat2, lon2), distancia)
+    return distancia
+
+
+def distancia_km(lat1, lon1, lat2, lon2, metodo='haversine'):
+    """
+    Distância entre coordenadas (em graus) pelo método escolhido.
+
+    Args:
+        metodo (str): 'haversine' (esfera, mais rápido) ou 'vincenty' (elipsoide WGS84)
+
+    Returns:
+        numpy.ndarray: Distâncias em quilômetros
+    """
+    if metodo == 'haversine':
+        return haversine_km(lat1, lon1, lat2, lon2)
+    if metodo == 'vincenty':
+        return vincenty_km(lat1, lon1, lat2, lon2)
+    raise ValueError(f"metodo deve ser um de {METODOS}")
+
+
+def _linhas_por_bloco(n_colunas, memoria_max_mb, temporarios=8):
+    """
+    Linhas por bloco para que os temporários float64 de um bloco caibam no orçamento.
+    """
+    bytes_por_linha = max(n_colunas, 1) * 8 * temporarios
+    return max(1, int(memoria_max_mb * 1024 * 1024 // bytes_por_linha))
+
+
+def iterar_distancias_pareadas(lat_a, lon_a, lat_b, lon_b, metodo='haversine', memoria_max_mb=64):
+    """
+    Gera a matriz de distâncias entre dois conjuntos de pontos em blocos de linhas.
+
+    Cada bloco cobre algumas linhas de A contra todos os pontos de B, com os
+    temporários limitados a memoria_max_mb; a matriz N×M inteira nunca é
+    montada.
+
+    Args:
+        lat_a, lon_a (array): Coordenadas dos N pontos de A, em graus
+        lat_b, lon_b (array): Coordenadas dos M pontos de B, em graus
+        metodo (str): 'haversine' ou 'vincenty'
+        memoria_max_mb (float): Orçamento de memória dos temporários de um bloco
+
+    Yields:
+        tuple: (índice da primeira linha, bloco de distâncias em km com forma (linhas, M))
+    """
+    lat_a, lon_a = np.asarray(lat_a, dtype=np.float64), np.asarray(lon_a, dtype=np.float64)
+    lat_b, lon_b = np.asarray(lat_b, dtype=np.float64), np.asarray(lon_b, dtype=np.float64)
+    temporarios = 8 if metodo == 'haversine' else 40
+    passo = _linhas_por_bloco(len(lat_b), memoria_max_mb, temporarios)
+    for inicio in range(0, len(lat_a), passo):
+        fim = min(inicio + passo, len(lat_a))
+        yield inicio, distancia_km(lat_a[inicio:fim, None], lon_a[inicio:fim, None],
+                                   lat_b[None, :], lon_b[None, :], metodo)
+
+
+def distancias_pareadas_km(lat_a, lon_a, lat_b, lon_b, metodo='haversine', memoria_max_mb=64):
+    """
+    Matriz N×M de distâncias entre dois conjuntos de pontos, calculada em blocos.
+
+    Apenas a matriz de saída ocupa N×M; os temporários do cálculo ficam
+    limitados a memoria_max_mb (ver iterar_distancias_pareadas).
+
+    Returns:
+        numpy.ndarray: Distâncias em quilômetros, forma (N, M)
+    """
+    distancias = np.empty((len(lat_a), len(lat_b)), dtype=np.float64)
+    for inicio, bloco in iterar_distancias_pareadas(lat_a, lon_a, lat_b, lon_b, metodo, memoria_max_mb):
+        distancias[inicio:inicio + len(bloco)] = bloco
+    return distancias
+
+
+def vetores_unitarios(latitude, longitude):
+    """
+    Converte latitude e longitude (graus) em vetores unitários 3D.
+
+    A distância euclidiana entre vetores unitários (a corda) cresce junto com a
+    distância do grande círculo, então uma árvore k-d sobre eles encontra os
+    vizinhos mais próximos na esfera.
+    """
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def corda_para_km(corda):
+    """
+    Converte a distância da corda entre vetores unitários em distância do grande círculo.
+    """
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.clip(np.asarray(corda) / 2, 0.0, 1.0))
+
+
+def km_para_corda(distancia_km):
+    """
+    Converte uma distância do grande círculo na corda entre vetores unitários.
+    """
+    return 2 * np.sin(np.minimum(np.asarray(distancia_km) / RAIO_TERRA_KM, np.pi) / 2)
+
+
+class IndiceGeodesico:
+    """
+    Árvore k-d de pontos geográficos para buscas de vizinhos em quilômetros.
+    """
+
+    def __init__(self, latitude, longitude):
+        """
+        Args:
+            latitude, longitude (array): Coordenadas dos pontos de referência, em graus
+        """
+        self.n = len(latitude)
+        self.arvore = cKDTree(vetores_unitarios(latitude, longitude)) if self.n else None
+
+    def vizinho_mais_proximo(self, latitude, longitude, indices_proprios=None,
+                             distancia_max_km=np.inf, tamanho_bloco=1000000):
+        """
+        Retorna o ponto de referência mais próximo de cada consulta.
+
+        Args:
+            latitude, longitude (array): Coordenadas das consultas, em graus
+            indices_proprios (array, opcional): Para cada consulta, o índice dela
+                entre os pontos de referência (-1 se não for um deles); o próprio
+                ponto é ignorado (leave-one-out) por uma consulta de dois vizinhos
+            distancia_max_km (float): Distância máxima; consultas sem vizinho
+                dentro dela recebem distância infinita e índice -1
+            tamanho_bloco (int): Consultas processadas por vez (limita a memória)
+
+        Returns:
+            tuple: (distâncias em km do grande círculo, índices dos vizinhos)
+        """
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        n = len(latitude)
+        distancias = np.full(n, np.inf)
+        indices = np.full(n, -1, dtype=np.int64)
+        if self.n == 0:
+            return distancias, indices
+
+        corda_max = km_para_corda(distancia_max_km) if np.isfinite(distancia_max_km) else np.inf
+        k = 1 if indices_proprios is None else 2
+        for inicio in range(0, n, tamanho_bloco):
+            fim = min(inicio + tamanho_bloco, n)
+            corda, vizinho = self.arvore.query(vetores_unitarios(latitude[inicio:fim], longitude[inicio:fim]),
+                                               k=k, distance_upper_bound=corda_max)
+            if k == 2:
+                # Descartar o primeiro vizinho quando for o próprio ponto
+                proprio = vizinho[:, 0] == np.asarray(indices_proprios)[inicio:fim]
+                corda = np.where(proprio, corda[:, 1], corda[:, 0])
+                vizinho = np.where(proprio, vizinho[:, 1], vizinho[:, 0])
+            encontrado = np.isfinite(corda)
+            distancias[inicio:fim] = np.where(encontrado, corda_para_km(np.where(encontrado, corda, 0.0)), np.inf)
+            indices[inicio:fim] = np.where(encontrado, vizinho, -1)
+        return distancias, indices
+
+    def vizinhos_no_raio(self, latitude, longitude, raio_km):
+        """
+        Retorna, para cada consulta, os índices dos pontos a até raio_km.
+
+        Returns:
+            list: Uma lista de índices por consulta
+        """
+        if self.n == 0:
+            return [[] for _ in range(len(latitude))]
+        return self.arvore.query_ball_point(vetores_unitarios(latitude, longitude), km_para_corda(raio_km))
+
+
+def vizinho_mais_proximo_km(lat_consulta, lon_consulta, lat_referencia, lon_referencia,
+                            indices_proprios=None, distancia_max_km=np.inf):
+    """
+    Distância (km) e índice do ponto de referência mais próximo de cada consulta.
+
+    Atalho para IndiceGeodesico(...).vizinho_mais_proximo(...); a memória é
+    proporcional a N + M, nunca a N×M.
+
+    Returns:
+        tuple: (distâncias em km, índices; -1 quando não há vizinho)
+    """
+    indice = IndiceGeodesico(lat_referencia, lon_referencia)
+    return indice.vizinho_mais_proximo(lat_consulta, lon_consulta, indices_proprios, distancia_max_km)
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    import time
+
+    print("Comparando distâncias geodésicas com a aproximação em graus...")
+    for latitude in (0.0, -5.0, -10.0, -30.0, -60.0):
+        # Deslocamento leste-oeste que a aproximação planar considera 5 km (0.045 grau)
+        planar_km = 0.045 * 111
+        print(f"  Latitude {latitude:6.1f}°: 0.045° de longitude = "
+              f"{haversine_km(latitude, 0.0, latitude, 0.045):.3f} km (haversine), "
+              f"{vincenty_km(latitude, 0.0, latitude, 0.045):.3f} km (Vincenty), "
+              f"{planar_km:.3f} km (111 km/grau)")
+
+    rng = np.random.default_rng(42)
+    n, m = 1000000, 20000
+    lat_q, lon_q = rng.uniform(-10, 5, n), rng.uniform(-75, -50, n)
+    lat_r, lon_r = rng.uniform(-10, 5, m), rng.uniform(-75, -50, m)
+
+    inicio = time.time()
+    distancias, indices = vizinho_mais_proximo_km(lat_q, lon_q, lat_r, lon_r)
+    print(f"  Vizinho mais próximo de {n} consultas entre {m} pontos em {time.time() - inicio:.2f} s")
+
+    inicio = time.time()
+    amostra = slice(0, 2000)
+    minimo = np.full(2000, np.inf)
+    for linha, bloco in iterar_distancias_pareadas(lat_q[amostra], lon_q[amostra], lat_r, lon_r):
+        minimo[linha:linha + len(bloco)] = bloco.min(axis=1)
+    print(f"  Conferência por força bruta em blocos ({2000}x{m}) em {time.time() - inicio:.2f} s: "
+          f"diferença máxima de {np.abs(minimo - distancias[amostra]).max():.2e} km")
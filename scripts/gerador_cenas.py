@@ -0,0 +1,339 @@
+# Gerador de Cenas LIDAR Simuladas em Lote
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script gera corpora de cenas LIDAR simuladas para treinar e avaliar
+# detectores. Cada cena recebe várias estruturas arqueológicas em posições, escalas,
+# rotações e profundidades aleatórias, e as imagens, máscaras de referência e caixas
+# delimitadoras são gravadas diretamente em arrays em disco.
+
+import os
+import json
+import numpy as np
+from scipy import ndimage
+
+from deteccao_sitios import RANDOM_SEED, criar_diretorio_se_nao_existir
+
+# Diretório para salvar resultados
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'corpus')
+
+# Tipos de estrutura; o índice + 1 é a classe usada nas máscaras (0 = fundo)
+TIPOS_ESTRUTURA = ('geoglifo', 'aldeia_circular', 'vala_circular')
+
+# Registro de cada estrutura inserida em uma cena
+DTYPE_CAIXAS = np.dtype([
+    ('cena', np.int32),
+    ('classe', np.uint8),
+    ('y0', np.int32),
+    ('x0', np.int32),
+    ('y1', np.int32),
+    ('x1', np.int32),
+    ('centro_y', np.float32),
+    ('centro_x', np.float32),
+    ('escala', np.float32),
+    ('rotacao', np.float32),
+    ('profundidade', np.float32),
+])
+
+
+def gerar_terrenos(n_cenas, tamanho, rng):
+    """
+    Gera o terreno natural de várias cenas de uma só vez.
+
+    Segue os mesmos passos de gerar_imagem_lidar_simulada (ruído suavizado,
+    vegetação e normalização), vetorizados sobre o eixo das cenas.
+
+    Args:
+        n_cenas (int): Número de cenas
+        tamanho (int): Lado de cada cena
+        rng (numpy.random.Generator): Gerador de números aleatórios
+
+    Returns:
+        numpy.ndarray: Terrenos normalizados, forma (n_cenas, tamanho, tamanho), float32
+    """
+    terrenos = rng.normal(0.5, 0.1, (n_cenas, tamanho, tamanho)).astype(np.float32)
+
+    # Suavizar apenas nos eixos espaciais
+    terrenos = ndimage.gaussian_filter(terrenos, sigma=(0, 5, 5))
+
+    # Adicionar ruído de vegetação
+    terrenos += rng.normal(0, 0.05, terrenos.shape).astype(np.float32)
+
+    # Normalizar cada cena para [0, 1]
+    minimos = terrenos.min(axis=(1, 2), keepdims=True)
+    maximos = terrenos.max(axis=(1, 2), keepdims=True)
+    terrenos -= minimos
+    terrenos /= maximos - minimos
+
+    return terrenos
+
+
+def raio_envolvente(escala):
+    """
+    Raio do círculo que envolve qualquer estrutura de uma dada escala, em qualquer rotação.
+    """
+    # O geoglifo (quadrado de meio-lado = escala) é a forma mais extensa
+    return int(np.ceil(escala * np.sqrt(2))) + 1
+
+
+def relevo_estrutura(tipo, escala, rotacao, margem=0):
+    """
+    Desenha uma estrutura em um recorte local centrado nela, sem laços por pixel.
+
+    As proporções seguem gerar_imagem_lidar_simulada, onde escala corresponde a
+    tamanho // 4 de uma imagem de referência.
+
+    Args:
+        tipo (str): Tipo de estrutura ('geoglifo', 'aldeia_circular', 'vala_circular')
+        escala (float): Meio-lado do geoglifo / raio externo da vala, em pixels
+        rotacao (float): Rotação da estrutura em radianos
+        margem (int): Pixels extras ao redor da estrutura (espaço para suavização)
+
+    Returns:
+        tuple: (relevo, mascara) de lado 2 * (raio_envolvente(escala) + margem) + 1, onde relevo
+            é a alteração de elevação e mascara indica os pixels da estrutura
+    """
+    raio = raio_envolvente(escala) + margem
+    y, x = np.ogrid[-raio:raio + 1, -raio:raio + 1]
+
+    # Coordenadas no referencial da estrutura
+    cos_r, sin_r = np.cos(rotacao), np.sin(rotacao)
+    u = x * cos_r + y * sin_r
+    v = -x * sin_r + y * cos_r
+    espessura = max(escala * 0.08, 1.5)
+
+    relevo = np.zeros((2 * raio + 1, 2 * raio + 1), dtype=np.float32)
+
+    if tipo == 'geoglifo':
+        # Quadrado externo com linhas internas em cruz
+        distancia_quadrado = np.maximum(np.abs(u), np.abs(v))
+        dentro = distancia_quadrado <= escala
+        moldura = dentro & (distancia_quadrado > escala - espessura)
+        cruz = dentro & ((np.abs(u) < espessura / 2) | (np.abs(v) < espessura / 2))
+        mascara = moldura | cruz
+        relevo[mascara] = 0.3
+
+    elif tipo == 'aldeia_circular':
+        # Anel externo com estruturas internas (casas)
+        raio_aldeia = escala * 0.8
+        distancia2 = u * u + v * v
+        mascara_anel = ((distancia2 <= raio_aldeia ** 2)
+                        & (distancia2 > (raio_aldeia - espessura) ** 2))
+        relevo[mascara_anel] = 0.3
+
+        # Oito casas em um único teste vetorizado (eixo 0 = casa)
+        angulos = 2 * np.pi * np.arange(8) / 8
+        casas_u = (raio_aldeia * 0.6 * np.cos(angulos))[:, None, None]
+        casas_v = (raio_aldeia * 0.6 * np.sin(angulos))[:, None, None]
+        meio_lado = max(escala * 0.1, 1.0)
+        mascara_casas = ((np.abs(u - casas_u) < meio_lado)
+                         & (np.abs(v - casas_v) < meio_lado)).any(axis=0)
+        relevo[mascara_casas] += 0.25
+        mascara = mascara_anel | mascara_casas
+
+    elif tipo == 'vala_circular':
+        # Vala circular (depressão) com uma entrada
+        raio_interno = escala * 0.8
+        distancia2 = u * u + v * v
+        mascara_vala = (distancia2 <= escala ** 2) & (distancia2 > raio_interno ** 2)
+        angulo = np.arctan2(v, u) % (2 * np.pi)
+        entrada = np.abs(angulo - np.pi / 4) < np.pi / 16
+        mascara = mascara_vala & ~entrada
+        relevo[mascara] = -0.3
+
+    else:
+        raise ValueError(f"Tipo de estrutura não reconhecido: {tipo}")
+
+    return relevo, mascara
+
+
+def sortear_posicoes(n, raios, tamanho, rng, tentativas=20):
+    """
+    Sorteia centros para estruturas de uma cena, evitando sobreposição.
+
+    Args:
+        n (int): Número de estruturas desejadas
+        raios (numpy.ndarray): Raio envolvente de cada estrutura
+        tamanho (int): Lado da cena
+        rng (numpy.random.Generator): Gerador de números aleatórios
+        tentativas (int): Candidatos sorteados por estrutura
+
+    Returns:
+        list: Pares (índice da estrutura, centro_y, centro_x) das estruturas aceitas
+    """
+    aceitas = []
+    centros = np.empty((0, 2))
+    raios_aceitos = np.empty(0)
+    for i in range(n):
+        r = raios[i]
+        if 2 * r + 1 >= tamanho:
+            continue
+        candidatos = rng.uniform(r, tamanho - r - 1, size=(tentativas, 2))
+        if len(centros):
+            distancias = np.linalg.norm(candidatos[:, None, :] - centros[None, :, :], axis=-1)
+            livres = (distancias >= raios_aceitos[None, :] + r).all(axis=1)
+            if not livres.any():
+                continue
+            candidato = candidatos[np.argmax(livres)]
+        else:
+            candidato = candidatos[0]
+        aceitas.append((i, candidato[0], candidato[1]))
+        centros = np.vstack([centros, candidato])
+        raios_aceitos = np.append(raios_aceitos, r)
+    return aceitas
+
+
+def gerar_lote_cenas(n_cenas, tamanho, rng, estruturas_por_cena=(1, 4),
+                     escala=(0.05, 0.25), profundidade_max=0.7, indice_inicial=0):
+    """
+    Gera um lote de cenas com várias estruturas cada, em memória.
+
+    Args:
+        n_cenas (int): Número de cenas do lote
+        tamanho (int): Lado de cada cena
+        rng (numpy.random.Generator): Gerador de números aleatórios
+        estruturas_por_cena (tuple): Mínimo e máximo de estruturas por cena
+        escala (tuple): Faixa da escala das estruturas, como fração de tamanho
+        profundidade_max (float): Soterramento máximo (0 = superfície, 1 = invisível)
+        indice_inicial (int): Índice global da primeira cena do lote
+
+    Returns:
+        tuple: (imagens float32, mascaras uint8, caixas com DTYPE_CAIXAS)
+    """
+    imagens = gerar_terrenos(n_cenas, tamanho, rng)
+    mascaras = np.zeros((n_cenas, tamanho, tamanho), dtype=np.uint8)
+    caixas = []
+
+    for cena in range(n_cenas):
+        n = rng.integers(estruturas_por_cena[0], estruturas_por_cena[1] + 1)
+        classes = rng.integers(0, len(TIPOS_ESTRUTURA), n)
+        escalas = rng.uniform(escala[0], escala[1], n) * tamanho
+        rotacoes = rng.uniform(0, 2 * np.pi, n)
+        profundidades = rng.uniform(0, profundidade_max, n)
+        sigmas = 1 + 4 * profundidades
+        margens = np.ceil(3 * sigmas).astype(int)
+        raios = np.array([raio_envolvente(e) for e in escalas]) + margens
+
+        for i, cy, cx in sortear_posicoes(n, raios, tamanho, rng):
+            relevo, mascara = relevo_estrutura(TIPOS_ESTRUTURA[classes[i]], escalas[i],
+                                               rotacoes[i], margens[i])
+
+            # O soterramento atenua e espalha o relevo da estrutura
+            relevo *= 1 - profundidades[i]
+            relevo = ndimage.gaussian_filter(relevo, sigma=sigmas[i])
+
+            r = raios[i]
+            y0, x0 = int(round(cy)) - r, int(round(cx)) - r
+            janela = (slice(y0, y0 + 2 * r + 1), slice(x0, x0 + 2 * r + 1))
+            imagens[cena][janela] += relevo
+            mascaras[cena][janela][mascara] = classes[i] + 1
+
+            # Caixa delimitadora exata a partir da máscara
+            linhas = np.flatnonzero(mascara.any(axis=1))
+            colunas = np.flatnonzero(mascara.any(axis=0))
+            caixas.append((indice_inicial + cena, classes[i] + 1,
+                           y0 + linhas[0], x0 + colunas[0],
+                           y0 + linhas[-1] + 1, x0 + colunas[-1] + 1,
+                           cy, cx, escalas[i], rotacoes[i], profundidades[i]))
+
+    # Recortar e adicionar imperfeições de captura, como na cena única
+    np.clip(imagens, 0, 1, out=imagens)
+    imagens += rng.normal(0, 0.02, imagens.shape).astype(np.float32)
+    np.clip(imagens, 0, 1, out=imagens)
+
+    return imagens, mascaras, np.array(caixas, dtype=DTYPE_CAIXAS)
+
+
+def gerar_corpus_cenas(dir_saida, n_cenas=1000, tamanho=512, estruturas_por_cena=(1, 4),
+                       escala=(0.05, 0.25), profundidade_max=0.7, tamanho_lote=64,
+                       semente=RANDOM_SEED):
+    """
+    Gera um corpus de cenas e grava imagens, máscaras e caixas em disco.
+
+    As imagens e máscaras são escritas lote a lote em arquivos .npy mapeados em
+    memória, então o consumo de memória depende de tamanho_lote e não de n_cenas.
+
+    Args:
+        dir_saida (str): Diretório do corpus
+        n_cenas (int): Número total de cenas
+        tamanho (int): Lado de cada cena
+        estruturas_por_cena (tuple): Mínimo e máximo de estruturas por cena
+        escala (tuple): Faixa da escala das estruturas, como fração de tamanho
+        profundidade_max (float): Soterramento máximo (0 = superfície, 1 = invisível)
+        tamanho_lote (int): Cenas geradas por lote
+        semente (int): Semente do gerador de números aleatórios
+
+    Returns:
+        dict: Caminhos dos arquivos do corpus
+    """
+    criar_diretorio_se_nao_existir(dir_saida)
+    rng = np.random.default_rng(semente)
+
+    caminhos = {
+        'imagens': os.path.join(dir_saida, 'imagens.npy'),
+        'mascaras': os.path.join(dir_saida, 'mascaras.npy'),
+        'caixas': os.path.join(dir_saida, 'caixas.npy'),
+        'metadados': os.path.join(dir_saida, 'metadados.json'),
+    }
+    imagens = np.lib.format.open_memmap(caminhos['imagens'], mode='w+', dtype=np.float32,
+                                        shape=(n_cenas, tamanho, tamanho))
+    mascaras = np.lib.format.open_memmap(caminhos['mascaras'], mode='w+', dtype=np.uint8,
+                                         shape=(n_cenas, tamanho, tamanho))
+    caixas = []
+
+    for inicio in range(0, n_cenas, tamanho_lote):
+        n = min(tamanho_lote, n_cenas - inicio)
+        lote_imagens, lote_mascaras, lote_caixas = gerar_lote_cenas(
+            n, tamanho, rng, estruturas_por_cena, escala, profundidade_max, inicio
+        )
+        imagens[inicio:inicio + n] = lote_imagens
+        mascaras[inicio:inicio + n] = lote_mascaras
+        caixas.append(lote_caixas)
+        print(f"  {inicio + n}/{n_cenas} cenas geradas")
+
+    imagens.flush()
+    mascaras.flush()
+    caixas = np.concatenate(caixas) if caixas else np.zeros(0, dtype=DTYPE_CAIXAS)
+    np.save(caminhos['caixas'], caixas)
+
+    with open(caminhos['metadados'], 'w') as f:
+        json.dump({
+            'n_cenas': n_cenas,
+            'tamanho': tamanho,
+            'classes': {str(i + 1): tipo for i, tipo in enumerate(TIPOS_ESTRUTURA)},
+            'n_estruturas': int(len(caixas)),
+            'estruturas_por_cena': list(estruturas_por_cena),
+            'escala': list(escala),
+            'profundidade_max': profundidade_max,
+            'semente': semente,
+        }, f, indent=2)
+
+    return caminhos
+
+
+def abrir_corpus(dir_corpus):
+    """
+    Abre um corpus gerado por gerar_corpus_cenas sem carregá-lo na memória.
+
+    Args:
+        dir_corpus (str): Diretório do corpus
+
+    Returns:
+        dict: 'imagens' e 'mascaras' mapeados em memória, 'caixas' e 'metadados'
+    """
+    with open(os.path.join(dir_corpus, 'metadados.json')) as f:
+        metadados = json.load(f)
+    return {
+        'imagens': np.load(os.path.join(dir_corpus, 'imagens.npy'), mmap_mode='r'),
+        'mascaras': np.load(os.path.join(dir_corpus, 'mascaras.npy'), mmap_mode='r'),
+        'caixas': np.load(os.path.join(dir_corpus, 'caixas.npy')),
+        'metadados': metadados,
+    }
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    print("Gerando corpus de cenas LIDAR simuladas...")
+    caminhos = gerar_corpus_cenas(RESULTS_DIR, n_cenas=256, tamanho=512)
+    print(f"Corpus gerado. Resultados salvos em: {RESULTS_DIR}")
@@ -0,0 +1,398 @@
+# Instrumentação das Etapas dos Scripts
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script registra, para cada etapa nomeada dos scripts (geração de dados,
+# treinamento, avaliação, importância, renderização, gravação, tiles), a duração, o tempo
+# de CPU, o pico de memória e o número de itens processados, e grava uma linha do tempo no
+# formato Chrome Trace (abrir em chrome://tracing ou https://ui.perfetto.dev). A
+# instrumentação é ativada pela variável de ambiente AMAZONIA_TRACE e, desativada, custa
+# apenas uma verificação por chamada.
+
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+import threading
+import tracemalloc
+import multiprocessing
+
+from orcamento_memoria import rss_atual_mb, pico_rss_mb, reiniciar_pico_rss
+
+# Diretório para salvar resultados
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'instrumentacao')
+
+# Variáveis de ambiente: caminho do trace (ou '1' para o caminho padrão) e medida de memória
+VARIAVEL_TRACE = 'AMAZONIA_TRACE'
+VARIAVEL_MEMORIA = 'AMAZONIA_TRACE_MEMORIA'
+
+# Medidas de memória: pico de RSS do processo, pico das alocações do Python
+# (tracemalloc, mais lento, mas atribui a memória ao código Python) ou nenhuma
+MODOS_MEMORIA = ('rss', 'tracemalloc', 'nenhuma')
+
+# Estado da instrumentação no processo (None = desativada)
+_ESTADO = None
+
+
+class _EtapaNula:
+    """
+    Etapa devolvida quando a instrumentação está desativada: não mede nada.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def contar(self, n=1):
+        pass
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_ETAPA_NULA = _EtapaNula()
+
+
+class _Estado:
+    """
+    Eventos registrados e pilha de etapas abertas do processo.
+    """
+
+    def __init__(self, caminho, memoria):
+        if memoria not in MODOS_MEMORIA:
+            raise ValueError(f"memoria deve ser um de {MODOS_MEMORIA}")
+        self.caminho = caminho
+        self.memoria = memoria
+        self.eventos = []
+        self.pilha = []
+        self.bloqueio = threading.Lock()
+        if memoria == 'tracemalloc' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def memoria_atual(self):
+        if self.memoria == 'rss':
+            return rss_atual_mb()
+        if self.memoria == 'tracemalloc':
+            return tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+        return 0.0
+
+    def pico_memoria(self):
+        if self.memoria == 'rss':
+            return pico_rss_mb()
+        if self.memoria == 'tracemalloc':
+            return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        return 0.0
+
+    def reiniciar_pico(self):
+        if self.memoria == 'rss':
+            reiniciar_pico_rss()
+        elif self.memoria == 'tracemalloc':
+            tracemalloc.reset_peak()
+
+
+class Etapa:
+    """
+    Etapa em medição: duração, tempo de CPU, pico de memória e itens processados.
+
+    O pico é reiniciado no início de cada etapa; ao fechar, uma etapa repassa o
+    seu pico à etapa que a contém, então o pico de uma etapa externa também
+    cobre as etapas internas.
+    """
+
+    __slots__ = ('_estado', 'nome', 'itens', 'args', '_inicio', '_inicio_cpu',
+                 '_memoria_inicial', '_pico_internas')
+
+    def __init__(self, estado, nome, itens=None, args=None):
+        self._estado = estado
+        self.nome = nome
+        self.itens = itens
+        self.args = args or {}
+
+    def contar(self, n=1):
+        """
+        Soma n aos itens processados pela etapa.
+        """
+        self.itens = (self.itens or 0) + n
+
+    def __enter__(self):
+        estado = self._estado
+        estado.pilha.append(self)
+        estado.reiniciar_pico()
+        self._memoria_inicial = estado.memoria_atual()
+        self._pico_internas = 0.0
+        self._inicio_cpu = time.process_time()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        fim = time.perf_counter()
+        estado = self._estado
+        pico = max(estado.pico_memoria(), self._pico_internas)
+        estado.pilha.remove(self)
+        if estado.pilha:
+            externa = estado.pilha[-1]
+            externa._pico_internas = max(externa._pico_internas, pico)
+
+        args = dict(self.args)
+        args['cpu_ms'] = round((time.process_time() - self._inicio_cpu) * 1e3, 3)
+        if estado.memoria != 'nenhuma':
+            args['pico_mb'] = round(pico, 3)
+            args['acrescimo_mb'] = round(max(pico - self._memoria_inicial, 0.0), 3)
+        if self.itens is not None:
+            args['itens'] = self.itens
+        pid = os.getpid()
+        eventos = [{
+            'name': self.nome,
+            'cat': 'etapa',
+            'ph': 'X',
+            'ts': self._inicio * 1e6,
+            'dur': (fim - self._inicio) * 1e6,
+            'pid': pid,
+            'tid': threading.get_ident(),
+            'args': args,
+        }]
+        if estado.memoria != 'nenhuma':
+            eventos.append({
+                'name': f"memoria_{estado.memoria}_mb",
+                'ph': 'C',
+                'ts': fim * 1e6,
+                'pid': pid,
+                'args': {'atual': round(estado.memoria_atual(), 3)},
+            })
+        with estado.bloqueio:
+            estado.eventos.extend(eventos)
+        return False
+
+
+def ativar(caminho=None, memoria='rss'):
+    """
+    Ativa a instrumentação no processo atual.
+
+    Args:
+        caminho (str, opcional): Arquivo do trace; se omitido, um arquivo com data e
+            hora em RESULTS_DIR
+        memoria (str): Medida de memória ('rss', 'tracemalloc' ou 'nenhuma')
+    """
+    global _ESTADO
+    if caminho is None:
+        caminho = os.path.join(RESULTS_DIR, f"trace_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.json")
+    _ESTADO = _Estado(caminho, memoria)
+
+
+def desativar():
+    """
+    Desativa a instrumentação, descartando os eventos não gravados.
+    """
+    global _ESTADO
+    _ESTADO = None
+
+
+def ativa():
+    """
+    Indica se a instrumentação está ativa no processo.
+    """
+    return _ESTADO is not None
+
+
+def etapa(nome, itens=None, **args):
+    """
+    Abre uma etapa nomeada, para uso com with.
+
+    Exemplo:
+        with etapa('treino', itens=len(X_train), modelo='rf') as registro:
+            ...
+            registro.itens = n  # ou registro.contar(n)
+
+    Args:
+        nome (str): Nome da etapa na linha do tempo
+        itens (int, opcional): Itens processados pela etapa
+        **args: Atributos adicionais gravados com a etapa
+
+    Returns:
+        Etapa, ou uma etapa nula se a instrumentação estiver desativada
+    """
+    if _ESTADO is None:
+        return _ETAPA_NULA
+    return Etapa(_ESTADO, nome, itens, args)
+
+
+def instrumentar(nome=None, itens=None):
+    """
+    Decorador que registra cada chamada da função como uma etapa.
+
+    Args:
+        nome (str, opcional): Nome da etapa (padrão: nome da função)
+        itens (callable, opcional): Função que recebe o retorno e devolve o
+            número de itens processados
+
+    Returns:
+        callable: Decorador
+    """
+    def decorar(funcao):
+        rotulo = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def instrumentada(*args, **kwargs):
+            if _ESTADO is None:
+                return funcao(*args, **kwargs)
+            with Etapa(_ESTADO, rotulo) as registro:
+                resultado = funcao(*args, **kwargs)
+                if itens is not None:
+                    registro.itens = itens(resultado)
+            return resultado
+
+        return instrumentada
+
+    return decorar
+
+
+def drenar_eventos():
+    """
+    Retira e devolve os eventos registrados no processo (ex.: de um trabalhador).
+
+    Returns:
+        list: Eventos no formato Chrome Trace (vazia se desativada)
+    """
+    if _ESTADO is None:
+        return []
+    with _ESTADO.bloqueio:
+        eventos, _ESTADO.eventos = _ESTADO.eventos, []
+    return eventos
+
+
+def incorporar_eventos(eventos):
+    """
+    Acrescenta ao processo atual eventos drenados de outro processo.
+    """
+    if _ESTADO is not None and eventos:
+        with _ESTADO.bloqueio:
+            _ESTADO.eventos.extend(eventos)
+
+
+def reiniciar_no_trabalhador():
+    """
+    Descarta, em um processo trabalhador recém-criado, os eventos e etapas abertas
+    herdados do processo principal (fork), mantendo a instrumentação ativa.
+    """
+    if _ESTADO is not None:
+        ativar(_ESTADO.caminho, _ESTADO.memoria)
+
+
+def resumir(eventos=None):
+    """
+    Agrega as etapas por nome: chamadas, tempo total, CPU, maior pico e itens.
+
+    Args:
+        eventos (list, opcional): Eventos a resumir (padrão: os do processo)
+
+    Returns:
+        dict: nome -> resumo, em ordem decrescente de tempo total
+    """
+    if eventos is None:
+        eventos = _ESTADO.eventos if _ESTADO is not None else []
+    resumo = {}
+    for evento in eventos:
+        if evento['ph'] != 'X':
+            continue
+        item = resumo.setdefault(evento['name'], {
+            'chamadas': 0, 'tempo_s': 0.0, 'cpu_s': 0.0, 'pico_mb': None, 'itens': None,
+        })
+        args = evento['args']
+        item['chamadas'] += 1
+        item['tempo_s'] += evento['dur'] / 1e6
+        item['cpu_s'] += args['cpu_ms'] / 1e3
+        if 'pico_mb' in args:
+            item['pico_mb'] = max(item['pico_mb'] or 0.0, args['pico_mb'])
+        if 'itens' in args:
+            item['itens'] = (item['itens'] or 0) + args['itens']
+    return dict(sorted(resumo.items(), key=lambda par: -par[1]['tempo_s']))
+
+
+def formatar_resumo(resumo):
+    """
+    Formata o resumo das etapas como uma tabela de texto.
+    """
+    linhas = [f"  {'etapa':<28} {'chamadas':>8} {'tempo (s)':>10} {'CPU (s)':>10} "
+              f"{'pico (MB)':>10} {'itens':>10}"]
+    for nome, item in resumo.items():
+        pico = '-' if item['pico_mb'] is None else f"{item['pico_mb']:.1f}"
+        itens = '-' if item['itens'] is None else str(item['itens'])
+        linhas.append(f"  {nome:<28} {item['chamadas']:>8} {item['tempo_s']:>10.3f} "
+                      f"{item['cpu_s']:>10.3f} {pico:>10} {itens:>10}")
+    return "\n".join(linhas)
+
+
+def salvar_trace(caminho=None):
+    """
+    Grava os eventos registrados no formato Chrome Trace (JSON).
+
+    Args:
+        caminho (str, opcional): Arquivo de destino (padrão: o definido em ativar)
+
+    Returns:
+        str: Caminho do arquivo gravado, ou None se a instrumentação estiver desativada
+    """
+    if _ESTADO is None:
+        return None
+    caminho = caminho or _ESTADO.caminho
+    eventos = list(_ESTADO.eventos)
+
+    # Nomear os processos na linha do tempo
+    principal = os.getpid()
+    for pid in sorted({evento['pid'] for evento in eventos}):
+        eventos.append({
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': pid,
+            'args': {'name': 'principal' if pid == principal else f"trabalhador {pid}"},
+        })
+
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    with open(caminho, 'w') as arquivo:
+        json.dump({
+            'traceEvents': eventos,
+            'displayTimeUnit': 'ms',
+            'otherData': {'script': os.path.basename(sys.argv[0]), 'memoria': _ESTADO.memoria},
+        }, arquivo, default=str)
+    return caminho
+
+
+def _salvar_ao_sair():
+    """
+    Grava o trace e imprime o resumo ao final do processo principal.
+    """
+    if _ESTADO is None or multiprocessing.parent_process() is not None or not _ESTADO.eventos:
+        return
+    caminho = salvar_trace()
+    print("Tempo por etapa:")
+    print(formatar_resumo(resumir()))
+    print(f"Linha do tempo gravada em: {caminho}")
+
+
+atexit.register(_salvar_ao_sair)
+
+# Ativar pela variável de ambiente (os trabalhadores a herdam do processo principal)
+if os.environ.get(VARIAVEL_TRACE):
+    _valor = os.environ[VARIAVEL_TRACE]
+    ativar(None if _valor == '1' else _valor, os.environ.get(VARIAVEL_MEMORIA, 'rss'))
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Resumo por etapa de uma linha do tempo gravada")
+    parser.add_argument('trace', help="Arquivo Chrome Trace gravado pela instrumentação")
+    argumentos = parser.parse_args()
+
+    with open(argumentos.trace) as arquivo:
+        eventos = json.load(arquivo)['traceEvents']
+    print(f"Tempo por etapa ({argumentos.trace}):")
+    print(formatar_resumo(resumir(eventos)))
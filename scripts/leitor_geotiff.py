@@ -0,0 +1,618 @@
+# Leitura de MDEs GeoTIFF e Georreferenciamento das Detecções
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script lê modelos digitais de elevação em GeoTIFF usando apenas NumPy e
+# zlib. O arquivo é lido por janelas: apenas as faixas (strips) ou tiles internos que
+# cruzam a janela pedida são descomprimidos. A transformação afim do GeoTIFF acompanha o
+# raster pelas etapas de detecção, e as regiões segmentadas recebem latitude e longitude
+# que podem ser associadas às tabelas de sítios previstos de previsao_coordenadas*.py.
+
+import os
+import glob
+import zlib
+import struct
+from collections import namedtuple, OrderedDict
+import numpy as np
+import pandas as pd
+
+from deteccao_sitios import criar_diretorio_se_nao_existir
+from geodesia import IndiceGeodesico
+
+# Diretório para salvar resultados
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'geotiff')
+
+# Diretório das tabelas de sítios previstos
+COORDENADAS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'coordenadas')
+
+# Tags TIFF e GeoTIFF utilizadas
+TAG_LARGURA = 256
+TAG_ALTURA = 257
+TAG_BITS = 258
+TAG_COMPRESSAO = 259
+TAG_FOTOMETRICA = 262
+TAG_OFFSETS_FAIXAS = 273
+TAG_AMOSTRAS = 277
+TAG_LINHAS_POR_FAIXA = 278
+TAG_BYTES_FAIXAS = 279
+TAG_PLANAR = 284
+TAG_PREDITOR = 317
+TAG_LARGURA_TILE = 322
+TAG_ALTURA_TILE = 323
+TAG_OFFSETS_TILES = 324
+TAG_BYTES_TILES = 325
+TAG_FORMATO_AMOSTRA = 339
+TAG_ESCALA_PIXEL = 33550
+TAG_PONTOS_CONTROLE = 33922
+TAG_TRANSFORMACAO = 34264
+TAG_CHAVES_GEO = 34735
+TAG_NODATA = 42113
+
+# Chaves GeoTIFF
+CHAVE_TIPO_RASTER = 1025
+CHAVE_CRS_GEOGRAFICO = 2048
+CHAVE_CRS_PROJETADO = 3072
+RASTER_PIXEL_PONTO = 2
+
+# Tipos de campo TIFF: código -> (formato numpy, tamanho)
+TIPOS_CAMPO = {
+    1: ('u1', 1), 2: ('S1', 1), 3: ('u2', 2), 4: ('u4', 4), 5: ('u4', 4),
+    6: ('i1', 1), 7: ('u1', 1), 8: ('i2', 2), 9: ('i4', 4), 10: ('i4', 4),
+    11: ('f4', 4), 12: ('f8', 8), 16: ('u8', 8), 17: ('i8', 8), 18: ('u8', 8),
+}
+
+# Compressões suportadas: nenhuma e deflate (código oficial e código antigo)
+COMPRESSOES = {1: None, 8: 'deflate', 32946: 'deflate'}
+
+# Formato de amostra TIFF -> tipo numpy
+FORMATOS_AMOSTRA = {1: 'u', 2: 'i', 3: 'f'}
+
+# Sistemas geográficos (graus): WGS 84, SIRGAS 2000 e SAD69
+EPSG_GEOGRAFICOS = (4326, 4674, 4618)
+
+# SIRGAS 2000 / UTM: código EPSG -> (fuso, hemisfério sul)
+EPSG_SIRGAS_UTM = {
+    31972: (18, False), 31973: (19, False), 31974: (20, False), 31975: (21, False),
+    31976: (22, False), 31977: (17, True), 31978: (18, True), 31979: (19, True),
+    31980: (20, True), 31981: (21, True), 31982: (22, True), 31983: (23, True),
+    31984: (24, True), 31985: (25, True),
+}
+
+# Transformação afim no padrão GDAL:
+# x = x0 + coluna·dx + linha·rx ; y = y0 + coluna·ry + linha·dy
+Transformacao = namedtuple('Transformacao', ['x0', 'dx', 'rx', 'y0', 'ry', 'dy'])
+
+
+def pixel_para_coordenada(transformacao, linha, coluna):
+    """
+    Converte posições de pixel (contínuas, canto superior esquerdo = 0) em coordenadas.
+
+    Para o centro do pixel (i, j), use linha = i + 0.5 e coluna = j + 0.5.
+
+    Returns:
+        tuple: (x, y) no sistema de referência do raster
+    """
+    t = transformacao
+    return (t.x0 + coluna * t.dx + linha * t.rx,
+            t.y0 + coluna * t.ry + linha * t.dy)
+
+
+def utm_para_latlon(leste, norte, fuso, sul):
+    """
+    Converte coordenadas UTM (elipsoide WGS 84 / GRS 80) em latitude e longitude.
+
+    Usa as séries da projeção transversa de Mercator inversa (Snyder, 1987),
+    com precisão submétrica dentro do fuso.
+
+    Args:
+        leste, norte (numpy.ndarray): Coordenadas UTM em metros
+        fuso (int): Fuso UTM (1-60)
+        sul (bool): True para o hemisfério sul (falso norte de 10 000 km)
+
+    Returns:
+        tuple: (latitude, longitude) em graus
+    """
+    k0 = 0.9996
+    a = 6378137.0
+    f = 1 / 298.257223563
+    e2 = f * (2 - f)
+    ep2 = e2 / (1 - e2)
+    e1 = (1 - np.sqrt(1 - e2)) / (1 + np.sqrt(1 - e2))
+
+    x = np.asarray(leste, dtype=np.float64) - 500000.0
+    y = np.asarray(norte, dtype=np.float64) - (10000000.0 if sul else 0.0)
+
+    mu = y / k0 / (a * (1 - e2 / 4 - 3 * e2 ** 2 / 64 - 5 * e2 ** 3 / 256))
+    phi1 = (mu + (3 * e1 / 2 - 27 * e1 ** 3 / 32) * np.sin(2 * mu)
+            + (21 * e1 ** 2 / 16 - 55 * e1 ** 4 / 32) * np.sin(4 * mu)
+            + (151 * e1 ** 3 / 96) * np.sin(6 * mu)
+            + (1097 * e1 ** 4 / 512) * np.sin(8 * mu))
+
+    seno, cosseno, tangente = np.sin(phi1), np.cos(phi1), np.tan(phi1)
+    n1 = a / np.sqrt(1 - e2 * seno ** 2)
+    t1 = tangente ** 2
+    c1 = ep2 * cosseno ** 2
+    r1 = a * (1 - e2) / (1 - e2 * seno ** 2) ** 1.5
+    d = x / (n1 * k0)
+
+    latitude = phi1 - (n1 * tangente / r1) * (
+        d ** 2 / 2
+        - (5 + 3 * t1 + 10 * c1 - 4 * c1 ** 2 - 9 * ep2) * d ** 4 / 24
+        + (61 + 90 * t1 + 298 * c1 + 45 * t1 ** 2 - 252 * ep2 - 3 * c1 ** 2) * d ** 6 / 720
+    )
+    longitude = (d - (1 + 2 * t1 + c1) * d ** 3 / 6
+                 + (5 - 2 * c1 + 28 * t1 - 3 * c1 ** 2 + 8 * ep2 + 24 * t1 ** 2) * d ** 5 / 120) / cosseno
+
+    meridiano_central = (fuso - 1) * 6 - 180 + 3
+    return np.degrees(latitude), meridiano_central + np.degrees(longitude)
+
+
+def coordenada_para_latlon(x, y, epsg):
+    """
+    Converte coordenadas do sistema do raster em latitude e longitude.
+
+    Args:
+        x, y (numpy.ndarray): Coordenadas no sistema do raster
+        epsg (int): Código EPSG do sistema (geográfico, WGS 84 UTM ou SIRGAS 2000 UTM)
+
+    Returns:
+        tuple: (latitude, longitude) em graus
+    """
+    if epsg in EPSG_GEOGRAFICOS:
+        return np.asarray(y, dtype=np.float64), np.asarray(x, dtype=np.float64)
+    if 32601 <= epsg <= 32660:
+        return utm_para_latlon(x, y, epsg - 32600, sul=False)
+    if 32701 <= epsg <= 32760:
+        return utm_para_latlon(x, y, epsg - 32700, sul=True)
+    if epsg in EPSG_SIRGAS_UTM:
+        return utm_para_latlon(x, y, *EPSG_SIRGAS_UTM[epsg])
+    raise ValueError(f"Sistema de referência não suportado: EPSG {epsg}")
+
+
+class RasterGeoTIFF:
+    """
+    MDE GeoTIFF lido por janelas, com a interface de fatiamento de um array 2D.
+
+    Apenas as tags são lidas ao abrir o arquivo. raster[y0:y1, x0:x1] lê e
+    descomprime somente os blocos (faixas ou tiles) que cruzam a janela; os
+    blocos decodificados mais recentes ficam em cache, pois janelas vizinhas
+    com halo costumam compartilhar blocos. Pode ser passado diretamente a
+    processamento_tiles.processar_raster_em_tiles.
+    """
+
+    def __init__(self, caminho, banda=0, blocos_em_cache=64):
+        """
+        Args:
+            caminho (str): Arquivo .tif
+            banda (int): Banda lida em arquivos com várias amostras por pixel
+            blocos_em_cache (int): Número de blocos decodificados mantidos em cache
+        """
+        self.caminho = caminho
+        self.banda = banda
+        self.blocos_em_cache = blocos_em_cache
+        self._cache = OrderedDict()
+
+        with open(caminho, 'rb') as arquivo:
+            tags = self._ler_tags(arquivo)
+
+        self.forma = (int(tags[TAG_ALTURA][0]), int(tags[TAG_LARGURA][0]))
+        self.amostras = int(tags.get(TAG_AMOSTRAS, [1])[0])
+        if banda >= self.amostras:
+            raise ValueError(f"Banda {banda} inexistente ({self.amostras} amostras por pixel)")
+        self.planar = int(tags.get(TAG_PLANAR, [1])[0])
+        bits = int(tags[TAG_BITS][0])
+        formato = FORMATOS_AMOSTRA[int(tags.get(TAG_FORMATO_AMOSTRA, [1])[0])]
+        self.dtype = np.dtype(formato + str(bits // 8)).newbyteorder(self._ordem)
+
+        compressao = int(tags.get(TAG_COMPRESSAO, [1])[0])
+        if compressao not in COMPRESSOES:
+            raise ValueError(f"Compressão TIFF não suportada: {compressao}")
+        self.compressao = COMPRESSOES[compressao]
+        self.preditor = int(tags.get(TAG_PREDITOR, [1])[0])
+
+        if TAG_OFFSETS_TILES in tags:
+            self.bloco = (int(tags[TAG_ALTURA_TILE][0]), int(tags[TAG_LARGURA_TILE][0]))
+            self.offsets = np.asarray(tags[TAG_OFFSETS_TILES], dtype=np.int64)
+            self.bytes_blocos = np.asarray(tags[TAG_BYTES_TILES], dtype=np.int64)
+        else:
+            linhas = int(tags.get(TAG_LINHAS_POR_FAIXA, [self.forma[0]])[0])
+            self.bloco = (min(linhas, self.forma[0]), self.forma[1])
+            self.offsets = np.asarray(tags[TAG_OFFSETS_FAIXAS], dtype=np.int64)
+            self.bytes_blocos = np.asarray(tags[TAG_BYTES_FAIXAS], dtype=np.int64)
+        self.grade_blocos = (-(-self.forma[0] // self.bloco[0]), -(-self.forma[1] // self.bloco[1]))
+
+        self.nodata = None
+        if TAG_NODATA in tags:
+            self.nodata = float(b''.join(tags[TAG_NODATA]).strip(b'\x00').decode() or 'nan')
+
+        self.epsg, tipo_raster = self._ler_chaves_geo(tags.get(TAG_CHAVES_GEO))
+        self.transformacao = self._ler_transformacao(tags, tipo_raster)
+
+    @property
+    def shape(self):
+        return self.forma
+
+    @property
+    def ndim(self):
+        return 2
+
+    def _ler_tags(self, arquivo):
+        """
+        Lê as tags do primeiro IFD (TIFF clássico ou BigTIFF, qualquer ordem de bytes).
+        """
+        cabecalho = arquivo.read(16)
+        if cabecalho[:2] == b'II':
+            self._ordem = '<'
+        elif cabecalho[:2] == b'MM':
+            self._ordem = '>'
+        else:
+            raise ValueError(f"Arquivo não é um TIFF: {self.caminho}")
+        o = self._ordem
+        versao = struct.unpack(o + 'H', cabecalho[2:4])[0]
+        if versao == 42:
+            grande = False
+            posicao = struct.unpack(o + 'I', cabecalho[4:8])[0]
+        elif versao == 43:
+            grande = True
+            posicao = struct.unpack(o + 'Q', cabecalho[8:16])[0]
+        else:
+            raise ValueError(f"Versão TIFF desconhecida: {versao}")
+
+        arquivo.seek(posicao)
+        if grande:
+            n_entradas = struct.unpack(o + 'Q', arquivo.read(8))[0]
+            formato_entrada, tamanho_valor = o + 'HHQ8s', 8
+        else:
+            n_entradas = struct.unpack(o + 'H', arquivo.read(2))[0]
+            formato_entrada, tamanho_valor = o + 'HHI4s', 4
+        tamanho_entrada = struct.calcsize(formato_entrada)
+        entradas = arquivo.read(n_entradas * tamanho_entrada)
+
+        tags = {}
+        for i in range(n_entradas):
+            tag, tipo, contagem, valor = struct.unpack_from(formato_entrada, entradas, i * tamanho_entrada)
+            if tipo not in TIPOS_CAMPO:
+                continue
+            formato, tamanho = TIPOS_CAMPO[tipo]
+            n_bytes = contagem * tamanho * (2 if tipo in (5, 10) else 1)
+            if n_bytes <= tamanho_valor:
+                dados = valor[:n_bytes]
+            else:
+                arquivo.seek(struct.unpack(o + ('Q' if grande else 'I'), valor)[0])
+                dados = arquivo.read(n_bytes)
+            valores = np.frombuffer(dados, dtype=np.dtype(formato).newbyteorder(o))
+            if tipo in (5, 10):
+                valores = valores[0::2] / valores[1::2]
+            tags[tag] = list(valores) if tipo == 2 else valores
+        return tags
+
+    def _ler_chaves_geo(self, chaves):
+        """
+        Extrai o código EPSG e o tipo de raster (área ou ponto) do diretório de chaves GeoTIFF.
+        """
+        if chaves is None:
+            return None, None
+        chaves = np.asarray(chaves, dtype=np.int64)
+        valores = {}
+        for i in range(int(chaves[3])):
+            chave, local, _, valor = chaves[4 + 4 * i:8 + 4 * i]
+            if local == 0:
+                valores[int(chave)] = int(valor)
+        epsg = valores.get(CHAVE_CRS_PROJETADO, valores.get(CHAVE_CRS_GEOGRAFICO))
+        return epsg, valores.get(CHAVE_TIPO_RASTER)
+
+    def _ler_transformacao(self, tags, tipo_raster):
+        """
+        Monta a transformação afim a partir da matriz de transformação ou do par
+        ponto de controle + escala do pixel.
+        """
+        if TAG_TRANSFORMACAO in tags:
+            m = np.asarray(tags[TAG_TRANSFORMACAO], dtype=np.float64)
+            transformacao = Transformacao(m[3], m[0], m[1], m[7], m[4], m[5])
+        elif TAG_PONTOS_CONTROLE in tags and TAG_ESCALA_PIXEL in tags:
+            i, j, _, x, y, _ = np.asarray(tags[TAG_PONTOS_CONTROLE], dtype=np.float64)[:6]
+            sx, sy = np.asarray(tags[TAG_ESCALA_PIXEL], dtype=np.float64)[:2]
+            transformacao = Transformacao(x - i * sx, sx, 0.0, y + j * sy, 0.0, -sy)
+        else:
+            return None
+
+        # Em rasters do tipo ponto, as coordenadas referem-se ao centro do pixel
+        if tipo_raster == RASTER_PIXEL_PONTO:
+            t = transformacao
+            transformacao = t._replace(x0=t.x0 - (t.dx + t.rx) / 2, y0=t.y0 - (t.ry + t.dy) / 2)
+        return transformacao
+
+    def _decodificar_bloco(self, indice):
+        """
+        Lê e decodifica um bloco (faixa ou tile), com cache dos mais recentes.
+        """
+        if indice in self._cache:
+            self._cache.move_to_end(indice)
+            return self._cache[indice]
+
+        altura_bloco, largura_bloco = self.bloco
+        linha_bloco = indice // self.grade_blocos[1]
+        if self.planar == 2:
+            # Planos separados: os blocos da banda vêm depois dos das bandas anteriores
+            indice_arquivo = indice + self.banda * self.grade_blocos[0] * self.grade_blocos[1]
+            amostras = 1
+        else:
+            indice_arquivo = indice
+            amostras = self.amostras
+        if self.offsets.shape[0] == self.grade_blocos[0]:
+            # Faixas: a última pode ter menos linhas
+            altura_bloco = min(altura_bloco, self.forma[0] - linha_bloco * altura_bloco)
+
+        with open(self.caminho, 'rb') as arquivo:
+            arquivo.seek(int(self.offsets[indice_arquivo]))
+            dados = arquivo.read(int(self.bytes_blocos[indice_arquivo]))
+        if self.compressao == 'deflate':
+            dados = zlib.decompress(dados)
+
+        n_valores = altura_bloco * largura_bloco * amostras
+        if self.preditor == 3:
+            # Preditor de ponto flutuante: bytes separados por significância, com diferenças
+            n = self.dtype.itemsize
+            bytes_linha = np.frombuffer(dados, np.uint8, n_valores * n).reshape(altura_bloco, -1)
+            bytes_linha = np.cumsum(bytes_linha, axis=1, dtype=np.uint8)
+            bytes_linha = bytes_linha.reshape(altura_bloco, n, -1).transpose(0, 2, 1)
+            bloco = np.ascontiguousarray(bytes_linha).view(self.dtype.newbyteorder('>'))
+        else:
+            bloco = np.frombuffer(dados, self.dtype, n_valores)
+        bloco = bloco.reshape(altura_bloco, largura_bloco, amostras)
+        if self.preditor == 2:
+            bloco = np.cumsum(bloco, axis=1, dtype=self.dtype)
+        bloco = bloco[:, :, 0 if self.planar == 2 else self.banda].astype(self.dtype.newbyteorder('='))
+
+        self._cache[indice] = bloco
+        if len(self._cache) > self.blocos_em_cache:
+            self._cache.popitem(last=False)
+        return bloco
+
+    def ler_janela(self, y0, y1, x0, x1):
+        """
+        Lê uma janela do raster decodificando apenas os blocos que a cruzam.
+
+        Args:
+            y0, y1, x0, x1 (int): Limites da janela (linhas [y0, y1), colunas [x0, x1))
+
+        Returns:
+            numpy.ndarray: Janela com o tipo nativo do raster
+        """
+        altura_bloco, largura_bloco = self.bloco
+        janela = np.empty((max(y1 - y0, 0), max(x1 - x0, 0)), dtype=self.dtype.newbyteorder('='))
+        for by in range(y0 // altura_bloco, -(-y1 // altura_bloco)):
+            for bx in range(x0 // largura_bloco, -(-x1 // largura_bloco)):
+                bloco = self._decodificar_bloco(by * self.grade_blocos[1] + bx)
+                oy, ox = by * altura_bloco, bx * largura_bloco
+                ya, yb = max(y0, oy), min(y1, oy + altura_bloco)
+                xa, xb = max(x0, ox), min(x1, ox + largura_bloco)
+                janela[ya - y0:yb - y0, xa - x0:xb - x0] = bloco[ya - oy:yb - oy, xa - ox:xb - ox]
+        return janela
+
+    def __getitem__(self, chave):
+        if not isinstance(chave, tuple):
+            chave = (chave,)
+        chave = chave + (slice(None),) * (2 - len(chave))
+        limites = []
+        reduzir = []
+        for eixo, indice in enumerate(chave):
+            if isinstance(indice, slice):
+                inicio, fim, passo = indice.indices(self.forma[eixo])
+                if passo != 1:
+                    raise ValueError("RasterGeoTIFF não suporta fatias com passo")
+                limites.append((inicio, max(fim, inicio)))
+            else:
+                indice = int(indice) % self.forma[eixo]
+                limites.append((indice, indice + 1))
+                reduzir.append(eixo)
+        janela = self.ler_janela(limites[0][0], limites[0][1], limites[1][0], limites[1][1])
+        return janela.squeeze(axis=tuple(reduzir)) if reduzir else janela
+
+    def __array__(self, dtype=None, copy=None):
+        janela = self.ler_janela(0, self.forma[0], 0, self.forma[1])
+        return janela if dtype is None else janela.astype(dtype)
+
+
+def escrever_geotiff(caminho, array, transformacao, epsg=4326, tamanho_tile=256,
+                     comprimir=True, preditor=1, nodata=None):
+    """
+    Grava um raster 2D em um GeoTIFF clássico (little-endian) organizado em tiles.
+
+    Args:
+        caminho (str): Arquivo .tif a criar
+        array (numpy.ndarray): Raster 2D
+        transformacao (Transformacao): Transformação afim do raster
+        epsg (int): Código EPSG do sistema de referência
+        tamanho_tile (int): Lado dos tiles internos (múltiplo de 16)
+        comprimir (bool): Comprimir os tiles com deflate
+        preditor (int): 1 (nenhum), 2 (diferença horizontal, inteiros) ou 3 (ponto flutuante)
+        nodata (float, opcional): Valor de ausência de dado
+
+    Returns:
+        str: Caminho do arquivo gravado
+    """
+    array = np.asarray(array)
+    dtype = array.dtype.newbyteorder('<')
+    altura, largura = array.shape
+    t = tamanho_tile
+    linhas_tiles, colunas_tiles = -(-altura // t), -(-largura // t)
+
+    # Codificar os tiles (completados com zeros até o tamanho do tile)
+    tiles = []
+    for ty in range(linhas_tiles):
+        for tx in range(colunas_tiles):
+            bloco = np.zeros((t, t), dtype=dtype)
+            parte = array[ty * t:(ty + 1) * t, tx * t:(tx + 1) * t]
+            bloco[:parte.shape[0], :parte.shape[1]] = parte
+            if preditor == 2:
+                bloco[:, 1:] = bloco[:, 1:] - bloco[:, :-1]
+            elif preditor == 3:
+                n = dtype.itemsize
+                planos = bloco.astype(dtype.newbyteorder('>')).view(np.uint8).reshape(t, t, n)
+                planos = np.ascontiguousarray(planos.transpose(0, 2, 1)).reshape(t, -1)
+                planos[:, 1:] = planos[:, 1:] - planos[:, :-1]
+                bloco = planos
+            dados = bloco.tobytes()
+            tiles.append(zlib.compress(dados, 6) if comprimir else dados)
+
+    formato_amostra = {'u': 1, 'i': 2, 'f': 3}[dtype.kind]
+    tipo_modelo = 2 if epsg in EPSG_GEOGRAFICOS else 1
+    chave_crs = CHAVE_CRS_GEOGRAFICO if tipo_modelo == 2 else CHAVE_CRS_PROJETADO
+    chaves_geo = [1, 1, 0, 3, 1024, 0, 1, tipo_modelo, CHAVE_TIPO_RASTER, 0, 1, 1, chave_crs, 0, 1, epsg]
+
+    offsets_tiles = np.cumsum([8] + [len(d) for d in tiles[:-1]])
+    entradas = [
+        (TAG_LARGURA, 4, [largura]),
+        (TAG_ALTURA, 4, [altura]),
+        (TAG_BITS, 3, [dtype.itemsize * 8]),
+        (TAG_COMPRESSAO, 3, [8 if comprimir else 1]),
+        (TAG_FOTOMETRICA, 3, [1]),
+        (TAG_AMOSTRAS, 3, [1]),
+        (TAG_PLANAR, 3, [1]),
+        (TAG_PREDITOR, 3, [preditor]),
+        (TAG_LARGURA_TILE, 3, [t]),
+        (TAG_ALTURA_TILE, 3, [t]),
+        (TAG_OFFSETS_TILES, 4, offsets_tiles),
+        (TAG_BYTES_TILES, 4, [len(d) for d in tiles]),
+        (TAG_FORMATO_AMOSTRA, 3, [formato_amostra]),
+        (TAG_CHAVES_GEO, 3, chaves_geo),
+    ]
+    if transformacao.rx == 0 and transformacao.ry == 0:
+        entradas.append((TAG_ESCALA_PIXEL, 12, [transformacao.dx, -transformacao.dy, 0.0]))
+        entradas.append((TAG_PONTOS_CONTROLE, 12, [0.0, 0.0, 0.0, transformacao.x0, transformacao.y0, 0.0]))
+    else:
+        x0, dx, rx, y0, ry, dy = transformacao
+        entradas.append((TAG_TRANSFORMACAO, 12, [dx, rx, 0, x0, ry, dy, 0, y0, 0, 0, 0, 0, 0, 0, 0, 1]))
+    if nodata is not None:
+        entradas.append((TAG_NODATA, 2, list(f"{nodata}\x00".encode())))
+    entradas.sort()
+
+    # IFD logo após os tiles; valores que não cabem na entrada vêm depois do IFD
+    posicao_ifd = 8 + sum(len(d) for d in tiles)
+    posicao_dados = posicao_ifd + 2 + 12 * len(entradas) + 4
+    ifd = [struct.pack('<H', len(entradas))]
+    dados_extras = []
+    for tag, tipo, valores in entradas:
+        formato, _ = TIPOS_CAMPO[tipo]
+        bruto = np.asarray(valores, dtype=np.dtype('u1' if tipo == 2 else formato).newbyteorder('<')).tobytes()
+        if len(bruto) <= 4:
+            ifd.append(struct.pack('<HHI4s', tag, tipo, len(valores), bruto.ljust(4, b'\x00')))
+        else:
+            ifd.append(struct.pack('<HHII', tag, tipo, len(valores), posicao_dados))
+            dados_extras.append(bruto)
+            posicao_dados += len(bruto)
+    ifd.append(struct.pack('<I', 0))
+
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(b'II' + struct.pack('<HI', 42, posicao_ifd))
+        for dados in tiles:
+            arquivo.write(dados)
+        arquivo.write(b''.join(ifd))
+        arquivo.write(b''.join(dados_extras))
+    return caminho
+
+
+def georreferenciar_propriedades(tabela, transformacao, epsg):
+    """
+    Acrescenta latitude e longitude do centroide a uma tabela de propriedades de regiões.
+
+    Args:
+        tabela (numpy.ndarray): Tabela de propriedades_regioes (coordenadas em pixels do raster)
+        transformacao (Transformacao): Transformação afim do raster
+        epsg (int): Código EPSG do sistema do raster
+
+    Returns:
+        numpy.ndarray: Tabela com os campos adicionais 'latitude' e 'longitude'
+    """
+    dtype = np.dtype(tabela.dtype.descr + [('latitude', np.float64), ('longitude', np.float64)])
+    georreferenciada = np.zeros(len(tabela), dtype=dtype)
+    for nome in tabela.dtype.names:
+        georreferenciada[nome] = tabela[nome]
+    x, y = pixel_para_coordenada(transformacao, tabela['centro_y'] + 0.5, tabela['centro_x'] + 0.5)
+    georreferenciada['latitude'], georreferenciada['longitude'] = coordenada_para_latlon(x, y, epsg)
+    return georreferenciada
+
+
+def carregar_sitios_previstos(diretorio=COORDENADAS_DIR):
+    """
+    Carrega e concatena as tabelas sitios_previstos_<regiao>.csv.
+
+    Returns:
+        pandas.DataFrame: Latitude, Longitude, Confiança e a coluna 'Regiao'
+    """
+    tabelas = []
+    for caminho in sorted(glob.glob(os.path.join(diretorio, 'sitios_previstos_*.csv'))):
+        tabela = pd.read_csv(caminho)
+        tabela['Regiao'] = os.path.basename(caminho)[len('sitios_previstos_'):-len('.csv')]
+        tabelas.append(tabela)
+    if not tabelas:
+        return pd.DataFrame(columns=['Latitude', 'Longitude', 'Confiança', 'Regiao'])
+    return pd.concat(tabelas, ignore_index=True)
+
+
+def associar_sitios_previstos(regioes, sitios, raio_km=5.0):
+    """
+    Associa cada região detectada ao sítio previsto mais próximo dentro de um raio.
+
+    A busca usa o índice geodésico (árvore k-d sobre vetores unitários 3D, ver
+    geodesia.py); a distância informada é a do grande círculo.
+
+    Args:
+        regioes (numpy.ndarray): Tabela georreferenciada (ver georreferenciar_propriedades)
+        sitios (pandas.DataFrame): Sítios previstos com colunas Latitude e Longitude
+        raio_km (float): Distância máxima da associação
+
+    Returns:
+        pandas.DataFrame: Regiões com 'indice_sitio' (-1 sem associação) e 'dist_sitio_km',
+            acrescidas das colunas do sítio associado
+    """
+    resultado = pd.DataFrame(regioes)
+    resultado['indice_sitio'] = -1
+    resultado['dist_sitio_km'] = np.nan
+    if len(sitios) == 0 or len(resultado) == 0:
+        return resultado
+
+    indice_sitios = IndiceGeodesico(sitios['Latitude'].values, sitios['Longitude'].values)
+    distancia, indice = indice_sitios.vizinho_mais_proximo(resultado['latitude'].values,
+                                                           resultado['longitude'].values,
+                                                           distancia_max_km=raio_km)
+    associada = indice >= 0
+    resultado.loc[associada, 'indice_sitio'] = indice[associada]
+    resultado.loc[associada, 'dist_sitio_km'] = distancia[associada]
+
+    colunas_sitio = sitios.reset_index(drop=True).add_suffix('_sitio')
+    return resultado.join(colunas_sitio, on='indice_sitio')
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    from processamento_tiles import processar_raster_em_tiles, gerar_raster_simulado_em_disco
+    from propriedades_regioes import carregar_tabela
+
+    print("Gerando MDE GeoTIFF simulado na região do Acre...")
+    criar_diretorio_se_nao_existir(RESULTS_DIR)
+    caminho_npy = gerar_raster_simulado_em_disco(os.path.join(RESULTS_DIR, 'mde.npy'))
+    mde = np.load(caminho_npy)
+
+    # Pixels de 1 segundo de arco (~30 m) a partir de -9.0°, -68.0°
+    resolucao = 1 / 3600
+    transformacao = Transformacao(-68.0, resolucao, 0.0, -9.0, 0.0, -resolucao)
+    caminho_tif = escrever_geotiff(os.path.join(RESULTS_DIR, 'mde.tif'), mde.astype(np.float32),
+                                   transformacao, epsg=4326, preditor=3)
+    os.remove(caminho_npy)
+
+    print("Executando a detecção sobre o GeoTIFF (leitura por janelas)...")
+    resumo = processar_raster_em_tiles(caminho_tif, os.path.join(RESULTS_DIR, 'deteccao'),
+                                       etapas=('segmentacao',))
+    regioes = carregar_tabela(resumo['caminhos']['propriedades'])
+    print(f"  {len(regioes)} regiões entre {regioes['latitude'].min():.4f}° e "
+          f"{regioes['latitude'].max():.4f}° de latitude")
+
+    sitios = carregar_sitios_previstos()
+    associadas = associar_sitios_previstos(regioes, sitios, raio_km=5.0)
+    caminho_csv = os.path.join(RESULTS_DIR, 'regioes_sitios_previstos.csv')
+    associadas.to_csv(caminho_csv, index=False)
+    print(f"  {int((associadas['indice_sitio'] >= 0).sum())} regiões a até 5 km de um sítio previsto")
+    print(f"Processamento concluído. Resultados salvos em: {RESULTS_DIR}")
@@ -0,0 +1,411 @@
+# Leitura de Nuvens de Pontos LAS e Geração de MDT
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script lê nuvens de pontos LIDAR no formato LAS usando apenas NumPy:
+# o cabeçalho é decodificado com um dtype estruturado e os registros de pontos são
+# mapeados em memória e percorridos em blocos. Os pontos de solo são agregados em um
+# modelo digital de terreno (MDT) gravado em disco, pronto para as etapas de detecção
+# de processamento_tiles.py, sem carregar a nuvem inteira na memória.
+
+import os
+import math
+import numpy as np
+from scipy import ndimage
+
+from deteccao_sitios import criar_diretorio_se_nao_existir, gerar_imagem_lidar_simulada
+
+# Diretório para salvar resultados
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'las')
+
+# Classes ASPRS usadas pelo projeto
+CLASSE_SOLO = 2
+CLASSE_VEGETACAO_ALTA = 5
+
+# Cabeçalho público LAS 1.2 (227 bytes, little-endian)
+DTYPE_CABECALHO = np.dtype([
+    ('assinatura', 'S4'),
+    ('id_origem', '<u2'),
+    ('codificacao_global', '<u2'),
+    ('guid', 'V16'),
+    ('versao_maior', 'u1'),
+    ('versao_menor', 'u1'),
+    ('sistema', 'S32'),
+    ('software', 'S32'),
+    ('dia_criacao', '<u2'),
+    ('ano_criacao', '<u2'),
+    ('tamanho_cabecalho', '<u2'),
+    ('inicio_pontos', '<u4'),
+    ('n_vlrs', '<u4'),
+    ('formato_ponto', 'u1'),
+    ('tamanho_registro', '<u2'),
+    ('n_pontos', '<u4'),
+    ('n_por_retorno', '<u4', (5,)),
+    ('escala', '<f8', (3,)),
+    ('deslocamento', '<f8', (3,)),
+    ('max_x', '<f8'),
+    ('min_x', '<f8'),
+    ('max_y', '<f8'),
+    ('min_y', '<f8'),
+    ('max_z', '<f8'),
+    ('min_z', '<f8'),
+])
+
+# Posição do número de pontos de 64 bits do cabeçalho LAS 1.4
+POSICAO_N_PONTOS_14 = 247
+
+# Campos dos registros de pontos: (nome, tipo, posição) por formato
+_CAMPOS_LEGADOS = [
+    ('X', '<i4', 0), ('Y', '<i4', 4), ('Z', '<i4', 8), ('intensidade', '<u2', 12),
+    ('retornos', 'u1', 14), ('classificacao', 'u1', 15),
+]
+_CAMPOS_ESTENDIDOS = [
+    ('X', '<i4', 0), ('Y', '<i4', 4), ('Z', '<i4', 8), ('intensidade', '<u2', 12),
+    ('retornos', 'u1', 14), ('classificacao', 'u1', 16),
+]
+CAMPOS_FORMATO = {
+    0: _CAMPOS_LEGADOS,
+    1: _CAMPOS_LEGADOS + [('tempo_gps', '<f8', 20)],
+    2: _CAMPOS_LEGADOS,
+    3: _CAMPOS_LEGADOS + [('tempo_gps', '<f8', 20)],
+    6: _CAMPOS_ESTENDIDOS + [('tempo_gps', '<f8', 22)],
+    7: _CAMPOS_ESTENDIDOS + [('tempo_gps', '<f8', 22)],
+    8: _CAMPOS_ESTENDIDOS + [('tempo_gps', '<f8', 22)],
+}
+
+# Tamanho mínimo do registro de cada formato
+TAMANHO_FORMATO = {0: 20, 1: 28, 2: 26, 3: 34, 6: 30, 7: 36, 8: 38}
+
+# Métodos de agregação das células do MDT
+METODOS_MDT = ('min', 'max', 'media', 'idw')
+
+
+def dtype_pontos(formato, tamanho_registro):
+    """
+    Monta o dtype dos registros de pontos de um formato LAS.
+
+    Campos extras no fim do registro (bytes adicionais) são ignorados pelo dtype,
+    que usa o tamanho de registro declarado no cabeçalho.
+
+    Args:
+        formato (int): Formato dos registros de pontos
+        tamanho_registro (int): Tamanho de cada registro em bytes
+
+    Returns:
+        numpy.dtype: Dtype estruturado dos registros
+    """
+    if formato not in CAMPOS_FORMATO:
+        raise ValueError(f"Formato de ponto LAS não suportado: {formato}")
+    if tamanho_registro < TAMANHO_FORMATO[formato]:
+        raise ValueError(f"Registro de {tamanho_registro} bytes menor que o formato {formato}")
+    nomes, tipos, posicoes = zip(*CAMPOS_FORMATO[formato])
+    return np.dtype({'names': list(nomes), 'formats': list(tipos),
+                     'offsets': list(posicoes), 'itemsize': tamanho_registro})
+
+
+class NuvemLAS:
+    """
+    Nuvem de pontos LAS com os registros mapeados em memória.
+
+    Apenas o cabeçalho é lido ao abrir o arquivo; os registros são acessados
+    sob demanda, bloco a bloco, por iterar_blocos.
+    """
+
+    def __init__(self, caminho):
+        """
+        Args:
+            caminho (str): Caminho do arquivo .las
+        """
+        self.caminho = caminho
+        with open(caminho, 'rb') as arquivo:
+            bruto = arquivo.read(POSICAO_N_PONTOS_14 + 8)
+        if bruto[:4] != b'LASF':
+            raise ValueError(f"Arquivo sem assinatura LASF: {caminho}")
+
+        cabecalho = np.frombuffer(bruto, dtype=DTYPE_CABECALHO, count=1)[0]
+        self.versao = (int(cabecalho['versao_maior']), int(cabecalho['versao_menor']))
+        self.formato = int(cabecalho['formato_ponto']) & 0x3F  # bits 6-7: compressão
+        self.escala = cabecalho['escala'].copy()
+        self.deslocamento = cabecalho['deslocamento'].copy()
+        self.limites = {chave: float(cabecalho[chave]) for chave in
+                        ('min_x', 'max_x', 'min_y', 'max_y', 'min_z', 'max_z')}
+
+        self.n_pontos = int(cabecalho['n_pontos'])
+        if self.versao >= (1, 4) and self.n_pontos == 0 and len(bruto) >= POSICAO_N_PONTOS_14 + 8:
+            self.n_pontos = int(np.frombuffer(bruto, '<u8', 1, POSICAO_N_PONTOS_14)[0])
+
+        self.pontos = np.memmap(
+            caminho, dtype=dtype_pontos(self.formato, int(cabecalho['tamanho_registro'])),
+            mode='r', offset=int(cabecalho['inicio_pontos']), shape=(self.n_pontos,)
+        )
+
+    def iterar_blocos(self, tamanho_bloco=1_000_000, classes=None):
+        """
+        Percorre a nuvem em blocos, devolvendo coordenadas já escaladas.
+
+        Args:
+            tamanho_bloco (int): Número de registros lidos por bloco
+            classes (iterable, opcional): Classes ASPRS mantidas (ex.: (CLASSE_SOLO,))
+
+        Yields:
+            tuple: (x, y, z) em float64 para os pontos do bloco
+        """
+        if classes is not None:
+            classes = np.asarray(list(classes), dtype=np.uint8)
+        for inicio in range(0, self.n_pontos, tamanho_bloco):
+            bloco = self.pontos[inicio:inicio + tamanho_bloco]
+            if classes is not None:
+                bloco = bloco[np.isin(bloco['classificacao'] & 0x1F if self.formato < 6
+                                      else bloco['classificacao'], classes)]
+            yield (bloco['X'] * self.escala[0] + self.deslocamento[0],
+                   bloco['Y'] * self.escala[1] + self.deslocamento[1],
+                   bloco['Z'] * self.escala[2] + self.deslocamento[2])
+
+
+def escrever_las(caminho, x, y, z, classificacao=None, escala=0.01):
+    """
+    Grava uma nuvem de pontos em um arquivo LAS 1.2, formato de ponto 0.
+
+    Args:
+        caminho (str): Caminho do arquivo .las
+        x, y, z (numpy.ndarray): Coordenadas dos pontos
+        classificacao (numpy.ndarray, opcional): Classe ASPRS de cada ponto
+        escala (float): Resolução das coordenadas inteiras gravadas
+
+    Returns:
+        str: Caminho do arquivo gravado
+    """
+    x, y, z = (np.asarray(v, dtype=np.float64) for v in (x, y, z))
+    deslocamento = np.floor([x.min(), y.min(), z.min()])
+
+    cabecalho = np.zeros(1, dtype=DTYPE_CABECALHO)
+    cabecalho['assinatura'] = b'LASF'
+    cabecalho['versao_maior'] = 1
+    cabecalho['versao_menor'] = 2
+    cabecalho['software'] = b'Amazonia Explorer'
+    cabecalho['tamanho_cabecalho'] = DTYPE_CABECALHO.itemsize
+    cabecalho['inicio_pontos'] = DTYPE_CABECALHO.itemsize
+    cabecalho['formato_ponto'] = 0
+    cabecalho['tamanho_registro'] = TAMANHO_FORMATO[0]
+    cabecalho['n_pontos'] = len(x)
+    cabecalho['n_por_retorno'][0, 0] = len(x)
+    cabecalho['escala'] = escala
+    cabecalho['deslocamento'] = deslocamento
+    for eixo, valores in zip('xyz', (x, y, z)):
+        cabecalho[f'max_{eixo}'] = valores.max()
+        cabecalho[f'min_{eixo}'] = valores.min()
+
+    pontos = np.zeros(len(x), dtype=dtype_pontos(0, TAMANHO_FORMATO[0]))
+    for campo, valores, eixo in (('X', x, 0), ('Y', y, 1), ('Z', z, 2)):
+        pontos[campo] = np.round((valores - deslocamento[eixo]) / escala)
+    pontos['retornos'] = 0b00001001  # retorno 1 de 1
+    if classificacao is not None:
+        pontos['classificacao'] = classificacao
+
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(cabecalho.tobytes())
+        arquivo.write(pontos.tobytes())
+    return caminho
+
+
+def _acumular_bloco(x, y, z, grade, metodo, acumuladores):
+    """
+    Agrega um bloco de pontos nas células da grade e atualiza os acumuladores em disco.
+    """
+    coluna = np.floor((x - grade['min_x']) / grade['resolucao']).astype(np.int64)
+    linha = np.floor((grade['max_y'] - y) / grade['resolucao']).astype(np.int64)
+    # Pontos exatamente sobre o limite máximo caem na última célula
+    np.clip(coluna, 0, grade['largura'] - 1, out=coluna)
+    np.clip(linha, 0, grade['altura'] - 1, out=linha)
+    celula = linha * grade['largura'] + coluna
+    if len(celula) == 0:
+        return
+
+    if metodo in ('min', 'max'):
+        # Ordenar por célula e cota: o primeiro ponto de cada célula é o extremo
+        sinal = 1.0 if metodo == 'min' else -1.0
+        ordem = np.lexsort((sinal * z, celula))
+        celulas, inicio = np.unique(celula[ordem], return_index=True)
+        valor = acumuladores['valor'].reshape(-1)
+        extremo = np.minimum if metodo == 'min' else np.maximum
+        valor[celulas] = extremo(valor[celulas], z[ordem][inicio])
+        return
+
+    if metodo == 'media':
+        peso = np.ones_like(z)
+    else:
+        # Peso pelo inverso do quadrado da distância ao centro da célula
+        centro_x = grade['min_x'] + (coluna + 0.5) * grade['resolucao']
+        centro_y = grade['max_y'] - (linha + 0.5) * grade['resolucao']
+        distancia2 = (x - centro_x) ** 2 + (y - centro_y) ** 2
+        peso = 1.0 / (distancia2 + (0.01 * grade['resolucao']) ** 2)
+
+    # Reduzir o bloco às células presentes antes de tocar os arrays em disco
+    celulas, inverso = np.unique(celula, return_inverse=True)
+    soma = acumuladores['soma'].reshape(-1)
+    pesos = acumuladores['peso'].reshape(-1)
+    soma[celulas] += np.bincount(inverso, weights=peso * z, minlength=len(celulas))
+    pesos[celulas] += np.bincount(inverso, weights=peso, minlength=len(celulas))
+
+
+def preencher_vazios(mdt, vazios, raio=8):
+    """
+    Preenche células sem pontos com o valor da célula válida mais próxima.
+
+    Args:
+        mdt (numpy.ndarray): Faixa do MDT (com halo)
+        vazios (numpy.ndarray): Máscara das células sem pontos
+        raio (int): Distância máxima de busca, em células
+
+    Returns:
+        numpy.ndarray: Faixa preenchida; células sem vizinho válido ficam NaN
+    """
+    if not vazios.any() or vazios.all():
+        return mdt
+    distancia, (linhas, colunas) = ndimage.distance_transform_edt(vazios, return_indices=True)
+    preenchido = mdt[linhas, colunas]
+    preenchido[distancia > raio] = np.nan
+    return preenchido
+
+
+def gerar_mdt(caminho_las, destino, resolucao=1.0, metodo='min', classes=(CLASSE_SOLO,),
+              tamanho_bloco=1_000_000, memoria_max_mb=512, raio_preenchimento=8):
+    """
+    Agrega os pontos de solo de uma nuvem LAS em um MDT gravado em disco.
+
+    A nuvem é percorrida em blocos; cada bloco é reduzido às suas células e
+    acumulado em arrays mapeados em disco. A finalização (média, preenchimento de
+    vazios pelo vizinho válido mais próximo) é feita em faixas de linhas com halo,
+    de modo que nem a nuvem nem a grade precisam caber na memória.
+
+    Args:
+        caminho_las (str): Arquivo .las de entrada
+        destino (str): Arquivo .npy do MDT (float32, linha 0 ao norte)
+        resolucao (float): Lado da célula, nas unidades da nuvem
+        metodo (str): 'min' (menor cota), 'max' (maior cota, para modelos de
+            superfície), 'media' ou 'idw' (inverso da distância ao
+            centro da célula, apenas com os pontos da própria célula)
+        classes (iterable, opcional): Classes usadas; None usa todos os pontos
+        tamanho_bloco (int): Pontos lidos por bloco
+        memoria_max_mb (float): Orçamento de memória de cada faixa na finalização
+        raio_preenchimento (int): Distância máxima, em células, para preencher vazios
+
+    Returns:
+        dict: Caminho do MDT, forma, resolução, origem (min_x, max_y) e fração de vazios
+    """
+    if metodo not in METODOS_MDT:
+        raise ValueError(f"metodo deve ser um de {METODOS_MDT}")
+
+    nuvem = NuvemLAS(caminho_las)
+    limites = nuvem.limites
+    grade = {
+        'resolucao': float(resolucao),
+        'min_x': limites['min_x'],
+        'max_y': limites['max_y'],
+        'largura': max(1, math.ceil((limites['max_x'] - limites['min_x']) / resolucao)),
+        'altura': max(1, math.ceil((limites['max_y'] - limites['min_y']) / resolucao)),
+    }
+    forma = (grade['altura'], grade['largura'])
+
+    # Acumuladores temporários ao lado do destino
+    base = os.path.splitext(destino)[0]
+    nomes = ('valor',) if metodo in ('min', 'max') else ('soma', 'peso')
+    acumuladores = {}
+    for nome in nomes:
+        acumuladores[nome] = np.lib.format.open_memmap(f"{base}_{nome}.tmp.npy", mode='w+',
+                                                       dtype=np.float64, shape=forma)
+    if metodo in ('min', 'max'):
+        acumuladores['valor'][:] = np.inf if metodo == 'min' else -np.inf
+
+    for x, y, z in nuvem.iterar_blocos(tamanho_bloco, classes):
+        _acumular_bloco(x, y, z, grade, metodo, acumuladores)
+
+    # Finalizar em faixas de linhas com halo para o preenchimento de vazios
+    mdt = np.lib.format.open_memmap(destino, mode='w+', dtype=np.float32, shape=forma)
+    linhas_por_faixa = max(1, int(memoria_max_mb * 1024 * 1024 / (64 * grade['largura'])))
+    n_vazios = 0
+    for y0 in range(0, forma[0], linhas_por_faixa):
+        y1 = min(y0 + linhas_por_faixa, forma[0])
+        h0, h1 = max(0, y0 - raio_preenchimento), min(forma[0], y1 + raio_preenchimento)
+        if metodo in ('min', 'max'):
+            faixa = np.array(acumuladores['valor'][h0:h1])
+            vazios = np.isinf(faixa)
+        else:
+            peso = np.array(acumuladores['peso'][h0:h1])
+            vazios = peso == 0
+            faixa = np.array(acumuladores['soma'][h0:h1]) / np.where(vazios, 1.0, peso)
+        n_vazios += int(vazios[y0 - h0:y1 - h0].sum())
+        mdt[y0:y1] = preencher_vazios(faixa, vazios, raio_preenchimento)[y0 - h0:y1 - h0]
+    mdt.flush()
+
+    for nome in nomes:
+        caminho_temporario = acumuladores[nome].filename
+        del acumuladores[nome]
+        os.remove(caminho_temporario)
+
+    return {
+        'caminho': destino,
+        'forma': forma,
+        'resolucao': grade['resolucao'],
+        'origem': (grade['min_x'], grade['max_y']),
+        'fracao_vazios': n_vazios / float(forma[0] * forma[1]),
+        'n_pontos': nuvem.n_pontos,
+    }
+
+
+def gerar_nuvem_simulada(caminho, tipo='geoglifo', tamanho=512, pontos_por_celula=4,
+                         fracao_solo=0.3, altura_dossel=25.0, semente=42):
+    """
+    Gera uma nuvem LAS simulada sobre uma imagem LIDAR simulada.
+
+    Uma fração dos retornos atinge o solo (classe 2, sobre o terreno simulado) e o
+    restante para no dossel (classe 5, até altura_dossel metros acima do solo).
+
+    Args:
+        caminho (str): Arquivo .las a criar
+        tipo (str): Tipo de estrutura da imagem simulada
+        tamanho (int): Lado do terreno em metros (1 pixel = 1 metro)
+        pontos_por_celula (float): Densidade média de pontos por metro quadrado
+        fracao_solo (float): Fração de retornos de solo
+        altura_dossel (float): Altura máxima do dossel em metros
+        semente (int): Semente do gerador de números aleatórios
+
+    Returns:
+        str: Caminho do arquivo gravado
+    """
+    rng = np.random.default_rng(semente)
+    # A imagem simulada já traz ruído de vegetação pixel a pixel; aqui a vegetação é
+    # modelada pelos retornos de dossel, então o terreno é suavizado
+    terreno = ndimage.gaussian_filter(gerar_imagem_lidar_simulada(tamanho=tamanho, tipo=tipo), 2) * 10.0
+
+    n = int(tamanho * tamanho * pontos_por_celula)
+    x = rng.uniform(0, tamanho, n)
+    y = rng.uniform(0, tamanho, n)
+    linha = np.minimum((tamanho - y).astype(np.int64), tamanho - 1)
+    coluna = np.minimum(x.astype(np.int64), tamanho - 1)
+    z = terreno[linha, coluna] + rng.normal(0, 0.02, n)
+
+    solo = rng.random(n) < fracao_solo
+    z[~solo] += rng.uniform(2.0, altura_dossel, (~solo).sum())
+    classificacao = np.where(solo, CLASSE_SOLO, CLASSE_VEGETACAO_ALTA).astype(np.uint8)
+
+    return escrever_las(caminho, x + 500000.0, y + 9000000.0, z, classificacao)
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    from processamento_tiles import processar_raster_em_tiles
+
+    print("Gerando nuvem de pontos LAS simulada...")
+    criar_diretorio_se_nao_existir(RESULTS_DIR)
+    caminho_las = gerar_nuvem_simulada(os.path.join(RESULTS_DIR, 'nuvem_geoglifo.las'))
+
+    print("Gerando MDT a partir dos pontos de solo...")
+    mdt = gerar_mdt(caminho_las, os.path.join(RESULTS_DIR, 'mdt.npy'), resolucao=1.0, metodo='min')
+    print(f"  {mdt['n_pontos']} pontos, MDT de {mdt['forma'][0]}x{mdt['forma'][1]} células "
+          f"({mdt['fracao_vazios']:.1%} preenchidas por vizinhança)")
+
+    print("Executando a detecção sobre o MDT...")
+    processar_raster_em_tiles(mdt['caminho'], os.path.join(RESULTS_DIR, 'deteccao'))
+    print(f"Processamento concluído. Resultados salvos em: {RESULTS_DIR}")
@@ -0,0 +1,139 @@
+# Modos de Treinamento para Conjuntos Pequenos e Grandes
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script escolhe os estimadores dos scripts de previsão conforme o tamanho
+# do conjunto de treinamento. No modo exato (padrão para poucos milhares de amostras)
+# são usados os mesmos Random Forest e Gradient Boosting de sempre. No modo para grandes
+# conjuntos, o boosting passa a ser por histogramas (HistGradientBoosting: características
+# discretizadas em até 255 faixas, treinamento em vários núcleos e parada antecipada em uma
+# fração de validação) e as florestas são construídas em paralelo. O modo automático
+# troca de um para o outro a partir de LIMIAR_AMOSTRAS.
+
+import os
+
+from sklearn.ensemble import (GradientBoostingClassifier, GradientBoostingRegressor,
+                              HistGradientBoostingClassifier, HistGradientBoostingRegressor,
+                              RandomForestClassifier, RandomForestRegressor)
+
+# Modos disponíveis
+MODOS = ('auto', 'exato', 'grande')
+
+# Número de amostras a partir do qual o modo automático usa o modo para grandes conjuntos
+LIMIAR_AMOSTRAS = 100000
+
+# Parada antecipada do boosting por histogramas
+FRACAO_VALIDACAO = 0.1
+ITERACOES_SEM_MELHORA = 10
+
+# Estimadores por tarefa: (floresta, boosting exato, boosting por histogramas)
+ESTIMADORES = {
+    'regressao': (RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor),
+    'classificacao': (RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier),
+}
+
+
+def escolher_modo(n_amostras, modo='auto'):
+    """
+    Resolve o modo de treinamento.
+
+    A variável de ambiente AMAZONIA_MODO_TREINO (auto, exato ou grande) tem
+    precedência sobre o modo 'auto' pedido pelo código.
+
+    Args:
+        n_amostras (int): Número de amostras de treinamento
+        modo (str): 'auto', 'exato' ou 'grande'
+
+    Returns:
+        str: 'exato' ou 'grande'
+    """
+    if modo == 'auto':
+        modo = os.environ.get('AMAZONIA_MODO_TREINO', 'auto')
+    if modo not in MODOS:
+        raise ValueError(f"modo deve ser um de {MODOS}")
+    if modo == 'auto':
+        return 'grande' if n_amostras >= LIMIAR_AMOSTRAS else 'exato'
+    return modo
+
+
+def criar_floresta(tarefa, n_amostras, modo='auto', **hiperparametros):
+    """
+    Cria um Random Forest para a tarefa; no modo para grandes conjuntos, as
+    árvores são construídas em todos os núcleos (n_jobs=-1).
+
+    Args:
+        tarefa (str): 'regressao' ou 'classificacao'
+        n_amostras (int): Número de amostras de treinamento
+        modo (str): 'auto', 'exato' ou 'grande'
+        **hiperparametros: Hiperparâmetros do RandomForest (n_estimators, max_depth, ...)
+
+    Returns:
+        Estimador não ajustado
+    """
+    floresta = ESTIMADORES[tarefa][0]
+    if escolher_modo(n_amostras, modo) == 'grande':
+        hiperparametros.setdefault('n_jobs', -1)
+    return floresta(**hiperparametros)
+
+
+def criar_boosting(tarefa, n_amostras, modo='auto', **hiperparametros):
+    """
+    Cria um Gradient Boosting para a tarefa.
+
+    No modo exato, é o GradientBoosting de sempre, com os hiperparâmetros
+    recebidos. No modo para grandes conjuntos, é o HistGradientBoosting: n_estimators
+    vira o limite de iterações (max_iter), learning_rate, max_depth e
+    random_state são mantidos, e o treinamento para quando o erro em
+    FRACAO_VALIDACAO das amostras não melhora por ITERACOES_SEM_MELHORA iterações.
+
+    Args:
+        tarefa (str): 'regressao' ou 'classificacao'
+        n_amostras (int): Número de amostras de treinamento
+        modo (str): 'auto', 'exato' ou 'grande'
+        **hiperparametros: Hiperparâmetros do GradientBoosting
+
+    Returns:
+        Estimador não ajustado
+    """
+    _, boosting, boosting_histograma = ESTIMADORES[tarefa]
+    if escolher_modo(n_amostras, modo) == 'exato':
+        return boosting(**hiperparametros)
+    parametros = {'max_iter': hiperparametros.get('n_estimators', 100),
+                  'early_stopping': True,
+                  'validation_fraction': FRACAO_VALIDACAO,
+                  'n_iter_no_change': ITERACOES_SEM_MELHORA}
+    for nome in ('learning_rate', 'max_depth', 'random_state'):
+        if nome in hiperparametros:
+            parametros[nome] = hiperparametros[nome]
+    return boosting_histograma(**parametros)
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    import time
+    import argparse
+    import numpy as np
+    from sklearn.datasets import make_classification
+    from sklearn.model_selection import train_test_split
+
+    parser = argparse.ArgumentParser(description="Comparação dos modos de treinamento")
+    parser.add_argument('--amostras', type=int, nargs='+', default=[10000, 150000],
+                        help="Números de amostras simuladas")
+    argumentos = parser.parse_args()
+
+    print("Comparando os modos de treinamento em conjuntos crescentes...")
+    for n_amostras in argumentos.amostras:
+        X, y = make_classification(n_samples=n_amostras, n_features=7, n_informative=5, random_state=42)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
+        for modo in ('exato', 'grande'):
+            for nome, criar in (('floresta', criar_floresta), ('boosting', criar_boosting)):
+                modelo = criar('classificacao', len(X_train), modo, n_estimators=100, random_state=42)
+                inicio = time.time()
+                modelo.fit(X_train, y_train)
+                tempo = time.time() - inicio
+                acuracia = np.mean(modelo.predict(X_test) == y_test)
+                print(f"  {n_amostras:>7} amostras, modo {modo:<6} {nome:<9} ({type(modelo).__name__}): "
+                      f"{tempo:6.2f} s, acurácia {acuracia:.3f}")
+        print(f"  Modo automático para {len(X_train)} amostras de treinamento: {escolher_modo(len(X_train))}")
+    print("Processamento concluído.")
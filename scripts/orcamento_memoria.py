@@ -0,0 +1,314 @@
+# Orçamento de Memória da Detecção
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script mede o pico de memória residente (RSS) de cada etapa da detecção
+# de sítios e mantém buffers de trabalho reutilizáveis entre chamadas. Com ele, o modo de
+# economia de memória de deteccao_sitios.py (float32 de ponta a ponta, operações no lugar)
+# é comparado ao modo padrão em bytes por pixel, e a precisão do float32 é verificada
+# explicitamente contra o float64.
+
+import os
+import time
+import ctypes
+import ctypes.util
+import resource
+from contextlib import contextmanager, nullcontext
+import numpy as np
+
+# Diretório para salvar resultados
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'memoria')
+
+# Diferenças máximas aceitas entre os modos float32 e float64: erro absoluto da
+# imagem e da sobreposição RGB; fração de pixels do realce que mudam mais de um
+# nível de cinza (o CLAHE quantiza a entrada, então arredondamentos perto de um
+# limite de nível mudam o nível inteiro); fração de pixels com bordas ou
+# rótulos diferentes
+TOLERANCIAS = {
+    'imagem': 1e-6,
+    'sobreposicao': 1e-6,
+    'realce': 1e-4,
+    'bordas': 1e-3,
+    'rotulos': 1e-3,
+}
+
+# Níveis de cinza do CLAHE (mesmo padrão do skimage)
+NIVEIS_CINZA = 256
+
+
+def _ler_status(campo):
+    """
+    Lê um campo de memória (em kB) de /proc/self/status, ou None fora do Linux.
+    """
+    try:
+        with open('/proc/self/status') as arquivo:
+            for linha in arquivo:
+                if linha.startswith(campo + ':'):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def rss_atual_mb():
+    """
+    Retorna a memória residente atual do processo em megabytes.
+    """
+    kb = _ler_status('VmRSS')
+    if kb is None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024
+
+
+def pico_rss_mb():
+    """
+    Retorna o pico de memória residente do processo em megabytes.
+    """
+    kb = _ler_status('VmHWM')
+    if kb is None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024
+
+
+def devolver_memoria_livre():
+    """
+    Devolve ao sistema a memória livre do heap do processo (malloc_trim da glibc).
+
+    Sem isso, uma etapa reaproveita a memória liberada pelas anteriores e o seu
+    pico de RSS fica abaixo do que ela realmente aloca.
+
+    Returns:
+        bool: True se a glibc está disponível
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6')
+        libc.malloc_trim(0)
+        return True
+    except (OSError, AttributeError):
+        return False
+
+
+def reiniciar_pico_rss():
+    """
+    Reinicia o pico de memória residente (Linux >= 4.0), para medir uma etapa isolada.
+
+    Returns:
+        bool: True se o pico foi reiniciado; sem suporte, o pico é cumulativo
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as arquivo:
+            arquivo.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class MedidorMemoria:
+    """
+    Registra, por etapa, o pico de RSS acima da memória residente no início da etapa.
+
+    No início de cada etapa, a memória livre do heap é devolvida ao sistema e o
+    pico é reiniciado, então o valor reflete apenas a memória alocada pela etapa
+    (incluindo o array que ela devolve), e não o que sobrou livre das etapas
+    anteriores. Para comparar execuções, meça cada uma em um processo novo.
+    """
+
+    def __init__(self, n_pixels=None):
+        """
+        Args:
+            n_pixels (int, opcional): Pixels da imagem, para expressar o pico em bytes por pixel
+        """
+        self.n_pixels = n_pixels
+        self.etapas = {}
+
+    @contextmanager
+    def etapa(self, nome):
+        """
+        Mede o pico de RSS, o tempo de relógio e o tempo de CPU do bloco como a etapa nome.
+        """
+        devolver_memoria_livre()
+        reiniciar_pico_rss()
+        base = rss_atual_mb()
+        inicio = time.perf_counter()
+        inicio_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.etapas[nome] = {
+                'pico_mb': max(pico_rss_mb() - base, 0.0),
+                'tempo_s': time.perf_counter() - inicio,
+                'cpu_s': time.process_time() - inicio_cpu,
+            }
+
+    def bytes_por_pixel(self, nome):
+        """
+        Retorna o pico de uma etapa em bytes por pixel (ou None sem n_pixels).
+        """
+        if not self.n_pixels:
+            return None
+        return self.etapas[nome]['pico_mb'] * 1024 * 1024 / self.n_pixels
+
+    def relatorio(self):
+        """
+        Formata o pico de RSS e o tempo de cada etapa, uma por linha.
+
+        Returns:
+            str: Relatório
+        """
+        linhas = []
+        for nome, medida in self.etapas.items():
+            linha = f"  {nome:<14} pico de {medida['pico_mb']:8.1f} MB"
+            if self.n_pixels:
+                linha += f" ({self.bytes_por_pixel(nome):5.1f} B/pixel)"
+            linhas.append(linha + f" em {medida['tempo_s']:.2f} s")
+        return "\n".join(linhas)
+
+
+@contextmanager
+def medir(medidor, nome):
+    """
+    Mede a etapa no medidor, se houver, e a registra na instrumentação, se ativa.
+    """
+    from instrumentacao import etapa
+    with (nullcontext() if medidor is None else medidor.etapa(nome)), etapa(nome):
+        yield
+
+
+class BuffersTrabalho:
+    """
+    Buffers de trabalho nomeados, reutilizados entre chamadas com a mesma forma e tipo.
+
+    Evita alocar (e fazer o sistema zerar) um array novo a cada imagem nas
+    etapas que precisam de um array temporário do tamanho da imagem.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+
+    def obter(self, nome, forma, dtype):
+        """
+        Retorna o buffer nome com a forma e o tipo pedidos (conteúdo indefinido).
+        """
+        buffer = self._buffers.get(nome)
+        if buffer is None or buffer.shape != tuple(forma) or buffer.dtype != np.dtype(dtype):
+            buffer = np.empty(forma, dtype=dtype)
+            self._buffers[nome] = buffer
+        return buffer
+
+
+def obter_buffer(buffers, nome, forma, dtype):
+    """
+    Retorna um buffer de trabalho, ou um array novo sem BuffersTrabalho.
+    """
+    if buffers is None:
+        return np.empty(forma, dtype=dtype)
+    return buffers.obter(nome, forma, dtype)
+
+
+def medir_pipeline(tipo='geoglifo', tamanho=2048, economizar_memoria=False, semente=42):
+    """
+    Executa a detecção de um tipo de estrutura medindo o pico de RSS de cada etapa.
+
+    Args:
+        tipo (str): Tipo de estrutura simulada
+        tamanho (int): Lado da imagem simulada
+        economizar_memoria (bool): Usar o modo float32 com buffers reutilizáveis
+        semente (int): Semente do gerador de números aleatórios
+
+    Returns:
+        tuple: (MedidorMemoria, resultados por etapa)
+    """
+    from deteccao_sitios import (
+        gerar_imagem_lidar_simulada,
+        executar_etapas,
+        sobrepor_rotulos,
+        calcular_propriedades,
+    )
+
+    dtype = np.float32 if economizar_memoria else np.float64
+    buffers = BuffersTrabalho() if economizar_memoria else None
+    medidor = MedidorMemoria(tamanho * tamanho)
+
+    np.random.seed(semente)
+    with medidor.etapa('geracao'):
+        imagem = gerar_imagem_lidar_simulada(tamanho, tipo, dtype=dtype, buffers=buffers)
+    bordas, realce, rotulos = executar_etapas(imagem, medidor=medidor, buffers=buffers)
+    with medidor.etapa('propriedades'):
+        calcular_propriedades(rotulos, imagem)
+    with medidor.etapa('sobreposicao'):
+        if economizar_memoria:
+            sobreposicao = sobrepor_rotulos(rotulos, imagem, buffers=buffers)
+        else:
+            from skimage import color
+            sobreposicao = color.label2rgb(rotulos, imagem, alpha=0.5, bg_label=0)
+
+    resultados = {
+        'imagem': imagem,
+        'bordas': bordas,
+        'realce': realce,
+        'rotulos': rotulos,
+        'sobreposicao': sobreposicao,
+    }
+    return medidor, resultados
+
+
+def verificar_precisao(referencia, economico, tolerancias=TOLERANCIAS):
+    """
+    Compara os resultados do modo float32 com os do float64.
+
+    Args:
+        referencia (dict): Resultados do modo padrão (ver medir_pipeline)
+        economico (dict): Resultados do modo de economia de memória
+        tolerancias (dict): Diferenças máximas aceitas por resultado
+
+    Returns:
+        dict: Diferença medida e aprovação por resultado
+    """
+    diferencas = {}
+    for nome in ('imagem', 'sobreposicao'):
+        diferencas[nome] = float(np.abs(referencia[nome] - economico[nome]).max())
+    erro_realce = np.abs(referencia['realce'] - economico['realce'])
+    diferencas['realce'] = float((erro_realce > 1.0 / NIVEIS_CINZA).mean())
+    diferencas['bordas'] = float((referencia['bordas'] != economico['bordas']).mean())
+    diferencas['rotulos'] = float((referencia['rotulos'] != economico['rotulos']).mean())
+    return {nome: (diferenca, diferenca <= tolerancias[nome])
+            for nome, diferenca in diferencas.items()}
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    import json
+    from concurrent.futures import ProcessPoolExecutor
+    from deteccao_sitios import criar_diretorio_se_nao_existir
+
+    print("Medindo o pico de memória por etapa da detecção...")
+    criar_diretorio_se_nao_existir(RESULTS_DIR)
+    relatorio = {}
+    resultados = {}
+    for modo, economizar in (('float64', False), ('float32', True)):
+        # Cada modo roda em um processo novo, para que a memória liberada por um
+        # não seja reaproveitada pelo outro e esconda o seu pico
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            medidor, resultados[modo] = executor.submit(
+                medir_pipeline, economizar_memoria=economizar).result()
+        print(f"Modo {modo}:")
+        print(medidor.relatorio())
+        relatorio[modo] = {nome: medidor.bytes_por_pixel(nome) for nome in medidor.etapas}
+
+    pico_padrao = max(relatorio['float64'].values())
+    pico_economico = max(relatorio['float32'].values())
+    print(f"Maior pico por pixel: {pico_padrao:.1f} B (float64) -> {pico_economico:.1f} B (float32), "
+          f"{pico_economico / pico_padrao:.0%} do modo padrão")
+
+    print("Verificando a precisão do float32...")
+    precisao = verificar_precisao(resultados['float64'], resultados['float32'])
+    for nome, (diferenca, aprovado) in precisao.items():
+        print(f"  {nome:<14} {diferenca:.2e} (tolerância {TOLERANCIAS[nome]:.0e}) "
+              f"{'ok' if aprovado else 'FALHOU'}")
+    relatorio['precisao'] = {nome: {'diferenca': diferenca, 'aprovado': aprovado}
+                             for nome, (diferenca, aprovado) in precisao.items()}
+
+    with open(os.path.join(RESULTS_DIR, 'orcamento_memoria.json'), 'w') as arquivo:
+        json.dump(relatorio, arquivo, indent=2)
+    print(f"Processamento concluído. Resultados salvos em: {RESULTS_DIR}")
@@ -1,12 +1,16 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, confusion_matrix
 import geopandas as gpd
 from shapely.geometry import Point
+from agendador_tiles import numero_processos
+from cache_modelos import ajustar_em_cache
+from geodesia import vizinho_mais_proximo_km
+from modos_treino import criar_boosting, criar_floresta
 
 # Configuração do diretório de trabalho
 base_dir = '/home/ubuntu/amazonia-explorador'
@@ -86,6 +90,23 @@ def gerar_dados_treinamento(n_amostras=1000, ruido=0.2):
     
     return X_df, y
 
+# Treinar o modelo do Método 1
+def treinar_metodo_1_ambiental(X_train, y_train):
+    """
+    Ajusta o Random Forest do Método 1
+    
+    Parâmetros:
+    X_train: features de treinamento
+    y_train: labels de treinamento
+    
+    Retorna:
+    modelo: Random Forest ajustado
+    """
+    # Ajustes idênticos são reaproveitados do cache; em grandes conjuntos as
+    # árvores são construídas em paralelo (ver modos_treino.py)
+    floresta = criar_floresta('classificacao', len(X_train), n_estimators=100, random_state=42)
+    return ajustar_em_cache(floresta, X_train, y_train)
+
 # Método 1: Modelo baseado em características ambientais e topográficas
 def metodo_1_ambiental(X_train, y_train, X_test):
     """
@@ -104,8 +125,7 @@ def metodo_1_ambiental(X_train, y_train, X_test):
     print("Método 1: Aplicando modelo baseado em características ambientais e topográficas...")
     
     # Treinar modelo Random Forest
-    modelo = RandomForestClassifier(n_estimators=100, random_state=42)
-    modelo.fit(X_train, y_train)
+    modelo = treinar_metodo_1_ambiental(X_train, y_train)
     
     # Fazer previsões
     y_pred = modelo.predict(X_test)
@@ -118,6 +138,29 @@ def metodo_1_ambiental(X_train, y_train, X_test):
     
     return y_pred, importancia
 
+# Distância ao sítio conhecido mais próximo (árvore k-d geodésica)
+def distancia_sitio_proximo(coords, coords_sitios, indices_proprios=None, sem_sitios=999):
+    """
+    Calcula a distância de cada ponto ao sítio conhecido mais próximo com uma árvore k-d
+    
+    Parâmetros:
+    coords: coordenadas [latitude, longitude] dos pontos
+    coords_sitios: coordenadas dos sítios conhecidos
+    indices_proprios: para cada ponto, o índice do próprio ponto em coords_sitios
+        (-1 se o ponto não é um sítio); o próprio sítio é ignorado (leave-one-out)
+    sem_sitios: valor usado quando não há outro sítio conhecido
+    
+    Retorna:
+    distancias: distância geodésica (em km) ao sítio mais próximo
+    """
+    coords = np.asarray(coords, dtype=float)
+    coords_sitios = np.asarray(coords_sitios, dtype=float).reshape(-1, 2)
+    distancias, _ = vizinho_mais_proximo_km(coords[:, 0], coords[:, 1],
+                                            coords_sitios[:, 0], coords_sitios[:, 1],
+                                            indices_proprios)
+    # Sem sítio conhecido (ou sem um segundo sítio), a distância é infinita
+    return np.where(np.isfinite(distancias), distancias, float(sem_sitios))
+
 # Método 2: Modelo baseado em padrões espaciais e proximidade
 def metodo_2_espacial(X_train, y_train, X_test, coords_train, coords_test):
     """
@@ -140,40 +183,23 @@ def metodo_2_espacial(X_train, y_train, X_test, coords_train, coords_test):
     X_train_espacial = X_train.copy()
     X_test_espacial = X_test.copy()
     
-    # Para cada ponto, calcular distância para o sítio conhecido mais próximo
-    for i, (lat, lon) in enumerate(coords_test):
-        # Calcular distâncias para todos os sítios conhecidos (onde y_train == 1)
-        sitios_conhecidos = coords_train[y_train == 1]
-        if len(sitios_conhecidos) > 0:
-            distancias = np.sqrt(((sitios_conhecidos[:, 0] - lat) ** 2) + 
-                                ((sitios_conhecidos[:, 1] - lon) ** 2))
-            dist_min = np.min(distancias)
-        else:
-            dist_min = 999  # Valor alto se não houver sítios conhecidos
-        
-        # Adicionar como nova feature
-        X_test_espacial.loc[i, 'Dist_Sitio_Proximo'] = dist_min
-    
-    # Para os dados de treinamento, usar validação cruzada para evitar vazamento de dados
-    for i, (lat, lon) in enumerate(coords_train):
-        # Excluir o próprio ponto
-        outros_sitios = np.delete(coords_train, i, axis=0)
-        outros_y = np.delete(y_train, i)
-        
-        # Calcular distâncias para todos os outros sítios conhecidos
-        sitios_conhecidos = outros_sitios[outros_y == 1]
-        if len(sitios_conhecidos) > 0:
-            distancias = np.sqrt(((sitios_conhecidos[:, 0] - lat) ** 2) + 
-                                ((sitios_conhecidos[:, 1] - lon) ** 2))
-            dist_min = np.min(distancias)
-        else:
-            dist_min = 999
-        
-        X_train_espacial.loc[i, 'Dist_Sitio_Proximo'] = dist_min
+    # Distância de cada ponto de teste ao sítio conhecido mais próximo (onde y_train == 1)
+    y_train_array = np.asarray(y_train)
+    indices_sitios = np.flatnonzero(y_train_array == 1)
+    sitios_conhecidos = coords_train[indices_sitios]
+    # Atribuição por posição: os índices de X_train/X_test vêm embaralhados do train_test_split
+    X_test_espacial['Dist_Sitio_Proximo'] = distancia_sitio_proximo(coords_test, sitios_conhecidos)
+    
+    # Para os dados de treinamento, excluir o próprio ponto para evitar vazamento de dados
+    indices_proprios = np.full(len(coords_train), -1)
+    indices_proprios[indices_sitios] = np.arange(len(indices_sitios))
+    X_train_espacial['Dist_Sitio_Proximo'] = distancia_sitio_proximo(
+        coords_train, sitios_conhecidos, indices_proprios
+    )
     
-    # Treinar modelo Gradient Boosting
-    modelo = GradientBoostingClassifier(n_estimators=100, random_state=42)
-    modelo.fit(X_train_espacial, y_train)
+    # Treinar modelo Gradient Boosting (por histogramas em grandes conjuntos, ver modos_treino.py)
+    boosting = criar_boosting('classificacao', len(X_train), n_estimators=100, random_state=42)
+    modelo = ajustar_em_cache(boosting, X_train_espacial, y_train)
     
     # Fazer previsões
     y_pred = modelo.predict(X_test_espacial)
@@ -333,10 +359,81 @@ def visualizar_mapa(coords, y_true, y_pred_1, y_pred_2, regiao, filename):
     
     return caminho_completo
 
+# Processar uma região (executada em um processo do pool)
+def processar_regiao(regiao, X_train, y_train, X_test, y_test, coords_train, coords_test):
+    """
+    Aplica os dois métodos a uma região e salva figuras e sítios previstos
+    
+    Parâmetros:
+    regiao: nome da região
+    X_train, y_train: dados de treinamento
+    X_test, y_test: dados de teste
+    coords_train, coords_test: coordenadas dos pontos de treinamento e de teste
+    
+    Retorna:
+    resultados: caminhos dos arquivos gerados para a região
+    """
+    print(f"\nProcessando região: {regiao}")
+    resultados = []
+    
+    # Aplicar Método 1: Baseado em características ambientais
+    y_pred_1, importancia = metodo_1_ambiental(X_train, y_train, X_test)
+    
+    # Aplicar Método 2: Baseado em padrões espaciais
+    y_pred_2 = metodo_2_espacial(X_train, y_train, X_test, coords_train, coords_test)
+    
+    # Comparar resultados
+    metricas = comparar_metodos(y_test, y_pred_1, y_pred_2)
+    
+    print(f"Resultados para região {regiao}:")
+    print(f"Acurácia Método 1: {metricas['Acurácia Método 1']:.4f}")
+    print(f"Acurácia Método 2: {metricas['Acurácia Método 2']:.4f}")
+    print(f"Concordância entre métodos: {metricas['Concordância entre métodos']:.4f}")
+    print(f"Acurácia quando métodos concordam: {metricas['Acurácia quando concordam']:.4f}")
+    
+    # Visualizar importância das features (Método 1)
+    plt.figure(figsize=(10, 6))
+    importancia.plot(kind='barh', x='Feature', y='Importância')
+    plt.title(f'Importância das Características - Região: {regiao.title()}')
+    plt.tight_layout()
+    caminho_importancia = os.path.join(coordenadas_dir, f'importancia_features_{regiao}.png')
+    plt.savefig(caminho_importancia, dpi=300)
+    plt.close()
+    resultados.append(caminho_importancia)
+    
+    # Visualizar resultados em mapa
+    caminho_mapa = visualizar_mapa(
+        coords_test, y_test, y_pred_1, y_pred_2, 
+        regiao, f'mapa_previsoes_{regiao}.png'
+    )
+    resultados.append(caminho_mapa)
+    
+    # Salvar coordenadas de sítios previstos com alta confiança
+    sitios_alta_confianca = np.where((y_pred_1 == 1) & (y_pred_2 == 1))[0]
+    if len(sitios_alta_confianca) > 0:
+        coords_alta_confianca = coords_test[sitios_alta_confianca]
+        df_alta_confianca = pd.DataFrame({
+            'Latitude': coords_alta_confianca[:, 0],
+            'Longitude': coords_alta_confianca[:, 1],
+            'Confiança': np.ones(len(sitios_alta_confianca))
+        })
+        
+        caminho_csv = os.path.join(coordenadas_dir, f'sitios_previstos_{regiao}.csv')
+        df_alta_confianca.to_csv(caminho_csv, index=False)
+        resultados.append(caminho_csv)
+    
+    return resultados
+
 # Função principal para demonstrar o fluxo de trabalho
-def demonstrar_previsao_coordenadas():
+def demonstrar_previsao_coordenadas(n_processos=None):
     """
     Demonstra o fluxo de trabalho completo para previsão e verificação de coordenadas
+    
+    Parâmetros:
+    n_processos: número de processos para as regiões (padrão: todos os núcleos; 1 = serial)
+    
+    Retorna:
+    resultados: caminhos dos arquivos gerados
     """
     resultados = []
     
@@ -350,61 +447,28 @@ def demonstrar_previsao_coordenadas():
     )
     
     # Gerar coordenadas simuladas para os dados
+    # (no processo principal, na mesma sequência aleatória da execução serial)
     print("Gerando coordenadas simuladas...")
     regioes = ['amazonia', 'acre', 'xingu', 'tapajos']
-    
+    tarefas = []
     for regiao in regioes:
-        print(f"\nProcessando região: {regiao}")
-        
-        # Gerar coordenadas para esta região
         coords_train = gerar_coordenadas_simuladas(len(X_train), regiao)
         coords_test = gerar_coordenadas_simuladas(len(X_test), regiao)
-        
-        # Aplicar Método 1: Baseado em características ambientais
-        y_pred_1, importancia = metodo_1_ambiental(X_train, y_train, X_test)
-        
-        # Aplicar Método 2: Baseado em padrões espaciais
-        y_pred_2 = metodo_2_espacial(X_train, y_train, X_test, coords_train, coords_test)
-        
-        # Comparar resultados
-        metricas = comparar_metodos(y_test, y_pred_1, y_pred_2)
-        
-        print(f"Resultados para região {regiao}:")
-        print(f"Acurácia Método 1: {metricas['Acurácia Método 1']:.4f}")
-        print(f"Acurácia Método 2: {metricas['Acurácia Método 2']:.4f}")
-        print(f"Concordância entre métodos: {metricas['Concordância entre métodos']:.4f}")
-        print(f"Acurácia quando métodos concordam: {metricas['Acurácia quando concordam']:.4f}")
-        
-        # Visualizar importância das features (Método 1)
-        plt.figure(figsize=(10, 6))
-        importancia.plot(kind='barh', x='Feature', y='Importância')
-        plt.title(f'Importância das Características - Região: {regiao.title()}')
-        plt.tight_layout()
-        caminho_importancia = os.path.join(coordenadas_dir, f'importancia_features_{regiao}.png')
-        plt.savefig(caminho_importancia, dpi=300)
-        plt.close()
-        resultados.append(caminho_importancia)
-        
-        # Visualizar resultados em mapa
-        caminho_mapa = visualizar_mapa(
-            coords_test, y_test, y_pred_1, y_pred_2, 
-            regiao, f'mapa_previsoes_{regiao}.png'
-        )
-        resultados.append(caminho_mapa)
-        
-        # Salvar coordenadas de sítios previstos com alta confiança
-        sitios_alta_confianca = np.where((y_pred_1 == 1) & (y_pred_2 == 1))[0]
-        if len(sitios_alta_confianca) > 0:
-            coords_alta_confianca = coords_test[sitios_alta_confianca]
-            df_alta_confianca = pd.DataFrame({
-                'Latitude': coords_alta_confianca[:, 0],
-                'Longitude': coords_alta_confianca[:, 1],
-                'Confiança': np.ones(len(sitios_alta_confianca))
-            })
-            
-            caminho_csv = os.path.join(coordenadas_dir, f'sitios_previstos_{regiao}.csv')
-            df_alta_confianca.to_csv(caminho_csv, index=False)
-            resultados.append(caminho_csv)
+        tarefas.append((regiao, X_train, y_train, X_test, y_test, coords_train, coords_test))
+    
+    # O Método 1 não depende das coordenadas: ajustá-lo uma vez antes do pool
+    # deixa o modelo no cache, e todas as regiões o reaproveitam
+    treinar_metodo_1_ambiental(X_train, y_train)
+    
+    # Processar as regiões em paralelo (cada uma ajusta apenas o seu Método 2)
+    n_processos = min(numero_processos(n_processos), len(tarefas))
+    if n_processos == 1:
+        for tarefa in tarefas:
+            resultados.extend(processar_regiao(*tarefa))
+    else:
+        with ProcessPoolExecutor(max_workers=n_processos) as executor:
+            for caminhos in executor.map(processar_regiao, *zip(*tarefas)):
+                resultados.extend(caminhos)
     
     return resultados
 
@@ -9,13 +9,20 @@ import os
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 import json
 import random
 from matplotlib.colors import LinearSegmentedColormap
 
+from artefatos_modelos import salvar_artefato
+from cache_rasters import calcular_chave
+from cache_modelos import impressao_digital
+from geodesia import haversine_km
+from regressao_coordenadas import RegressorEncadeado, prever_coordenadas
+from instrumentacao import etapa, instrumentar
+from modos_treino import MODOS, criar_boosting, criar_floresta, escolher_modo
+
 # Configurações
 RANDOM_SEED = 42
 np.random.seed(RANDOM_SEED)
@@ -25,6 +32,10 @@ random.seed(RANDOM_SEED)
 RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'coordenadas')
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+# Limiares de distância geodésica (km) da concordância entre modelos e da acurácia
+LIMIAR_CONCORDANCIA_KM = 5.0
+LIMIAR_ACURACIA_KM = 10.0
+
 def criar_diretorio_se_nao_existir(diretorio):
     """
     Cria um diretório se ele não existir.
@@ -94,13 +105,14 @@ def gerar_dados_simulados(n_amostras=100):
     
     return X, y
 
-def treinar_modelo_rf(X_train, y_train):
+def treinar_modelo_rf(X_train, y_train, modo='auto'):
     """
     Treina um modelo de Random Forest para prever coordenadas.
     
     Args:
         X_train (pandas.DataFrame): Características de treinamento
         y_train (pandas.DataFrame): Coordenadas de treinamento
+        modo (str): Modo de treinamento ('auto', 'exato' ou 'grande', ver modos_treino.py)
     
     Returns:
         tuple: (modelo_lat, modelo_lon) modelos treinados para latitude e longitude
@@ -108,7 +120,8 @@ def treinar_modelo_rf(X_train, y_train):
     print("Treinando modelo Random Forest...")
     
     # Modelo para latitude
-    modelo_lat = RandomForestRegressor(
+    modelo_lat = criar_floresta(
+        'regressao', len(X_train), modo,
         n_estimators=100,
         max_depth=10,
         random_state=RANDOM_SEED
@@ -116,7 +129,8 @@ def treinar_modelo_rf(X_train, y_train):
     modelo_lat.fit(X_train, y_train['latitude'])
     
     # Modelo para longitude
-    modelo_lon = RandomForestRegressor(
+    modelo_lon = criar_floresta(
+        'regressao', len(X_train), modo,
         n_estimators=100,
         max_depth=10,
         random_state=RANDOM_SEED
@@ -125,13 +139,14 @@ def treinar_modelo_rf(X_train, y_train):
     
     return modelo_lat, modelo_lon
 
-def treinar_modelo_gb(X_train, y_train):
+def treinar_modelo_gb(X_train, y_train, modo='auto'):
     """
     Treina um modelo de Gradient Boosting para prever coordenadas.
     
     Args:
         X_train (pandas.DataFrame): Características de treinamento
         y_train (pandas.DataFrame): Coordenadas de treinamento
+        modo (str): Modo de treinamento ('auto', 'exato' ou 'grande', ver modos_treino.py)
     
     Returns:
         tuple: (modelo_lat, modelo_lon) modelos treinados para latitude e longitude
@@ -139,7 +154,8 @@ def treinar_modelo_gb(X_train, y_train):
     print("Treinando modelo Gradient Boosting...")
     
     # Modelo para latitude
-    modelo_lat = GradientBoostingRegressor(
+    modelo_lat = criar_boosting(
+        'regressao', len(X_train), modo,
         n_estimators=100,
         max_depth=5,
         learning_rate=0.1,
@@ -148,7 +164,8 @@ def treinar_modelo_gb(X_train, y_train):
     modelo_lat.fit(X_train, y_train['latitude'])
     
     # Modelo para longitude
-    modelo_lon = GradientBoostingRegressor(
+    modelo_lon = criar_boosting(
+        'regressao', len(X_train), modo,
         n_estimators=100,
         max_depth=5,
         learning_rate=0.1,
@@ -158,13 +175,71 @@ def treinar_modelo_gb(X_train, y_train):
     
     return modelo_lat, modelo_lon
 
+def treinar_modelo_rf_conjunto(X_train, y_train, modo='auto'):
+    """
+    Treina um único Random Forest com saída dupla (latitude e longitude).
+    
+    As árvores escolhem as divisões pela redução do erro das duas coordenadas
+    ao mesmo tempo, então a floresta é treinada e consultada uma única vez e
+    aproveita a correlação entre latitude e longitude.
+    
+    Args:
+        X_train (pandas.DataFrame): Características de treinamento
+        y_train (pandas.DataFrame): Coordenadas de treinamento
+        modo (str): Modo de treinamento ('auto', 'exato' ou 'grande', ver modos_treino.py)
+    
+    Returns:
+        tuple: (modelo, None) - o modelo prevê as duas coordenadas
+    """
+    print("Treinando modelo Random Forest conjunto...")
+    
+    modelo = criar_floresta(
+        'regressao', len(X_train), modo,
+        n_estimators=100,
+        max_depth=10,
+        random_state=RANDOM_SEED
+    )
+    modelo.fit(X_train, y_train[['latitude', 'longitude']])
+    
+    return modelo, None
+
+def treinar_modelo_gb_encadeado(X_train, y_train, modo='auto'):
+    """
+    Treina um Gradient Boosting encadeado para prever coordenadas.
+    
+    A latitude é prevista primeiro, e a previsão entra como característica do
+    modelo de longitude (ver RegressorEncadeado).
+    
+    Args:
+        X_train (pandas.DataFrame): Características de treinamento
+        y_train (pandas.DataFrame): Coordenadas de treinamento
+        modo (str): Modo de treinamento ('auto', 'exato' ou 'grande', ver modos_treino.py)
+    
+    Returns:
+        tuple: (modelo, None) - o modelo prevê as duas coordenadas
+    """
+    print("Treinando modelo Gradient Boosting encadeado...")
+    
+    modelo = RegressorEncadeado(
+        criar_boosting(
+            'regressao', len(X_train), modo,
+            n_estimators=100,
+            max_depth=5,
+            learning_rate=0.1,
+            random_state=RANDOM_SEED
+        )
+    )
+    modelo.fit(X_train, y_train[['latitude', 'longitude']])
+    
+    return modelo, None
+
 def avaliar_modelo(modelo_lat, modelo_lon, X_test, y_test, nome_modelo):
     """
     Avalia o desempenho do modelo.
     
     Args:
-        modelo_lat: Modelo treinado para latitude
-        modelo_lon: Modelo treinado para longitude
+        modelo_lat: Modelo treinado para latitude, ou modelo conjunto (saída dupla)
+        modelo_lon: Modelo treinado para longitude, ou None com um modelo conjunto
         X_test (pandas.DataFrame): Características de teste
         y_test (pandas.DataFrame): Coordenadas de teste
         nome_modelo (str): Nome do modelo para exibição
@@ -175,8 +250,7 @@ def avaliar_modelo(modelo_lat, modelo_lon, X_test, y_test, nome_modelo):
     print(f"Avaliando modelo {nome_modelo}...")
     
     # Fazer previsões
-    y_pred_lat = modelo_lat.predict(X_test)
-    y_pred_lon = modelo_lon.predict(X_test)
+    y_pred_lat, y_pred_lon = prever_coordenadas(modelo_lat, modelo_lon, X_test)
     
     # Calcular métricas
     rmse_lat = np.sqrt(mean_squared_error(y_test['latitude'], y_pred_lat))
@@ -184,17 +258,21 @@ def avaliar_modelo(modelo_lat, modelo_lon, X_test, y_test, nome_modelo):
     r2_lat = r2_score(y_test['latitude'], y_pred_lat)
     r2_lon = r2_score(y_test['longitude'], y_pred_lon)
     
-    # Calcular erro de distância em km (aproximação)
-    # 1 grau de latitude ≈ 111 km
-    # 1 grau de longitude ≈ 111 * cos(latitude) km
-    lat_media = y_test['latitude'].mean()
-    erro_lat_km = rmse_lat * 111
-    erro_lon_km = rmse_lon * 111 * np.cos(np.radians(lat_media))
-    erro_dist_km = np.sqrt(erro_lat_km**2 + erro_lon_km**2)
+    # Calcular erros em km pela distância geodésica de cada previsão
+    # (componentes norte-sul e leste-oeste medidas na latitude de cada ponto)
+    lat_real = y_test['latitude'].values
+    lon_real = y_test['longitude'].values
+    erros_km = haversine_km(lat_real, lon_real, y_pred_lat, y_pred_lon)
+    erros_lat_km = haversine_km(lat_real, lon_real, y_pred_lat, lon_real)
+    erros_lon_km = haversine_km(lat_real, lon_real, lat_real, y_pred_lon)
+    erro_lat_km = np.sqrt(np.mean(erros_lat_km**2))
+    erro_lon_km = np.sqrt(np.mean(erros_lon_km**2))
+    erro_dist_km = np.mean(erros_km)
+    erro_mediano_km = np.median(erros_km)
     
     print(f"  RMSE Latitude: {rmse_lat:.6f} graus ({erro_lat_km:.2f} km)")
     print(f"  RMSE Longitude: {rmse_lon:.6f} graus ({erro_lon_km:.2f} km)")
-    print(f"  Erro de distância médio: {erro_dist_km:.2f} km")
+    print(f"  Erro de distância médio: {erro_dist_km:.2f} km (mediana {erro_mediano_km:.2f} km)")
     print(f"  R² Latitude: {r2_lat:.4f}")
     print(f"  R² Longitude: {r2_lon:.4f}")
     
@@ -205,6 +283,7 @@ def avaliar_modelo(modelo_lat, modelo_lon, X_test, y_test, nome_modelo):
         'r2_lat': r2_lat,
         'r2_lon': r2_lon,
         'erro_dist_km': erro_dist_km,
+        'erro_mediano_km': erro_mediano_km,
         'y_pred_lat': y_pred_lat.tolist(),
         'y_pred_lon': y_pred_lon.tolist()
     }
@@ -214,18 +293,22 @@ def calcular_importancia_features(modelo_rf_lat, modelo_rf_lon, X):
     Calcula e visualiza a importância das características.
     
     Args:
-        modelo_rf_lat: Modelo Random Forest para latitude
-        modelo_rf_lon: Modelo Random Forest para longitude
+        modelo_rf_lat: Modelo Random Forest para latitude, ou modelo conjunto
+        modelo_rf_lon: Modelo Random Forest para longitude, ou None com um modelo conjunto
         X (pandas.DataFrame): DataFrame com as características
     """
     print("Calculando importância das características...")
     
-    # Obter importância das características
-    importancia_lat = modelo_rf_lat.feature_importances_
-    importancia_lon = modelo_rf_lon.feature_importances_
-    
-    # Importância média entre latitude e longitude
-    importancia_media = (importancia_lat + importancia_lon) / 2
+    if modelo_rf_lon is None:
+        # O modelo conjunto já mede a importância para as duas coordenadas
+        importancia_media = modelo_rf_lat.feature_importances_
+    else:
+        # Obter importância das características
+        importancia_lat = modelo_rf_lat.feature_importances_
+        importancia_lon = modelo_rf_lon.feature_importances_
+        
+        # Importância média entre latitude e longitude
+        importancia_media = (importancia_lat + importancia_lon) / 2
     
     # Criar DataFrame para visualização
     df_importancia = pd.DataFrame({
@@ -265,19 +348,22 @@ def visualizar_previsoes(y_test, resultados_rf, resultados_gb):
     lat_gb = np.array(resultados_gb['y_pred_lat'])
     lon_gb = np.array(resultados_gb['y_pred_lon'])
     
-    # Calcular concordância entre modelos (distância < 5km)
-    # 0.045 graus ≈ 5km
-    limiar_concordancia = 0.045
-    distancia_entre_modelos = np.sqrt((lat_rf - lat_gb)**2 + (lon_rf - lon_gb)**2)
-    concordancia = distancia_entre_modelos < limiar_concordancia
+    # Calcular concordância entre modelos (distância geodésica < 5km)
+    distancia_entre_modelos = haversine_km(lat_rf, lon_rf, lat_gb, lon_gb)
+    concordancia = distancia_entre_modelos < LIMIAR_CONCORDANCIA_KM
+    
+    # Calcular acurácia (distância geodésica < 10km do real)
+    distancia_rf = haversine_km(lat_real, lon_real, lat_rf, lon_rf)
+    distancia_gb = haversine_km(lat_real, lon_real, lat_gb, lon_gb)
+    acuracia_rf = distancia_rf < LIMIAR_ACURACIA_KM
+    acuracia_gb = distancia_gb < LIMIAR_ACURACIA_KM
     
-    # Calcular acurácia (distância < 10km do real)
-    # 0.09 graus ≈ 10km
-    limiar_acuracia = 0.09
-    distancia_rf = np.sqrt((lat_rf - lat_real)**2 + (lon_rf - lon_real)**2)
-    distancia_gb = np.sqrt((lat_gb - lat_real)**2 + (lon_gb - lon_real)**2)
-    acuracia_rf = distancia_rf < limiar_acuracia
-    acuracia_gb = distancia_gb < limiar_acuracia
+    # Média das previsões, desenhada onde há concordância; uma chamada de
+    # scatter por cor em vez de uma por ponto
+    lat_media = (lat_rf + lat_gb) / 2
+    lon_media = (lon_rf + lon_gb) / 2
+    acertos = concordancia & acuracia_rf & acuracia_gb
+    erros = concordancia & ~(acuracia_rf & acuracia_gb)
     
     # Criar mapa da Amazônia
     plt.figure(figsize=(12, 8))
@@ -290,18 +376,10 @@ def visualizar_previsoes(y_test, resultados_rf, resultados_gb):
     plt.scatter(lon_real, lat_real, c='green', s=50, label='Sítios Reais', zorder=3)
     
     # Plotar previsões com concordância entre modelos
-    for i in range(len(lat_real)):
-        if concordancia[i]:
-            # Média das previsões quando há concordância
-            lat_media = (lat_rf[i] + lat_gb[i]) / 2
-            lon_media = (lon_rf[i] + lon_gb[i]) / 2
-            
-            if acuracia_rf[i] and acuracia_gb[i]:
-                # Ambos modelos acertaram (azul)
-                plt.scatter(lon_media, lat_media, c='blue', s=30, alpha=0.8, zorder=2)
-            else:
-                # Concordância mas errado (vermelho)
-                plt.scatter(lon_media, lat_media, c='red', s=30, alpha=0.8, zorder=2)
+    # Ambos modelos acertaram (azul)
+    plt.scatter(lon_media[acertos], lat_media[acertos], c='blue', s=30, alpha=0.8, zorder=2)
+    # Concordância mas errado (vermelho)
+    plt.scatter(lon_media[erros], lat_media[erros], c='red', s=30, alpha=0.8, zorder=2)
     
     # Adicionar grade e rótulos
     plt.grid(True, linestyle='--', alpha=0.7)
@@ -339,18 +417,10 @@ def visualizar_previsoes(y_test, resultados_rf, resultados_gb):
     plt.scatter(lon_real, lat_real, c='green', s=50, label='Sítios Reais', zorder=3)
     
     # Plotar previsões com concordância entre modelos
-    for i in range(len(lat_real)):
-        if concordancia[i]:
-            # Média das previsões quando há concordância
-            lat_media = (lat_rf[i] + lat_gb[i]) / 2
-            lon_media = (lon_rf[i] + lon_gb[i]) / 2
-            
-            if acuracia_rf[i] and acuracia_gb[i]:
-                # Ambos modelos acertaram (azul)
-                plt.scatter(lon_media, lat_media, c='blue', s=30, alpha=0.8, zorder=2)
-            else:
-                # Concordância mas errado (vermelho)
-                plt.scatter(lon_media, lat_media, c='red', s=30, alpha=0.8, zorder=2)
+    # Ambos modelos acertaram (azul)
+    plt.scatter(lon_media[acertos], lat_media[acertos], c='blue', s=30, alpha=0.8, zorder=2)
+    # Concordância mas errado (vermelho)
+    plt.scatter(lon_media[erros], lat_media[erros], c='red', s=30, alpha=0.8, zorder=2)
     
     # Adicionar grade e rótulos
     plt.grid(True, linestyle='--', alpha=0.7)
@@ -409,9 +479,62 @@ def salvar_resultados(X, y_test, resultados_rf, resultados_gb, estatisticas, df_
     
     print(f"Resultados salvos em: {os.path.join(RESULTS_DIR, 'resumo_amazonia.json')}")
 
-def executar_pipeline():
+def salvar_modelos(modelos, X_train, y_train, resultados, regiao='amazonia'):
+    """
+    Salva os modelos treinados como artefatos versionados (ver artefatos_modelos.py).
+    
+    Cada tipo de modelo vira o artefato 'coordenadas_<tipo>_<regiao>', com os
+    modelos de latitude e longitude (ou o modelo conjunto, alvo 'coordenadas',
+    com as saídas latitude e longitude). Um treinamento idêntico ao da última
+    versão (mesmos dados, estimadores e hiperparâmetros) não cria uma versão nova.
+    
+    Args:
+        modelos (dict): (modelo_lat, modelo_lon) por tipo ('rf', 'gb'); modelo_lon
+            é None para modelos conjuntos
+        X_train (pandas.DataFrame): Características de treinamento
+        y_train (pandas.DataFrame): Coordenadas de treinamento
+        resultados (dict): Resultados de avaliar_modelo por tipo
+        regiao (str): Região dos dados de treinamento
+    
+    Returns:
+        dict: Versão gravada por nome de artefato
+    """
+    print("Salvando modelos...")
+    versoes = {}
+    for tipo, (modelo_lat, modelo_lon) in modelos.items():
+        nome = f'coordenadas_{tipo}_{regiao}'
+        metricas = {chave: float(resultados[tipo][chave])
+                    for chave in ('rmse_lat', 'rmse_lon', 'r2_lat', 'r2_lon', 'erro_dist_km', 'erro_mediano_km')}
+        metadados = {'regiao': regiao, 'modelo': resultados[tipo]['nome'],
+                     'n_amostras': len(X_train), 'metricas': metricas}
+        if modelo_lon is None:
+            estimadores = {'coordenadas': modelo_lat}
+            metadados['saidas'] = {'coordenadas': ['latitude', 'longitude']}
+        else:
+            estimadores = {'latitude': modelo_lat, 'longitude': modelo_lon}
+        impressao = calcular_chave(list(estimadores), *(impressao_digital(modelo, X_train, y_train)
+                                                        for modelo in estimadores.values()))
+        versoes[nome] = salvar_artefato(nome, estimadores, X_train.columns,
+                                        impressao=impressao, metadados=metadados)
+        print(f"  {nome}: versão {versoes[nome]}")
+    return versoes
+
+@instrumentar('pipeline_coordenadas')
+def executar_pipeline(modelos_conjuntos=False, n_amostras=200, modo_treino='auto'):
     """
     Executa o pipeline completo de previsão de coordenadas.
+    
+    Com a instrumentação ativa (AMAZONIA_TRACE), cada etapa é registrada na
+    linha do tempo (ver instrumentacao.py).
+    
+    Args:
+        modelos_conjuntos (bool): Usar um Random Forest de saída dupla e um Gradient
+            Boosting encadeado em vez de um modelo por coordenada (ver
+            benchmark_coordenadas.py)
+        n_amostras (int): Número de amostras simuladas
+        modo_treino (str): Modo de treinamento ('auto', 'exato' ou 'grande'); no modo
+            automático, conjuntos grandes usam boosting por histogramas e florestas
+            paralelas (ver modos_treino.py)
     """
     print("Iniciando pipeline de previsão de coordenadas...")
     
@@ -419,7 +542,8 @@ def executar_pipeline():
     criar_diretorio_se_nao_existir(RESULTS_DIR)
     
     # Gerar dados simulados
-    X, y = gerar_dados_simulados(n_amostras=200)
+    with etapa('geracao_dados', itens=n_amostras):
+        X, y = gerar_dados_simulados(n_amostras=n_amostras)
     
     # Dividir em treino e teste
     X_train, X_test, y_train, y_test = train_test_split(
@@ -427,21 +551,38 @@ def executar_pipeline():
     )
     
     # Treinar modelos
-    modelo_rf_lat, modelo_rf_lon = treinar_modelo_rf(X_train, y_train)
-    modelo_gb_lat, modelo_gb_lon = treinar_modelo_gb(X_train, y_train)
+    treinar_rf = treinar_modelo_rf_conjunto if modelos_conjuntos else treinar_modelo_rf
+    treinar_gb = treinar_modelo_gb_encadeado if modelos_conjuntos else treinar_modelo_gb
+    print(f"Modo de treinamento: {escolher_modo(len(X_train), modo_treino)}")
+    with etapa('treino', itens=len(X_train), modelo='Random Forest'):
+        modelo_rf_lat, modelo_rf_lon = treinar_rf(X_train, y_train, modo_treino)
+    with etapa('treino', itens=len(X_train), modelo='Gradient Boosting'):
+        modelo_gb_lat, modelo_gb_lon = treinar_gb(X_train, y_train, modo_treino)
     
     # Avaliar modelos
-    resultados_rf = avaliar_modelo(modelo_rf_lat, modelo_rf_lon, X_test, y_test, "Random Forest")
-    resultados_gb = avaliar_modelo(modelo_gb_lat, modelo_gb_lon, X_test, y_test, "Gradient Boosting")
+    with etapa('avaliacao', itens=len(X_test), modelo='Random Forest'):
+        resultados_rf = avaliar_modelo(modelo_rf_lat, modelo_rf_lon, X_test, y_test, "Random Forest")
+    with etapa('avaliacao', itens=len(X_test), modelo='Gradient Boosting'):
+        resultados_gb = avaliar_modelo(modelo_gb_lat, modelo_gb_lon, X_test, y_test, "Gradient Boosting")
     
     # Calcular importância das características
-    df_importancia = calcular_importancia_features(modelo_rf_lat, modelo_rf_lon, X)
+    with etapa('importancia', itens=X.shape[1]):
+        df_importancia = calcular_importancia_features(modelo_rf_lat, modelo_rf_lon, X)
     
     # Visualizar previsões
-    estatisticas = visualizar_previsoes(y_test, resultados_rf, resultados_gb)
+    with etapa('renderizacao', itens=len(y_test)):
+        estatisticas = visualizar_previsoes(y_test, resultados_rf, resultados_gb)
     
     # Salvar resultados
-    salvar_resultados(X, y_test, resultados_rf, resultados_gb, estatisticas, df_importancia)
+    with etapa('gravacao'):
+        salvar_resultados(X, y_test, resultados_rf, resultados_gb, estatisticas, df_importancia)
+    
+    # Salvar modelos para o servidor de inferência (ver servidor_inferencia.py)
+    with etapa('gravacao_modelos'):
+        salvar_modelos(
+            {'rf': (modelo_rf_lat, modelo_rf_lon), 'gb': (modelo_gb_lat, modelo_gb_lon)},
+            X_train, y_train, {'rf': resultados_rf, 'gb': resultados_gb}
+        )
     
     print("Pipeline concluído com sucesso!")
 
@@ -449,6 +590,17 @@ if __name__ == "__main__":
     """
     Ponto de entrada principal do script.
     """
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Previsão de coordenadas de sítios arqueológicos")
+    parser.add_argument('--modelos-conjuntos', action='store_true',
+                        help="Usar modelos de saída dupla em vez de um modelo por coordenada")
+    parser.add_argument('--amostras', type=int, default=200,
+                        help="Número de amostras simuladas")
+    parser.add_argument('--modo-treino', choices=MODOS, default='auto',
+                        help="Modo de treinamento (auto escolhe pelo tamanho do conjunto)")
+    argumentos = parser.parse_args()
+    
     print("Iniciando previsão de coordenadas de sítios arqueológicos na Amazônia...")
-    executar_pipeline()
+    executar_pipeline(argumentos.modelos_conjuntos, argumentos.amostras, argumentos.modo_treino)
     print("Processamento concluído!")
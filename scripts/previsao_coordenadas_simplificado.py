@@ -2,10 +2,10 @@ import os
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, confusion_matrix
 from sklearn.impute import SimpleImputer
+from modos_treino import criar_boosting, criar_floresta
 
 # Configuração do diretório de trabalho
 base_dir = '/home/ubuntu/amazonia-explorador'
@@ -85,8 +85,8 @@ def metodo_1_ambiental(X_train, y_train, X_test):
     """
     print("Método 1: Aplicando modelo baseado em características ambientais e topográficas...")
     
-    # Treinar modelo Random Forest
-    modelo = RandomForestClassifier(n_estimators=100, random_state=42)
+    # Treinar modelo Random Forest (paralelo em grandes conjuntos, ver modos_treino.py)
+    modelo = criar_floresta('classificacao', len(X_train), n_estimators=100, random_state=42)
     modelo.fit(X_train, y_train)
     
     # Fazer previsões
@@ -117,8 +117,8 @@ def metodo_2_simplificado(X_train, y_train, X_test):
     X_train_simples['Dist_Elevacao_Ideal'] = np.abs(X_train['Elevacao'] - 150)
     X_test_simples['Dist_Elevacao_Ideal'] = np.abs(X_test['Elevacao'] - 150)
     
-    # Treinar modelo Gradient Boosting
-    modelo = GradientBoostingClassifier(n_estimators=100, random_state=42)
+    # Treinar modelo Gradient Boosting (por histogramas em grandes conjuntos, ver modos_treino.py)
+    modelo = criar_boosting('classificacao', len(X_train), n_estimators=100, random_state=42)
     modelo.fit(X_train_simples, y_train)
     
     # Fazer previsões
@@ -0,0 +1,845 @@
+# Processamento em Tiles de Rasters LIDAR
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script executa as etapas de detecção de bordas, realce e segmentação
+# de deteccao_sitios.py sobre rasters maiores que a memória disponível, lendo o raster
+# por mapeamento em memória e processando-o em tiles com halos de sobreposição.
+
+import os
+import json
+import math
+from collections import namedtuple
+import numpy as np
+from skimage import filters
+
+from agendador_tiles import ArenaCompartilhada, mapear_com_arena, numero_processos
+from cache_rasters import abrir_cache, calcular_chave
+from deteccao_sitios import (
+    gerar_imagem_lidar_simulada,
+    detectar_bordas,
+    realcar_estruturas,
+    segmentar_rotulos,
+    criar_diretorio_se_nao_existir,
+)
+from espaco_escala import EspacoEscala, NBINS
+import instrumentacao
+from leitor_geotiff import RasterGeoTIFF, georreferenciar_propriedades
+from propriedades_regioes import (
+    agrupar_propriedades,
+    calcular_propriedades,
+    contar_perimetro,
+    salvar_tabela,
+)
+
+# Diretório para salvar resultados
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'tiles')
+
+# Truncamento dos filtros gaussianos (mesmo padrão do scipy/skimage)
+TRUNCAMENTO_GAUSSIANO = 4.0
+
+# Margem extra para a histerese do Canny, que conecta bordas fracas a fortes
+MARGEM_HISTERESE = 16
+
+# Largura (de cada lado da divisa) das faixas de rótulos comparadas entre tiles
+# vizinhos para unir as regiões que cruzam a divisa
+LARGURA_FAIXA = 8
+
+# Fração mínima da menor das duas regiões, dentro da faixa, que precisa coincidir
+# com a outra para que sejam unidas
+SOBREPOSICAO_MINIMA = 0.5
+
+# Estimativa conservadora de bytes de trabalho por pixel da janela (com halo)
+# durante as etapas: níveis gaussianos e níveis de cinza mantidos no espaço de
+# escala, gradientes do Canny, mapas de distância, marcadores e rótulos do watershed.
+BYTES_POR_PIXEL = 128
+
+ETAPAS = ('bordas', 'realce', 'segmentacao')
+
+# Parâmetros do plano que definem o produto de cada etapa (compõem a chave do cache);
+# as bordas dependem ainda do nível suavizado, que tem chave própria
+PARAMETROS_ETAPAS = {
+    'bordas': ('sigma_canny',),
+    'realce': ('kernel_clahe', 'clip_limit'),
+    'segmentacao': ('limiar', 'min_distance', 'largura_faixa'),
+}
+
+Tile = namedtuple('Tile', ['linha', 'coluna', 'janela', 'interior', 'recorte'])
+
+
+def calcular_halos(sigma_suavizacao=1.0, sigma_canny=2.0, kernel_clahe=64,
+                   min_distance=20, raio_max_estrutura=None):
+    """
+    Calcula a largura do halo necessária para cada etapa a partir do suporte dos filtros.
+
+    Args:
+        sigma_suavizacao (float): Sigma do filtro gaussiano anterior ao Canny
+        sigma_canny (float): Sigma da suavização interna do Canny
+        kernel_clahe (int): Tamanho das regiões contextuais do CLAHE
+        min_distance (int): Distância mínima entre marcadores do watershed
+        raio_max_estrutura (int, opcional): Raio da maior estrutura esperada; limita
+            o alcance da transformada de distância usada pelo watershed
+
+    Returns:
+        dict: Halo (em pixels) por etapa
+    """
+    # Gaussiana + gaussiana do Canny + Sobel + supressão de não-máximos
+    halo_bordas = (math.ceil(TRUNCAMENTO_GAUSSIANO * sigma_suavizacao)
+                   + math.ceil(TRUNCAMENTO_GAUSSIANO * sigma_canny)
+                   + 2 + MARGEM_HISTERESE)
+
+    # O CLAHE interpola entre as duas regiões contextuais vizinhas de cada pixel
+    halo_realce = 2 * kernel_clahe
+
+    # Máximos locais precisam de min_distance; a distância precisa ver o fundo
+    if raio_max_estrutura is None:
+        raio_max_estrutura = 2 * min_distance
+    halo_segmentacao = max(2 * min_distance, raio_max_estrutura) + 1
+
+    return {
+        'bordas': halo_bordas,
+        'realce': halo_realce,
+        'segmentacao': halo_segmentacao,
+    }
+
+
+def calcular_tamanho_tile(memoria_max_mb, halo, multiplo=1, bytes_por_pixel=BYTES_POR_PIXEL):
+    """
+    Calcula o maior tile quadrado cuja janela com halo cabe no orçamento de memória.
+
+    Args:
+        memoria_max_mb (float): Orçamento de memória por tile em megabytes
+        halo (int): Largura do halo em pixels
+        multiplo (int): O lado do tile é arredondado para baixo para este múltiplo
+        bytes_por_pixel (int): Memória de trabalho por pixel da janela
+
+    Returns:
+        int: Lado do tile (sem halo) em pixels
+    """
+    pixels_janela = memoria_max_mb * 1024 * 1024 / bytes_por_pixel
+    lado = int(math.sqrt(pixels_janela)) - 2 * halo
+    lado = (lado // multiplo) * multiplo
+    if lado < multiplo or lado <= 0:
+        raise ValueError(
+            f"Orçamento de {memoria_max_mb} MB insuficiente para halo de {halo} pixels"
+        )
+    return lado
+
+
+def iterar_tiles(forma, tamanho_tile, halo, regiao=None):
+    """
+    Percorre um raster em tiles regulares com halo de sobreposição.
+
+    Args:
+        forma (tuple): Dimensões (altura, largura) do raster
+        tamanho_tile (int): Lado do tile sem halo
+        halo (int): Largura do halo em pixels
+        regiao (tuple, opcional): Limites (y0, y1, x0, x1) de uma sub-região a
+            percorrer; os halos podem avançar além dela, até a borda do raster
+
+    Yields:
+        Tile: Índices do tile, janela com halo e interior (em coordenadas globais)
+            e recorte do interior relativo à janela
+    """
+    altura, largura = forma
+    ry0, ry1, rx0, rx1 = regiao if regiao is not None else (0, altura, 0, largura)
+    for linha, y0 in enumerate(range(ry0, ry1, tamanho_tile)):
+        y1 = min(y0 + tamanho_tile, ry1)
+        jy0, jy1 = max(y0 - halo, 0), min(y1 + halo, altura)
+        for coluna, x0 in enumerate(range(rx0, rx1, tamanho_tile)):
+            x1 = min(x0 + tamanho_tile, rx1)
+            jx0, jx1 = max(x0 - halo, 0), min(x1 + halo, largura)
+            yield Tile(
+                linha,
+                coluna,
+                (slice(jy0, jy1), slice(jx0, jx1)),
+                (slice(y0, y1), slice(x0, x1)),
+                (slice(y0 - jy0, y1 - jy0), slice(x0 - jx0, x1 - jx0)),
+            )
+
+
+def abrir_raster(raster):
+    """
+    Abre um raster para leitura sem carregá-lo inteiro na memória.
+
+    Args:
+        raster (str ou numpy.ndarray): Caminho de um arquivo .npy ou GeoTIFF, ou array já aberto
+
+    Returns:
+        numpy.ndarray ou RasterGeoTIFF: Array mapeado em memória (.npy), raster lido
+            por janelas (.tif) ou o próprio array
+    """
+    if isinstance(raster, str):
+        if raster.lower().endswith(('.tif', '.tiff')):
+            return RasterGeoTIFF(raster)
+        return np.load(raster, mmap_mode='r')
+    return raster
+
+
+@instrumentacao.instrumentar('estatisticas_globais')
+def calcular_estatisticas_globais(raster, memoria_max_mb=512):
+    """
+    Calcula mínimo, máximo e histograma global do raster lendo faixas de linhas.
+
+    Args:
+        raster (numpy.ndarray): Raster (possivelmente mapeado em memória)
+        memoria_max_mb (float): Orçamento de memória para cada faixa lida
+
+    Returns:
+        dict: 'minimo', 'maximo', 'histograma' e 'centros' (NBINS bins sobre [minimo, maximo])
+    """
+    altura, largura = raster.shape
+    linhas_por_faixa = max(1, int(memoria_max_mb * 1024 * 1024 / (8 * 4 * largura)))
+
+    minimo, maximo = np.inf, -np.inf
+    for y0 in range(0, altura, linhas_por_faixa):
+        faixa = np.asarray(raster[y0:y0 + linhas_por_faixa])
+        minimo = min(minimo, float(faixa.min()))
+        maximo = max(maximo, float(faixa.max()))
+
+    histograma = np.zeros(NBINS, dtype=np.int64)
+    for y0 in range(0, altura, linhas_por_faixa):
+        faixa = np.asarray(raster[y0:y0 + linhas_por_faixa], dtype=np.float64)
+        histograma += np.histogram(faixa, bins=NBINS, range=(minimo, maximo))[0]
+
+    bordas_bins = np.linspace(minimo, maximo, NBINS + 1)
+    centros = (bordas_bins[:-1] + bordas_bins[1:]) / 2
+
+    return {
+        'minimo': minimo,
+        'maximo': maximo,
+        'histograma': histograma,
+        'centros': centros,
+    }
+
+
+def limiar_otsu_global(estatisticas):
+    """
+    Calcula o limiar de Otsu a partir do histograma global normalizado para [0, 1].
+
+    Args:
+        estatisticas (dict): Resultado de calcular_estatisticas_globais
+
+    Returns:
+        float: Limiar de Otsu na escala normalizada
+    """
+    minimo, maximo = estatisticas['minimo'], estatisticas['maximo']
+    centros = (estatisticas['centros'] - minimo) / max(maximo - minimo, np.finfo(float).eps)
+    return filters.threshold_otsu(hist=(estatisticas['histograma'], centros))
+
+
+def _executar_etapa(etapa, janela, espaco, tile, plano):
+    """
+    Executa uma etapa sobre a janela de um tile e devolve o seu interior.
+    """
+    if etapa == 'bordas':
+        resultado = detectar_bordas(janela, plano['sigma_suavizacao'], plano['sigma_canny'],
+                                    espaco=espaco)
+    elif etapa == 'realce':
+        resultado = realcar_estruturas(janela, espaco=espaco, kernel_size=plano['kernel_clahe'],
+                                       clip_limit=plano['clip_limit'])
+    else:
+        rotulos = segmentar_rotulos(janela, limiar=plano['limiar'],
+                                    min_distance=plano['min_distance'], espaco=espaco)
+        # Renumerar de forma compacta (1..n, 0 = fundo) as regiões presentes no
+        # interior; as que só aparecem no halo viram fundo
+        interior = rotulos[tile.recorte]
+        presentes = np.zeros(rotulos.max() + 1, dtype=bool)
+        presentes[interior.ravel()] = True
+        presentes[0] = False
+        renumeracao = np.cumsum(presentes, dtype=np.int32)
+        renumeracao[~presentes] = 0
+        # Devolver o interior expandido pelas faixas usadas na união entre tiles
+        return renumeracao[rotulos[recorte_expandido(tile, plano['largura_faixa'])[0]]]
+
+    return resultado[tile.recorte]
+
+
+def recorte_expandido(tile, largura):
+    """
+    Calcula o recorte do interior de um tile expandido por até largura pixels de halo.
+
+    Args:
+        tile (Tile): Tile
+        largura (int): Expansão máxima de cada lado
+
+    Returns:
+        tuple: (recorte relativo à janela, expansões (cima, baixo, esquerda, direita));
+            a expansão é menor onde a janela termina antes, na borda do raster
+    """
+    (janela_y, janela_x), (interior_y, interior_x) = tile.janela, tile.interior
+    cima = min(largura, interior_y.start - janela_y.start)
+    baixo = min(largura, janela_y.stop - interior_y.stop)
+    esquerda = min(largura, interior_x.start - janela_x.start)
+    direita = min(largura, janela_x.stop - interior_x.stop)
+    recorte_y, recorte_x = tile.recorte
+    recorte = (slice(recorte_y.start - cima, recorte_y.stop + baixo),
+               slice(recorte_x.start - esquerda, recorte_x.stop + direita))
+    return recorte, (cima, baixo, esquerda, direita)
+
+
+def extrair_faixas(expandido, tile, largura):
+    """
+    Separa os rótulos expandidos de um tile em interior e faixas das divisas.
+
+    A faixa de cada lado cobre até largura pixels do interior e até largura
+    pixels do halo; os dois tiles de uma divisa produzem faixas sobre os mesmos
+    pixels, cada uma com a sua própria rotulagem.
+
+    Args:
+        expandido (numpy.ndarray): Rótulos sobre recorte_expandido(tile, largura)
+        tile (Tile): Tile
+        largura (int): Largura das faixas
+
+    Returns:
+        tuple: (rótulos do interior, faixas por lado: 'norte', 'sul', 'oeste', 'leste')
+    """
+    cima, baixo, esquerda, direita = recorte_expandido(tile, largura)[1]
+    altura = tile.interior[0].stop - tile.interior[0].start
+    largura_interior = tile.interior[1].stop - tile.interior[1].start
+    linhas = slice(cima, cima + altura)
+    colunas = slice(esquerda, esquerda + largura_interior)
+    interior = expandido[linhas, colunas]
+
+    faixas = {}
+    if cima:
+        faixas['norte'] = expandido[:cima + min(largura, altura), colunas].copy()
+    if baixo:
+        faixas['sul'] = expandido[cima + altura - min(largura, altura):, colunas].copy()
+    if esquerda:
+        faixas['oeste'] = expandido[linhas, :esquerda + min(largura, largura_interior)].copy()
+    if direita:
+        faixas['leste'] = expandido[linhas, esquerda + largura_interior - min(largura, largura_interior):].copy()
+    return interior, faixas
+
+
+@instrumentacao.instrumentar('tile')
+def processar_tile(raster, tile, plano):
+    """
+    Executa as etapas do plano sobre um único tile.
+
+    Se o plano tiver 'dir_cache', cada produto é procurado em cache_rasters antes
+    de ser calculado. A chave de um tile é o hash da janela lida, da normalização
+    global e da posição do interior na janela; a de cada etapa combina essa chave
+    com os parâmetros da etapa (PARAMETROS_ETAPAS). As bordas encadeiam a chave do
+    nível suavizado, que também é guardado, de modo que alterar sigma_canny não
+    refaz o pré-filtro e alterar a segmentação não refaz bordas nem realce.
+
+    Args:
+        raster (numpy.ndarray): Raster de entrada (possivelmente mapeado em memória)
+        tile (Tile): Tile lido com o halo máximo do plano
+        plano (dict): Parâmetros resolvidos por planejar_processamento
+
+    Returns:
+        dict: Interior do tile por etapa; a segmentação usa rótulos locais 1..n e
+            vem acompanhada de 'faixas' (ver extrair_faixas)
+    """
+    # Ler janela com o maior halo e normalizar para [0, 1]
+    bruta = np.asarray(raster[tile.janela], dtype=np.float64)
+    janela = (bruta - plano['minimo']) * plano['escala']
+
+    # Um único espaço de escala por tile, compartilhado por todas as etapas
+    espaco = EspacoEscala(janela, faixa=(0.0, 1.0))
+
+    cache = abrir_cache(plano.get('dir_cache'), plano.get('cache_max_mb', 1024))
+    if cache is None:
+        resultados = {etapa: _executar_etapa(etapa, janela, espaco, tile, plano)
+                      for etapa in plano['etapas']}
+    else:
+        resultados = _executar_etapas_em_cache(cache, bruta, janela, espaco, tile, plano)
+
+    if 'segmentacao' in resultados:
+        resultados['segmentacao'], resultados['faixas'] = extrair_faixas(
+            resultados['segmentacao'], tile, plano['largura_faixa'])
+    return resultados
+
+
+def _executar_etapas_em_cache(cache, bruta, janela, espaco, tile, plano):
+    """
+    Executa as etapas de um tile, procurando cada produto no cache antes de calculá-lo.
+    """
+    recorte = [(fatia.start, fatia.stop) for fatia in tile.recorte]
+    chave_tile = calcular_chave(bruta, plano['minimo'], plano['escala'], recorte)
+    chave_suavizada = calcular_chave(chave_tile, 'suavizada', plano['sigma_suavizacao'])
+
+    resultados = {}
+    for etapa in plano['etapas']:
+        anterior = chave_suavizada if etapa == 'bordas' else chave_tile
+        chave = calcular_chave(anterior, etapa,
+                               {nome: plano[nome] for nome in PARAMETROS_ETAPAS[etapa]})
+        resultado = cache.obter(chave)
+        if resultado is None:
+            if etapa == 'bordas':
+                nivel = cache.obter(chave_suavizada)
+                if nivel is None:
+                    cache.guardar(chave_suavizada, espaco.suavizada(plano['sigma_suavizacao']))
+                else:
+                    espaco.semear(plano['sigma_suavizacao'], nivel)
+            resultado = _executar_etapa(etapa, janela, espaco, tile, plano)
+            cache.guardar(chave, resultado)
+        resultados[etapa] = resultado
+
+    return resultados
+
+
+def contar_rotulos(resultados):
+    """
+    Retorna o número de rótulos locais de um tile processado.
+    """
+    if 'segmentacao' not in resultados:
+        return 0
+    return int(resultados['segmentacao'].max(initial=0))
+
+
+def propriedades_do_tile(raster, tile, resultados):
+    """
+    Calcula a tabela de propriedades das regiões de um tile processado.
+
+    Centroides e caixas ficam nas coordenadas do raster; a elevação média e a
+    textura usam os valores originais (não normalizados) do raster.
+
+    Returns:
+        numpy.ndarray: Tabela com rótulos locais, ou None sem etapa de segmentação
+    """
+    if 'segmentacao' not in resultados:
+        return None
+    origem = (tile.interior[0].start, tile.interior[1].start)
+    return calcular_propriedades(resultados['segmentacao'], raster[tile.interior], origem)
+
+
+def planejar_processamento(raster, memoria_max_mb=512, tamanho_tile=None, etapas=ETAPAS,
+                           sigma_suavizacao=1.0, sigma_canny=2.0, kernel_clahe=64,
+                           clip_limit=0.03, min_distance=20, raio_max_estrutura=None):
+    """
+    Resolve halos, tamanho de tile, normalização e limiar global de um raster.
+
+    Args:
+        raster (numpy.ndarray): Raster de entrada (possivelmente mapeado em memória)
+        Demais argumentos: ver processar_raster_em_tiles
+
+    Returns:
+        dict: Plano de processamento compartilhado por todos os tiles
+    """
+    halos = calcular_halos(sigma_suavizacao, sigma_canny, kernel_clahe,
+                           min_distance, raio_max_estrutura)
+    halo_maximo = max(halos[etapa] for etapa in etapas)
+
+    # Tiles e halos múltiplos do kernel do CLAHE mantêm as regiões contextuais alinhadas
+    halo_maximo = -(-halo_maximo // kernel_clahe) * kernel_clahe
+    if tamanho_tile is None:
+        tamanho_tile = calcular_tamanho_tile(memoria_max_mb, halo_maximo, multiplo=kernel_clahe)
+    elif tamanho_tile % kernel_clahe:
+        raise ValueError("tamanho_tile deve ser múltiplo de kernel_clahe")
+
+    # Passada global: faixa de normalização e limiar de Otsu
+    estatisticas = calcular_estatisticas_globais(raster, memoria_max_mb)
+    minimo = estatisticas['minimo']
+
+    return {
+        'etapas': tuple(etapas),
+        'halos': halos,
+        'halo_maximo': halo_maximo,
+        'tamanho_tile': tamanho_tile,
+        'minimo': minimo,
+        'escala': 1.0 / max(estatisticas['maximo'] - minimo, np.finfo(float).eps),
+        'limiar': float(limiar_otsu_global(estatisticas)),
+        'sigma_suavizacao': sigma_suavizacao,
+        'sigma_canny': sigma_canny,
+        'kernel_clahe': kernel_clahe,
+        'clip_limit': clip_limit,
+        'min_distance': min_distance,
+        'largura_faixa': min(LARGURA_FAIXA, halo_maximo, tamanho_tile),
+        # Georreferenciamento (apenas para rasters GeoTIFF)
+        'transformacao': getattr(raster, 'transformacao', None),
+        'epsg': getattr(raster, 'epsg', None),
+    }
+
+
+# Rasters abertos por cada processo trabalhador, reaproveitados entre tarefas
+_RASTERS_ABERTOS = {}
+
+
+def _abrir_em_trabalhador(caminho, modo):
+    """
+    Abre (uma única vez por processo) um .npy mapeado em memória ou um GeoTIFF.
+    """
+    chave = (caminho, modo)
+    if chave not in _RASTERS_ABERTOS:
+        if modo == 'r':
+            _RASTERS_ABERTOS[chave] = abrir_raster(caminho)
+        else:
+            _RASTERS_ABERTOS[chave] = np.load(caminho, mmap_mode=modo)
+    return _RASTERS_ABERTOS[chave]
+
+
+def _processar_tile_tarefa(arrays, tile, plano):
+    """
+    Tarefa do agendador: processa um tile e escreve o interior nas saídas em disco.
+
+    O raster vem da arena compartilhada quando estava em memória; caso contrário,
+    cada trabalhador o mapeia diretamente do disco.
+    """
+    if 'raster' in arrays:
+        raster = arrays['raster']
+    else:
+        raster = _abrir_em_trabalhador(plano['caminho_raster'], 'r')
+
+    resultados = processar_tile(raster, tile, plano)
+    for etapa in plano['etapas']:
+        _abrir_em_trabalhador(plano['caminhos'][etapa], 'r+')[tile.interior] = resultados[etapa]
+
+    return (contar_rotulos(resultados), propriedades_do_tile(raster, tile, resultados),
+            resultados.get('faixas'))
+
+
+@instrumentacao.instrumentar('processamento_tiles')
+def processar_raster_em_tiles(raster, dir_saida, memoria_max_mb=512, tamanho_tile=None,
+                              etapas=ETAPAS, sigma_suavizacao=1.0, sigma_canny=2.0,
+                              kernel_clahe=64, clip_limit=0.03, min_distance=20,
+                              raio_max_estrutura=None, n_processos=1, dir_cache=None,
+                              cache_max_mb=1024, unir_regioes=True):
+    """
+    Executa bordas, realce e segmentação sobre um raster grande, tile a tile.
+
+    O raster é lido por mapeamento em memória e cada resultado é escrito em um
+    arquivo .npy mapeado em disco, de modo que o pico de memória depende apenas
+    do tamanho do tile, nunca do tamanho do raster. A normalização e o limiar de
+    Otsu são globais (calculados em uma passada inicial) e os halos cobrem o
+    suporte de cada filtro, então bordas e realce não apresentam costuras.
+
+    Com n_processos > 1 os tiles são distribuídos por agendador_tiles: cada
+    trabalhador mapeia o raster de disco (ou o recebe por memória compartilhada,
+    se estiver em memória) e escreve diretamente nas saídas. O orçamento de
+    memória vale por trabalhador.
+
+    Cada tile segmenta a sua janela independentemente; com unir_regioes, as
+    rotulagens dos dois lados de cada divisa são comparadas nas faixas de halo e
+    as regiões que cruzam divisas recebem um único rótulo em todo o raster (ver
+    unir_rotulos_entre_tiles). Sem unir_regioes, os rótulos são únicos, mas uma
+    região dividida recebe um rótulo diferente em cada tile.
+
+    Args:
+        raster (str ou numpy.ndarray): Caminho de um .npy 2D ou array de entrada
+        dir_saida (str): Diretório onde os resultados .npy serão gravados
+        memoria_max_mb (float): Orçamento de memória por tile em megabytes
+        tamanho_tile (int, opcional): Lado do tile; se omitido, deriva do orçamento
+        etapas (tuple): Etapas a executar ('bordas', 'realce', 'segmentacao')
+        sigma_suavizacao (float): Sigma do filtro gaussiano anterior ao Canny
+        sigma_canny (float): Sigma da suavização interna do Canny
+        kernel_clahe (int): Tamanho das regiões contextuais do CLAHE
+        clip_limit (float): Limite de recorte do CLAHE
+        min_distance (int): Distância mínima entre marcadores do watershed
+        raio_max_estrutura (int, opcional): Raio da maior estrutura esperada
+        n_processos (int, opcional): Processos trabalhadores; None usa todos os núcleos
+        dir_cache (str, opcional): Diretório do cache de produtos intermediários
+            (ver cache_rasters); reexecuções reaproveitam os tiles e etapas inalterados
+        cache_max_mb (float): Tamanho máximo do cache em megabytes
+        unir_regioes (bool): Unir as regiões que cruzam as divisas entre tiles
+
+    Returns:
+        dict: Caminhos dos arquivos gerados por etapa e resumo do processamento
+    """
+    criar_diretorio_se_nao_existir(dir_saida)
+    caminho_raster = raster if isinstance(raster, str) else None
+    raster = abrir_raster(raster)
+    if raster.ndim != 2:
+        raise ValueError("O raster de entrada deve ser bidimensional")
+
+    plano = planejar_processamento(raster, memoria_max_mb, tamanho_tile, etapas,
+                                   sigma_suavizacao, sigma_canny, kernel_clahe,
+                                   clip_limit, min_distance, raio_max_estrutura)
+
+    caminhos, saidas = criar_saidas(dir_saida, raster.shape, etapas)
+    plano['caminhos'] = caminhos
+    plano['caminho_raster'] = caminho_raster
+    plano['dir_cache'] = dir_cache
+    plano['cache_max_mb'] = cache_max_mb
+    plano['unir_regioes'] = unir_regioes
+
+    tiles = list(iterar_tiles(raster.shape, plano['tamanho_tile'], plano['halo_maximo']))
+    contagens = executar_tiles(raster, tiles, plano, saidas, n_processos)
+
+    print(f"  {len(tiles)} tiles de {plano['tamanho_tile']}x{plano['tamanho_tile']} pixels "
+          f"(halo de {plano['halo_maximo']} pixels)")
+
+    # As saídas .npy mantêm a grade do raster: registrar o georreferenciamento ao lado delas
+    if plano['transformacao'] is not None:
+        with open(os.path.join(dir_saida, 'georreferencia.json'), 'w') as arquivo:
+            json.dump({'transformacao': plano['transformacao']._asdict(), 'epsg': plano['epsg']},
+                      arquivo, indent=2)
+
+    return {
+        'caminhos': caminhos,
+        'tamanho_tile': plano['tamanho_tile'],
+        'halos': plano['halos'],
+        'n_tiles': len(tiles),
+        'limiar_otsu': plano['limiar'],
+        'n_rotulos': int(sum(contagens)),
+        'transformacao': plano['transformacao'],
+        'epsg': plano['epsg'],
+    }
+
+
+def criar_saidas(dir_saida, forma, etapas):
+    """
+    Cria os arquivos .npy de saída, mapeados em disco e zerados.
+
+    Args:
+        dir_saida (str): Diretório de saída
+        forma (tuple): Dimensões do raster
+        etapas (tuple): Etapas cujas saídas serão criadas
+
+    Returns:
+        tuple: (caminhos por etapa, arrays mapeados por etapa)
+    """
+    tipos_saida = {'bordas': np.bool_, 'realce': np.float64, 'segmentacao': np.int32}
+    caminhos = {}
+    saidas = {}
+    for etapa in etapas:
+        caminhos[etapa] = os.path.join(dir_saida, f"{etapa}.npy")
+        saidas[etapa] = np.lib.format.open_memmap(
+            caminhos[etapa], mode='w+', dtype=tipos_saida[etapa], shape=forma
+        )
+    return caminhos, saidas
+
+
+def _raiz(pai, rotulo):
+    """
+    Encontra a raiz de um rótulo na floresta de união-busca, comprimindo o caminho.
+    """
+    raiz = rotulo
+    while pai[raiz] != raiz:
+        raiz = pai[raiz]
+    while pai[rotulo] != raiz:
+        pai[rotulo], rotulo = raiz, pai[rotulo]
+    return raiz
+
+
+def _pares_da_faixa(faixa_a, faixa_b, deslocamento_a, deslocamento_b, sobreposicao_minima):
+    """
+    Encontra os pares de regiões que coincidem nas duas rotulagens de uma faixa.
+
+    Returns:
+        numpy.ndarray: Pares (rótulo global em a, rótulo global em b), forma (n, 2)
+    """
+    validos = (faixa_a > 0) & (faixa_b > 0)
+    if not validos.any():
+        return np.zeros((0, 2), dtype=np.int64)
+    pares, sobreposicao = np.unique(np.stack([faixa_a[validos], faixa_b[validos]]),
+                                    axis=1, return_counts=True)
+    area_a = np.bincount(faixa_a.ravel())[pares[0]]
+    area_b = np.bincount(faixa_b.ravel())[pares[1]]
+    unir = sobreposicao >= sobreposicao_minima * np.minimum(area_a, area_b)
+    return np.stack([pares[0][unir] + deslocamento_a, pares[1][unir] + deslocamento_b], axis=1)
+
+
+def _divisas(tiles, faixas):
+    """
+    Percorre as divisas entre tiles vizinhos que compartilham um lado inteiro.
+
+    Yields:
+        tuple: (índice do tile de cima/esquerda, índice do vizinho, faixa do primeiro,
+            faixa do vizinho, eixo da divisa: 0 horizontal, 1 vertical)
+    """
+    por_origem = {(tile.interior[0].start, tile.interior[1].start): indice
+                  for indice, tile in enumerate(tiles)}
+    for indice, tile in enumerate(tiles):
+        interior_y, interior_x = tile.interior
+        vizinhos = ((0, 'sul', 'norte', (interior_y.stop, interior_x.start)),
+                    (1, 'leste', 'oeste', (interior_y.start, interior_x.stop)))
+        for eixo, lado, oposto, origem in vizinhos:
+            vizinho = por_origem.get(origem)
+            if vizinho is None:
+                continue
+            faixa, faixa_vizinho = faixas[indice].get(lado), faixas[vizinho].get(oposto)
+            if faixa is None or faixa_vizinho is None or faixa.shape != faixa_vizinho.shape:
+                continue
+            yield indice, vizinho, faixa, faixa_vizinho, eixo
+
+
+def unir_rotulos_entre_tiles(tiles, deslocamentos, contagens, faixas, largura,
+                             sobreposicao_minima=SOBREPOSICAO_MINIMA):
+    """
+    Une as regiões que cruzam divisas entre tiles e renumera os rótulos globais.
+
+    Cada tile rotula a sua janela com halo independentemente; nas faixas das
+    divisas os dois tiles vizinhos rotulam os mesmos pixels. Duas regiões são
+    unidas (união-busca) quando, dentro da faixa, coincidem em pelo menos
+    sobreposicao_minima da menor delas. Apenas as faixas são usadas, então a
+    imagem de rótulos inteira nunca é carregada.
+
+    Args:
+        tiles (list): Tiles processados
+        deslocamentos (numpy.ndarray): Deslocamento dos rótulos locais de cada tile
+        contagens (list): Número de rótulos locais de cada tile
+        faixas (list): Faixas de cada tile (ver extrair_faixas)
+        largura (int): Largura das faixas
+        sobreposicao_minima (float): Fração mínima de coincidência para unir
+
+    Returns:
+        tuple: (destino, descontos). destino[g] é o rótulo final (1..n, ordenado
+            pelo menor rótulo global da região) do rótulo global g; descontos[f]
+            é o número de arestas de divisa internas à região final f, que o
+            perímetro contado por tile trata como fronteira dos dois lados.
+    """
+    total = int(sum(contagens))
+    pai = np.arange(total + 1, dtype=np.int64)
+    for indice, vizinho, faixa, faixa_vizinho, _ in _divisas(tiles, faixas):
+        pares = _pares_da_faixa(faixa, faixa_vizinho, deslocamentos[indice],
+                                deslocamentos[vizinho], sobreposicao_minima)
+        for rotulo_a, rotulo_b in pares:
+            raiz_a, raiz_b = _raiz(pai, rotulo_a), _raiz(pai, rotulo_b)
+            # A raiz é sempre o menor rótulo, o que torna a numeração determinística
+            pai[max(raiz_a, raiz_b)] = min(raiz_a, raiz_b)
+
+    # Comprimir todos os caminhos de uma vez (saltos de ponteiro)
+    raizes = pai[pai]
+    while not np.array_equal(raizes, pai):
+        pai, raizes = raizes, raizes[raizes]
+    destino = np.zeros(total + 1, dtype=np.int32)
+    destino[1:] = np.unique(raizes[1:], return_inverse=True)[1].ravel() + 1
+
+    # Arestas da divisa entre pixels vizinhos que terminaram na mesma região
+    descontos = np.zeros(int(destino.max(initial=0)) + 1, dtype=np.int64)
+    for indice, vizinho, faixa, faixa_vizinho, eixo in _divisas(tiles, faixas):
+        proprios = min(largura, tiles[indice].interior[eixo].stop - tiles[indice].interior[eixo].start)
+        lado_a = np.take(faixa, proprios - 1, axis=eixo)
+        lado_b = np.take(faixa_vizinho, proprios, axis=eixo)
+        final_a = np.where(lado_a > 0, destino[np.where(lado_a > 0, lado_a + deslocamentos[indice], 0)], 0)
+        final_b = np.where(lado_b > 0, destino[np.where(lado_b > 0, lado_b + deslocamentos[vizinho], 0)], 0)
+        iguais = (final_a == final_b) & (final_a > 0)
+        descontos += np.bincount(final_a[iguais], minlength=len(descontos))
+    return destino, descontos
+
+
+def executar_tiles(raster, tiles, plano, saidas, n_processos=1):
+    """
+    Processa uma lista de tiles, em série ou em paralelo, e grava os interiores.
+
+    Ao final, os rótulos locais de cada tile são deslocados na ordem dos tiles
+    para que sejam únicos no raster e, com plano['unir_regioes'] (padrão), as
+    regiões que cruzam divisas são unidas (ver unir_rotulos_entre_tiles) e os
+    rótulos renumerados de 1 a n. Execuções em série e em paralelo produzem
+    resultados idênticos.
+
+    Args:
+        raster (numpy.ndarray): Raster de entrada (possivelmente mapeado em memória)
+        tiles (list): Tiles a processar
+        plano (dict): Plano com 'caminhos' e 'caminho_raster' preenchidos
+        saidas (dict): Arrays de saída mapeados em disco
+        n_processos (int, opcional): Processos trabalhadores; None usa todos os núcleos
+
+    Com a etapa de segmentação, a tabela de propriedades das regiões de todos os
+    tiles (com os rótulos já deslocados) é gravada ao lado das saídas e seu
+    caminho é registrado em plano['caminhos']['propriedades']. Em rasters
+    georreferenciados, a tabela recebe latitude e longitude dos centroides.
+
+    Returns:
+        list: Número de regiões de cada tile (uma região unida conta apenas no
+            tile do seu primeiro pedaço)
+    """
+    caminho_raster = plano['caminho_raster']
+    if numero_processos(n_processos) == 1:
+        retornos = []
+        for tile in tiles:
+            resultados = processar_tile(raster, tile, plano)
+            for etapa in plano['etapas']:
+                saidas[etapa][tile.interior] = resultados[etapa]
+            retornos.append((contar_rotulos(resultados),
+                             propriedades_do_tile(raster, tile, resultados),
+                             resultados.get('faixas')))
+    else:
+        for saida in saidas.values():
+            saida.flush()
+        with ArenaCompartilhada() as arena:
+            if caminho_raster is None:
+                arena.copiar('raster', raster)
+            retornos = mapear_com_arena(_processar_tile_tarefa, arena, tiles,
+                                        n_processos, plano)
+    contagens = [contagem for contagem, _, _ in retornos]
+
+    if 'segmentacao' in saidas and contagens:
+        # Deslocar os rótulos locais de cada tile para torná-los únicos no raster e,
+        # se pedido, unir as regiões que cruzam as divisas entre tiles
+        deslocamentos = np.concatenate(([0], np.cumsum(contagens)[:-1]))
+        if plano.get('unir_regioes', True):
+            faixas = [faixas_tile for _, _, faixas_tile in retornos]
+            with instrumentacao.etapa('uniao_regioes', itens=int(sum(contagens))):
+                destino, descontos = unir_rotulos_entre_tiles(tiles, deslocamentos, contagens, faixas,
+                                                              plano['largura_faixa'])
+        else:
+            destino, descontos = np.arange(sum(contagens) + 1, dtype=np.int32), None
+
+        # Reescrever os rótulos tile a tile, sem carregar a imagem de rótulos inteira.
+        # Com regiões unidas, o perímetro é recontado sobre os rótulos finais de cada
+        # tile (a borda do tile conta como fronteira) e as arestas de divisa internas
+        # a uma região são descontadas dos dois lados
+        n_finais = int(destino.max(initial=0))
+        perimetro = None if descontos is None else -2 * descontos
+        with instrumentacao.etapa('reescrita_rotulos', itens=len(tiles)):
+            for tile, deslocamento in zip(tiles, deslocamentos):
+                bloco = np.array(saidas['segmentacao'][tile.interior], dtype=np.int64)
+                np.add(bloco, deslocamento, out=bloco, where=bloco > 0)
+                bloco = destino[bloco]
+                saidas['segmentacao'][tile.interior] = bloco
+                if perimetro is not None:
+                    perimetro += contar_perimetro(bloco, n_finais)
+
+        tabelas = []
+        for deslocamento, (_, tabela, _) in zip(deslocamentos, retornos):
+            tabela['rotulo'] += deslocamento
+            tabelas.append(tabela)
+        tabela = np.concatenate(tabelas)
+        if descontos is None:
+            tabela['rotulo'] = destino[tabela['rotulo']]
+        else:
+            tabela = agrupar_propriedades(tabela, destino[tabela['rotulo']], perimetro)
+
+        # Cada região passa a contar no tile do seu primeiro pedaço
+        primeiros = np.unique(destino[1:], return_index=True)[1] + 1
+        contagens = np.bincount(np.searchsorted(deslocamentos, primeiros, side='left') - 1,
+                                minlength=len(tiles)).tolist()
+
+        if plano['transformacao'] is not None and plano['epsg'] is not None:
+            tabela = georreferenciar_propriedades(tabela, plano['transformacao'], plano['epsg'])
+        diretorio = os.path.dirname(plano['caminhos']['segmentacao'])
+        plano['caminhos']['propriedades'] = salvar_tabela(tabela, os.path.join(diretorio, 'propriedades'))
+
+    for saida in saidas.values():
+        saida.flush()
+
+    return contagens
+
+
+def gerar_raster_simulado_em_disco(caminho, n_blocos=4, tamanho_bloco=512):
+    """
+    Monta um raster grande em disco justapondo imagens LIDAR simuladas.
+
+    Args:
+        caminho (str): Caminho do arquivo .npy a ser criado
+        n_blocos (int): Número de blocos por lado
+        tamanho_bloco (int): Lado de cada bloco simulado
+
+    Returns:
+        str: Caminho do raster gerado
+    """
+    tipos = ['geoglifo', 'aldeia_circular', 'vala_circular']
+    lado = n_blocos * tamanho_bloco
+    raster = np.lib.format.open_memmap(caminho, mode='w+', dtype=np.float64, shape=(lado, lado))
+    for i in range(n_blocos):
+        for j in range(n_blocos):
+            tipo = tipos[(i * n_blocos + j) % len(tipos)]
+            raster[i * tamanho_bloco:(i + 1) * tamanho_bloco,
+                   j * tamanho_bloco:(j + 1) * tamanho_bloco] = gerar_imagem_lidar_simulada(tamanho_bloco, tipo)
+    raster.flush()
+    return caminho
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    print("Iniciando processamento em tiles de raster LIDAR simulado...")
+    criar_diretorio_se_nao_existir(RESULTS_DIR)
+    caminho_raster = gerar_raster_simulado_em_disco(os.path.join(RESULTS_DIR, 'raster_simulado.npy'))
+    resumo = processar_raster_em_tiles(caminho_raster, RESULTS_DIR, memoria_max_mb=128)
+    print(f"Processamento concluído. Resultados salvos em: {RESULTS_DIR}")
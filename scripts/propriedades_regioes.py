@@ -0,0 +1,189 @@
+# Tabela de Propriedades das Regiões Segmentadas
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script calcula, a partir dos rótulos do watershed, uma tabela colunar
+# com as propriedades de cada região (centroide, área, perímetro, circularidade, caixa
+# envolvente, elevação média e textura) em uma única passada vetorizada. As colunas
+# area, perimetro, circularidade, elevacao e textura são as mesmas usadas pelo notebook
+# de classificação de estruturas arqueológicas.
+
+import numpy as np
+
+# Colunas da tabela de propriedades
+DTYPE_PROPRIEDADES = np.dtype([
+    ('rotulo', np.int32),
+    ('centro_y', np.float32),
+    ('centro_x', np.float32),
+    ('area', np.int32),
+    ('perimetro', np.int32),
+    ('circularidade', np.float32),
+    ('y0', np.int32),
+    ('x0', np.int32),
+    ('y1', np.int32),
+    ('x1', np.int32),
+    ('elevacao', np.float32),
+    ('textura', np.float32),
+])
+
+
+def contar_perimetro(rotulos, n_rotulos):
+    """
+    Conta, para cada rótulo, as arestas de pixel que o separam de outra região.
+
+    Args:
+        rotulos (numpy.ndarray): Imagem de rótulos (0 = fundo)
+        n_rotulos (int): Maior rótulo presente
+
+    Returns:
+        numpy.ndarray: Perímetro por rótulo (índice = rótulo)
+    """
+    # A borda da imagem conta como fronteira
+    completo = np.pad(rotulos, 1)
+    perimetro = np.zeros(n_rotulos + 1, dtype=np.int64)
+    for eixo in (0, 1):
+        antes = np.take(completo, np.arange(completo.shape[eixo] - 1), axis=eixo)
+        depois = np.take(completo, np.arange(1, completo.shape[eixo]), axis=eixo)
+        fronteira = antes != depois
+        perimetro += np.bincount(antes[fronteira], minlength=n_rotulos + 1)
+        perimetro += np.bincount(depois[fronteira], minlength=n_rotulos + 1)
+    perimetro[0] = 0
+    return perimetro
+
+
+def calcular_propriedades(rotulos, imagem, origem=(0, 0)):
+    """
+    Calcula a tabela de propriedades de todas as regiões rotuladas.
+
+    Os pixels rotulados são ordenados por rótulo uma única vez; todas as
+    reduções por região (somas, mínimos e máximos) são feitas com reduceat,
+    sem laço em Python por região.
+
+    Args:
+        rotulos (numpy.ndarray): Imagem de rótulos (0 = fundo)
+        imagem (numpy.ndarray): Imagem de elevação com a mesma forma
+        origem (tuple): Deslocamento (linha, coluna) somado às coordenadas, para
+            expressar centroides e caixas de um tile no sistema do raster
+
+    Returns:
+        numpy.ndarray: Tabela com DTYPE_PROPRIEDADES, uma linha por rótulo presente.
+            Circularidade = 4π·área/perímetro², com o perímetro contado em arestas
+            de pixel (um disco discreto fica próximo de π/4). Textura é o desvio
+            padrão da elevação dentro da região.
+    """
+    rotulos = np.asarray(rotulos)
+    largura = rotulos.shape[1]
+    planos = rotulos.ravel()
+    indices = np.flatnonzero(planos)
+    if len(indices) == 0:
+        return np.zeros(0, dtype=DTYPE_PROPRIEDADES)
+
+    # Agrupar os pixels rotulados por rótulo
+    ordem = np.argsort(planos[indices], kind='stable')
+    indices = indices[ordem]
+    ids, inicio, area = np.unique(planos[indices], return_index=True, return_counts=True)
+    y, x = np.divmod(indices, largura)
+    # Converter apenas os pixels rotulados (sem cópia float64 da imagem inteira)
+    elevacao = np.asarray(imagem).ravel()[indices].astype(np.float64)
+
+    media = np.add.reduceat(elevacao, inicio) / area
+    variancia = np.add.reduceat(elevacao * elevacao, inicio) / area - media * media
+    perimetro = contar_perimetro(rotulos, int(ids[-1]))[ids]
+
+    tabela = np.zeros(len(ids), dtype=DTYPE_PROPRIEDADES)
+    tabela['rotulo'] = ids
+    tabela['area'] = area
+    tabela['centro_y'] = np.add.reduceat(y, inicio) / area + origem[0]
+    tabela['centro_x'] = np.add.reduceat(x, inicio) / area + origem[1]
+    tabela['perimetro'] = perimetro
+    tabela['circularidade'] = 4 * np.pi * area / np.maximum(perimetro, 1) ** 2
+    tabela['y0'] = np.minimum.reduceat(y, inicio) + origem[0]
+    tabela['x0'] = np.minimum.reduceat(x, inicio) + origem[1]
+    tabela['y1'] = np.maximum.reduceat(y, inicio) + 1 + origem[0]
+    tabela['x1'] = np.maximum.reduceat(x, inicio) + 1 + origem[1]
+    tabela['elevacao'] = media
+    tabela['textura'] = np.sqrt(np.maximum(variancia, 0))
+    return tabela
+
+
+def agrupar_propriedades(tabela, destino, perimetro=None):
+    """
+    Combina em uma linha por região os pedaços de regiões divididas entre tiles.
+
+    Áreas, somas de coordenadas e somas de elevação e de elevação ao quadrado
+    são acumuladas por região, então centroide, elevação média e textura saem
+    iguais às da região inteira. O perímetro não é aditivo (as arestas entre
+    pedaços unidos deixam de ser fronteira), então deve ser informado quando
+    conhecido; sem ele, usa-se a soma dos perímetros dos pedaços.
+
+    Args:
+        tabela (numpy.ndarray): Tabela com DTYPE_PROPRIEDADES, um pedaço por linha
+        destino (numpy.ndarray): Rótulo final (1..n) de cada linha
+        perimetro (numpy.ndarray, opcional): Perímetro por rótulo final (índice = rótulo)
+
+    Returns:
+        numpy.ndarray: Tabela com DTYPE_PROPRIEDADES, uma linha por rótulo final
+    """
+    ids, grupo = np.unique(destino, return_inverse=True)
+    grupo = grupo.ravel()
+
+    def somar(valores):
+        return np.bincount(grupo, weights=valores, minlength=len(ids))
+
+    area = somar(tabela['area'])
+    elevacao = somar(tabela['elevacao'] * tabela['area'].astype(np.float64)) / area
+    quadrados = tabela['textura'].astype(np.float64) ** 2 + tabela['elevacao'].astype(np.float64) ** 2
+    variancia = somar(quadrados * tabela['area']) / area - elevacao * elevacao
+    perimetro = somar(tabela['perimetro']) if perimetro is None else perimetro[ids]
+
+    agrupada = np.zeros(len(ids), dtype=DTYPE_PROPRIEDADES)
+    agrupada['rotulo'] = ids
+    agrupada['area'] = area
+    agrupada['centro_y'] = somar(tabela['centro_y'] * tabela['area'].astype(np.float64)) / area
+    agrupada['centro_x'] = somar(tabela['centro_x'] * tabela['area'].astype(np.float64)) / area
+    agrupada['perimetro'] = perimetro
+    agrupada['circularidade'] = 4 * np.pi * area / np.maximum(perimetro, 1) ** 2
+    for campo, reducao, inicial in (('y0', np.minimum, np.iinfo(np.int32).max),
+                                    ('x0', np.minimum, np.iinfo(np.int32).max),
+                                    ('y1', np.maximum, 0), ('x1', np.maximum, 0)):
+        valores = np.full(len(ids), inicial, dtype=np.int32)
+        reducao.at(valores, grupo, tabela[campo])
+        agrupada[campo] = valores
+    agrupada['elevacao'] = elevacao
+    agrupada['textura'] = np.sqrt(np.maximum(variancia, 0))
+    return agrupada
+
+
+def salvar_tabela(tabela, caminho_base):
+    """
+    Salva a tabela em Parquet, se o pyarrow estiver disponível, ou como .npy estruturado.
+
+    Args:
+        tabela (numpy.ndarray): Tabela com DTYPE_PROPRIEDADES
+        caminho_base (str): Caminho sem extensão
+
+    Returns:
+        str: Caminho do arquivo gravado
+    """
+    try:
+        import pyarrow
+        import pandas as pd
+    except ImportError:
+        caminho = caminho_base + '.npy'
+        np.save(caminho, tabela)
+    else:
+        caminho = caminho_base + '.parquet'
+        pd.DataFrame(tabela).to_parquet(caminho, index=False)
+    return caminho
+
+
+def carregar_tabela(caminho):
+    """
+    Carrega uma tabela gravada por salvar_tabela (Parquet ou .npy estruturado).
+
+    Returns:
+        numpy.ndarray: Tabela como array estruturado
+    """
+    if caminho.endswith('.parquet'):
+        import pandas as pd
+        return pd.read_parquet(caminho).to_records(index=False)
+    return np.load(caminho)
@@ -0,0 +1,59 @@
+# Regressão Conjunta de Coordenadas
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script reúne o que os modelos conjuntos de coordenadas precisam fora
+# do script de previsão: a cadeia de regressores (a longitude recebe a latitude prevista
+# como característica) e a previsão de latitude e longitude tanto por um par de modelos
+# quanto por um modelo de saída dupla. Por ficarem em um módulo importável, os modelos
+# gravados em artefatos podem ser carregados por outros processos.
+
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+
+
+class RegressorEncadeado(RegressorMixin, BaseEstimator):
+    """
+    Cadeia de regressores: cada saída recebe as anteriores como características.
+
+    No treinamento, as saídas anteriores entram com os valores reais; na
+    previsão, com os valores previstos. Cada estimador é consultado uma única
+    vez por previsão (o RegressorChain do scikit-learn consulta cada um duas).
+    """
+
+    def __init__(self, estimador):
+        self.estimador = estimador
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self.estimadores_ = []
+        for saida in range(y.shape[1]):
+            estimador = clone(self.estimador)
+            estimador.fit(np.column_stack((X, y[:, :saida])), y[:, saida])
+            self.estimadores_.append(estimador)
+        return self
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        previsoes = np.empty((len(X), len(self.estimadores_)))
+        for saida, estimador in enumerate(self.estimadores_):
+            previsoes[:, saida] = estimador.predict(np.column_stack((X, previsoes[:, :saida])))
+        return previsoes
+
+
+def prever_coordenadas(modelo_lat, modelo_lon, X):
+    """
+    Prevê latitude e longitude com um par de modelos ou com um modelo conjunto.
+
+    Args:
+        modelo_lat: Modelo de latitude, ou modelo conjunto se modelo_lon for None
+        modelo_lon: Modelo de longitude, ou None
+        X (pandas.DataFrame): Características
+
+    Returns:
+        tuple: (latitudes, longitudes) previstas
+    """
+    if modelo_lon is None:
+        previsao = np.asarray(modelo_lat.predict(X))
+        return previsao[:, 0], previsao[:, 1]
+    return modelo_lat.predict(X), modelo_lon.predict(X)
@@ -0,0 +1,94 @@
+# Renderização de Resultados de Detecção
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script transforma em figuras PNG os arrays brutos gravados por
+# deteccao_sitios.py no modo de saída 'arrays'. A renderização é separada da detecção:
+# roda depois, apenas para os arrays escolhidos, e distribui as figuras entre processos.
+
+import os
+import glob
+import numpy as np
+from skimage import color
+
+from agendador_tiles import ArenaCompartilhada, mapear_com_arena
+from deteccao_sitios import FIGURAS, RESULTS_DIR, salvar_figura
+
+# Sufixo dos arquivos gravados no modo de saída 'arrays'
+SUFIXO_RESULTADOS = '_resultados.npz'
+
+
+def listar_resultados(diretorio=RESULTS_DIR):
+    """
+    Lista os arquivos de arrays brutos de um diretório.
+
+    Args:
+        diretorio (str): Diretório com os arquivos <tipo>_resultados.npz
+
+    Returns:
+        list: Caminhos encontrados, em ordem alfabética
+    """
+    return sorted(glob.glob(os.path.join(diretorio, '*' + SUFIXO_RESULTADOS)))
+
+
+def _renderizar_tarefa(arrays, tarefa, parametros):
+    """
+    Tarefa do agendador: renderiza uma figura de um arquivo de resultados.
+    """
+    caminho, nome = tarefa
+    tipo = os.path.basename(caminho)[:-len(SUFIXO_RESULTADOS)]
+    with np.load(caminho) as resultados:
+        if nome == 'segmentacao':
+            array = color.label2rgb(resultados['rotulos'], resultados['original'],
+                                    alpha=0.5, bg_label=0)
+        else:
+            array = resultados[nome]
+    dir_saida = parametros['dir_saida'] or os.path.dirname(caminho)
+    return salvar_figura(tipo, nome, array, dir_saida, parametros['dpi'])
+
+
+def renderizar_resultados(caminhos=None, nomes=None, dir_saida=None, dpi=300, n_processos=None):
+    """
+    Renderiza figuras a partir de arquivos de arrays brutos, em paralelo.
+
+    Cada par (arquivo, figura) é uma tarefa independente do agendador.
+
+    Args:
+        caminhos (list, opcional): Arquivos .npz; se omitido, usa os de RESULTS_DIR
+        nomes (list, opcional): Figuras a gerar (chaves de FIGURAS); padrão: todas
+        dir_saida (str, opcional): Diretório das figuras; padrão: o de cada arquivo
+        dpi (int): Resolução das figuras
+        n_processos (int, opcional): Processos trabalhadores; None usa todos os núcleos
+
+    Returns:
+        list: Caminhos das figuras gravadas
+    """
+    if caminhos is None:
+        caminhos = listar_resultados()
+    if nomes is None:
+        nomes = list(FIGURAS)
+    desconhecidos = set(nomes) - set(FIGURAS)
+    if desconhecidos:
+        raise ValueError(f"Figuras desconhecidas: {sorted(desconhecidos)}")
+
+    tarefas = [(caminho, nome) for caminho in caminhos for nome in nomes]
+    with ArenaCompartilhada() as arena:
+        return mapear_com_arena(_renderizar_tarefa, arena, tarefas, n_processos,
+                                {'dir_saida': dir_saida, 'dpi': dpi})
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Renderização de resultados de detecção salvos como arrays")
+    parser.add_argument('caminhos', nargs='*', help="Arquivos <tipo>_resultados.npz (padrão: todos em RESULTS_DIR)")
+    parser.add_argument('--figuras', nargs='+', choices=list(FIGURAS), help="Figuras a gerar (padrão: todas)")
+    parser.add_argument('--dpi', type=int, default=300, help="Resolução das figuras")
+    argumentos = parser.parse_args()
+
+    print("Renderizando resultados de detecção...")
+    figuras = renderizar_resultados(argumentos.caminhos or None, argumentos.figuras,
+                                    dpi=argumentos.dpi)
+    print(f"{len(figuras)} figuras salvas")
@@ -0,0 +1,660 @@
+# Servidor Local de Inferência para Previsão de Coordenadas
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script serve os modelos salvos por previsao_coordenadas_final.py
+# (ver artefatos_modelos.py) por HTTP local ou socket Unix, para que áreas candidatas
+# sejam avaliadas interativamente sem executar o treinamento de novo. Os pedidos que
+# chegam ao mesmo modelo em poucos milissegundos são agrupados em um único lote de
+# previsão; os modelos de cada região ficam em um cache LRU, e cada resposta informa a
+# latência do pedido e o tamanho do lote em que foi processado.
+
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from artefatos_modelos import MODELOS_DIR, carregar_artefato, listar_artefatos, listar_versoes
+
+# Endereço padrão do servidor
+HOST = '127.0.0.1'
+PORTA = 8765
+
+# Agrupamento: linhas máximas por lote e espera máxima por mais pedidos
+MAX_LOTE = 256
+ESPERA_MAX_MS = 5.0
+
+# Modelos mantidos em memória e latências guardadas para as estatísticas
+MAX_MODELOS = 8
+JANELA_LATENCIAS = 10000
+
+# Intervalo de atualização da lista de artefatos e versões (em segundos): os
+# pedidos consultam a lista em memória, sem percorrer o diretório a cada vez
+INTERVALO_LISTAGEM_S = 2.0
+
+MOTIVOS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class ErroPedido(Exception):
+    """
+    Pedido inválido; o status HTTP acompanha a mensagem.
+    """
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class ModelosLRU:
+    """
+    Modelos carregados de artefatos, com remoção do menos usado recentemente.
+
+    O acesso é protegido por uma trava, pois as previsões são executadas em
+    threads fora do laço de eventos. Pedidos simultâneos de um modelo ainda não
+    carregado aguardam um único carregamento.
+    """
+
+    def __init__(self, diretorio=MODELOS_DIR, max_modelos=MAX_MODELOS,
+                 intervalo_listagem_s=INTERVALO_LISTAGEM_S):
+        """
+        Args:
+            diretorio (str): Diretório dos artefatos
+            max_modelos (int): Número máximo de versões de modelos em memória
+            intervalo_listagem_s (float): Idade máxima da lista de artefatos em memória
+        """
+        self.diretorio = diretorio
+        self.max_modelos = max_modelos
+        self.intervalo_listagem_s = intervalo_listagem_s
+        self.modelos = OrderedDict()
+        self.carregando = {}
+        self.carregamentos = 0
+        self.listagem = {}
+        self.listagem_em = None
+        self.trava = threading.Lock()
+
+    def listagem_expirada(self):
+        """
+        Indica se a lista de artefatos em memória precisa ser relida do disco.
+        """
+        return self.listagem_em is None or time.monotonic() - self.listagem_em > self.intervalo_listagem_s
+
+    def listar(self):
+        """
+        Relê do disco os artefatos e as suas versões (executado em thread).
+
+        Returns:
+            dict: Versões por nome de artefato
+        """
+        listagem = {nome: listar_versoes(nome, self.diretorio) for nome in listar_artefatos(self.diretorio)}
+        self.listagem, self.listagem_em = listagem, time.monotonic()
+        return listagem
+
+    def resolver(self, nome, versao=None):
+        """
+        Retorna a versão pedida, ou a mais recente, de um artefato.
+
+        O nome vem do pedido e vira caminho em disco: só são aceitos nomes sem
+        separadores de diretório nem '..' e que estejam na lista de artefatos
+        (ver listar). A consulta é feita na lista em memória, sem acesso ao disco.
+
+        Raises:
+            ErroPedido: Se o nome ou a versão forem inválidos (status 400) ou se o
+                artefato ou a versão não existirem (status 404)
+        """
+        separadores = {'/', '\\', os.sep, os.altsep} - {None}
+        if (not isinstance(nome, str) or not nome or '..' in nome
+                or any(separador in nome for separador in separadores)):
+            raise ErroPedido(f"Nome de modelo inválido: {nome!r}")
+        if versao is not None and (isinstance(versao, bool) or not isinstance(versao, int)):
+            raise ErroPedido(f"'versao' deve ser um número inteiro: {versao!r}")
+        versoes = self.listagem.get(nome)
+        if not versoes:
+            raise ErroPedido(f"Modelo não encontrado: {nome}", 404)
+        if versao is None:
+            return versoes[-1]
+        if versao not in versoes:
+            raise ErroPedido(f"Versão {versao} do modelo {nome} não encontrada", 404)
+        return versao
+
+    def obter(self, nome, versao):
+        """
+        Retorna (estimadores por alvo, metadados), carregando o artefato se necessário.
+        """
+        chave = (nome, versao)
+        with self.trava:
+            if chave in self.modelos:
+                self.modelos.move_to_end(chave)
+                return self.modelos[chave]
+            # Um carregamento por chave: quem chega depois aguarda o mesmo resultado
+            carregamento = self.carregando.get(chave)
+            responsavel = carregamento is None
+            if responsavel:
+                carregamento = self.carregando[chave] = Future()
+        if not responsavel:
+            return carregamento.result()
+        try:
+            modelo = carregar_artefato(nome, versao, self.diretorio)
+        except Exception as erro:
+            with self.trava:
+                del self.carregando[chave]
+            carregamento.set_exception(erro)
+            raise
+        with self.trava:
+            self.carregamentos += 1
+            self.modelos[chave] = modelo
+            self.modelos.move_to_end(chave)
+            while len(self.modelos) > self.max_modelos:
+                self.modelos.popitem(last=False)
+            del self.carregando[chave]
+        carregamento.set_result(modelo)
+        return modelo
+
+
+class EstatisticasLatencia:
+    """
+    Latências dos pedidos e tamanhos dos lotes em uma janela deslizante.
+    """
+
+    def __init__(self, janela=JANELA_LATENCIAS):
+        self.latencias_ms = deque(maxlen=janela)
+        self.linhas_por_lote = deque(maxlen=janela)
+        self.pedidos_por_lote = deque(maxlen=janela)
+        self.tempos_lote_ms = deque(maxlen=janela)
+        self.pedidos = 0
+        self.linhas = 0
+        self.lotes = 0
+
+    def registrar_pedido(self, n_linhas, latencia_ms):
+        self.pedidos += 1
+        self.linhas += n_linhas
+        self.latencias_ms.append(latencia_ms)
+
+    def registrar_lote(self, n_linhas, n_pedidos, tempo_ms):
+        self.lotes += 1
+        self.linhas_por_lote.append(n_linhas)
+        self.pedidos_por_lote.append(n_pedidos)
+        self.tempos_lote_ms.append(tempo_ms)
+
+    def resumir(self):
+        """
+        Returns:
+            dict: Contagens, percentis de latência (ms) e tamanho médio dos lotes
+        """
+        resumo = {'pedidos': self.pedidos, 'linhas': self.linhas, 'lotes': self.lotes}
+        if self.latencias_ms:
+            latencias = np.asarray(self.latencias_ms)
+            p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+            resumo.update({'latencia_media_ms': float(latencias.mean()), 'latencia_p50_ms': float(p50),
+                           'latencia_p95_ms': float(p95), 'latencia_p99_ms': float(p99),
+                           'latencia_max_ms': float(latencias.max())})
+        if self.linhas_por_lote:
+            resumo.update({'linhas_por_lote': float(np.mean(self.linhas_por_lote)),
+                           'pedidos_por_lote': float(np.mean(self.pedidos_por_lote)),
+                           'tempo_lote_medio_ms': float(np.mean(self.tempos_lote_ms))})
+        return resumo
+
+
+class AgrupadorLotes:
+    """
+    Fila de pedidos de um modelo, processada em lotes (micro-batching).
+
+    O primeiro pedido abre um lote, que recebe os pedidos seguintes até somar
+    max_lote linhas ou até esperar espera_max_ms; o lote inteiro é previsto em
+    uma única chamada, executada em uma thread para não bloquear o laço de eventos.
+    Se a previsão do lote falhar, cada pedido é previsto sozinho, de modo que o
+    erro de um pedido não chega aos demais.
+    """
+
+    def __init__(self, prever, max_lote, espera_max_ms, estatisticas):
+        """
+        Args:
+            prever (callable): Função que recebe a matriz de linhas e retorna um array por alvo
+            max_lote (int): Linhas máximas por lote
+            espera_max_ms (float): Espera máxima por novos pedidos depois do primeiro
+            estatisticas (list): Objetos EstatisticasLatencia que recebem os lotes
+        """
+        self.prever = prever
+        self.max_lote = max_lote
+        self.espera_max_s = espera_max_ms / 1000
+        self.estatisticas = estatisticas
+        self.fila = asyncio.Queue()
+        self.tarefa = asyncio.ensure_future(self._executar())
+
+    async def submeter(self, linhas):
+        """
+        Enfileira as linhas de um pedido e aguarda o resultado do lote.
+
+        Returns:
+            tuple: (previsões por alvo para as linhas do pedido, linhas do lote)
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        await self.fila.put((linhas, futuro))
+        return await futuro
+
+    async def _coletar(self):
+        """
+        Aguarda o primeiro pedido e junta os seguintes até o lote fechar.
+        """
+        laco = asyncio.get_running_loop()
+        pedidos = [await self.fila.get()]
+        n_linhas = len(pedidos[0][0])
+        prazo = laco.time() + self.espera_max_s
+        while n_linhas < self.max_lote:
+            if self.fila.empty():
+                restante = prazo - laco.time()
+                if restante <= 0:
+                    break
+                try:
+                    pedido = await asyncio.wait_for(self.fila.get(), restante)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                pedido = self.fila.get_nowait()
+            pedidos.append(pedido)
+            n_linhas += len(pedido[0])
+        return pedidos, n_linhas
+
+    async def _executar(self):
+        laco = asyncio.get_running_loop()
+        while True:
+            pedidos, n_linhas = await self._coletar()
+            linhas = np.concatenate([linhas for linhas, _ in pedidos])
+            inicio = time.perf_counter()
+            try:
+                previsoes = await laco.run_in_executor(None, self.prever, linhas)
+            except Exception as erro:
+                if len(pedidos) == 1:
+                    if not pedidos[0][1].done():
+                        pedidos[0][1].set_exception(erro)
+                else:
+                    await self._executar_separados(pedidos)
+                continue
+            tempo_ms = (time.perf_counter() - inicio) * 1000
+            for estatisticas in self.estatisticas:
+                estatisticas.registrar_lote(n_linhas, len(pedidos), tempo_ms)
+
+            # Devolver a cada pedido apenas as suas linhas
+            posicao = 0
+            for linhas_pedido, futuro in pedidos:
+                fim = posicao + len(linhas_pedido)
+                if not futuro.done():
+                    futuro.set_result(({alvo: valores[posicao:fim] for alvo, valores in previsoes.items()},
+                                       n_linhas))
+                posicao = fim
+
+    async def _executar_separados(self, pedidos):
+        """
+        Prevê os pedidos de um lote que falhou um a um.
+        """
+        laco = asyncio.get_running_loop()
+        for linhas, futuro in pedidos:
+            inicio = time.perf_counter()
+            try:
+                previsoes = await laco.run_in_executor(None, self.prever, linhas)
+            except Exception as erro:
+                if not futuro.done():
+                    futuro.set_exception(erro)
+                continue
+            tempo_ms = (time.perf_counter() - inicio) * 1000
+            for estatisticas in self.estatisticas:
+                estatisticas.registrar_lote(len(linhas), 1, tempo_ms)
+            if not futuro.done():
+                futuro.set_result((previsoes, len(linhas)))
+
+    def cancelar(self):
+        self.tarefa.cancel()
+
+
+class ServidorInferencia:
+    """
+    Servidor HTTP/1.1 mínimo (asyncio) para previsões em lote.
+
+    Rotas:
+        GET  /saude         Estado do servidor
+        GET  /modelos       Artefatos disponíveis e suas versões
+        GET  /estatisticas  Latências e lotes, geral e por modelo
+        POST /prever        {"modelo": ..., "regiao": ..., "versao": ..., "linhas": [...]}
+
+    As linhas podem ser listas na ordem das características do modelo ou
+    dicionários com os nomes das características. Com "regiao", o artefato
+    usado é "<modelo>_<regiao>".
+    """
+
+    def __init__(self, diretorio=MODELOS_DIR, max_lote=MAX_LOTE, espera_max_ms=ESPERA_MAX_MS,
+                 max_modelos=MAX_MODELOS):
+        """
+        Args:
+            diretorio (str): Diretório dos artefatos
+            max_lote (int): Linhas máximas por lote (1 desativa o agrupamento)
+            espera_max_ms (float): Espera máxima por pedidos para completar um lote
+            max_modelos (int): Versões de modelos mantidas em memória
+        """
+        self.diretorio = diretorio
+        self.max_lote = max_lote
+        self.espera_max_ms = espera_max_ms
+        self.modelos = ModelosLRU(diretorio, max_modelos)
+        self.agrupadores = {}
+        self.estatisticas = EstatisticasLatencia()
+        self.estatisticas_modelos = {}
+        self.servidor = None
+        self.inicio = time.time()
+
+    def _prever_lote(self, nome, versao, linhas):
+        """
+        Prevê todos os alvos de um modelo para as linhas de um lote (executado em thread).
+        """
+        modelos, metadados = self.modelos.obter(nome, versao)
+        X = pd.DataFrame(linhas, columns=metadados['caracteristicas'])
+        previsoes = {}
+        for alvo, modelo in modelos.items():
+            previsao = np.asarray(modelo.predict(X))
+            if previsao.ndim == 2:
+                # Modelo conjunto: uma coluna por saída (ex.: latitude e longitude)
+                saidas = metadados.get('saidas', {}).get(alvo) or [f'{alvo}_{i}' for i in range(previsao.shape[1])]
+                previsoes.update(zip(saidas, previsao.T))
+            else:
+                previsoes[alvo] = previsao
+        return previsoes
+
+    def _agrupador(self, nome, versao):
+        chave = f'{nome}@v{versao}'
+        if chave not in self.agrupadores:
+            self.estatisticas_modelos[chave] = EstatisticasLatencia()
+            self.agrupadores[chave] = AgrupadorLotes(
+                lambda linhas: self._prever_lote(nome, versao, linhas),
+                self.max_lote, self.espera_max_ms,
+                [self.estatisticas, self.estatisticas_modelos[chave]]
+            )
+        return chave, self.agrupadores[chave]
+
+    def _converter_linhas(self, linhas, caracteristicas):
+        """
+        Converte as linhas de um pedido em uma matriz (linhas x características).
+        """
+        if not isinstance(linhas, list) or not linhas:
+            raise ErroPedido("'linhas' deve ser uma lista não vazia")
+        try:
+            if isinstance(linhas[0], dict):
+                faltando = [nome for nome in caracteristicas if nome not in linhas[0]]
+                if faltando:
+                    raise ErroPedido(f"Características ausentes: {', '.join(faltando)}")
+                linhas = [[linha[nome] for nome in caracteristicas] for linha in linhas]
+            matriz = np.asarray(linhas, dtype=np.float64)
+        except (KeyError, TypeError, ValueError) as erro:
+            raise ErroPedido(f"Linhas inválidas: {erro}")
+        if matriz.ndim != 2 or matriz.shape[1] != len(caracteristicas):
+            raise ErroPedido(f"Cada linha deve ter {len(caracteristicas)} valores: {', '.join(caracteristicas)}")
+        # json.loads aceita NaN e Infinity, que os estimadores recusam
+        if not np.isfinite(matriz).all():
+            raise ErroPedido("As linhas não podem conter NaN nem valores infinitos")
+        return matriz
+
+    async def prever(self, modelo, linhas, regiao=None, versao=None):
+        """
+        Prevê as linhas com um modelo, passando pelo agrupamento em lotes.
+
+        Returns:
+            dict: Previsões por linha, modelo e versão usados, latência e tamanho do lote
+        """
+        inicio = time.perf_counter()
+        if not modelo:
+            raise ErroPedido("Informe o 'modelo'")
+        if not isinstance(modelo, str) or not (regiao is None or isinstance(regiao, str)):
+            raise ErroPedido("'modelo' e 'regiao' devem ser textos")
+        nome = f'{modelo}_{regiao}' if regiao else modelo
+        # A leitura do diretório e o carregamento do disco não bloqueiam o laço de eventos
+        laco = asyncio.get_running_loop()
+        if self.modelos.listagem_expirada():
+            await laco.run_in_executor(None, self.modelos.listar)
+        versao = self.modelos.resolver(nome, versao)
+        _, metadados = await laco.run_in_executor(None, self.modelos.obter, nome, versao)
+        matriz = self._converter_linhas(linhas, metadados['caracteristicas'])
+
+        chave, agrupador = self._agrupador(nome, versao)
+        previsoes, tamanho_lote = await agrupador.submeter(matriz)
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        self.estatisticas.registrar_pedido(len(matriz), latencia_ms)
+        self.estatisticas_modelos[chave].registrar_pedido(len(matriz), latencia_ms)
+        alvos = list(previsoes)
+        return {
+            'modelo': nome,
+            'versao': versao,
+            'previsoes': [dict(zip(alvos, map(float, valores))) for valores in zip(*previsoes.values())],
+            'latencia_ms': latencia_ms,
+            'tamanho_lote': int(tamanho_lote),
+        }
+
+    def resumir(self):
+        """
+        Returns:
+            dict: Estatísticas gerais e por modelo
+        """
+        return {
+            'geral': self.estatisticas.resumir(),
+            'modelos': {chave: estatisticas.resumir() for chave, estatisticas in self.estatisticas_modelos.items()},
+            'modelos_em_memoria': [f'{nome}@v{versao}' for nome, versao in self.modelos.modelos],
+            'carregamentos': self.modelos.carregamentos,
+        }
+
+    async def _rotear(self, metodo, caminho, corpo):
+        """
+        Returns:
+            tuple: (status HTTP, resposta em JSON)
+        """
+        caminho = caminho.split('?', 1)[0]
+        try:
+            if caminho == '/prever':
+                if metodo != 'POST':
+                    raise ErroPedido("Use POST em /prever", 405)
+                try:
+                    pedido = json.loads(corpo or b'{}')
+                except ValueError:
+                    raise ErroPedido("Corpo JSON inválido")
+                if not isinstance(pedido, dict):
+                    raise ErroPedido("O corpo deve ser um objeto JSON")
+                return 200, await self.prever(pedido.get('modelo'), pedido.get('linhas'),
+                                              pedido.get('regiao'), pedido.get('versao'))
+            if metodo != 'GET':
+                raise ErroPedido(f"Use GET em {caminho}", 405)
+            if caminho == '/saude':
+                return 200, {'estado': 'ok', 'tempo_ativo_s': time.time() - self.inicio}
+            if caminho == '/modelos':
+                return 200, await asyncio.get_running_loop().run_in_executor(None, self.modelos.listar)
+            if caminho == '/estatisticas':
+                return 200, self.resumir()
+            raise ErroPedido(f"Rota não encontrada: {caminho}", 404)
+        except ErroPedido as erro:
+            return erro.status, {'erro': str(erro)}
+        except Exception as erro:
+            return 500, {'erro': f"{type(erro).__name__}: {erro}"}
+
+    async def _atender(self, leitor, escritor):
+        """
+        Atende uma conexão (HTTP/1.1 com keep-alive).
+        """
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                metodo, caminho, _ = linha.decode('latin-1').split(' ', 2)
+                cabecalhos = {}
+                while True:
+                    cabecalho = await leitor.readline()
+                    if cabecalho in (b'\r\n', b'\n', b''):
+                        break
+                    chave, _, valor = cabecalho.decode('latin-1').partition(':')
+                    cabecalhos[chave.strip().lower()] = valor.strip()
+                tamanho = int(cabecalhos.get('content-length', 0))
+                corpo = await leitor.readexactly(tamanho) if tamanho else b''
+
+                status, resposta = await self._rotear(metodo, caminho, corpo)
+                dados = json.dumps(resposta).encode()
+                manter = cabecalhos.get('connection', '').lower() != 'close'
+                escritor.write((f"HTTP/1.1 {status} {MOTIVOS[status]}\r\n"
+                                f"Content-Type: application/json\r\n"
+                                f"Content-Length: {len(dados)}\r\n"
+                                f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n").encode() + dados)
+                await escritor.drain()
+                if not manter:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+    async def iniciar(self, host=HOST, porta=PORTA, socket_unix=None):
+        """
+        Começa a aceitar conexões em host:porta ou em um socket Unix.
+
+        Returns:
+            str: Endereço em que o servidor está escutando
+        """
+        if socket_unix:
+            if os.path.exists(socket_unix):
+                os.remove(socket_unix)
+            self.servidor = await asyncio.start_unix_server(self._atender, path=socket_unix)
+            return socket_unix
+        self.servidor = await asyncio.start_server(self._atender, host, porta)
+        host, porta = self.servidor.sockets[0].getsockname()[:2]
+        return f'http://{host}:{porta}'
+
+    async def encerrar(self):
+        """
+        Para de aceitar conexões e cancela as filas de lotes.
+        """
+        for agrupador in self.agrupadores.values():
+            agrupador.cancelar()
+        if self.servidor is not None:
+            self.servidor.close()
+            await self.servidor.wait_closed()
+
+
+def prever_remoto(linhas, modelo, regiao=None, versao=None, host=HOST, porta=PORTA, tempo_limite=30):
+    """
+    Envia um pedido de previsão a um servidor em execução (cliente síncrono).
+
+    Args:
+        linhas (list): Linhas de características (listas ou dicionários)
+        modelo (str): Nome do modelo (ex.: 'coordenadas_rf')
+        regiao (str, opcional): Região do modelo (ex.: 'amazonia')
+        versao (int, opcional): Versão do artefato; a mais recente se omitida
+
+    Returns:
+        dict: Resposta do servidor
+    """
+    import urllib.request
+
+    corpo = json.dumps({'modelo': modelo, 'regiao': regiao, 'versao': versao, 'linhas': linhas}).encode()
+    pedido = urllib.request.Request(f'http://{host}:{porta}/prever', data=corpo,
+                                    headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(pedido, timeout=tempo_limite) as resposta:
+        return json.loads(resposta.read())
+
+
+async def _analista_simulado(porta, pedidos):
+    """
+    Envia pedidos em sequência por uma conexão keep-alive (usado na demonstração).
+    """
+    leitor, escritor = await asyncio.open_connection(HOST, porta)
+    try:
+        for pedido in pedidos:
+            corpo = json.dumps(pedido).encode()
+            escritor.write((f"POST /prever HTTP/1.1\r\nHost: {HOST}\r\n"
+                            f"Content-Length: {len(corpo)}\r\n\r\n").encode() + corpo)
+            await escritor.drain()
+            tamanho = 0
+            while True:
+                cabecalho = await leitor.readline()
+                if cabecalho in (b'\r\n', b''):
+                    break
+                if cabecalho.lower().startswith(b'content-length:'):
+                    tamanho = int(cabecalho.split(b':')[1])
+            resposta = json.loads(await leitor.readexactly(tamanho))
+            if 'erro' in resposta:
+                raise RuntimeError(resposta['erro'])
+    finally:
+        escritor.close()
+
+
+async def _demonstrar(diretorio, regioes, caracteristicas, n_analistas=32, pedidos_por_analista=20):
+    """
+    Compara o servidor com e sem agrupamento sob pedidos concorrentes pequenos.
+    """
+    rng = np.random.default_rng(42)
+    carga = [[{'modelo': 'coordenadas_rf', 'regiao': regioes[(analista + i) % len(regioes)],
+               'linhas': rng.normal(size=(int(rng.integers(1, 9)), len(caracteristicas))).tolist()}
+              for i in range(pedidos_por_analista)]
+             for analista in range(n_analistas)]
+
+    for max_lote, descricao in ((1, 'sem agrupamento'), (MAX_LOTE, f'lotes de até {MAX_LOTE} linhas')):
+        servidor = ServidorInferencia(diretorio, max_lote=max_lote)
+        endereco = await servidor.iniciar(porta=0)
+        porta = int(endereco.rsplit(':', 1)[1])
+        inicio = time.perf_counter()
+        await asyncio.gather(*(_analista_simulado(porta, pedidos) for pedidos in carga))
+        tempo = time.perf_counter() - inicio
+        resumo = servidor.resumir()['geral']
+        print(f"  {descricao}: {resumo['pedidos']} pedidos ({resumo['linhas']} linhas) em {tempo:.2f} s, "
+              f"{resumo['lotes']} lotes ({resumo['linhas_por_lote']:.1f} linhas/lote), "
+              f"latência p50 {resumo['latencia_p50_ms']:.1f} ms, p95 {resumo['latencia_p95_ms']:.1f} ms, "
+              f"p99 {resumo['latencia_p99_ms']:.1f} ms")
+        await servidor.encerrar()
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Servidor local de inferência para previsão de coordenadas')
+    parser.add_argument('--host', default=HOST, help='Endereço de escuta')
+    parser.add_argument('--porta', type=int, default=PORTA, help='Porta HTTP')
+    parser.add_argument('--socket', default=None, help='Caminho de um socket Unix (em vez de host e porta)')
+    parser.add_argument('--modelos', default=MODELOS_DIR, help='Diretório dos artefatos de modelos')
+    parser.add_argument('--max-lote', type=int, default=MAX_LOTE, help='Linhas máximas por lote')
+    parser.add_argument('--espera-ms', type=float, default=ESPERA_MAX_MS, help='Espera máxima para completar um lote')
+    parser.add_argument('--max-modelos', type=int, default=MAX_MODELOS, help='Versões de modelos mantidas em memória')
+    parser.add_argument('--demonstracao', action='store_true',
+                        help='Treina modelos pequenos em um diretório temporário e mede o servidor com pedidos simulados')
+    args = parser.parse_args()
+
+    if args.demonstracao:
+        import shutil
+        import tempfile
+        from artefatos_modelos import salvar_artefato
+        from previsao_coordenadas_final import gerar_dados_simulados, treinar_modelo_rf
+
+        print("Demonstrando o servidor de inferência...")
+        diretorio = tempfile.mkdtemp(prefix='modelos_')
+        regioes = ['amazonia', 'xingu']
+        try:
+            for regiao in regioes:
+                X, y = gerar_dados_simulados(n_amostras=200)
+                modelo_lat, modelo_lon = treinar_modelo_rf(X, y)
+                salvar_artefato(f'coordenadas_rf_{regiao}', {'latitude': modelo_lat, 'longitude': modelo_lon},
+                                X.columns, metadados={'regiao': regiao}, diretorio=diretorio)
+            asyncio.run(_demonstrar(diretorio, regioes, list(X.columns)))
+        finally:
+            shutil.rmtree(diretorio)
+        print("Processamento concluído.")
+    else:
+        async def servir():
+            servidor = ServidorInferencia(args.modelos, args.max_lote, args.espera_ms, args.max_modelos)
+            endereco = await servidor.iniciar(args.host, args.porta, args.socket)
+            print(f"Servidor de inferência escutando em {endereco}")
+            print(f"Modelos disponíveis: {', '.join(listar_artefatos(args.modelos)) or 'nenhum'}")
+            async with servidor.servidor:
+                await servidor.servidor.serve_forever()
+
+        try:
+            asyncio.run(servir())
+        except KeyboardInterrupt:
+            print("Servidor encerrado.")
@@ -0,0 +1,524 @@
+# Superfície de Probabilidade de Sítios Arqueológicos
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script aplica os dois métodos de classificação de
+# previsao_coordenadas_corrigido.py a todas as células de uma grade regular sobre a caixa
+# de uma região (amazonia, acre, xingu, tapajos), em vez de a algumas centenas de pontos
+# sorteados. A grade é percorrida em tiles dimensionados pelo orçamento de memória: as
+# características de cada tile são calculadas, classificadas pelos dois métodos e
+# descartadas, e os resultados vão direto para arrays .npy mapeados em disco. São gravados
+# um raster de probabilidade (média dos dois métodos), um raster de concordância entre os
+# métodos e a lista dos k melhores candidatos (no máximo um por bloco da grade).
+
+import os
+import json
+import math
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.colors import ListedColormap
+from scipy.special import gammaincinv, ndtr
+from sklearn.model_selection import train_test_split
+
+from agendador_tiles import ArenaCompartilhada, mapear_com_arena, numero_processos
+from deteccao_sitios import criar_diretorio_se_nao_existir
+from geodesia import RAIO_TERRA_KM
+import instrumentacao
+from leitor_geotiff import Transformacao, escrever_geotiff, pixel_para_coordenada
+from previsao_coordenadas_corrigido import (COLUNAS, LIMITES_REGIOES, distancia_sitio_proximo,
+                                            gerar_coordenadas_simuladas, gerar_dados_treinamento,
+                                            treinar_metodo_1_ambiental, treinar_metodo_2_espacial)
+from processamento_tiles import calcular_tamanho_tile, iterar_tiles
+
+# Diretório para salvar resultados
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'superficie')
+
+# Comprimento de um grau de latitude (esfera de raio médio)
+GRAU_KM = math.pi * RAIO_TERRA_KM / 180.0
+
+# Resolução padrão da grade (metros) e orçamento de memória por tile
+RESOLUCAO_M = 30.0
+MEMORIA_MAX_MB = 256
+
+# Estimativa conservadora de bytes de trabalho por célula do tile: coordenadas,
+# características (DataFrame, cópia com Dist_Sitio_Proximo e matriz imputada),
+# conversões internas do scikit-learn e probabilidades dos dois métodos
+BYTES_POR_CELULA = 768
+
+# Candidatos: quantidade e lado dos blocos da grade (no máximo um candidato por
+# bloco; candidatos de blocos vizinhos podem ficar a menos que isso um do outro)
+TOP_K = 100
+ESPACAMENTO_CANDIDATOS_M = 1000.0
+
+# Códigos do raster de concordância (bits: 1 = Método 1 prevê sítio, 2 = Método 2)
+CONCORDANCIA_NENHUM = 0
+CONCORDANCIA_METODO_1 = 1
+CONCORDANCIA_METODO_2 = 2
+CONCORDANCIA_AMBOS = 3
+
+# Campos simulados: número de ondas somadas e comprimentos de onda (km)
+N_ONDAS = 8
+COMPRIMENTO_ONDA_KM = (2.0, 100.0)
+
+
+def definir_grade(limites, resolucao_m=RESOLUCAO_M):
+    """
+    Define a grade geográfica (EPSG:4326) que cobre uma caixa de coordenadas.
+
+    As células são quadradas em graus, com lado resolucao_m medido ao longo do
+    meridiano (1 segundo de arco ≈ 31 m); na latitude da Amazônia, o lado leste-oeste
+    difere menos de 2% disso.
+
+    Args:
+        limites (tuple): (lat_min, lat_max, lon_min, lon_max)
+        resolucao_m (float): Lado da célula em metros
+
+    Returns:
+        tuple: (Transformacao da grade, forma (linhas, colunas))
+    """
+    lat_min, lat_max, lon_min, lon_max = limites
+    passo = resolucao_m / 1000.0 / GRAU_KM
+    linhas = int(math.ceil((lat_max - lat_min) / passo - 1e-9))
+    colunas = int(math.ceil((lon_max - lon_min) / passo - 1e-9))
+    return Transformacao(lon_min, passo, 0.0, lat_max, 0.0, -passo), (linhas, colunas)
+
+
+def _campo_normal(lat, lon, semente):
+    """
+    Campo espacial suave e determinístico, com distribuição aproximadamente normal padrão.
+
+    Soma N_ONDAS ondas planas com direções, comprimentos e fases sorteados pela
+    semente; a mesma coordenada recebe sempre o mesmo valor, em qualquer tile.
+    """
+    rng = np.random.default_rng(semente)
+    angulos = rng.uniform(0, 2 * np.pi, N_ONDAS)
+    comprimentos = np.exp(rng.uniform(*np.log(COMPRIMENTO_ONDA_KM), N_ONDAS))
+    fases = rng.uniform(0, 2 * np.pi, N_ONDAS)
+    y_km = lat * GRAU_KM
+    x_km = lon * GRAU_KM * np.cos(np.radians(lat))
+    campo = np.zeros(np.shape(lat))
+    for angulo, comprimento, fase in zip(angulos, comprimentos, fases):
+        campo += np.cos(2 * np.pi * (x_km * np.cos(angulo) + y_km * np.sin(angulo)) / comprimento + fase)
+    # Cada cosseno com fase uniforme tem variância 1/2
+    return campo / np.sqrt(N_ONDAS / 2)
+
+
+def caracteristicas_simuladas(lat, lon, semente=42):
+    """
+    Calcula as características ambientais simuladas de cada coordenada.
+
+    Cada característica é um campo suave da posição cujas distribuições
+    marginais seguem as de gerar_dados_treinamento (uniforme, exponencial,
+    gama, beta, categórica e normais). Em dados reais, esta função é substituída
+    por uma que lê as camadas (MDE, hidrografia, NDVI, ...) nas mesmas coordenadas.
+
+    Args:
+        lat, lon (numpy.ndarray): Coordenadas das células
+        semente (int): Semente dos campos
+
+    Returns:
+        pandas.DataFrame: Colunas COLUNAS, uma linha por coordenada
+    """
+    z = [_campo_normal(lat, lon, semente + i) for i in range(len(COLUNAS))]
+    u = [np.clip(ndtr(campo), 1e-9, 1 - 1e-9) for campo in z]
+    return pd.DataFrame({
+        'Elevacao': 50 + 250 * u[0],
+        'Dist_Rios': -5 * np.log1p(-u[1]),
+        'Declividade': 2 * gammaincinv(2, u[2]),
+        # Inversa da beta(2, 2), cuja distribuição acumulada é 3x² - 2x³
+        'NDVI': 0.5 + np.sin(np.arcsin(2 * u[3] - 1) / 3),
+        'Tipo_Solo': np.floor(4 * u[4]),
+        'Precipitacao': 2000 + 500 * z[5],
+        'Temperatura': 25 + 3 * z[6],
+    }, columns=COLUNAS)
+
+
+def treinar_metodos(regiao, n_amostras=2000, ruido=0.3, semente=42):
+    """
+    Treina os dois métodos como em demonstrar_previsao_coordenadas.
+
+    Args:
+        regiao (str): Região das coordenadas simuladas de treinamento
+        n_amostras (int): Número de amostras simuladas
+        ruido (float): Nível de ruído dos rótulos
+        semente (int): Semente do gerador aleatório
+
+    Returns:
+        dict: Modelo do Método 1, modelo e imputação do Método 2 e sítios conhecidos
+    """
+    np.random.seed(semente)
+    X, y = gerar_dados_treinamento(n_amostras=n_amostras, ruido=ruido)
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.3, random_state=semente)
+    coords_train = gerar_coordenadas_simuladas(len(X_train), regiao)
+    modelo_2, imputer, sitios_conhecidos = treinar_metodo_2_espacial(X_train, y_train, coords_train)
+    return {
+        'modelo_1': treinar_metodo_1_ambiental(X_train, y_train),
+        'modelo_2': modelo_2,
+        'imputer': imputer,
+        'sitios_conhecidos': sitios_conhecidos,
+    }
+
+
+def _probabilidade_sitio(modelo, X):
+    """
+    Probabilidade da classe 1 (sítio) prevista por um classificador.
+    """
+    return modelo.predict_proba(X)[:, list(modelo.classes_).index(1)]
+
+
+def classificar_celulas(lat, lon, modelos, fonte_caracteristicas=caracteristicas_simuladas):
+    """
+    Aplica os dois métodos a um conjunto de células.
+
+    Args:
+        lat, lon (numpy.ndarray): Coordenadas (1D) das células
+        modelos (dict): Resultado de treinar_metodos
+        fonte_caracteristicas (callable): Função (lat, lon) -> DataFrame com COLUNAS
+
+    Returns:
+        tuple: (probabilidade do Método 1, probabilidade do Método 2)
+    """
+    X = fonte_caracteristicas(lat, lon)
+    p1 = _probabilidade_sitio(modelos['modelo_1'], X)
+    X['Dist_Sitio_Proximo'] = distancia_sitio_proximo(np.column_stack((lat, lon)), modelos['sitios_conhecidos'])
+    p2 = _probabilidade_sitio(modelos['modelo_2'], modelos['imputer'].transform(X))
+    return p1, p2
+
+
+def candidatos_do_tile(probabilidade, concordancia, p1, p2, origem, bloco, k):
+    """
+    Seleciona os melhores candidatos de um tile, no máximo um por bloco da grade.
+
+    Apenas células em que os dois métodos preveem sítio concorrem. Os blocos são
+    alinhados à grade inteira (o tile começa em um múltiplo de bloco), então
+    tiles vizinhos nunca disputam o mesmo bloco.
+
+    Args:
+        probabilidade, concordancia, p1, p2 (numpy.ndarray): Rasters 2D do tile
+        origem (tuple): (linha, coluna) do canto do tile na grade
+        bloco (int): Lado do bloco em células
+        k (int): Número máximo de candidatos
+
+    Returns:
+        dict: Arrays 'linha', 'coluna', 'probabilidade', 'prob_metodo_1' e 'prob_metodo_2'
+    """
+    altura, largura = probabilidade.shape
+    nby, nbx = -(-altura // bloco), -(-largura // bloco)
+    pontuacao = np.full((nby * bloco, nbx * bloco), -1.0)
+    pontuacao[:altura, :largura] = np.where(concordancia == CONCORDANCIA_AMBOS, probabilidade, -1.0)
+    blocos = pontuacao.reshape(nby, bloco, nbx, bloco).transpose(0, 2, 1, 3).reshape(nby, nbx, bloco * bloco)
+    posicao = blocos.argmax(axis=2)
+    melhor = np.take_along_axis(blocos, posicao[..., None], axis=2)[..., 0]
+
+    by, bx = np.nonzero(melhor >= 0)
+    if len(by) > k:
+        escolhidos = np.argpartition(-melhor[by, bx], k - 1)[:k]
+        by, bx = by[escolhidos], bx[escolhidos]
+    linha = by * bloco + posicao[by, bx] // bloco
+    coluna = bx * bloco + posicao[by, bx] % bloco
+    return {
+        'linha': linha + origem[0],
+        'coluna': coluna + origem[1],
+        'probabilidade': probabilidade[linha, coluna],
+        'prob_metodo_1': p1[linha, coluna],
+        'prob_metodo_2': p2[linha, coluna],
+    }
+
+
+# Saídas abertas por cada processo trabalhador, reaproveitadas entre tarefas
+_SAIDAS_ABERTAS = {}
+
+
+def _abrir_saida(caminho):
+    """
+    Abre (uma única vez por processo) um .npy de saída mapeado em memória para escrita.
+    """
+    if caminho not in _SAIDAS_ABERTAS:
+        _SAIDAS_ABERTAS[caminho] = np.load(caminho, mmap_mode='r+')
+    return _SAIDAS_ABERTAS[caminho]
+
+
+def _fechar_saidas():
+    """
+    Grava e descarta as saídas abertas por _abrir_saida neste processo.
+
+    A chave é apenas o caminho: sem isso, uma nova superfície gravada no mesmo
+    arquivo (outra resolução, por exemplo) reaproveitaria o mapeamento antigo.
+    """
+    for saida in _SAIDAS_ABERTAS.values():
+        saida.flush()
+    _SAIDAS_ABERTAS.clear()
+
+
+def _pontuar_tile_tarefa(arrays, tile, plano):
+    """
+    Tarefa do agendador: classifica as células de um tile e escreve os rasters em disco.
+
+    Returns:
+        dict: Candidatos do tile (ver candidatos_do_tile)
+    """
+    linhas, colunas = tile.interior
+    forma = (linhas.stop - linhas.start, colunas.stop - colunas.start)
+    lon, lat = pixel_para_coordenada(plano['transformacao'],
+                                     np.arange(linhas.start, linhas.stop)[:, None] + 0.5,
+                                     np.arange(colunas.start, colunas.stop)[None, :] + 0.5)
+    lat = np.broadcast_to(lat, forma).ravel()
+    lon = np.broadcast_to(lon, forma).ravel()
+
+    p1, p2 = classificar_celulas(lat, lon, plano['modelos'], plano['fonte_caracteristicas'])
+    p1, p2 = p1.reshape(forma), p2.reshape(forma)
+    probabilidade = ((p1 + p2) / 2).astype(np.float32)
+    concordancia = ((p1 > 0.5) * CONCORDANCIA_METODO_1 + (p2 > 0.5) * CONCORDANCIA_METODO_2).astype(np.uint8)
+
+    _abrir_saida(plano['caminhos']['probabilidade'])[tile.interior] = probabilidade
+    _abrir_saida(plano['caminhos']['concordancia'])[tile.interior] = concordancia
+    return candidatos_do_tile(probabilidade, concordancia, p1, p2,
+                              (linhas.start, colunas.start), plano['bloco'], plano['k'])
+
+
+def planejar_superficie(regiao='xingu', resolucao_m=RESOLUCAO_M, memoria_max_mb=MEMORIA_MAX_MB,
+                        espacamento_m=ESPACAMENTO_CANDIDATOS_M, limites=None):
+    """
+    Calcula a grade, o tamanho dos tiles e o espaço em disco de uma superfície.
+
+    Args:
+        regiao (str): Região de LIMITES_REGIOES
+        resolucao_m (float): Lado da célula em metros
+        memoria_max_mb (float): Orçamento de memória por tile (por processo)
+        espacamento_m (float): Lado dos blocos de candidatos, em metros
+        limites (tuple, opcional): Caixa (lat_min, lat_max, lon_min, lon_max) no lugar da região
+
+    Returns:
+        dict: Transformação, forma, lado do bloco e do tile, número de tiles e células
+    """
+    if limites is None:
+        if regiao not in LIMITES_REGIOES:
+            raise ValueError("Região não reconhecida")
+        limites = LIMITES_REGIOES[regiao]
+    transformacao, forma = definir_grade(limites, resolucao_m)
+    bloco = max(1, int(round(espacamento_m / resolucao_m)))
+    tamanho_tile = calcular_tamanho_tile(memoria_max_mb, 0, multiplo=bloco, bytes_por_pixel=BYTES_POR_CELULA)
+    n_celulas = forma[0] * forma[1]
+    return {
+        'regiao': regiao,
+        'limites': list(limites),
+        'resolucao_m': resolucao_m,
+        'transformacao': transformacao,
+        'forma': forma,
+        'bloco': bloco,
+        'tamanho_tile': tamanho_tile,
+        'n_tiles': -(-forma[0] // tamanho_tile) * -(-forma[1] // tamanho_tile),
+        'n_celulas': n_celulas,
+        # float32 (probabilidade) + uint8 (concordância)
+        'disco_gb': n_celulas * 5 / 1024 ** 3,
+    }
+
+
+@instrumentacao.instrumentar('superficie_probabilidade')
+def gerar_superficie(regiao='xingu', dir_saida=RESULTS_DIR, resolucao_m=RESOLUCAO_M,
+                     memoria_max_mb=MEMORIA_MAX_MB, n_processos=1, k=TOP_K,
+                     espacamento_m=ESPACAMENTO_CANDIDATOS_M, modelos=None,
+                     fonte_caracteristicas=caracteristicas_simuladas, limites=None):
+    """
+    Classifica todas as células da grade de uma região e grava os resultados.
+
+    A memória de cada processo fica limitada ao tile (memoria_max_mb): os rasters
+    de saída são arrays .npy mapeados em disco, preenchidos tile a tile, e de cada
+    tile só voltam ao processo principal os seus k melhores candidatos.
+
+    Args:
+        regiao (str): Região de LIMITES_REGIOES
+        dir_saida (str): Diretório de saída
+        resolucao_m (float): Lado da célula em metros
+        memoria_max_mb (float): Orçamento de memória por tile (por processo)
+        n_processos (int, opcional): Número de processos (None = todos os núcleos)
+        k (int): Número de candidatos da lista final
+        espacamento_m (float): No máximo um candidato por bloco deste lado
+        modelos (dict, opcional): Resultado de treinar_metodos (treinados se omitido)
+        fonte_caracteristicas (callable): Função (lat, lon) -> DataFrame com COLUNAS,
+            definida no nível de módulo
+        limites (tuple, opcional): Caixa (lat_min, lat_max, lon_min, lon_max) no lugar da região
+
+    Returns:
+        dict: Resumo da execução (grade, arquivos gravados, tempo e taxa de células)
+    """
+    plano = planejar_superficie(regiao, resolucao_m, memoria_max_mb, espacamento_m, limites)
+    criar_diretorio_se_nao_existir(dir_saida)
+    if modelos is None:
+        modelos = treinar_metodos(regiao)
+
+    caminhos = {
+        'probabilidade': os.path.join(dir_saida, f'probabilidade_{regiao}.npy'),
+        'concordancia': os.path.join(dir_saida, f'concordancia_{regiao}.npy'),
+    }
+    for nome, dtype in (('probabilidade', np.float32), ('concordancia', np.uint8)):
+        # Criar o arquivo sem preenchê-lo: cada tile escreve a sua parte
+        saida = np.lib.format.open_memmap(caminhos[nome], mode='w+', dtype=dtype, shape=plano['forma'])
+        del saida
+
+    parametros = {
+        'transformacao': plano['transformacao'],
+        'caminhos': caminhos,
+        'modelos': modelos,
+        'fonte_caracteristicas': fonte_caracteristicas,
+        'bloco': plano['bloco'],
+        'k': k,
+    }
+    tiles = list(iterar_tiles(plano['forma'], plano['tamanho_tile'], 0))
+    inicio = time.time()
+    # Com n_processos=1 os tiles são escritos por este processo: os mapeamentos
+    # de uma chamada anterior não podem ser reaproveitados
+    _fechar_saidas()
+    try:
+        with ArenaCompartilhada() as arena:
+            resultados = mapear_com_arena(_pontuar_tile_tarefa, arena, tiles, n_processos, parametros)
+    finally:
+        _fechar_saidas()
+    tempo = time.time() - inicio
+
+    # Unir os candidatos dos tiles e manter os k melhores
+    candidatos = pd.DataFrame({nome: np.concatenate([r[nome] for r in resultados])
+                               for nome in resultados[0]})
+    candidatos = candidatos.nlargest(k, 'probabilidade').reset_index(drop=True)
+    lon, lat = pixel_para_coordenada(plano['transformacao'], candidatos['linha'] + 0.5,
+                                     candidatos['coluna'] + 0.5)
+    candidatos.insert(0, 'Latitude', lat)
+    candidatos.insert(1, 'Longitude', lon)
+    caminhos['candidatos'] = os.path.join(dir_saida, f'candidatos_{regiao}.csv')
+    candidatos.to_csv(caminhos['candidatos'], index=False)
+
+    resumo = {
+        'regiao': regiao,
+        'limites': plano['limites'],
+        'resolucao_m': resolucao_m,
+        'forma': list(plano['forma']),
+        'transformacao': list(plano['transformacao']),
+        'epsg': 4326,
+        'tamanho_tile': plano['tamanho_tile'],
+        'n_tiles': plano['n_tiles'],
+        'n_celulas': plano['n_celulas'],
+        'n_processos': min(numero_processos(n_processos), len(tiles)),
+        'tempo_s': tempo,
+        'celulas_por_s': plano['n_celulas'] / tempo,
+        'n_candidatos': len(candidatos),
+        'arquivos': caminhos,
+    }
+    with open(os.path.join(dir_saida, f'superficie_{regiao}.json'), 'w') as arquivo:
+        json.dump(resumo, arquivo, indent=2)
+    return resumo
+
+
+def exportar_geotiff(resumo):
+    """
+    Grava os rasters de uma superfície também como GeoTIFF (EPSG:4326).
+
+    O GeoTIFF clássico é limitado a 4 GB; para grades do tamanho da Amazônia
+    inteira, use os arquivos .npy e a transformação do resumo.
+
+    Args:
+        resumo (dict): Resultado de gerar_superficie
+
+    Returns:
+        list: Caminhos dos arquivos gravados
+    """
+    transformacao = Transformacao(*resumo['transformacao'])
+    caminhos = []
+    for nome, preditor in (('probabilidade', 3), ('concordancia', 2)):
+        raster = np.load(resumo['arquivos'][nome], mmap_mode='r')
+        caminho = os.path.splitext(resumo['arquivos'][nome])[0] + '.tif'
+        caminhos.append(escrever_geotiff(caminho, raster, transformacao, epsg=resumo['epsg'], preditor=preditor))
+    return caminhos
+
+
+def visualizar_superficie(resumo, max_pixels=1000):
+    """
+    Salva uma prévia dos rasters, lida com passo fixo para não carregar a grade inteira.
+
+    Args:
+        resumo (dict): Resultado de gerar_superficie
+        max_pixels (int): Maior dimensão da prévia
+
+    Returns:
+        str: Caminho da figura
+    """
+    passo = max(1, -(-max(resumo['forma']) // max_pixels))
+    probabilidade = np.load(resumo['arquivos']['probabilidade'], mmap_mode='r')[::passo, ::passo]
+    concordancia = np.load(resumo['arquivos']['concordancia'], mmap_mode='r')[::passo, ::passo]
+    lat_min, lat_max, lon_min, lon_max = resumo['limites']
+    extensao = (lon_min, lon_max, lat_min, lat_max)
+    candidatos = pd.read_csv(resumo['arquivos']['candidatos'])
+
+    fig, eixos = plt.subplots(1, 2, figsize=(16, 7))
+    imagem = eixos[0].imshow(probabilidade, extent=extensao, cmap='viridis', vmin=0, vmax=1)
+    eixos[0].scatter(candidatos['Longitude'], candidatos['Latitude'], s=12, facecolors='none',
+                     edgecolors='red', label=f'{len(candidatos)} melhores candidatos')
+    eixos[0].set_title('Probabilidade de sítio (média dos dois métodos)')
+    eixos[0].legend(loc='upper right')
+    fig.colorbar(imagem, ax=eixos[0], fraction=0.046)
+    cores = ListedColormap(['lightgray', 'cyan', 'purple', 'blue'])
+    imagem = eixos[1].imshow(concordancia, extent=extensao, cmap=cores, vmin=-0.5, vmax=3.5,
+                             interpolation='nearest')
+    eixos[1].set_title('Concordância entre os métodos')
+    barra = fig.colorbar(imagem, ax=eixos[1], fraction=0.046, ticks=range(4))
+    barra.ax.set_yticklabels(['Nenhum', 'Só Método 1', 'Só Método 2', 'Ambos'])
+    for eixo in eixos:
+        eixo.set_xlabel('Longitude')
+        eixo.set_ylabel('Latitude')
+    fig.suptitle(f"Superfície de probabilidade - Região: {resumo['regiao'].title()} "
+                 f"({resumo['resolucao_m']:g} m)")
+    caminho = os.path.join(os.path.dirname(resumo['arquivos']['probabilidade']),
+                           f"superficie_{resumo['regiao']}.png")
+    fig.savefig(caminho, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    return caminho
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Superfície de probabilidade de sítios sobre a grade de uma região")
+    parser.add_argument('--regiao', choices=list(LIMITES_REGIOES), default='xingu',
+                        help="Região cuja caixa é coberta pela grade")
+    parser.add_argument('--resolucao', type=float, default=RESOLUCAO_M,
+                        help="Lado da célula em metros")
+    parser.add_argument('--memoria-max-mb', type=float, default=MEMORIA_MAX_MB,
+                        help="Orçamento de memória por tile (por processo)")
+    parser.add_argument('--processos', type=int, default=None,
+                        help="Número de processos (padrão: todos os núcleos)")
+    parser.add_argument('--top-k', type=int, default=TOP_K,
+                        help="Número de candidatos da lista final")
+    parser.add_argument('--espacamento', type=float, default=ESPACAMENTO_CANDIDATOS_M,
+                        help="Lado dos blocos com no máximo um candidato, em metros")
+    parser.add_argument('--geotiff', action='store_true',
+                        help="Gravar também os rasters em GeoTIFF (até 4 GB)")
+    parser.add_argument('--apenas-plano', action='store_true',
+                        help="Apenas mostrar a grade, os tiles e o espaço em disco de cada região")
+    argumentos = parser.parse_args()
+
+    regioes = list(LIMITES_REGIOES) if argumentos.apenas_plano else [argumentos.regiao]
+    for regiao in regioes:
+        plano = planejar_superficie(regiao, argumentos.resolucao, argumentos.memoria_max_mb, argumentos.espacamento)
+        print(f"Região {regiao}: grade de {plano['forma'][0]} x {plano['forma'][1]} células "
+              f"({plano['n_celulas'] / 1e6:.1f} milhões) a {argumentos.resolucao:g} m, "
+              f"{plano['n_tiles']} tiles de {plano['tamanho_tile']} células, "
+              f"{plano['disco_gb']:.2f} GB em disco")
+    if argumentos.apenas_plano:
+        raise SystemExit(0)
+
+    print("Treinando os dois métodos...")
+    modelos = treinar_metodos(argumentos.regiao)
+    print("Classificando a grade...")
+    resumo = gerar_superficie(argumentos.regiao, RESULTS_DIR, argumentos.resolucao, argumentos.memoria_max_mb,
+                              argumentos.processos, argumentos.top_k, argumentos.espacamento, modelos)
+    print(f"  {resumo['n_celulas']} células em {resumo['tempo_s']:.1f} s "
+          f"({resumo['celulas_por_s'] / 1e3:.0f} mil células/s, {resumo['n_processos']} processo(s))")
+    print(f"  {resumo['n_candidatos']} candidatos em {resumo['arquivos']['candidatos']}")
+    if argumentos.geotiff:
+        for caminho in exportar_geotiff(resumo):
+            print(f"  GeoTIFF: {caminho}")
+    print(f"  Prévia: {visualizar_superficie(resumo)}")
+    print(f"Processamento concluído. Resultados salvos em: {RESULTS_DIR}")
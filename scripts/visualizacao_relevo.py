@@ -0,0 +1,332 @@
+# Visualizações de Relevo para Arqueologia
+# Autor: Amazônia Explorer
+# Data: Junho 2025
+# Descrição: Este script gera, a partir de um MDT, as visualizações usadas por arqueólogos
+# para enxergar estruturas de terra de baixo relevo: modelo de relevo local (MDT menos a
+# tendência de grande escala, calculada com tabelas de somas acumuladas), fator de visão
+# do céu (varredura do horizonte em raio limitado, vetorizada sobre as direções) e
+# sombreamento de múltiplos azimutes. Os operadores rodam em tiles com halo, em paralelo,
+# sobre blocos completos de levantamento.
+
+import os
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import ndimage
+
+from agendador_tiles import ArenaCompartilhada, mapear_com_arena, numero_processos
+from deteccao_sitios import criar_diretorio_se_nao_existir
+from processamento_tiles import (
+    abrir_raster,
+    calcular_tamanho_tile,
+    iterar_tiles,
+    _abrir_em_trabalhador,
+)
+
+# Diretório para salvar resultados
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'resultados', 'relevo')
+
+PRODUTOS = ('relevo_local', 'visao_ceu', 'sombreamento')
+
+
+def media_caixa(imagem, raio):
+    """
+    Calcula a média em janelas quadradas de lado 2·raio + 1 com uma tabela de somas acumuladas.
+
+    O custo não depende do raio: cada média sai de quatro consultas à tabela.
+    Nas bordas da imagem a janela é truncada e a média usa apenas os pixels
+    existentes.
+
+    Args:
+        imagem (numpy.ndarray): Imagem de entrada
+        raio (int): Raio da janela em pixels
+
+    Returns:
+        numpy.ndarray: Média local (float64)
+    """
+    altura, largura = imagem.shape
+    tabela = np.zeros((altura + 1, largura + 1), dtype=np.float64)
+    np.cumsum(imagem, axis=0, dtype=np.float64, out=tabela[1:, 1:])
+    np.cumsum(tabela[1:, 1:], axis=1, out=tabela[1:, 1:])
+
+    # Limites (exclusivos) da janela de cada linha e coluna, truncados na imagem
+    y0 = np.clip(np.arange(altura) - raio, 0, altura)
+    y1 = np.clip(np.arange(altura) + raio + 1, 0, altura)
+    x0 = np.clip(np.arange(largura) - raio, 0, largura)
+    x1 = np.clip(np.arange(largura) + raio + 1, 0, largura)
+
+    soma = (tabela[y1[:, None], x1[None, :]] - tabela[y0[:, None], x1[None, :]]
+            - tabela[y1[:, None], x0[None, :]] + tabela[y0[:, None], x0[None, :]])
+    contagem = (y1 - y0)[:, None] * (x1 - x0)[None, :]
+    return soma / contagem
+
+
+def relevo_local(mdt, raio=20):
+    """
+    Calcula o modelo de relevo local: o MDT menos a sua tendência de grande escala.
+
+    Args:
+        mdt (numpy.ndarray): Modelo digital do terreno
+        raio (int): Raio, em pixels, da janela que define a tendência (maior que
+            as estruturas procuradas)
+
+    Returns:
+        numpy.ndarray: Relevo local em unidades de elevação (float32)
+    """
+    mdt = np.asarray(mdt, dtype=np.float64)
+    return (mdt - media_caixa(mdt, raio)).astype(np.float32)
+
+
+def deslocamentos_horizonte(raio, n_direcoes=16):
+    """
+    Calcula os deslocamentos inteiros de cada passo da varredura do horizonte.
+
+    Args:
+        raio (int): Raio da varredura em pixels
+        n_direcoes (int): Número de direções igualmente espaçadas
+
+    Returns:
+        tuple: (dy, dx, distancia), arrays (passos, direções); a distância é a do
+            pixel efetivamente amostrado, em pixels
+    """
+    angulos = 2 * np.pi * np.arange(n_direcoes) / n_direcoes
+    passos = np.arange(1, raio + 1)[:, None]
+    dy = np.rint(-passos * np.cos(angulos)).astype(np.intp)
+    dx = np.rint(passos * np.sin(angulos)).astype(np.intp)
+    return dy, dx, np.hypot(dy, dx)
+
+
+def fator_visao_ceu(mdt, raio=10, n_direcoes=16, resolucao=1.0):
+    """
+    Calcula o fator de visão do céu (SVF) por varredura do horizonte em raio limitado.
+
+    Em cada passo da varredura, as cotas das n_direcoes posições deslocadas são
+    reunidas de uma só vez a partir de uma vista deslizante (sem cópia) do MDT
+    preenchido, e a maior tangente de elevação de cada direção é atualizada no
+    mesmo array (direções, altura, largura). O SVF é 1 menos a média do seno do
+    ângulo do horizonte (horizontes abaixo da horizontal contam como zero), de
+    modo que terreno plano vale 1 e fundos de valas e fossos ficam mais escuros.
+
+    Args:
+        mdt (numpy.ndarray): Modelo digital do terreno
+        raio (int): Raio da varredura em pixels
+        n_direcoes (int): Número de direções
+        resolucao (float): Lado do pixel, na mesma unidade das cotas
+
+    Returns:
+        numpy.ndarray: Fator de visão do céu em [0, 1] (float32)
+    """
+    mdt = np.asarray(mdt, dtype=np.float32)
+    altura, largura = mdt.shape
+    dy, dx, distancia = deslocamentos_horizonte(raio, n_direcoes)
+
+    # Fora do raster não há horizonte: NaN é ignorado por fmax
+    preenchido = np.pad(mdt, raio, constant_values=np.nan)
+    vistas = sliding_window_view(preenchido, (altura, largura))
+
+    tangente_max = np.zeros((n_direcoes, altura, largura), dtype=np.float32)
+    for passo in range(raio):
+        cotas = vistas[raio + dy[passo], raio + dx[passo]]
+        cotas -= mdt
+        cotas *= (1.0 / (distancia[passo] * resolucao)).astype(np.float32)[:, None, None]
+        np.fmax(tangente_max, cotas, out=tangente_max)
+
+    # sen(arctan(t)) = t / sqrt(1 + t²)
+    seno = tangente_max / np.sqrt(1 + tangente_max * tangente_max)
+    return (1 - seno.mean(axis=0)).astype(np.float32)
+
+
+def sombreamento_multidirecional(mdt, n_azimutes=8, elevacao_solar=35.0, resolucao=1.0):
+    """
+    Calcula a média do sombreamento do relevo sob vários azimutes de iluminação.
+
+    Com um único azimute, estruturas lineares paralelas à luz desaparecem; a
+    média de azimutes igualmente espaçados elimina essa dependência. As
+    derivadas usam o operador de Horn (Sobel / 8) e todos os azimutes são
+    avaliados de uma só vez por difusão de eixos.
+
+    Args:
+        mdt (numpy.ndarray): Modelo digital do terreno
+        n_azimutes (int): Número de azimutes igualmente espaçados a partir do norte
+        elevacao_solar (float): Elevação da fonte de luz, em graus
+        resolucao (float): Lado do pixel, na mesma unidade das cotas
+
+    Returns:
+        numpy.ndarray: Sombreamento em [0, 1] (float32)
+    """
+    mdt = np.asarray(mdt, dtype=np.float64)
+    # Eixo x para o leste e eixo y para o norte (as linhas crescem para o sul)
+    dz_dx = ndimage.sobel(mdt, axis=1, mode='nearest') / (8 * resolucao)
+    dz_dy = -ndimage.sobel(mdt, axis=0, mode='nearest') / (8 * resolucao)
+    norma = np.sqrt(1 + dz_dx * dz_dx + dz_dy * dz_dy)
+
+    azimutes = np.deg2rad(360.0 * np.arange(n_azimutes) / n_azimutes)[:, None, None]
+    elevacao = np.deg2rad(elevacao_solar)
+    luz_x = np.cos(elevacao) * np.sin(azimutes)
+    luz_y = np.cos(elevacao) * np.cos(azimutes)
+
+    # Normal (-dz/dx, -dz/dy, 1) / norma · direção da luz, para todos os azimutes
+    iluminacao = (np.sin(elevacao) - dz_dx * luz_x - dz_dy * luz_y) / norma
+    return np.clip(iluminacao, 0, 1).mean(axis=0).astype(np.float32)
+
+
+def calcular_halo_relevo(produtos, raio_relevo=20, raio_visao=10):
+    """
+    Calcula o halo que torna os produtos em tiles idênticos aos da imagem inteira.
+    """
+    halos = {'relevo_local': raio_relevo, 'visao_ceu': raio_visao, 'sombreamento': 1}
+    return max(halos[produto] for produto in produtos)
+
+
+def _visualizar_tile(mdt, tile, parametros):
+    """
+    Calcula os produtos de um tile e devolve os seus interiores.
+    """
+    janela = np.asarray(mdt[tile.janela], dtype=np.float64)
+    resultados = {}
+    for produto in parametros['produtos']:
+        if produto == 'relevo_local':
+            resultado = relevo_local(janela, parametros['raio_relevo'])
+        elif produto == 'visao_ceu':
+            resultado = fator_visao_ceu(janela, parametros['raio_visao'],
+                                        parametros['n_direcoes'], parametros['resolucao'])
+        else:
+            resultado = sombreamento_multidirecional(janela, parametros['n_azimutes'],
+                                                     parametros['elevacao_solar'],
+                                                     parametros['resolucao'])
+        resultados[produto] = resultado[tile.recorte]
+    return resultados
+
+
+def _visualizar_tile_tarefa(arrays, tile, parametros):
+    """
+    Tarefa do agendador: calcula um tile e escreve os interiores nas saídas em disco.
+    """
+    if 'mdt' in arrays:
+        mdt = arrays['mdt']
+    else:
+        mdt = _abrir_em_trabalhador(parametros['caminho_mdt'], 'r')
+
+    for produto, resultado in _visualizar_tile(mdt, tile, parametros).items():
+        _abrir_em_trabalhador(parametros['saidas'][produto], 'r+')[tile.interior] = resultado
+
+
+def gerar_visualizacoes_em_tiles(mdt, dir_saida, produtos=PRODUTOS, resolucao=1.0,
+                                 raio_relevo=20, raio_visao=10, n_direcoes=16, n_azimutes=8,
+                                 elevacao_solar=35.0, memoria_max_mb=512, tamanho_tile=None,
+                                 n_processos=1):
+    """
+    Gera as visualizações de relevo de um MDT grande, tile a tile e em paralelo.
+
+    Args:
+        mdt (str ou numpy.ndarray): Caminho de um .npy ou GeoTIFF, ou array do MDT
+        dir_saida (str): Diretório onde <produto>.npy será gravado (float32)
+        produtos (tuple): Produtos a gerar ('relevo_local', 'visao_ceu', 'sombreamento')
+        resolucao (float): Lado do pixel, na mesma unidade das cotas
+        raio_relevo (int): Raio da tendência removida do relevo local, em pixels
+        raio_visao (int): Raio da varredura do horizonte, em pixels
+        n_direcoes (int): Direções da varredura do horizonte
+        n_azimutes (int): Azimutes do sombreamento
+        elevacao_solar (float): Elevação da luz do sombreamento, em graus
+        memoria_max_mb (float): Orçamento de memória por tile em megabytes
+        tamanho_tile (int, opcional): Lado do tile; se omitido, deriva do orçamento
+        n_processos (int, opcional): Processos trabalhadores; None usa todos os núcleos
+
+    Returns:
+        dict: Caminhos por produto e resumo do processamento
+    """
+    for produto in produtos:
+        if produto not in PRODUTOS:
+            raise ValueError(f"Produto desconhecido: {produto} (use {PRODUTOS})")
+    criar_diretorio_se_nao_existir(dir_saida)
+    caminho_mdt = mdt if isinstance(mdt, str) else None
+    mdt = abrir_raster(mdt)
+
+    halo = calcular_halo_relevo(produtos, raio_relevo, raio_visao)
+    if tamanho_tile is None:
+        # A varredura do horizonte mantém até três arrays float32 por direção e o
+        # sombreamento um float64 por azimute, além das derivadas e da tabela de somas
+        bytes_por_pixel = 64 + max(12 * n_direcoes if 'visao_ceu' in produtos else 0,
+                                   8 * n_azimutes if 'sombreamento' in produtos else 0)
+        tamanho_tile = calcular_tamanho_tile(memoria_max_mb, halo, bytes_por_pixel=bytes_por_pixel)
+    tiles = list(iterar_tiles(mdt.shape, tamanho_tile, halo))
+
+    saidas = {}
+    for produto in produtos:
+        saidas[produto] = os.path.join(dir_saida, f"{produto}.npy")
+        np.lib.format.open_memmap(saidas[produto], mode='w+', dtype=np.float32,
+                                  shape=mdt.shape).flush()
+
+    parametros = {
+        'produtos': tuple(produtos),
+        'resolucao': resolucao,
+        'raio_relevo': raio_relevo,
+        'raio_visao': raio_visao,
+        'n_direcoes': n_direcoes,
+        'n_azimutes': n_azimutes,
+        'elevacao_solar': elevacao_solar,
+        'caminho_mdt': caminho_mdt,
+        'saidas': saidas,
+    }
+    if numero_processos(n_processos) == 1:
+        arrays = {produto: np.load(saidas[produto], mmap_mode='r+') for produto in produtos}
+        for tile in tiles:
+            for produto, resultado in _visualizar_tile(mdt, tile, parametros).items():
+                arrays[produto][tile.interior] = resultado
+        for array in arrays.values():
+            array.flush()
+    else:
+        with ArenaCompartilhada() as arena:
+            if caminho_mdt is None:
+                arena.copiar('mdt', mdt)
+            mapear_com_arena(_visualizar_tile_tarefa, arena, tiles, n_processos, parametros)
+
+    print(f"  {len(tiles)} tiles de {tamanho_tile}x{tamanho_tile} pixels (halo de {halo} pixels)")
+
+    return {
+        'caminhos': saidas,
+        'halo': halo,
+        'tamanho_tile': tamanho_tile,
+        'n_tiles': len(tiles),
+    }
+
+
+def salvar_visualizacoes(caminhos, diretorio=RESULTS_DIR):
+    """
+    Salva uma figura PNG de cada produto, com contraste recortado nos percentis 2-98.
+
+    Args:
+        caminhos (dict): Caminhos por produto (ver gerar_visualizacoes_em_tiles)
+        diretorio (str): Diretório de saída
+    """
+    import matplotlib.pyplot as plt
+
+    mapas = {'relevo_local': 'RdBu_r', 'visao_ceu': 'gray', 'sombreamento': 'gray'}
+    for produto, caminho in caminhos.items():
+        array = np.load(caminho, mmap_mode='r')
+        minimo, maximo = np.percentile(array, [2, 98])
+        if produto == 'relevo_local':
+            # Relevo local simétrico em torno de zero
+            maximo = max(abs(minimo), abs(maximo))
+            minimo = -maximo
+        plt.imsave(os.path.join(diretorio, f"{produto}.png"), array,
+                   cmap=mapas[produto], vmin=minimo, vmax=maximo)
+
+
+if __name__ == "__main__":
+    """
+    Ponto de entrada principal do script.
+    """
+    import time
+    from processamento_tiles import gerar_raster_simulado_em_disco
+
+    print("Iniciando geração de visualizações de relevo...")
+    criar_diretorio_se_nao_existir(RESULTS_DIR)
+    caminho_mdt = gerar_raster_simulado_em_disco(os.path.join(RESULTS_DIR, 'mdt_simulado.npy'))
+
+    inicio = time.time()
+    resumo = gerar_visualizacoes_em_tiles(caminho_mdt, RESULTS_DIR, memoria_max_mb=256,
+                                          n_processos=None)
+    print(f"Visualizações geradas em {time.time() - inicio:.1f} s")
+
+    salvar_visualizacoes(resumo['caminhos'])
+    print(f"Processamento concluído. Resultados salvos em: {RESULTS_DIR}")